@@ -0,0 +1,172 @@
+"""
+Daily activity rollup
+DailyActivity keeps one row per user per local day, upserted as learning
+events happen. Streaks walk it newest-first and stop at the first gap; the
+heatmap reads a year of it in one query.
+"""
+
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyActivity, StudySession, UserProfile
+
+STREAK_PAGE = 32  # Rows per step of the streak scan; most streaks end in the first page
+
+
+def user_timezone(name):
+    """ZoneInfo for a UserProfile.timezone value, falling back to UTC"""
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def timezone_for(user_id):
+    """The user's configured timezone"""
+    name = UserProfile.objects.filter(user_id=user_id).values_list('timezone', flat=True).first()
+    return user_timezone(name)
+
+
+def add_activity(user_id, day, minutes=0, lessons=0, quizzes=0):
+    """
+    Add to the user's activity for a local day, creating the row if needed
+
+    Args:
+        user_id (int): User the activity belongs to
+        day (date): Local calendar day
+        minutes (int): Study minutes to add
+        lessons (int): Completed lessons to add
+        quizzes (int): Completed quizzes to add
+    """
+    increments = {
+        'minutes': F('minutes') + minutes,
+        'lessons': F('lessons') + lessons,
+        'quizzes': F('quizzes') + quizzes,
+    }
+    if DailyActivity.objects.filter(user_id=user_id, local_date=day).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            DailyActivity.objects.create(
+                user_id=user_id, local_date=day, minutes=minutes, lessons=lessons, quizzes=quizzes
+            )
+    except IntegrityError:
+        # Another request created the row first
+        DailyActivity.objects.filter(user_id=user_id, local_date=day).update(**increments)
+
+
+def current_streak(user_id, today):
+    """
+    Consecutive active days ending today or yesterday
+
+    Reads DailyActivity newest-first through the (user, local_date) index, a
+    page at a time, and stops at the first missing day.
+
+    Args:
+        user_id (int): User to check
+        today (date): The user's local today
+    """
+    queryset = DailyActivity.objects.filter(user_id=user_id).order_by('-local_date').values_list(
+        'local_date', flat=True
+    )
+    expected = None
+    streak = 0
+    upper = today
+    while True:
+        page = list(queryset.filter(local_date__lte=upper)[:STREAK_PAGE])
+        for day in page:
+            if expected is None:
+                # The streak may still be alive from yesterday
+                if day < today - timedelta(days=1):
+                    return 0
+            elif day != expected:
+                return streak
+            streak += 1
+            expected = day - timedelta(days=1)
+        if len(page) < STREAK_PAGE:
+            return streak
+        upper = expected
+
+
+def heatmap(user_id, days=365, today=None):
+    """
+    Activity for the last `days` days, in one query (plus the timezone lookup
+    when today is omitted)
+
+    Args:
+        user_id (int): User to read
+        days (int): Window length, ending with the user's today
+        today (date): The user's local today (looked up from their timezone if omitted)
+
+    Returns:
+        dict: from/to dates and a list of active days with their counts
+    """
+    end = today or timezone.localdate(timezone=timezone_for(user_id))
+    start = end - timedelta(days=days)
+    rows = list(
+        DailyActivity.objects.filter(user_id=user_id, local_date__gt=start, local_date__lte=end)
+        .order_by('local_date')
+        .values('local_date', 'minutes', 'lessons', 'quizzes')
+    )
+    return {
+        'from': start + timedelta(days=1),
+        'to': end,
+        'active_days': len(rows),
+        'activity': [
+            {'date': row['local_date'], 'minutes': row['minutes'], 'lessons': row['lessons'], 'quizzes': row['quizzes']}
+            for row in rows
+        ],
+    }
+
+
+def rebuild_activity(user_ids):
+    """
+    Recompute DailyActivity for the given users from the source tables
+
+    Users are grouped by timezone so each group costs a fixed number of
+    aggregate queries with the dates truncated in that timezone.
+    """
+    from courses.models import LessonProgress, QuizAttempt
+
+    user_ids = list(user_ids)
+    zones = dict(UserProfile.objects.filter(user_id__in=user_ids).values_list('user_id', 'timezone'))
+    by_zone = {}
+    for user_id in user_ids:
+        by_zone.setdefault(zones.get(user_id) or 'UTC', []).append(user_id)
+
+    completed_lessons = LessonProgress.objects.filter(is_completed=True, completed_at__isnull=False)
+    completed_quizzes = QuizAttempt.objects.filter(is_completed=True, completed_at__isnull=False)
+    sources = [
+        # (queryset, timestamp giving the day, counters summed per day)
+        (LessonProgress.objects.all(), 'last_accessed', {}),
+        (completed_lessons, 'completed_at', {'lessons': Count('id')}),
+        (QuizAttempt.objects.all(), 'started_at', {}),
+        (completed_quizzes, 'completed_at', {'quizzes': Count('id'), 'minutes': Sum('time_taken_minutes')}),
+        (StudySession.objects.all(), 'start_time', {'minutes': Sum('duration_minutes')}),
+    ]
+
+    days = {}
+    for name, ids in by_zone.items():
+        tz = user_timezone(name)
+        for queryset, timestamp, counters in sources:
+            rows = queryset.filter(user_id__in=ids).annotate(day=TruncDate(timestamp, tzinfo=tz)).values(
+                'user_id', 'day'
+            )
+            rows = rows.annotate(**counters) if counters else rows.distinct()
+            for row in rows:
+                entry = days.setdefault((row['user_id'], row['day']), {'minutes': 0, 'lessons': 0, 'quizzes': 0})
+                for field in counters:
+                    entry[field] += row[field] or 0
+
+    with transaction.atomic():
+        DailyActivity.objects.filter(user_id__in=user_ids).delete()
+        DailyActivity.objects.bulk_create(
+            [DailyActivity(user_id=user_id, local_date=day, **counts) for (user_id, day), counts in days.items()],
+            batch_size=1000,
+        )
+    return len(days)
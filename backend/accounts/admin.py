@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, UserProfile, Achievement, StudySession, UpcomingTask
+from .models import CustomUser, UserProfile, Achievement, StudySession, UpcomingTask, EmailOutbox, MailingCampaign
 
 
 @admin.register(CustomUser)
@@ -57,4 +57,20 @@ class UpcomingTaskAdmin(admin.ModelAdmin):
             'fields': ('course', 'lesson', 'quiz'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('recipient_email', 'template', 'status', 'attempts', 'next_try_at', 'sent_at')
+    list_filter = ('status', 'template')
+    search_fields = ('recipient_email', 'message_id')
+    ordering = ('-created_at',)
+    readonly_fields = ('message_id', 'last_error', 'created_at', 'sent_at')
+
+
+@admin.register(MailingCampaign)
+class MailingCampaignAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'announcement', 'status', 'sent_count', 'failed_count', 'started_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('last_user_id', 'sent_count', 'failed_count', 'failed_user_ids', 'started_at', 'finished_at')
@@ -0,0 +1,46 @@
+"""
+Async (ASGI) variant of the password reset request
+Routed instead of the sync view when ASYNC_OUTBOUND_VIEWS is on; the email
+itself is queued in the outbox and delivered by the send_outbox worker (or
+inline when EMAIL_OUTBOX_WORKER is off)
+"""
+
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from bece_platform.async_http import async_api_view
+from .models import CustomUser
+from .outbox import aenqueue_email
+
+RESET_REQUESTED_MESSAGE = 'If an account with this email exists, you will receive a password reset link.'
+
+
+@async_api_view(['POST'])
+async def request_password_reset(request):
+    email = request.data.get('email')
+
+    if not email:
+        return {'error': 'Email is required'}, 400
+
+    user = await CustomUser.objects.filter(email=email).afirst()
+    if user is None:
+        # Don't reveal if user exists or not for security
+        return {'message': RESET_REQUESTED_MESSAGE}
+
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
+
+    await aenqueue_email(
+        'password_reset',
+        recipient_email=user.email,
+        recipient_name=user.get_full_name() or user.email,
+        context={
+            'user_name': user.get_full_name() or user.email,
+            'reset_link': reset_link,
+            'expires_in_hours': 24,
+        }
+    )
+    return {'message': RESET_REQUESTED_MESSAGE}
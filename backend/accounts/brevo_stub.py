@@ -0,0 +1,124 @@
+"""
+Local Brevo transactional email API stub
+Accepts POST /v3/smtp/email (single sends and messageVersions batches) with
+configurable latency and error rate, and counts what it received. Run it with
+`manage.py run_brevo_stub` and point BREVO_API_URL at it.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BrevoStubConfig:
+    """
+    Stub behaviour
+
+    latency_ms: added to every response (uniform +/- jitter_ms)
+    error_rate: share of calls answered with HTTP 500
+    rate_limit_rate: share of calls answered with HTTP 429
+    seed: makes latencies and errors repeatable
+    """
+    latency_ms: float = 80.0
+    jitter_ms: float = 20.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    seed: int = 0
+
+
+class BrevoStub:
+    """WSGI application emulating Brevo's /smtp/email endpoint"""
+
+    def __init__(self, config=None):
+        self.config = config or BrevoStubConfig()
+        self.requests = 0
+        self.recipients = 0
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            rng = self._rng
+            latency = rng.uniform(self.config.latency_ms - self.config.jitter_ms,
+                                  self.config.latency_ms + self.config.jitter_ms)
+            roll = rng.random()
+        if roll < self.config.error_rate:
+            return max(0.0, latency) / 1000, 500
+        if roll < self.config.error_rate + self.config.rate_limit_rate:
+            return max(0.0, latency) / 1000, 429
+        return max(0.0, latency) / 1000, None
+
+    def __call__(self, environ, start_response):
+        latency, error = self._draw()
+        time.sleep(latency)
+
+        if environ['REQUEST_METHOD'] != 'POST' or environ.get('PATH_INFO', '').rstrip('/') != '/v3/smtp/email':
+            return self._respond(start_response, 404, {'code': 'not_found'})
+        if not environ.get('HTTP_API_KEY'):
+            return self._respond(start_response, 401, {'code': 'unauthorized', 'message': 'Key not found'})
+        if error:
+            return self._respond(start_response, error, {'code': 'too_many_requests' if error == 429 else 'internal_error'})
+
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+            payload = json.loads(environ['wsgi.input'].read(length) or b'{}')
+        except ValueError:
+            return self._respond(start_response, 400, {'code': 'bad_request', 'message': 'Invalid JSON'})
+
+        versions = payload.get('messageVersions')
+        if versions is not None:
+            if not versions or len(versions) > 1000:
+                return self._respond(start_response, 400, {'code': 'invalid_parameter', 'message': 'messageVersions'})
+            count = sum(len(version.get('to', [])) for version in versions)
+        else:
+            count = len(payload.get('to', []))
+        if not count or 'sender' not in payload:
+            return self._respond(start_response, 400, {'code': 'missing_parameter', 'message': 'to/sender'})
+
+        with self._lock:
+            self.requests += 1
+            self.recipients += count
+
+        if versions is not None:
+            body = {'messageIds': [f'<{uuid.uuid4().hex}@smtp-relay.mailin.fr>' for _ in versions]}
+        else:
+            body = {'messageId': f'<{uuid.uuid4().hex}@smtp-relay.mailin.fr>'}
+        return self._respond(start_response, 201, body)
+
+    def _respond(self, start_response, status, body):
+        reasons = {
+            201: 'Created', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+            429: 'Too Many Requests', 500: 'Internal Server Error',
+        }
+        data = json.dumps(body).encode()
+        start_response(f'{status} {reasons[status]}', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(data))),
+        ])
+        return [data]
+
+
+def make_server(host='127.0.0.1', port=8766, config=None):
+    """Threaded WSGI server for the stub"""
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+    from wsgiref.simple_server import make_server as wsgi_server
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    app = BrevoStub(config)
+    server = wsgi_server(host, port, app, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    return server, app
@@ -0,0 +1,207 @@
+"""
+Dashboard statistics projection
+UserDashboardStats holds the dashboard counters; the streak comes from the
+daily activity rollup and recent sessions are read as they are. Learning events apply their deltas here as they happen; a user
+without a row, or any drift (bulk deletes, admin edits), is fixed by
+rebuilding from the source tables.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .activity import add_activity, rebuild_activity, timezone_for, user_timezone
+from .models import Achievement, UserDashboardStats
+
+User = get_user_model()
+
+RECENT_LIMIT = 5
+QUIZ_PASS_SCORE = 70  # Matches the dashboard's historical definition of a passed quiz
+
+COUNTER_FIELDS = [
+    'lessons_completed', 'quizzes_passed', 'lesson_minutes', 'quiz_minutes',
+    'progress_total', 'courses_started', 'achievements_count',
+]
+
+
+def _push_recent(entries, item_id, at):
+    """Add (item_id, at) to a most-recent-first list capped at RECENT_LIMIT"""
+    entries = [entry for entry in entries if entry[0] != item_id]
+    entries.append([item_id, at.isoformat()])
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    return entries[:RECENT_LIMIT]
+
+
+def record_activity(user_id, activity_at=None, lesson_access=None, quiz_start=None,
+                    minutes=0, lessons=0, quizzes=0, **deltas):
+    """
+    Apply one learning event to the user's stats row and daily activity
+
+    Call after the source rows are saved: a user without a stats row gets one
+    (and their daily activity) rebuilt from the source tables instead.
+
+    Args:
+        user_id (int): User the event belongs to
+        activity_at (datetime): When the user was active; marks that local day as active
+        lesson_access (tuple): (lesson_id, first access time) of a newly opened lesson
+        quiz_start (tuple): (attempt_id, started_at) of a new quiz attempt
+        minutes (int): Study minutes to add to the day of activity_at
+        lessons (int): Completed lessons to add to the day of activity_at
+        quizzes (int): Completed quizzes to add to the day of activity_at
+        **deltas: Increments for COUNTER_FIELDS, e.g. lessons_completed=1
+    """
+    with transaction.atomic():
+        stats = UserDashboardStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None:
+            rebuild_stats([user_id])
+            return
+
+        for field, delta in deltas.items():
+            setattr(stats, field, max(0, getattr(stats, field) + delta))
+        if lesson_access:
+            stats.recent_lessons = _push_recent(stats.recent_lessons, *lesson_access)
+        if quiz_start:
+            stats.recent_quizzes = _push_recent(stats.recent_quizzes, *quiz_start)
+        stats.save()
+
+        if activity_at:
+            day = timezone.localtime(activity_at, timezone_for(user_id)).date()
+            add_activity(user_id, day, minutes=minutes, lessons=lessons, quizzes=quizzes)
+
+
+def get_dashboard_stats(user):
+    """The user's stats row (with their profile, for the timezone), building it on first use"""
+    queryset = UserDashboardStats.objects.select_related('user__profile')
+    stats = queryset.filter(user=user).first()
+    if stats is None:
+        rebuild_stats([user.id])
+        stats = queryset.get(user=user)
+    return stats
+
+
+def local_today(stats):
+    """Today in the timezone of the stats row's user"""
+    profile = getattr(stats.user, 'profile', None)
+    return timezone.localdate(timezone=user_timezone(profile.timezone if profile else None))
+
+
+def stats_payload(stats, streak):
+    """dashboard_stats fields derived from a stats row and the current streak (no queries)"""
+    week_ago = (timezone.now() - timedelta(days=7)).isoformat()
+    total_minutes = stats.lesson_minutes + stats.quiz_minutes
+
+    return {
+        'lessons_completed': stats.lessons_completed,
+        'quizzes_passed': stats.quizzes_passed,
+        'total_study_hours': round(total_minutes / 60, 1),
+        'study_streak': streak,
+        'overall_progress': round(stats.progress_total / stats.courses_started, 1) if stats.courses_started else 0.0,
+        'achievements_count': stats.achievements_count,
+        'total_study_time_minutes': total_minutes,
+        'recent_lessons_count': sum(1 for _, at in stats.recent_lessons if at >= week_ago),
+        'recent_quizzes_count': sum(1 for _, at in stats.recent_quizzes if at >= week_ago),
+    }
+
+
+def _recent(queryset, item_field, at_field, user_ids):
+    """{user_id: [[id, iso], ...]} of the RECENT_LIMIT newest rows per user, in one query"""
+    rows = (
+        queryset.filter(user_id__in=user_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=[F('user_id')], order_by=F(at_field).desc()))
+        .filter(rank__lte=RECENT_LIMIT)
+        .values_list('user_id', item_field, at_field)
+    )
+    recent = {}
+    for user_id, item_id, at in rows:
+        recent.setdefault(user_id, []).append([item_id, at.isoformat()])
+    for entries in recent.values():
+        entries.sort(key=lambda entry: entry[1], reverse=True)
+    return recent
+
+
+def _build_chunk(user_ids):
+    from courses.models import LessonProgress, QuizAttempt, UserProgress
+
+    lessons = {
+        row['user_id']: row for row in
+        LessonProgress.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            completed=Count('id', filter=Q(is_completed=True)), minutes=Sum('time_spent_minutes')
+        )
+    }
+    quizzes = {
+        row['user_id']: row for row in
+        QuizAttempt.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            passed=Count('id', filter=Q(is_completed=True, score__gte=QUIZ_PASS_SCORE)),
+            minutes=Sum('time_taken_minutes'),
+        )
+    }
+    progress = {
+        row['user_id']: row for row in
+        UserProgress.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+            total=Sum('completion_percentage'), started=Count('id')
+        )
+    }
+    achievements = dict(
+        Achievement.objects.filter(user_id__in=user_ids).values('user_id').annotate(n=Count('id'))
+        .values_list('user_id', 'n')
+    )
+
+    recent_lessons = _recent(LessonProgress.objects, 'lesson_id', 'last_accessed', user_ids)
+    recent_quizzes = _recent(QuizAttempt.objects, 'id', 'started_at', user_ids)
+
+    rows = []
+    for user_id in user_ids:
+        lesson = lessons.get(user_id, {})
+        quiz = quizzes.get(user_id, {})
+        course = progress.get(user_id, {})
+        rows.append(UserDashboardStats(
+            user_id=user_id,
+            lessons_completed=lesson.get('completed') or 0,
+            quizzes_passed=quiz.get('passed') or 0,
+            lesson_minutes=lesson.get('minutes') or 0,
+            quiz_minutes=quiz.get('minutes') or 0,
+            progress_total=course.get('total') or 0.0,
+            courses_started=course.get('started') or 0,
+            achievements_count=achievements.get(user_id, 0),
+            recent_lessons=recent_lessons.get(user_id, []),
+            recent_quizzes=recent_quizzes.get(user_id, []),
+        ))
+    return rows
+
+
+def rebuild_stats(user_ids=None, chunk_size=1000):
+    """
+    Recompute stats rows and daily activity from the source tables, a chunk
+    of users at a time
+
+    Each chunk costs a fixed number of aggregate queries (per timezone in use
+    for the daily rollup) plus the writes, whatever the number of users in it.
+
+    Args:
+        user_ids (list): Users to rebuild (default: everyone)
+        chunk_size (int): Users per chunk
+
+    Returns:
+        int: Number of rows written
+    """
+    if user_ids is None:
+        user_ids = User.objects.order_by('id').values_list('id', flat=True)
+    user_ids = list(user_ids)
+
+    written = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        rows = _build_chunk(chunk)
+        UserDashboardStats.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=COUNTER_FIELDS + ['recent_lessons', 'recent_quizzes', 'updated_at'],
+        )
+        rebuild_activity(chunk)
+        written += len(rows)
+    return written
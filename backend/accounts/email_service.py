@@ -12,6 +12,19 @@ from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
+# Template name -> (subject, HTML template, text template)
+MESSAGES = {
+    'password_reset': ("Reset Your GhanaLearn Password",
+                       'emails/password_reset.html', 'emails/password_reset.txt'),
+    'password_changed': ("Your GhanaLearn Password Has Been Changed",
+                         'emails/password_changed.html', 'emails/password_changed.txt'),
+    'announcement': ("{title}", 'emails/announcement.html', 'emails/announcement.txt'),
+    'weekly_digest_active': ("Your GhanaLearn week: {{{{ params.lessons_completed }}}} lessons completed",
+                             'emails/weekly_digest_active.html', 'emails/weekly_digest_active.txt'),
+    'weekly_digest_inactive': ("We miss you at GhanaLearn, {{{{ params.first_name }}}}",
+                               'emails/weekly_digest_inactive.html', 'emails/weekly_digest_inactive.txt'),
+}
+
 
 class BrevoEmailService:
     """Service class for sending emails through Brevo API"""
@@ -21,6 +34,7 @@ class BrevoEmailService:
         self.api_url = settings.BREVO_API_URL
         self.from_email = settings.DEFAULT_FROM_EMAIL
         self.from_name = settings.DEFAULT_FROM_NAME
+        self._session = None
         
         if not self.api_key or self.api_key == 'your-brevo-api-key-here':
             logger.warning("Brevo API key not configured. Email sending will be simulated.")
@@ -52,16 +66,190 @@ class BrevoEmailService:
         """
         
         # If API key is not configured, simulate email sending
-        if not self.api_key or self.api_key == 'your-brevo-api-key-here':
+        if not self._configured():
+            return self._simulate_email_send(to_email, subject)
+        
+        email_data = self._build_email_data(
+            to_email, to_name, subject, html_content, text_content, template_id, template_params
+        )
+        
+        try:
+            response = self.session.post(
+                f'{self.api_url}/smtp/email',
+                headers=self._headers(),
+                json=email_data,
+                timeout=30
+            )
+            return self._handle_response(response, to_email)
+                
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error sending email to {to_email}: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Network error: {str(e)}'
+            }
+        except Exception as e:
+            logger.error(f"Unexpected error sending email to {to_email}: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Unexpected error: {str(e)}'
+            }
+    
+    def send_batch(
+        self,
+        subject: str,
+        html_content: str,
+        text_content: str,
+        versions: List[Dict]
+    ) -> Dict:
+        """
+        Send one rendered message to many recipients in a single Brevo call
+        
+        Uses Brevo's messageVersions: the content is sent once and every
+        version supplies its recipient and the params substituted into
+        {{ params.* }} placeholders.
+        
+        Args:
+            subject: Email subject (may contain {{ params.* }})
+            html_content: HTML content shared by all versions
+            text_content: Plain text content shared by all versions
+            versions: List of {'email', 'name', 'params'} dicts (at most 1000)
+        
+        Returns:
+            Dict with success status and message
+        """
+        if not self._configured():
+            logger.info(f"SIMULATED BATCH SEND - {len(versions)} recipients, Subject: {subject}")
+            return {'success': True, 'message': 'Batch simulated successfully (API key not configured)', 'simulated': True}
+        
+        email_data = {
+            'sender': {
+                'name': self.from_name,
+                'email': self.from_email
+            },
+            'subject': subject,
+            'htmlContent': html_content,
+            'textContent': text_content,
+            'messageVersions': [
+                {
+                    'to': [{'email': version['email'], 'name': version['name']}],
+                    'params': version.get('params') or {}
+                }
+                for version in versions
+            ]
+        }
+        
+        try:
+            response = self.session.post(
+                f'{self.api_url}/smtp/email',
+                headers=self._headers(),
+                json=email_data,
+                timeout=60
+            )
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Network error sending batch of {len(versions)} emails: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Network error: {str(e)}'
+            }
+        
+        if response.status_code == 201:
+            return {
+                'success': True,
+                'message': 'Batch sent successfully',
+                'message_ids': response.json().get('messageIds', [])
+            }
+        
+        logger.error(f"Failed to send batch of {len(versions)} emails: {response.text}")
+        return {
+            'success': False,
+            'message': f'Failed to send batch: {response.text}',
+            'status_code': response.status_code
+        }
+    
+    async def asend_email(
+        self,
+        to_email: str,
+        to_name: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None,
+        template_id: Optional[int] = None,
+        template_params: Optional[Dict] = None
+    ) -> Dict:
+        """Async counterpart of send_email using the pooled httpx client"""
+        import httpx
+        from bece_platform.async_http import get_async_client
+        
+        if not self._configured():
             return self._simulate_email_send(to_email, subject)
         
-        headers = {
+        email_data = self._build_email_data(
+            to_email, to_name, subject, html_content, text_content, template_id, template_params
+        )
+        
+        try:
+            response = await get_async_client().post(
+                f'{self.api_url}/smtp/email',
+                headers=self._headers(),
+                json=email_data,
+                timeout=30
+            )
+            return self._handle_response(response, to_email)
+        
+        except httpx.HTTPError as e:
+            logger.error(f"Network error sending email to {to_email}: {str(e)}")
+            return {
+                'success': False,
+                'message': f'Network error: {str(e)}'
+            }
+    
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive session shared by every send from this process"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=16)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+        return self._session
+    
+    def render_message(self, template: str, context: Dict):
+        """
+        Render one of the MESSAGES templates
+        
+        Args:
+            template: Key of MESSAGES (e.g. 'password_reset')
+            context: Template context; site name and support address are added
+        
+        Returns:
+            Tuple of (subject, html_content, text_content)
+        """
+        subject, html_template, text_template = MESSAGES[template]
+        context = {
+            'site_name': 'GhanaLearn',
+            'support_email': 'support@ghanalearn.com',
+            **context
+        }
+        subject = subject.format(**context)
+        html_content = render_to_string(html_template, context)
+        text_content = render_to_string(text_template, context)
+        return subject, html_content, text_content
+    
+    def _configured(self) -> bool:
+        return bool(self.api_key) and self.api_key != 'your-brevo-api-key-here'
+    
+    def _headers(self) -> Dict:
+        return {
             'accept': 'application/json',
             'api-key': self.api_key,
             'content-type': 'application/json'
         }
-        
-        # Prepare email data
+    
+    def _build_email_data(self, to_email, to_name, subject, html_content, text_content=None,
+                          template_id=None, template_params=None) -> Dict:
+        """Brevo /smtp/email payload"""
         email_data = {
             'sender': {
                 'name': self.from_name,
@@ -87,42 +275,24 @@ class BrevoEmailService:
                 email_data['textContent'] = text_content
             else:
                 email_data['textContent'] = strip_tags(html_content)
-        
-        try:
-            response = requests.post(
-                f'{self.api_url}/smtp/email',
-                headers=headers,
-                json=email_data,
-                timeout=30
-            )
-            
-            if response.status_code == 201:
-                logger.info(f"Email sent successfully to {to_email}")
-                return {
-                    'success': True,
-                    'message': 'Email sent successfully',
-                    'message_id': response.json().get('messageId')
-                }
-            else:
-                logger.error(f"Failed to send email to {to_email}: {response.text}")
-                return {
-                    'success': False,
-                    'message': f'Failed to send email: {response.text}',
-                    'status_code': response.status_code
-                }
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Network error sending email to {to_email}: {str(e)}")
-            return {
-                'success': False,
-                'message': f'Network error: {str(e)}'
-            }
-        except Exception as e:
-            logger.error(f"Unexpected error sending email to {to_email}: {str(e)}")
+        return email_data
+    
+    def _handle_response(self, response, to_email: str) -> Dict:
+        """Result dict for a Brevo response (requests or httpx)"""
+        if response.status_code == 201:
+            logger.info(f"Email sent successfully to {to_email}")
             return {
-                'success': False,
-                'message': f'Unexpected error: {str(e)}'
+                'success': True,
+                'message': 'Email sent successfully',
+                'message_id': response.json().get('messageId')
             }
+        
+        logger.error(f"Failed to send email to {to_email}: {response.text}")
+        return {
+            'success': False,
+            'message': f'Failed to send email: {response.text}',
+            'status_code': response.status_code
+        }
     
     def _simulate_email_send(self, to_email: str, subject: str) -> Dict:
         """Simulate email sending for development/testing"""
@@ -153,20 +323,7 @@ class BrevoEmailService:
             Dict with success status and message
         """
         
-        subject = "Reset Your GhanaLearn Password"
-        
-        # Prepare template context
-        context = {
-            'user_name': user_name,
-            'reset_link': reset_link,
-            'expires_in_hours': expires_in_hours,
-            'site_name': 'GhanaLearn',
-            'support_email': 'support@ghanalearn.com'
-        }
-        
-        # Render HTML content
-        html_content = render_to_string('emails/password_reset.html', context)
-        text_content = render_to_string('emails/password_reset.txt', context)
+        subject, html_content, text_content = self._password_reset_message(user_name, reset_link, expires_in_hours)
         
         return self.send_email(
             to_email=user_email,
@@ -176,6 +333,32 @@ class BrevoEmailService:
             text_content=text_content
         )
     
+    async def asend_password_reset_email(
+        self,
+        user_email: str,
+        user_name: str,
+        reset_link: str,
+        expires_in_hours: int = 24
+    ) -> Dict:
+        """Async counterpart of send_password_reset_email"""
+        subject, html_content, text_content = self._password_reset_message(user_name, reset_link, expires_in_hours)
+        
+        return await self.asend_email(
+            to_email=user_email,
+            to_name=user_name,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content
+        )
+    
+    def _password_reset_message(self, user_name: str, reset_link: str, expires_in_hours: int):
+        """Subject, HTML and text of the password reset email"""
+        return self.render_message('password_reset', {
+            'user_name': user_name,
+            'reset_link': reset_link,
+            'expires_in_hours': expires_in_hours,
+        })
+    
     def send_welcome_email(
         self,
         user_email: str,
@@ -230,16 +413,7 @@ class BrevoEmailService:
             Dict with success status and message
         """
         
-        subject = "Your GhanaLearn Password Has Been Changed"
-        
-        context = {
-            'user_name': user_name,
-            'site_name': 'GhanaLearn',
-            'support_email': 'support@ghanalearn.com'
-        }
-        
-        html_content = render_to_string('emails/password_changed.html', context)
-        text_content = render_to_string('emails/password_changed.txt', context)
+        subject, html_content, text_content = self.render_message('password_changed', {'user_name': user_name})
         
         return self.send_email(
             to_email=user_email,
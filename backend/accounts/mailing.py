@@ -0,0 +1,272 @@
+"""
+Bulk mailing of announcements and weekly progress digests
+Recipients are walked in user id order (keyset pages, so the query never holds
+a cursor open while sending) and filtered by notification preferences. Each
+variant is rendered once; per-user values travel as Brevo params in batch
+sends of up to BREVO_BATCH_LIMIT recipients. The campaign row records how far
+the walk got and who was in batches Brevo refused, so a crashed run resumes
+where it stopped and a resumed campaign retries the failed batches first.
+"""
+
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Avg, Count, F
+from django.utils import timezone
+
+from .email_service import brevo_service
+from .models import MailingCampaign, UserProfile
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+BREVO_BATCH_LIMIT = 1000  # messageVersions per request
+SEND_RETRIES = 3
+
+# Preference keys (see accounts.views.update_preferences) a user must not have turned off
+OPT_OUT_KEYS = {
+    'announcement': ['email_notifications'],
+    'weekly_digest': ['email_notifications', 'study_reminders'],
+}
+
+
+def recipient_queryset(campaign):
+    """Active users with an email address who have not opted out of this kind of mail"""
+    queryset = User.objects.filter(is_active=True).exclude(email='')
+
+    # Users without a profile or without the key keep the default (opted in). A
+    # subquery rather than exclude() on the JSON key, which drops rows where the
+    # key is missing (NULL comparison)
+    for key in OPT_OUT_KEYS[campaign.kind]:
+        opted_out = UserProfile.objects.filter(**{f'notification_preferences__{key}': False}).values('user_id')
+        queryset = queryset.exclude(id__in=opted_out)
+
+    if campaign.kind == 'announcement' and not campaign.announcement.show_to_all:
+        queryset = queryset.filter(targeted_announcements=campaign.announcement)
+    return queryset
+
+
+def recipient_pages(campaign, page_size):
+    """
+    Yield lists of (id, email, first_name, last_name) after campaign.last_user_id
+
+    Args:
+        campaign (MailingCampaign): Campaign being sent
+        page_size (int): Users per page
+    """
+    queryset = recipient_queryset(campaign).order_by('id').values_list('id', 'email', 'first_name', 'last_name')
+    after = campaign.last_user_id
+    while True:
+        page = list(queryset.filter(id__gt=after)[:page_size])
+        if not page:
+            return
+        yield page
+        after = page[-1][0]
+
+
+def digest_stats(user_ids):
+    """Per-user activity over the last 7 days: {user_id: {lessons_completed, quizzes_taken, average_score}}"""
+    from courses.models import LessonProgress, QuizAttempt
+
+    week_ago = timezone.now() - timedelta(days=7)
+    lessons = dict(
+        LessonProgress.objects.filter(user_id__in=user_ids, is_completed=True, completed_at__gte=week_ago)
+        .values('user_id').annotate(n=Count('id')).values_list('user_id', 'n')
+    )
+    quizzes = {
+        row['user_id']: row
+        for row in QuizAttempt.objects.filter(user_id__in=user_ids, is_completed=True, completed_at__gte=week_ago)
+        .values('user_id').annotate(n=Count('id'), average=Avg('score'))
+    }
+    return {
+        user_id: {
+            'lessons_completed': lessons.get(user_id, 0),
+            'quizzes_taken': quizzes[user_id]['n'] if user_id in quizzes else 0,
+            'average_score': round(quizzes[user_id]['average']) if user_id in quizzes else 0,
+        }
+        for user_id in user_ids
+    }
+
+
+def render_variants(campaign):
+    """Subject, HTML and text for every variant of the campaign, rendered once"""
+    context = {
+        'preferences_link': f"{settings.FRONTEND_URL}/settings",
+        'dashboard_link': f"{settings.FRONTEND_URL}/dashboard",
+    }
+    if campaign.kind == 'announcement':
+        announcement = campaign.announcement
+        context.update(title=announcement.title, content=announcement.content)
+        return {'announcement': brevo_service.render_message('announcement', context)}
+    return {
+        variant: brevo_service.render_message(variant, context)
+        for variant in ('weekly_digest_active', 'weekly_digest_inactive')
+    }
+
+
+def build_versions(campaign, page):
+    """Group a page of recipients into {variant: ([version, ...], [user_id, ...])}"""
+    stats = digest_stats([row[0] for row in page]) if campaign.kind == 'weekly_digest' else {}
+    groups = {}
+    for user_id, email, first_name, last_name in page:
+        params = {'first_name': first_name or 'there'}
+        variant = 'announcement'
+        if campaign.kind == 'weekly_digest':
+            params.update(stats[user_id])
+            active = params['lessons_completed'] or params['quizzes_taken']
+            variant = 'weekly_digest_active' if active else 'weekly_digest_inactive'
+        versions, user_ids = groups.setdefault(variant, ([], []))
+        versions.append({
+            'email': email,
+            'name': f"{first_name} {last_name}".strip() or email,
+            'params': params,
+        })
+        user_ids.append(user_id)
+    return groups
+
+
+def send_chunk(content, versions, send=None):
+    """
+    Send one batch, retrying 429/5xx/network errors with jittered backoff
+
+    Returns:
+        bool: Whether Brevo accepted the batch
+    """
+    send = send or brevo_service.send_batch
+    subject, html_content, text_content = content
+    for attempt in range(SEND_RETRIES + 1):
+        result = send(subject, html_content, text_content, versions)
+        if result.get('success'):
+            return True
+        status_code = result.get('status_code')
+        if status_code is not None and status_code != 429 and status_code < 500:
+            break
+        if attempt < SEND_RETRIES:
+            time.sleep(min(30, 2 ** attempt) * random.uniform(0.5, 1.5))
+    logger.error(f"Batch of {len(versions)} emails failed: {result.get('message')}")
+    return False
+
+
+def retry_pages(campaign, page_size):
+    """Pages of the recipients in campaign.failed_user_ids who still qualify, like recipient_pages"""
+    rows = list(
+        recipient_queryset(campaign).filter(id__in=campaign.failed_user_ids)
+        .order_by('id').values_list('id', 'email', 'first_name', 'last_name')
+    )
+    for start in range(0, len(rows), page_size):
+        yield rows[start:start + page_size]
+
+
+def _send_rounds(campaign, pages, variants, pool, workers, send):
+    """Send pages `workers` at a time; yields (pages, sent user ids, failed user ids, requests) per round"""
+    while True:
+        round_pages = [page for _, page in zip(range(workers), pages)]
+        if not round_pages:
+            return
+
+        chunks = [
+            chunk
+            for page in round_pages
+            for chunk in build_versions(campaign, page).items()
+        ]
+        accepted = pool.map(lambda chunk: send_chunk(variants[chunk[0]], chunk[1][0], send), chunks)
+
+        sent, failed = [], []
+        for (_, (_, user_ids)), ok in zip(chunks, accepted):
+            (sent if ok else failed).extend(user_ids)
+        yield round_pages, sent, failed, len(chunks)
+
+
+def run_campaign(campaign, chunk_size=500, workers=4, send=None):
+    """
+    Send (or resume) a campaign
+
+    Each round fetches up to `workers` pages of recipients and sends their
+    batches concurrently; the campaign's cursor and counters are saved after
+    every round, so at most one round is sent twice after a crash. Recipients
+    of batches that still fail after retries are counted and kept in
+    failed_user_ids; resuming the campaign (even a completed one) sends to
+    them first. An announcement campaign whose announcement was deleted is
+    cancelled.
+
+    Args:
+        campaign (MailingCampaign): Campaign to send
+        chunk_size (int): Recipients per Brevo request (capped at BREVO_BATCH_LIMIT)
+        workers (int): Concurrent Brevo requests
+        send (callable): Batch sender (default: brevo_service.send_batch)
+
+    Returns:
+        dict: Recipients sent and failed, Brevo requests, elapsed seconds and recipients per second
+    """
+    chunk_size = max(1, min(chunk_size, BREVO_BATCH_LIMIT))
+    workers = max(1, workers)
+    stats = {'sent': 0, 'failed': 0, 'requests': 0, 'seconds': 0.0, 'per_second': 0.0}
+    if campaign.status == 'cancelled' or (campaign.status == 'completed' and not campaign.failed_user_ids):
+        return stats
+
+    if campaign.kind == 'announcement' and campaign.announcement_id is None:
+        logger.warning(f"Campaign {campaign.pk} cancelled: its announcement no longer exists")
+        MailingCampaign.objects.filter(pk=campaign.pk).update(status='cancelled', finished_at=timezone.now())
+        campaign.refresh_from_db()
+        return stats
+
+    variants = render_variants(campaign)
+    walk = campaign.status != 'completed'
+    MailingCampaign.objects.filter(pk=campaign.pk).update(
+        status='running', started_at=campaign.started_at or timezone.now()
+    )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Batches that failed in an earlier run go first
+        if campaign.failed_user_ids:
+            remaining = set(campaign.failed_user_ids)
+            failed_again = set()
+            for round_pages, sent, failed, requests in _send_rounds(
+                campaign, retry_pages(campaign, chunk_size), variants, pool, workers, send
+            ):
+                remaining.difference_update(row[0] for page in round_pages for row in page)
+                failed_again.update(failed)
+                stats['sent'] += len(sent)
+                stats['failed'] += len(failed)
+                stats['requests'] += requests
+                campaign.failed_user_ids = sorted(remaining | failed_again)
+                MailingCampaign.objects.filter(pk=campaign.pk).update(
+                    failed_user_ids=campaign.failed_user_ids,
+                    sent_count=F('sent_count') + len(sent),
+                    failed_count=F('failed_count') - len(sent),
+                )
+            # Whoever is left no longer qualifies (opted out, deactivated)
+            campaign.failed_user_ids = sorted(failed_again)
+            MailingCampaign.objects.filter(pk=campaign.pk).update(failed_user_ids=campaign.failed_user_ids)
+
+        if walk:
+            for round_pages, sent, failed, requests in _send_rounds(
+                campaign, recipient_pages(campaign, chunk_size), variants, pool, workers, send
+            ):
+                stats['sent'] += len(sent)
+                stats['failed'] += len(failed)
+                stats['requests'] += requests
+
+                campaign.last_user_id = round_pages[-1][-1][0]
+                campaign.failed_user_ids = campaign.failed_user_ids + failed
+                MailingCampaign.objects.filter(pk=campaign.pk).update(
+                    last_user_id=campaign.last_user_id,
+                    failed_user_ids=campaign.failed_user_ids,
+                    sent_count=F('sent_count') + len(sent),
+                    failed_count=F('failed_count') + len(failed),
+                )
+
+    MailingCampaign.objects.filter(pk=campaign.pk).update(status='completed', finished_at=timezone.now())
+    campaign.refresh_from_db()
+
+    seconds = time.perf_counter() - started
+    stats['seconds'] = round(seconds, 2)
+    stats['per_second'] = round((stats['sent'] + stats['failed']) / seconds, 1) if seconds else 0.0
+    return stats
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bece_platform import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Compare two bench_endpoints results and fail on latency or query-count regressions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='Baseline JSON (e.g. from the main branch)')
+        parser.add_argument('current', help='JSON to check against the baseline')
+        parser.add_argument('--threshold', type=float, default=20.0,
+                            help='Percent increase in p50/p95 latency that counts as a regression')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                            help='Ignore latency changes smaller than this many milliseconds')
+
+    def handle(self, *args, **options):
+        documents = []
+        for path in (options['baseline'], options['current']):
+            try:
+                with open(path) as f:
+                    documents.append(json.load(f))
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {path}: {e}')
+        baseline, current = documents
+
+        for key in ('transport', 'database'):
+            if baseline['environment'][key] != current['environment'][key]:
+                self.stderr.write(self.style.WARNING(
+                    f"Different {key}: {baseline['environment'][key]} vs {current['environment'][key]}"
+                ))
+
+        rows = benchmark.compare(baseline, current, options['threshold'] / 100, options['min_delta_ms'])
+        self.stdout.write(f"{baseline['revision']} -> {current['revision']}")
+        self.stdout.write(f"{'endpoint':<20}{'metric':<22}{'before':>10}{'after':>10}{'change':>10}")
+        for name, metric, before, after, change, regressed in rows:
+            change = f'{change:+.1f}' if metric in ('queries_per_request', 'errors') else f'{change:+.1%}'
+            line = f'{name:<20}{metric:<22}{before:>10}{after:>10}{change:>10}'
+            self.stdout.write(self.style.ERROR(f'{line}  REGRESSION') if regressed else line)
+
+        regressions = [row for row in rows if row[-1]]
+        if regressions:
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline["revision"]}')
+        self.stdout.write(self.style.SUCCESS('No regressions'))
@@ -0,0 +1,76 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from bece_platform import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the hot API endpoints on a generate_load_dataset dataset and save a JSON baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Timed requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=4, help='Concurrent client threads')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint')
+        parser.add_argument('--users', type=int, default=50, help='Generated users to spread requests over')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for users and request bodies')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Endpoint to run (repeatable; default: all)')
+        parser.add_argument('--base-url',
+                            help='Benchmark a running server (e.g. http://127.0.0.1:8000) instead of '
+                                 'the in-process test client')
+        parser.add_argument('--output', help='JSON file to write (default: benchmarks/<revision>.json)')
+
+    def handle(self, *args, **options):
+        endpoints = benchmark.ENDPOINTS
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - {name for name, _ in endpoints}
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['endpoints']]
+
+        try:
+            users = benchmark.load_users(options['users'], options['seed'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['base_url']:
+            transport = benchmark.HttpTransport(options['base_url'])
+        else:
+            transport = benchmark.ClientTransport()
+            if connection.vendor == 'sqlite' and options['concurrency'] > 1:
+                self.stderr.write(self.style.WARNING(
+                    'SQLite serializes writers: concurrent submits queue on the database lock; '
+                    'use PostgreSQL to measure write endpoints under concurrency'
+                ))
+
+        self.stdout.write(f"{'endpoint':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}"
+                          f"{'queries':>9}{'errors':>8}")
+
+        def progress(name, result):
+            queries = '-' if result['queries_per_request'] is None else result['queries_per_request']
+            self.stdout.write(
+                f"{name:<20}{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+                f"{result['throughput_rps']:>9}{queries:>9}{result['errors']:>8}"
+            )
+
+        # Server-Timing carries the query counts; the test client needs testserver allowed
+        with override_settings(SERVER_TIMING=True, PERF_LOG_SAMPLE_RATE=0.0,
+                               ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            try:
+                document = benchmark.run(
+                    transport, endpoints, users, options['requests'], options['concurrency'],
+                    warmup=options['warmup'], seed=options['seed'], progress=progress,
+                )
+            finally:
+                if options['base_url']:
+                    transport.close()
+
+        output = Path(options['output'] or Path(settings.BASE_DIR) / 'benchmarks' / f"{document['revision']}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(document, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output}'))
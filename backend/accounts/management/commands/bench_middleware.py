@@ -0,0 +1,68 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+
+# The stock Django classes the bece_platform.middleware ones replace
+STOCK_MIDDLEWARE = {
+    'bece_platform.middleware.BrowserSessionMiddleware': 'django.contrib.sessions.middleware.SessionMiddleware',
+    'bece_platform.middleware.BrowserCsrfViewMiddleware': 'django.middleware.csrf.CsrfViewMiddleware',
+    'bece_platform.middleware.BrowserAuthenticationMiddleware':
+        'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bece_platform.middleware.BrowserMessageMiddleware': 'django.contrib.messages.middleware.MessageMiddleware',
+    'bece_platform.middleware.BrowserXFrameOptionsMiddleware':
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time token-authenticated API requests through the stock and the lean middleware stacks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per stack and path')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='API path to request (repeatable; default: health check and profile)')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/health/', '/api/auth/profile/']
+        stock = [STOCK_MIDDLEWARE.get(path, path) for path in settings.MIDDLEWARE]
+        results = []
+
+        # A throwaway user and token, rolled back at the end
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    username='bench_middleware', email='bench_middleware@example.com', password=None
+                )
+                token = Token.objects.create(user=user)
+                for path in paths:
+                    for name, middleware in (('stock', stock), ('lean', settings.MIDDLEWARE)):
+                        results.append((path, name, *self._run(path, middleware, token.key, options['requests'])))
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"{'path':<24}{'stack':<8}{'us/request':>12}{'queries':>9}")
+        for path, name, per_request, queries in results:
+            self.stdout.write(f'{path:<24}{name:<8}{per_request:>12.1f}{queries:>9}')
+
+    def _run(self, path, middleware, key, requests):
+        with override_settings(MIDDLEWARE=middleware, ALLOWED_HOSTS=['testserver']):
+            client = Client(HTTP_AUTHORIZATION=f'Token {key}')
+            client.get(path)  # warm caches and URL resolution
+            with CaptureQueriesContext(connection) as queries:
+                client.get(path)
+            started = time.perf_counter()
+            for _ in range(requests):
+                client.get(path)
+            elapsed = time.perf_counter() - started
+        return elapsed / requests * 1e6, len(queries)
@@ -0,0 +1,423 @@
+import math
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Avg, Count, Max
+from django.utils import timezone
+
+from accounts.dashboard import rebuild_stats
+from accounts.models import StudySession, UserProfile
+from bece.models import (
+    BECEAnswer, BECEPaper, BECEPracticeAttempt, BECEQuestion, BECEStatistics, BECESubject, BECEUserAnswer,
+    BECEYear,
+)
+from courses.models import (
+    Answer, Course, Lesson, LessonProgress, Level, Question, Quiz, QuizAttempt, Subject, UserAnswer,
+    UserProgress,
+)
+from ecommerce.models import Bundle, Order, OrderItem, Payment, UserPurchase
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'load.example.com'
+CATALOG_PREFIX = 'load-'
+BECE_BUNDLE_SLUG = 'jhs3-bece-prep'  # bece.views.has_bece_access checks for this purchase
+
+LEVELS = [('JHS1', 'JHS 1', 1), ('JHS2', 'JHS 2', 2), ('JHS3', 'JHS 3', 3)]
+SUBJECTS = [
+    ('MATH', 'Mathematics'), ('ENG', 'English Language'), ('SCI', 'Integrated Science'),
+    ('SOC', 'Social Studies'), ('RME', 'Religious and Moral Education'), ('ICT', 'Computing'),
+]
+BECE_SUBJECTS = BECESubject.BECE_SUBJECTS[:6]
+BECE_YEARS = range(2014, 2024)
+LESSONS_PER_COURSE = 12
+QUIZZES_PER_COURSE = 3
+QUESTIONS_PER_QUIZ = 10
+QUESTIONS_PER_PAPER = 40
+OPTIONS = 'ABCD'
+HISTORY_DAYS = 180
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a reproducible synthetic dataset (users, purchases, progress, attempts) for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create')
+        parser.add_argument('--attempts-per-user', type=int, default=10,
+                            help='Mean quiz + BECE attempts per user (actual counts are long-tailed)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Users generated per transaction')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--password', default='loadtest123', help='Password of every generated user')
+        parser.add_argument('--clear', action='store_true',
+                            help=f'Delete previously generated users (@{EMAIL_DOMAIN}) first')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.counts = {}
+        started = time.perf_counter()
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+            self.stdout.write(f'Deleted {deleted} rows of previous load users')
+        elif User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').exists():
+            raise CommandError('Load users already exist; pass --clear to regenerate them')
+
+        self.catalog = self.build_catalog()
+        # One hash for every user: hashing is by far the slowest part of creating users
+        self.password = make_password(options['password'])
+
+        user_ids = []
+        for start in range(0, options['users'], options['chunk_size']):
+            stop = min(start + options['chunk_size'], options['users'])
+            with transaction.atomic():
+                user_ids += self.generate_chunk(range(start, stop), options['attempts_per_user'])
+            self.stdout.write(f'  users {stop}/{options["users"]} ({time.perf_counter() - started:.1f}s)')
+
+        rebuild_stats(user_ids)
+
+        elapsed = time.perf_counter() - started
+        for name, count in self.counts.items():
+            self.stdout.write(f'{name:<24}{count:>12}')
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)'
+        ))
+
+    def create(self, model, objs):
+        created = model.objects.bulk_create(objs, batch_size=self.batch_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(created)
+        return created
+
+    def ago(self, days):
+        return self.now - timedelta(days=days, seconds=self.rng.randrange(86400))
+
+    # Catalog
+
+    def build_catalog(self):
+        """Synthetic courses, quizzes, BECE papers and bundles, created once and reused"""
+        if not Course.objects.filter(slug__startswith=CATALOG_PREFIX).exists():
+            self.stdout.write('Creating the synthetic catalog')
+            with transaction.atomic():
+                self.create_catalog()
+
+        courses = list(Course.objects.filter(slug__startswith=CATALOG_PREFIX).order_by('id'))
+        lessons = {}
+        for lesson_id, course_id in Lesson.objects.filter(course__in=courses).order_by('order').values_list(
+            'id', 'course_id'
+        ):
+            lessons.setdefault(course_id, []).append(lesson_id)
+
+        quizzes = list(Quiz.objects.filter(course__in=courses).order_by('id'))
+        questions = {}
+        for question in Question.objects.filter(quiz__in=quizzes).prefetch_related('answers'):
+            answers = [(answer.id, answer.is_correct) for answer in question.answers.all()]
+            questions.setdefault(question.quiz_id, []).append((question.id, question.points, answers))
+
+        papers = list(BECEPaper.objects.filter(title__startswith='Load BECE').order_by('id'))
+        paper_questions = {}
+        for question in BECEQuestion.objects.filter(paper__in=papers).prefetch_related('answers'):
+            answers = [(answer.id, answer.is_correct) for answer in question.answers.all()]
+            paper_questions.setdefault(question.paper_id, []).append((question.id, question.marks, answers))
+
+        bundles = list(Bundle.objects.filter(slug__startswith=CATALOG_PREFIX).order_by('id'))
+        return {
+            'courses': courses,
+            'lessons': lessons,
+            'quizzes': [(quiz, questions[quiz.id]) for quiz in quizzes],
+            'papers': [(paper, paper_questions[paper.id]) for paper in papers],
+            'bundles': bundles,
+            'bece_bundle': Bundle.objects.get(slug=BECE_BUNDLE_SLUG),
+        }
+
+    def create_catalog(self):
+        levels = [
+            Level.objects.get_or_create(code=code, defaults={'name': name, 'order': order})[0]
+            for code, name, order in LEVELS
+        ]
+        subjects = [Subject.objects.get_or_create(code=code, defaults={'name': name})[0] for code, name in SUBJECTS]
+
+        courses = self.create(Course, [
+            Course(
+                title=f'{level.name} {subject.name}', slug=f'{CATALOG_PREFIX}{level.code}-{subject.code}'.lower(),
+                description=f'{subject.name} for {level.name}', subject=subject, level=level,
+                duration_hours=LESSONS_PER_COURSE // 4, is_published=True,
+            )
+            for level in levels for subject in subjects
+        ])
+        self.create(Lesson, [
+            Lesson(course=course, title=f'{course.title} lesson {n}', slug=f'lesson-{n}', order=n,
+                   lesson_type='video', duration_minutes=self.rng.randint(10, 25), is_published=True)
+            for course in courses for n in range(1, LESSONS_PER_COURSE + 1)
+        ])
+        quizzes = self.create(Quiz, [
+            Quiz(title=f'{course.title} quiz {n}', slug=f'{course.slug}-quiz-{n}', course=course,
+                 subject=course.subject, is_published=True)
+            for course in courses for n in range(1, QUIZZES_PER_COURSE + 1)
+        ])
+        questions = self.create(Question, [
+            Question(quiz=quiz, question_text=f'{quiz.title} question {n}', order=n)
+            for quiz in quizzes for n in range(1, QUESTIONS_PER_QUIZ + 1)
+        ])
+        self.create(Answer, [
+            Answer(question=question, answer_text=f'Option {letter}', is_correct=n == correct, order=n)
+            for question in questions
+            for correct in [self.rng.randrange(len(OPTIONS))]
+            for n, letter in enumerate(OPTIONS)
+        ])
+
+        bece_subjects = [
+            BECESubject.objects.get_or_create(name=name, defaults={'display_name': display_name})[0]
+            for name, display_name in BECE_SUBJECTS
+        ]
+        years = [BECEYear.objects.get_or_create(year=year)[0] for year in BECE_YEARS]
+        papers = self.create(BECEPaper, [
+            BECEPaper(year=year, subject=subject, paper_type='paper1', total_marks=QUESTIONS_PER_PAPER,
+                      title=f'Load BECE {year.year} {subject.display_name}', is_published=True)
+            for year in years for subject in bece_subjects
+        ])
+        paper_questions = self.create(BECEQuestion, [
+            BECEQuestion(paper=paper, question_number=n, question_text=f'{paper.title} question {n}',
+                         difficulty_level=self.rng.choice(['easy', 'medium', 'medium', 'hard']))
+            for paper in papers for n in range(1, QUESTIONS_PER_PAPER + 1)
+        ])
+        self.create(BECEAnswer, [
+            BECEAnswer(question=question, option_letter=letter, answer_text=f'Option {letter}',
+                       is_correct=n == correct)
+            for question in paper_questions
+            for correct in [self.rng.randrange(len(OPTIONS))]
+            for n, letter in enumerate(OPTIONS)
+        ])
+
+        # A bundle per level plus the BECE package
+        for level in levels:
+            bundle = Bundle.objects.create(
+                title=f'{level.name} Complete', slug=f'{CATALOG_PREFIX}{level.code.lower()}-complete',
+                description=f'Every {level.name} course', bundle_type='level',
+                original_price=200, discounted_price=150,
+            )
+            bundle.courses.set([course for course in courses if course.level_id == level.id])
+        bece_bundle, _ = Bundle.objects.get_or_create(slug=BECE_BUNDLE_SLUG, defaults={
+            'title': 'JHS 3 BECE Preparation', 'description': 'BECE past papers and JHS 3 courses',
+            'bundle_type': 'bece_prep', 'original_price': 300, 'discounted_price': 250,
+        })
+        bece_bundle.courses.add(*[course for course in courses if course.level_id == levels[-1].id])
+
+    # Users and activity
+
+    def long_tail(self, mean):
+        """Non-negative count with the given mean and a long tail (a few very active users)"""
+        sigma = 0.9
+        return int(round(mean * self.rng.lognormvariate(-sigma * sigma / 2, sigma)))
+
+    def generate_chunk(self, indexes, attempts_per_user):
+        users = self.create(User, [
+            User(username=f'load{i}', email=f'load{i}@{EMAIL_DOMAIN}', password=self.password,
+                 first_name='Load', last_name=f'User {i}', date_joined=self.ago(self.rng.randrange(365)))
+            for i in indexes
+        ])
+        self.create(UserProfile, [
+            UserProfile(user=user, grade_level=self.rng.choice(LEVELS)[1],
+                        daily_study_time=self.rng.choice([15, 30, 30, 45, 60]))
+            for user in users
+        ])
+
+        plans = []
+        for user in users:
+            plans.append({
+                'user': user,
+                'attempts': self.long_tail(attempts_per_user),
+                # Chance of picking the right option; most students sit between 45% and 85%
+                'ability': self.rng.betavariate(5, 3),
+                'bundles': self.purchases_for(),
+            })
+        has_bece = {plan['user'].id for plan in plans if self.catalog['bece_bundle'] in plan['bundles']}
+
+        self.create_orders(plans)
+        self.create_progress(plans)
+        self.create_quiz_attempts(plans, has_bece)
+        self.create_bece_attempts(plans, has_bece)
+        self.create_study_sessions(plans)
+        return [user.id for user in users]
+
+    def purchases_for(self):
+        """Bundles bought by one user: most buy nothing, a few buy several"""
+        roll = self.rng.random()
+        count = 0 if roll < 0.6 else 1 if roll < 0.9 else 2
+        options = self.catalog['bundles'] + [self.catalog['bece_bundle']] * 2
+        bundles = []
+        while len(bundles) < count:
+            bundle = self.rng.choice(options)
+            if bundle not in bundles:
+                bundles.append(bundle)
+        return bundles
+
+    def create_orders(self, plans):
+        orders, items, payments, purchases = [], [], [], []
+        for plan in plans:
+            user = plan['user']
+            abandoned = self.rng.random() < 0.08
+            baskets = [(bundle, 'completed') for bundle in plan['bundles']]
+            if abandoned:
+                baskets.append((self.rng.choice(self.catalog['bundles']), self.rng.choice(['pending', 'cancelled'])))
+            for n, (bundle, status) in enumerate(baskets):
+                created_at = self.ago(self.rng.randrange(HISTORY_DAYS))
+                order = Order(user=user, order_number=f'LOAD-{user.id}-{n}', subtotal=bundle.discounted_price,
+                              total_amount=bundle.discounted_price, status=status, created_at=created_at)
+                orders.append(order)
+                items.append((order, bundle))
+                payments.append((order, bundle, status, created_at))
+                if status == 'completed':
+                    purchases.append((order, bundle))
+
+        self.create(Order, orders)
+        self.create(OrderItem, [
+            OrderItem(order=order, bundle=bundle, unit_price=bundle.discounted_price,
+                      total_price=bundle.discounted_price)
+            for order, bundle in items
+        ])
+        self.create(Payment, [
+            Payment(order=order, payment_method=self.rng.choice(['mobile_money'] * 3 + ['card']),
+                    amount=bundle.discounted_price, transaction_id=f'LOAD-TXN-{order.order_number}',
+                    status=status, created_at=created_at,
+                    processed_at=created_at + timedelta(minutes=1) if status == 'completed' else None)
+            for order, bundle, status, created_at in payments
+        ])
+        self.create(UserPurchase, [
+            UserPurchase(user=order.user, bundle=bundle, order=order, purchased_at=order.created_at)
+            for order, bundle in purchases
+        ])
+
+    def create_progress(self, plans):
+        courses = self.catalog['courses']
+        course_progress, lesson_progress = [], []
+        for plan in plans:
+            started = min(len(courses), self.long_tail(2))
+            for course in self.rng.sample(courses, started):
+                lessons = self.catalog['lessons'][course.id]
+                # Students drop off: completed lessons skew towards the start of the course
+                completed = int(len(lessons) * self.rng.random() ** 1.5)
+                opened = min(len(lessons), completed + 1)
+                first_access = self.ago(self.rng.randrange(HISTORY_DAYS))
+                for n, lesson_id in enumerate(lessons[:opened]):
+                    at = min(self.now, first_access + timedelta(days=n, minutes=self.rng.randrange(600)))
+                    done = n < completed
+                    lesson_progress.append(LessonProgress(
+                        user=plan['user'], lesson_id=lesson_id, is_completed=done,
+                        completion_percentage=100.0 if done else self.rng.choice([0.0, 25.0, 50.0]),
+                        time_spent_minutes=self.rng.randint(5, 30) if done else self.rng.randint(0, 10),
+                        last_accessed=at, completed_at=at if done else None,
+                    ))
+                course_progress.append(UserProgress(
+                    user=plan['user'], course=course, lessons_completed=completed, total_lessons=len(lessons),
+                    completion_percentage=round(completed / len(lessons) * 100, 1),
+                    started_at=first_access, last_accessed=first_access,
+                    completed_at=first_access if completed == len(lessons) else None,
+                ))
+        self.create(UserProgress, course_progress)
+        self.create(LessonProgress, lesson_progress)
+
+    def answer(self, ability, answers):
+        """(answer_id, is_correct) picked by a student of the given ability"""
+        correct = [answer for answer in answers if answer[1]]
+        if correct and self.rng.random() < ability:
+            return correct[0]
+        return self.rng.choice([answer for answer in answers if not answer[1]] or answers)
+
+    def quiz_count(self, plan, has_bece):
+        # Students with BECE access split their practice between quizzes and past papers
+        if plan['user'].id in has_bece:
+            return plan['attempts'] // 2
+        return plan['attempts']
+
+    def create_quiz_attempts(self, plans, has_bece):
+        attempts, answer_sets = [], []
+        for plan in plans:
+            for _ in range(self.quiz_count(plan, has_bece)):
+                quiz, questions = self.rng.choice(self.catalog['quizzes'])
+                started_at = self.ago(self.rng.randrange(HISTORY_DAYS))
+                if self.rng.random() < 0.05:
+                    # Abandoned before submitting
+                    attempts.append(QuizAttempt(user=plan['user'], quiz=quiz, started_at=started_at,
+                                                total_questions=len(questions)))
+                    answer_sets.append([])
+                    continue
+                answers = [(question_id, points, self.answer(plan['ability'], options))
+                           for question_id, points, options in questions]
+                minutes = self.rng.randint(3, quiz.time_limit_minutes)
+                attempts.append(QuizAttempt(
+                    user=plan['user'], quiz=quiz, started_at=started_at,
+                    completed_at=started_at + timedelta(minutes=minutes), time_taken_minutes=minutes,
+                    score=sum(points for _, points, (_, correct) in answers if correct),
+                    total_questions=len(questions), is_completed=True,
+                ))
+                answer_sets.append(answers)
+
+        attempts = self.create(QuizAttempt, attempts)
+        self.create(UserAnswer, [
+            UserAnswer(attempt=attempt, question_id=question_id, selected_answer_id=answer_id,
+                       is_correct=correct, points_earned=points if correct else 0)
+            for attempt, answers in zip(attempts, answer_sets)
+            for question_id, points, (answer_id, correct) in answers
+        ])
+
+    def create_bece_attempts(self, plans, has_bece):
+        attempts, answer_sets = [], []
+        for plan in plans:
+            if plan['user'].id not in has_bece:
+                continue
+            for _ in range(plan['attempts'] - self.quiz_count(plan, has_bece)):
+                paper, questions = self.rng.choice(self.catalog['papers'])
+                started_at = self.ago(self.rng.randrange(HISTORY_DAYS))
+                answers = [(question_id, marks, self.answer(plan['ability'], options))
+                           for question_id, marks, options in questions]
+                score = sum(marks for _, marks, (_, correct) in answers if correct)
+                minutes = self.rng.randint(30, paper.duration_minutes)
+                attempts.append(BECEPracticeAttempt(
+                    user=plan['user'], paper=paper, started_at=started_at,
+                    completed_at=started_at + timedelta(minutes=minutes), time_taken_minutes=minutes,
+                    score=score, total_marks=paper.total_marks, is_completed=True,
+                    percentage=round(score / paper.total_marks * 100, 1) if paper.total_marks else 0,
+                ))
+                answer_sets.append(answers)
+
+        attempts = self.create(BECEPracticeAttempt, attempts)
+        self.create(BECEUserAnswer, [
+            BECEUserAnswer(attempt=attempt, question_id=question_id, selected_answer_id=answer_id,
+                           is_correct=correct, marks_earned=marks if correct else 0,
+                           answered_at=attempt.completed_at, time_spent_seconds=self.rng.randint(20, 180))
+            for attempt, answers in zip(attempts, answer_sets)
+            for question_id, marks, (answer_id, correct) in answers
+        ])
+
+        # Per-subject statistics, as submit_bece_practice keeps them
+        rows = (
+            BECEPracticeAttempt.objects.filter(user_id__in=has_bece, is_completed=True)
+            .values('user_id', 'paper__subject_id')
+            .annotate(total=Count('id'), best=Max('score'), average=Avg('score'), last=Max('completed_at'))
+        )
+        self.create(BECEStatistics, [
+            BECEStatistics(user_id=row['user_id'], subject_id=row['paper__subject_id'], total_attempts=row['total'],
+                           best_score=row['best'], average_score=row['average'], last_attempt=row['last'])
+            for row in rows
+        ])
+
+    def create_study_sessions(self, plans):
+        sessions = []
+        for plan in plans:
+            for _ in range(self.long_tail(max(1, math.ceil(plan['attempts'] * 1.5)))):
+                start = self.ago(self.rng.randrange(HISTORY_DAYS))
+                minutes = self.rng.randint(10, 90)
+                sessions.append(StudySession(
+                    user=plan['user'], start_time=start, end_time=start + timedelta(minutes=minutes),
+                    duration_minutes=minutes, subject=self.rng.choice(SUBJECTS)[1],
+                    activity_type=self.rng.choice(['lesson', 'lesson', 'quiz', 'practice']),
+                ))
+        self.create(StudySession, sessions)
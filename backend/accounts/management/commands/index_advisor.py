@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from bece_platform import query_plans
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot-path queries and report full table scans and missing indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--query', action='append', dest='queries',
+                            help='Hot query to explain (repeatable; default: all)')
+        parser.add_argument('--analyze', action='store_true',
+                            help='Refresh planner statistics (ANALYZE) before explaining')
+        parser.add_argument('--plans', action='store_true', help='Print the full plan of every query')
+
+    def handle(self, *args, **options):
+        queries = query_plans.HOT_QUERIES
+        if options['queries']:
+            unknown = set(options['queries']) - {query.name for query in queries}
+            if unknown:
+                raise CommandError(f'Unknown queries: {", ".join(sorted(unknown))}')
+            queries = [query for query in queries if query.name in options['queries']]
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Plans of {connection.vendor} are not supported (sqlite, postgresql)')
+        if options['analyze']:
+            query_plans.refresh_statistics()
+
+        reports = query_plans.explain_hot_queries(queries)
+        self.stdout.write(f"{'query':<28}{'table':<28}notes")
+        for report in reports:
+            notes = []
+            if report.table in report.full_scans:
+                notes.append('FULL SCAN')
+            if not report.expected_indexes:
+                notes.append(f"no index on ({', '.join(report.query.columns)})")
+            elif not report.uses_expected_index:
+                notes.append(f"planner skipped {', '.join(report.expected_indexes)}")
+            if report.unindexed_sort:
+                notes.append('sort')
+            line = f'{report.query.name:<28}{report.table:<28}{"; ".join(notes)}'
+            self.stdout.write(line if report.ok else self.style.ERROR(line))
+            self.stdout.write(f'    using {", ".join(report.indexes_used) or "no index"}')
+            if options['plans']:
+                for plan_line in report.plan.splitlines():
+                    self.stdout.write(f'    {plan_line}')
+
+        missing = [report for report in reports if not report.expected_indexes]
+        if missing:
+            self.stdout.write('\nSuggested indexes:')
+            for report in missing:
+                self.stdout.write(f'    {query_plans.suggested_index(report)}')
+        if connection.vendor == 'postgresql' and not options['analyze']:
+            # Small or never-analyzed tables make PostgreSQL prefer sequential scans
+            self.stdout.write(self.style.WARNING('Plans depend on table statistics; pass --analyze on a loaded '
+                                                 'database (generate_load_dataset) for representative results'))
+
+        failing = [report for report in reports if not report.ok]
+        if failing:
+            raise CommandError(f'{len(failing)} hot query(ies) scan their table or lack an index')
+        self.stdout.write(self.style.SUCCESS('Every hot query has an index'))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.dashboard import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard stats projection for all (or the given) users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='User ID (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Users recomputed per round of queries')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rebuild_stats(options['users'], chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt dashboard stats for {written} users in {elapsed:.2f}s'))
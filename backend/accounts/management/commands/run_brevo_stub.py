@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from accounts.brevo_stub import BrevoStubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local Brevo email API stub (set BREVO_API_URL to its address)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--latency-ms', type=float, default=80.0, help='Mean latency per call')
+        parser.add_argument('--jitter-ms', type=float, default=20.0, help='Spread of the latency')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered with HTTP 500')
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of calls answered with HTTP 429')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for repeatable runs')
+
+    def handle(self, *args, **options):
+        config = BrevoStubConfig(
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            seed=options['seed'],
+        )
+        server, app = make_server(options['host'], options['port'], config)
+        address = f"http://{options['host']}:{options['port']}/v3"
+        self.stdout.write(self.style.SUCCESS(f'Brevo stub listening on {address}'))
+        self.stdout.write(f'Run with BREVO_API_URL={address} and any BREVO_API_KEY to use it')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Accepted {app.requests} requests for {app.recipients} recipients")
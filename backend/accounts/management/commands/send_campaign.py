@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.mailing import run_campaign
+from accounts.models import MailingCampaign
+from ecommerce.models import Announcement
+
+
+class Command(BaseCommand):
+    help = 'Mail an announcement or the weekly progress digest to all opted-in users'
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--announcement', type=int, help='ID of the Announcement to mail')
+        target.add_argument('--digest', action='store_true', help='Send the weekly progress digest')
+        target.add_argument('--resume', type=int, help='ID of an unfinished MailingCampaign to continue')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Recipients per Brevo request (max 1000)')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent Brevo requests')
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            campaign = MailingCampaign.objects.filter(pk=options['resume']).first()
+            if campaign is None:
+                raise CommandError(f"Campaign {options['resume']} does not exist")
+            if campaign.status == 'cancelled':
+                raise CommandError(f"Campaign {campaign.pk} was cancelled")
+            if campaign.status == 'completed' and not campaign.failed_user_ids:
+                raise CommandError(f"Campaign {campaign.pk} already completed")
+        elif options['digest']:
+            campaign = MailingCampaign.objects.create(kind='weekly_digest')
+        else:
+            announcement = Announcement.objects.filter(pk=options['announcement']).first()
+            if announcement is None:
+                raise CommandError(f"Announcement {options['announcement']} does not exist")
+            campaign = MailingCampaign.objects.create(kind='announcement', announcement=announcement)
+
+        self.stdout.write(f"Sending campaign {campaign.pk} ({campaign.get_kind_display()}) "
+                          f"from user id {campaign.last_user_id}")
+        stats = run_campaign(campaign, chunk_size=options['chunk_size'], workers=options['workers'])
+        if campaign.status == 'cancelled':
+            raise CommandError(f"Campaign {campaign.pk} cancelled: its announcement no longer exists")
+
+        self.stdout.write(
+            f"{stats['sent']} sent, {stats['failed']} failed in {stats['requests']} requests, "
+            f"{stats['seconds']}s ({stats['per_second']} recipients/s)"
+        )
+        if campaign.failed_user_ids:
+            self.stdout.write(self.style.WARNING(
+                f"{len(campaign.failed_user_ids)} recipients failed; retry them with --resume {campaign.pk}"
+            ))
+        self.stdout.write(self.style.SUCCESS(f"Campaign {campaign.pk} completed"))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import outbox_metrics, send_outbox_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued transactional emails from the outbox through Brevo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails claimed per round')
+        parser.add_argument('--workers', type=int, default=4, help='Concurrent Brevo requests')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Run a single round and exit (e.g. from cron)')
+        parser.add_argument('--metrics', action='store_true', help='Print outbox metrics and exit')
+
+    def handle(self, *args, **options):
+        if options['metrics']:
+            for key, value in outbox_metrics().items():
+                self.stdout.write(f"{key}: {value}")
+            return
+
+        while True:
+            started = time.perf_counter()
+            counts = send_outbox_batch(batch_size=options['batch_size'], workers=options['workers'])
+            elapsed = time.perf_counter() - started
+
+            if counts['claimed']:
+                self.stdout.write(
+                    f"Processed {counts['claimed']} emails in {elapsed:.2f}s: {counts['sent']} sent, "
+                    f"{counts['retried']} retrying, {counts['failed']} failed, {counts['skipped']} skipped"
+                )
+
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS('Outbox round finished'))
+                return
+
+            # Go straight to the next batch while there is a backlog
+            if counts['claimed'] < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from bece_platform import stress
+
+
+class Command(BaseCommand):
+    help = 'Hammer the write paths from concurrent threads and check for lost updates and duplicates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent threads per scenario')
+        parser.add_argument('--rounds', type=int, default=10, help='Requests per thread')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Scenario to run (repeatable; default: all)')
+
+    def handle(self, *args, **options):
+        scenarios = stress.SCENARIOS
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in scenarios}
+            if unknown:
+                raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in scenarios if scenario.name in options['scenarios']]
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('Worker threads cannot share an in-memory SQLite database')
+
+        self.stdout.write(f'{connection.vendor}, {options["workers"]} workers x {options["rounds"]} rounds')
+        self.stdout.write(f"{'scenario':<20}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'lock ms/req':>13}"
+                          f"{'5xx':>6}  statuses")
+        with override_settings(PERF_LOG_SAMPLE_RATE=0.0):
+            results = [stress.run(scenario, options['workers'], options['rounds']) for scenario in scenarios]
+
+        failed = 0
+        for result in results:
+            self.stdout.write(
+                f"{result['scenario']:<20}{result['throughput_rps']:>8}{result['p50_ms']:>9}{result['p95_ms']:>9}"
+                f"{result['lock_wait_per_request_ms']:>13}{result['server_errors']:>6}  {result['statuses']}"
+            )
+            for exception in result['exceptions']:
+                self.stdout.write(f'    {exception}')
+            for violation in result['violations']:
+                self.stdout.write(self.style.ERROR(f'    {violation}'))
+            if result['violations'] or result['server_errors']:
+                failed += 1
+
+        if failed:
+            raise CommandError(f'{failed} scenario(s) lost updates, duplicated rows or failed requests')
+        self.stdout.write(self.style.SUCCESS('All invariants held'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_mailing_campaign'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDashboardStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('lessons_completed', models.PositiveIntegerField(default=0)),
+                ('quizzes_passed', models.PositiveIntegerField(default=0)),
+                ('lesson_minutes', models.PositiveIntegerField(default=0)),
+                ('quiz_minutes', models.PositiveIntegerField(default=0)),
+                ('progress_total', models.FloatField(default=0.0)),
+                ('courses_started', models.PositiveIntegerField(default=0)),
+                ('achievements_count', models.PositiveIntegerField(default=0)),
+                ('study_streak', models.PositiveIntegerField(default=0)),
+                ('last_activity_date', models.DateField(blank=True, null=True)),
+                ('recent_lessons', models.JSONField(blank=True, default=list)),
+                ('recent_quizzes', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='userdashboardstats',
+            name='last_activity_date',
+        ),
+        migrations.RemoveField(
+            model_name='userdashboardstats',
+            name='study_streak',
+        ),
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('local_date', models.DateField()),
+                ('minutes', models.PositiveIntegerField(default=0)),
+                ('lessons', models.PositiveIntegerField(default=0)),
+                ('quizzes', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-local_date'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'local_date'), name='daily_activity_user_date')],
+            },
+        ),
+    ]
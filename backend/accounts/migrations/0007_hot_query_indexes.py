@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_daily_activity'),
+        ('courses', '0010_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='upcomingtask',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', 'due_date'], name='upcoming_task_open'),
+        ),
+    ]
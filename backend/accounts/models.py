@@ -75,6 +75,51 @@ class StudySession(models.Model):
         return f"{self.user.email} - {self.start_time.date()}"
 
 
+
+class UserDashboardStats(models.Model):
+    """
+    Per-user dashboard counters, kept up to date by accounts.dashboard on every
+    learning event and recomputable with `manage.py rebuild_dashboard_stats`
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_stats')
+    lessons_completed = models.PositiveIntegerField(default=0)
+    quizzes_passed = models.PositiveIntegerField(default=0)
+    lesson_minutes = models.PositiveIntegerField(default=0)
+    quiz_minutes = models.PositiveIntegerField(default=0)
+    # Average course completion = progress_total / courses_started
+    progress_total = models.FloatField(default=0.0)
+    courses_started = models.PositiveIntegerField(default=0)
+    achievements_count = models.PositiveIntegerField(default=0)
+    # Five most recent [id, ISO timestamp] pairs, for the 7-day activity counts
+    recent_lessons = models.JSONField(default=list, blank=True)
+    recent_quizzes = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.user.email} Dashboard Stats"
+
+
+class DailyActivity(models.Model):
+    """
+    One row per user per local calendar day (UserProfile.timezone) with any
+    learning activity; drives the study streak and the activity heatmap
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='daily_activity')
+    local_date = models.DateField()
+    minutes = models.PositiveIntegerField(default=0)
+    lessons = models.PositiveIntegerField(default=0)
+    quizzes = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-local_date']
+        constraints = [
+            # Also the index behind streak scans and heatmap reads
+            models.UniqueConstraint(fields=['user', 'local_date'], name='daily_activity_user_date'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.email} - {self.local_date}"
+
 class UpcomingTask(models.Model):
     TASK_TYPES = [
         ('quiz', 'Quiz'),
@@ -108,6 +153,10 @@ class UpcomingTask(models.Model):
     
     class Meta:
         ordering = ['due_date', '-priority']
+        indexes = [
+            # upcoming_tasks only reads open tasks
+            models.Index(fields=['user', 'due_date'], name='upcoming_task_open', condition=models.Q(is_completed=False)),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.title}"
@@ -151,4 +200,82 @@ class UpcomingTask(models.Model):
         elif days <= 3:
             return "yellow"  # Due this week
         else:
-            return "green"  # Due later
\ No newline at end of file
+            return "green"  # Due later
+
+class EmailOutbox(models.Model):
+    """Transactional email queued by a request and delivered by the send_outbox worker"""
+    TEMPLATES = [
+        ('password_reset', 'Password Reset'),
+        ('password_changed', 'Password Changed'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ]
+    
+    recipient_email = models.EmailField()
+    recipient_name = models.CharField(max_length=200, blank=True)
+    template = models.CharField(max_length=50, choices=TEMPLATES)
+    context = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_try_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    message_id = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['next_try_at', 'id']
+        indexes = [
+            # The worker only ever scans the pending queue
+            models.Index(
+                fields=['next_try_at', 'id'],
+                name='email_outbox_due',
+                condition=models.Q(status='pending'),
+            ),
+            models.Index(fields=['recipient_email', 'template', 'sent_at'], name='email_outbox_recipient'),
+        ]
+    
+    def __str__(self):
+        return f"{self.recipient_email} - {self.template} ({self.status})"
+
+
+class MailingCampaign(models.Model):
+    """Bulk mailing to many users, sent in resumable chunks by the send_campaign command"""
+    KIND_CHOICES = [
+        ('announcement', 'Announcement'),
+        ('weekly_digest', 'Weekly Progress Digest'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    announcement = models.ForeignKey(
+        'ecommerce.Announcement', on_delete=models.SET_NULL, null=True, blank=True, related_name='mailings'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # Recipients are walked in user id order; everything up to here has been handed to Brevo
+    last_user_id = models.BigIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+    # Recipients of batches Brevo refused; resuming the campaign retries them
+    failed_user_ids = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
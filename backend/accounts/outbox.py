@@ -0,0 +1,279 @@
+"""
+Transactional email outbox
+Views queue emails with a single INSERT; the send_outbox worker renders and
+delivers them through Brevo in batches, retrying transient failures with
+backoff, collapsing duplicates and rate-limiting password reset emails.
+Without a worker (EMAIL_OUTBOX_WORKER off) each email is delivered right after
+the queuing transaction commits, and only retries wait for a worker.
+"""
+
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.utils import timezone
+
+from .email_service import brevo_service
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_CAP_SECONDS = 60 * 60
+# A claimed row not finished within this window (crashed worker) is queued again
+SENDING_LEASE_SECONDS = 5 * 60
+RATE_LIMITED_TEMPLATES = ('password_reset',)
+
+
+def enqueue_email(template, recipient_email, recipient_name='', context=None):
+    """
+    Queue an email for the send_outbox worker
+
+    Args:
+        template (str): Key of email_service.MESSAGES (e.g. 'password_reset')
+        recipient_email (str): Recipient address
+        recipient_name (str): Recipient display name
+        context (dict): JSON-serializable template context
+
+    Returns:
+        EmailOutbox: The queued row
+    """
+    email = EmailOutbox.objects.create(
+        template=template,
+        recipient_email=recipient_email,
+        recipient_name=recipient_name,
+        context=context or {},
+    )
+    if not settings.EMAIL_OUTBOX_WORKER:
+        transaction.on_commit(lambda: send_outbox_batch(ids=[email.id]))
+    return email
+
+
+async def aenqueue_email(template, recipient_email, recipient_name='', context=None):
+    """Async counterpart of enqueue_email"""
+    email = await EmailOutbox.objects.acreate(
+        template=template,
+        recipient_email=recipient_email,
+        recipient_name=recipient_name,
+        context=context or {},
+    )
+    if not settings.EMAIL_OUTBOX_WORKER:
+        await sync_to_async(send_outbox_batch)(ids=[email.id])
+    return email
+
+
+def next_try_delay(attempts):
+    """Exponential backoff with jitter before the next delivery attempt"""
+    delay = min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim_batch(batch_size, ids=None):
+    """
+    Move up to batch_size due emails from pending to sending
+
+    Uses SKIP LOCKED where the database supports it so several workers can
+    run side by side without picking the same rows. ids restricts the claim
+    to those emails (inline delivery).
+    """
+    now = timezone.now()
+    EmailOutbox.objects.filter(status='sending', next_try_at__lte=now).update(status='pending')
+
+    due = EmailOutbox.objects.filter(status='pending', next_try_at__lte=now)
+    if ids is not None:
+        due = due.filter(id__in=ids)
+    with transaction.atomic():
+        ids = list(
+            due.select_for_update(skip_locked=True)
+            .order_by('next_try_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        EmailOutbox.objects.filter(id__in=ids).update(
+            status='sending',
+            attempts=F('attempts') + 1,
+            next_try_at=now + timedelta(seconds=SENDING_LEASE_SECONDS),
+        )
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def _skip_duplicates(emails):
+    """
+    Keep only the newest email per (recipient, template)
+
+    Older copies in the batch, and any copy with a strictly newer pending row
+    still queued, are superseded. Older pending rows still queued behind a
+    kept email are marked superseded too (e.g. a user pressing "reset
+    password" five times gets one email with the latest link).
+    """
+    newest = {}
+    for email in emails:
+        key = (email.recipient_email, email.template)
+        if key not in newest or email.id > newest[key].id:
+            newest[key] = email
+
+    queued = {}
+    for recipient_email, template, newest_id in (
+        EmailOutbox.objects.filter(status='pending', recipient_email__in={key[0] for key in newest})
+        .values('recipient_email', 'template')
+        .annotate(newest=Max('id'))
+        .values_list('recipient_email', 'template', 'newest')
+    ):
+        queued[(recipient_email, template)] = newest_id
+
+    keep, skipped = [], []
+    for email in emails:
+        key = (email.recipient_email, email.template)
+        if newest[key] is email and queued.get(key, 0) < email.id:
+            keep.append(email)
+        else:
+            skipped.append(email)
+
+    older = Q()
+    for email in keep:
+        if (email.recipient_email, email.template) in queued:
+            older |= Q(recipient_email=email.recipient_email, template=email.template, id__lt=email.id)
+    if older:
+        EmailOutbox.objects.filter(older, status='pending').update(
+            status='skipped', last_error='Superseded by a newer email'
+        )
+    return keep, skipped
+
+
+def _skip_rate_limited(emails):
+    """Skip reset emails to addresses that already got EMAIL_OUTBOX_RESET_LIMIT in the last hour"""
+    limit = getattr(settings, 'EMAIL_OUTBOX_RESET_LIMIT', 3)
+    limited = [email for email in emails if email.template in RATE_LIMITED_TEMPLATES]
+    if not limited:
+        return emails, []
+
+    recent = dict(
+        EmailOutbox.objects.filter(
+            status='sent',
+            template__in=RATE_LIMITED_TEMPLATES,
+            recipient_email__in={email.recipient_email for email in limited},
+            sent_at__gte=timezone.now() - timedelta(hours=1),
+        ).values('recipient_email').annotate(sent=Count('id')).values_list('recipient_email', 'sent')
+    )
+
+    keep, skipped = [], []
+    for email in emails:
+        if email.template in RATE_LIMITED_TEMPLATES and recent.get(email.recipient_email, 0) >= limit:
+            skipped.append(email)
+        else:
+            keep.append(email)
+    return keep, skipped
+
+
+def _deliver(email):
+    """Render and send one email; returns the send_email result dict"""
+    try:
+        subject, html_content, text_content = brevo_service.render_message(email.template, email.context)
+    except Exception as e:
+        # Rendering problems do not go away on retry
+        return {'success': False, 'message': f'Render error: {e}', 'status_code': 400}
+
+    return brevo_service.send_email(
+        to_email=email.recipient_email,
+        to_name=email.recipient_name or email.recipient_email,
+        subject=subject,
+        html_content=html_content,
+        text_content=text_content,
+    )
+
+
+def _is_transient(result):
+    # Network errors carry no status code; 429 and 5xx are Brevo asking us to come back later
+    status_code = result.get('status_code')
+    return status_code is None or status_code == 429 or status_code >= 500
+
+
+def send_outbox_batch(batch_size=50, workers=4, ids=None):
+    """
+    Deliver one batch of due emails
+
+    Sends run in a thread pool over the shared Brevo session; database writes
+    stay on the calling thread.
+
+    Args:
+        batch_size (int): Emails claimed in this round
+        workers (int): Concurrent Brevo requests
+        ids (list): Only deliver these emails (inline delivery without a worker)
+
+    Returns:
+        dict: Counts of emails claimed, sent, retried, failed and skipped
+    """
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+    claimed = claim_batch(batch_size, ids=ids)
+    counts = {'claimed': len(claimed), 'sent': 0, 'retried': 0, 'failed': 0, 'skipped': 0}
+    if not claimed:
+        return counts
+
+    emails, duplicates = _skip_duplicates(claimed)
+    emails, rate_limited = _skip_rate_limited(emails)
+    for email in duplicates:
+        email.status, email.last_error = 'skipped', 'Superseded by a newer email'
+    for email in rate_limited:
+        email.status, email.last_error = 'skipped', 'Rate limited'
+    counts['skipped'] = len(duplicates) + len(rate_limited)
+
+    if emails:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(emails)))) as pool:
+            results = list(pool.map(_deliver, emails))
+    else:
+        results = []
+
+    now = timezone.now()
+    for email, result in zip(emails, results):
+        if result.get('success'):
+            email.status = 'sent'
+            email.sent_at = now
+            email.message_id = result.get('message_id') or ''
+            email.last_error = ''
+            counts['sent'] += 1
+        elif _is_transient(result) and email.attempts < max_attempts:
+            email.status = 'pending'
+            email.next_try_at = now + timedelta(seconds=next_try_delay(email.attempts))
+            email.last_error = result.get('message', '')
+            counts['retried'] += 1
+        else:
+            email.status = 'failed'
+            email.last_error = result.get('message', '')
+            counts['failed'] += 1
+            logger.error(f"Giving up on {email.template} email {email.id} to {email.recipient_email}")
+
+    EmailOutbox.objects.bulk_update(
+        claimed, ['status', 'sent_at', 'message_id', 'last_error', 'next_try_at']
+    )
+    return counts
+
+
+def outbox_metrics():
+    """
+    Delivery health of the outbox
+
+    Returns:
+        dict: Row counts per status, age of the oldest due email, and the
+        number of emails sent and their average attempts over the last hour
+    """
+    now = timezone.now()
+    hour_ago = now - timedelta(hours=1)
+
+    by_status = dict(EmailOutbox.objects.values('status').annotate(n=Count('id')).values_list('status', 'n'))
+    oldest_due = EmailOutbox.objects.filter(status='pending', next_try_at__lte=now).aggregate(
+        oldest=Min('next_try_at')
+    )['oldest']
+    recent = EmailOutbox.objects.filter(status='sent', sent_at__gte=hour_ago).aggregate(
+        sent=Count('id'), attempts=Avg('attempts')
+    )
+
+    return {
+        'status_counts': {status: by_status.get(status, 0) for status, _ in EmailOutbox.STATUS_CHOICES},
+        'oldest_due_seconds': round((now - oldest_due).total_seconds(), 1) if oldest_due else 0,
+        'sent_last_hour': recent['sent'],
+        'average_attempts_last_hour': round(recent['attempts'] or 0, 2),
+    }
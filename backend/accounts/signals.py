@@ -0,0 +1,44 @@
+"""
+Model signal handlers
+Achievements are awarded from several places (admin, scripts), so the
+dashboard counter follows the model rather than a view. User and token
+changes drop cached token authentication snapshots.
+"""
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from bece_platform.authentication import invalidate_token, invalidate_user_tokens
+from .dashboard import record_activity
+from .models import Achievement, CustomUser, UserDashboardStats
+
+
+@receiver(post_save, sender=Achievement)
+def achievement_saved(sender, instance, created, **kwargs):
+    if created:
+        record_activity(instance.user_id, achievements_count=1)
+
+
+@receiver(post_delete, sender=Achievement)
+def achievement_deleted(sender, instance, origin=None, **kwargs):
+    # Deleting the user deletes their stats row too
+    if isinstance(origin, CustomUser):
+        return
+    # Plain update: the stats row may already be gone
+    UserDashboardStats.objects.filter(user_id=instance.user_id, achievements_count__gt=0).update(
+        achievements_count=F('achievements_count') - 1
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def user_saved(sender, instance, created, **kwargs):
+    # e.g. is_premium set by a payment or is_active changed in the admin
+    if not created:
+        invalidate_user_tokens(instance)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
@@ -1,3 +1,526 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Avg, Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from bece_platform import query_plans, stress
+from bece_platform.async_http import async_api_view
+from bece_platform.perf import QueryBudgetExceeded
+from bece_platform.testing import PASSWORD, QueryCountTestCase
+
+from .activity import STREAK_PAGE, current_streak, rebuild_activity
+from .dashboard import COUNTER_FIELDS, rebuild_stats
+from .mailing import run_campaign
+from .models import (
+    Achievement, CustomUser, DailyActivity, EmailOutbox, MailingCampaign, UserDashboardStats, UserProfile
+)
+from .outbox import enqueue_email, send_outbox_batch
+
+
+@override_settings(AUTH_TOKEN_CACHE='default')
+class CachedTokenAuthenticationTests(TestCase):
+    """Authenticated GETs skip the Token + user lookup once the token is cached"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = CustomUser.objects.create_user(username='student', email='student@example.com', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/profile/')
+        return response, len(queries)
+
+    def test_cached_request_saves_one_query(self):
+        response, cold = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        response, warm = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(warm, cold - 1)
+
+    @override_settings(AUTH_TOKEN_CACHE=None)
+    def test_no_snapshots_without_a_shared_cache(self):
+        _, cold = self.get_profile()
+        _, warm = self.get_profile()
+        self.assertEqual(warm, cold)
+        self.token.delete()
+        response, _ = self.get_profile()
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_logout_invalidates(self):
+        self.get_profile()
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        response, _ = self.get_profile()
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_change_password_invalidates(self):
+        self.get_profile()
+        response = self.client.post('/api/auth/change-password/', {
+            'old_password': 'pass12345', 'new_password': 'newpass12345', 'new_password_confirm': 'newpass12345',
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        response, _ = self.get_profile()
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_delete_account_invalidates(self):
+        self.get_profile()
+        self.client.delete('/api/auth/delete-account/')
+        response, _ = self.get_profile()
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_user_changes_are_not_served_stale(self):
+        self.get_profile()
+        self.user.is_premium = True
+        self.user.save()
+        response, _ = self.get_profile()
+        self.assertTrue(response.json()['is_premium'])
+
+
+class LeanMiddlewareTests(TestCase):
+    """Token API requests skip the browser-only middleware; everything else keeps it"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='student', email='student@example.com', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_token_request_skips_browser_middleware(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertNotIn('X-Frame-Options', response.headers)
+
+    def test_session_requests_keep_full_stack(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Frame-Options'], 'DENY')
+        response = client.post('/api/auth/logout/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_admin_keeps_full_stack(self):
+        response = self.client.get('/admin/login/', HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('csrftoken', response.cookies)
+        self.assertEqual(response.headers['X-Frame-Options'], 'DENY')
+
+
+class AsyncAPIViewTests(SimpleTestCase):
+    """async_api_view parses bodies the way the views expect"""
+
+    def post(self, body):
+        @async_api_view(['POST'])
+        async def echo(request):
+            return {'data': request.data}
+
+        request = RequestFactory().post('/', body, content_type='application/json')
+        response = async_to_sync(echo)(request)
+        return response.status_code, json.loads(response.content)
+
+    def test_json_object(self):
+        self.assertEqual(self.post({'amount': '80'}), (200, {'data': {'amount': '80'}}))
+
+    def test_rejects_bodies_that_are_not_objects(self):
+        for body in ('[1, 2]', '"text"', '42', 'null'):
+            status, _ = self.post(body)
+            self.assertEqual(status, 400, body)
+
+    def test_rejects_invalid_json(self):
+        self.assertEqual(self.post('{not json'), (400, {'detail': 'JSON parse error'}))
+
+
+@override_settings(SERVER_TIMING=True)
+class PerformanceMiddlewareTests(TestCase):
+    """Server-Timing reports the request's queries and cache use; budgets are enforced"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = CustomUser.objects.create_user(username='student', email='student@example.com', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def timing(self, response):
+        return dict(part.split(';', 1) for part in response.headers['Server-Timing'].split(', '))
+
+    @override_settings(AUTH_TOKEN_CACHE='default')  # Token snapshots give the request cache traffic
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/profile/')
+        timing = self.timing(response)
+        self.assertIn(f'desc="{len(queries)} queries"', timing['db'])
+        self.assertIn('desc="0 hits 1 misses"', timing['cache'])
+
+        timing = self.timing(self.client.get('/api/auth/profile/'))
+        self.assertIn('desc="1 hits 0 misses"', timing['cache'])
+        self.assertIn('total', timing)
+        self.assertIn('serializer', timing)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_no_header_when_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/auth/profile/').headers)
+
+    @override_settings(QUERY_BUDGETS={'profile': 0})
+    def test_budget_fails_under_tests(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get('/api/auth/profile/')
+
+    @override_settings(QUERY_BUDGETS={'profile': 0}, QUERY_BUDGET_STRICT=False)
+    def test_budget_logs_in_production(self):
+        with self.assertLogs('bece_platform.perf', 'WARNING') as logs:
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('"view": "profile"', logs.output[0])
+
+
+class QueryCountTests(QueryCountTestCase):
+    """Account endpoints run the same number of queries for 10 and 100 rows"""
+    urlconf = 'accounts.urls'
+    endpoints = {
+        'register': lambda d: ('post', {}, {
+            'email': 'new@example.com', 'username': 'new', 'password': 'newpass123', 'password_confirm': 'newpass123',
+        }),
+        'login': lambda d: ('post', {}, {'email': d.user.email, 'password': PASSWORD}),
+        'logout': lambda d: ('post', {}, {}),
+        'profile': lambda d: ('get', {}, None),
+        'user-profile': lambda d: ('get', {}, None),
+        'change-password': lambda d: ('post', {}, {
+            'old_password': PASSWORD, 'new_password': 'newpass123', 'new_password_confirm': 'newpass123',
+        }),
+        'delete-account': lambda d: ('delete', {}, None),
+        'update-preferences': lambda d: ('patch', {}, {'study_reminders': False}),
+        'get-preferences': lambda d: ('get', {}, None),
+        'request-password-reset': lambda d: ('post', {}, {'email': d.user.email}),
+        'reset-password': lambda d: ('post', {}, {'uid': 'MQ', 'token': 'invalid', 'new_password': 'newpass123'}),
+        'email-outbox-metrics': lambda d: ('get', {}, None),
+        'achievements': lambda d: ('get', {}, None),
+        'study-sessions': lambda d: ('get', {}, None),
+        'dashboard-stats': lambda d: ('get', {}, None),
+        'activity-heatmap': lambda d: ('get', {}, None),
+        'upcoming-tasks': lambda d: ('get', {}, None),
+    }
+    # The delete collector removes cascaded rows 100 per query; three of the
+    # user's tables pass 100 rows in the large dataset
+    allowed_growth = {'delete-account': 3}
+
+
+class IndexAdvisorTests(TestCase):
+    def test_hot_queries_have_an_index_and_no_full_scan(self):
+        for report in query_plans.explain_hot_queries():
+            with self.subTest(report.query.name):
+                self.assertTrue(report.expected_indexes, f'no index on {report.table}{tuple(report.query.columns)}')
+                self.assertNotIn(report.table, report.full_scans, report.plan)
+
+    def test_parse_plans(self):
+        self.assertEqual(
+            query_plans.parse_plan('4 0 0 SCAN ecommerce_order\n26 0 0 USE TEMP B-TREE FOR ORDER BY', 'sqlite'),
+            ([], ['ecommerce_order'], True),
+        )
+        self.assertEqual(
+            query_plans.parse_plan(
+                '5 0 0 SEARCH courses_quizattempt USING INDEX quiz_attempt_open (user_id=? AND quiz_id=?)', 'sqlite'
+            ),
+            (['quiz_attempt_open'], [], False),
+        )
+        self.assertEqual(
+            query_plans.parse_plan(
+                'Limit  (cost=0.29..8.31 rows=1 width=45)\n'
+                '  ->  Index Scan using order_user_history on ecommerce_order  (cost=0.29..8.31 rows=1 width=45)\n'
+                '        Index Cond: (user_id = 1)', 'postgresql'
+            ),
+            (['order_user_history'], [], False),
+        )
+        self.assertEqual(
+            query_plans.parse_plan(
+                'Limit\n  ->  Sort\n        Sort Key: created_at DESC\n        ->  Seq Scan on ecommerce_order\n'
+                '              Filter: (user_id = 1)', 'postgresql'
+            ),
+            ([], ['ecommerce_order'], True),
+        )
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_superuser(username='admin', email='admin@example.com', password=PASSWORD)
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def test_export(self):
+        response = self.client.get('/api/exports/orders/', {'from': '2024-01-01', 'to': '2024-12-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'id,'))
+
+    def test_invalid_dates_are_rejected(self):
+        for value in ('yesterday', '2024-13-45'):
+            with self.subTest(value):
+                response = self.client.get('/api/exports/orders/', {'from': value})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('from', response.json()['error'])
+
+
+@override_settings(EMAIL_OUTBOX_WORKER=True)
+class OutboxTests(TestCase):
+    """Duplicate collapsing and inline delivery of queued emails"""
+
+    def setUp(self):
+        patcher = mock.patch(
+            'accounts.outbox.brevo_service.send_email', return_value={'success': True, 'message_id': 'm1'}
+        )
+        self.send_email = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, link):
+        return enqueue_email('password_reset', 'student@example.com', context={'reset_link': link})
+
+    def test_newest_reset_email_is_sent_once(self):
+        for n in range(3):
+            self.queue(f'link-{n}')
+        counts = send_outbox_batch()
+        self.assertEqual((counts['sent'], counts['skipped']), (1, 2))
+        self.assertIn('link-2', self.send_email.call_args.kwargs['html_content'])
+
+    def test_older_retry_does_not_suppress_a_newer_email(self):
+        retrying = self.queue('old')
+        fresh = self.queue('new')
+        # The older copy is waiting for its retry; the new one is due now
+        EmailOutbox.objects.filter(id=retrying.id).update(next_try_at=retrying.next_try_at + timedelta(hours=1))
+
+        self.assertEqual(send_outbox_batch()['sent'], 1)
+        fresh.refresh_from_db()
+        retrying.refresh_from_db()
+        self.assertEqual(fresh.status, 'sent')
+        self.assertEqual((retrying.status, retrying.last_error), ('skipped', 'Superseded by a newer email'))
+
+    def test_newer_queued_email_supersedes_a_due_one(self):
+        due = self.queue('old')
+        later = self.queue('new')
+        EmailOutbox.objects.filter(id=later.id).update(next_try_at=later.next_try_at + timedelta(hours=1))
+
+        self.assertEqual(send_outbox_batch()['skipped'], 1)
+        self.send_email.assert_not_called()
+        due.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual((due.status, later.status), ('skipped', 'pending'))
+
+    @override_settings(EMAIL_OUTBOX_WORKER=False)
+    def test_sent_inline_without_a_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            email = self.queue('link')
+        email.refresh_from_db()
+        self.assertEqual(email.status, 'sent')
+        self.send_email.assert_called_once()
+
+
+class MailingCampaignTests(TestCase):
+    """Failed batches are retried on resume; a deleted announcement cancels its campaign"""
+
+    def setUp(self):
+        self.users = [
+            CustomUser.objects.create_user(username=f'user{n}', email=f'user{n}@example.com', password=PASSWORD)
+            for n in range(5)
+        ]
+        self.refused = {'user2@example.com'}
+        self.batches = []
+
+    def send(self, subject, html_content, text_content, versions):
+        emails = [version['email'] for version in versions]
+        self.batches.append(emails)
+        if self.refused.intersection(emails):
+            return {'success': False, 'status_code': 400, 'message': 'Invalid recipient'}
+        return {'success': True}
+
+    def test_failed_batches_are_retried_on_resume(self):
+        campaign = MailingCampaign.objects.create(kind='weekly_digest')
+        with self.assertLogs('accounts.mailing', 'ERROR'):
+            stats = run_campaign(campaign, chunk_size=1, workers=2, send=self.send)
+        self.assertEqual((stats['sent'], stats['failed']), (4, 1))
+        self.assertEqual(campaign.status, 'completed')
+        self.assertEqual(campaign.failed_user_ids, [self.users[2].id])
+
+        self.refused = set()
+        self.batches = []
+        stats = run_campaign(campaign, chunk_size=1, workers=2, send=self.send)
+        self.assertEqual(self.batches, [['user2@example.com']])
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(
+            (campaign.sent_count, campaign.failed_count, campaign.failed_user_ids, campaign.status),
+            (5, 0, [], 'completed'),
+        )
+
+    def test_deleted_announcement_cancels_the_campaign(self):
+        from ecommerce.models import Announcement
+
+        announcement = Announcement.objects.create(title='Mock exams', content='Starting Monday')
+        campaign = MailingCampaign.objects.create(kind='announcement', announcement=announcement)
+        announcement.delete()
+        campaign.refresh_from_db()
+
+        with self.assertLogs('accounts.mailing', 'WARNING'):
+            stats = run_campaign(campaign, send=self.send)
+        self.assertEqual((stats['sent'], self.batches), (0, []))
+        self.assertEqual(campaign.status, 'cancelled')
+        self.assertIsNotNone(campaign.finished_at)
+
+
+class DashboardProjectionTests(TestCase):
+    """Stats kept up to date by record_activity match a rebuild and the old per-request queries"""
+
+    def setUp(self):
+        from courses.models import Answer, Question, Quiz
+
+        self.user = stress.make_user('dashboard')
+        rebuild_stats([self.user.id])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.course = stress.make_course(lessons=3)
+        self.lessons = list(self.course.lessons.order_by('order'))
+        self.quiz = Quiz.objects.create(
+            title='Quiz', slug='quiz', course=self.course, subject=self.course.subject, is_published=True
+        )
+        question = Question.objects.create(quiz=self.quiz, question_text='2 + 2?', points=100)
+        self.right = Answer.objects.create(question=question, answer_text='4', is_correct=True)
+        self.wrong = Answer.objects.create(question=question, answer_text='5')
+
+    def take_quiz(self, answer):
+        self.client.post(reverse('start-quiz', args=[self.quiz.id]))
+        response = self.client.post(reverse('submit-quiz'), {
+            'quiz_id': self.quiz.id,
+            'answers': [{'question_id': answer.question_id, 'answer_id': answer.id}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def learn(self):
+        self.client.get(reverse('lesson-detail', args=[self.lessons[0].id]))
+        self.client.post(reverse('complete-lesson', args=[self.lessons[0].id]))
+        self.client.post(reverse('complete-lesson', args=[self.lessons[1].id]))
+        self.client.post(reverse('complete-lesson', args=[self.lessons[1].id]))  # Counted once
+        self.take_quiz(self.right)
+        self.take_quiz(self.wrong)
+        self.client.post(reverse('study-sessions'), {'duration_minutes': 25, 'subject': 'Maths'})
+        Achievement.objects.create(user=self.user, title='First quiz', description='', achievement_type='quiz')
+
+    def snapshot(self):
+        stats = UserDashboardStats.objects.get(user=self.user)
+        return {field: getattr(stats, field) for field in COUNTER_FIELDS + ['recent_lessons', 'recent_quizzes']}
+
+    def test_incremental_row_equals_rebuild(self):
+        self.learn()
+        incremental = self.snapshot()
+        self.assertEqual(incremental['lessons_completed'], 2)
+        self.assertEqual(incremental['quizzes_passed'], 1)
+        self.assertEqual(incremental['achievements_count'], 1)
+
+        rebuild_stats([self.user.id])
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_dashboard_matches_the_per_field_queries(self):
+        from courses.models import LessonProgress, QuizAttempt, UserProgress
+
+        self.learn()
+        data = self.client.get(reverse('dashboard-stats')).json()
+
+        lessons = LessonProgress.objects.filter(user=self.user)
+        quizzes = QuizAttempt.objects.filter(user=self.user)
+        minutes = (lessons.aggregate(total=Sum('time_spent_minutes'))['total'] or 0) + (
+            quizzes.aggregate(total=Sum('time_taken_minutes'))['total'] or 0
+        )
+        week_ago = timezone.now() - timedelta(days=7)
+        expected = {
+            'lessons_completed': lessons.filter(is_completed=True).count(),
+            'quizzes_passed': quizzes.filter(is_completed=True, score__gte=70).count(),
+            'total_study_hours': round(minutes / 60, 1),
+            'overall_progress': round(
+                UserProgress.objects.filter(user=self.user).aggregate(avg=Avg('completion_percentage'))['avg'], 1
+            ),
+            'achievements_count': Achievement.objects.filter(user=self.user).count(),
+            'total_study_time_minutes': minutes,
+            'recent_lessons_count': min(5, lessons.filter(last_accessed__gte=week_ago).count()),
+            'recent_quizzes_count': min(5, quizzes.filter(started_at__gte=week_ago).count()),
+        }
+        self.assertEqual({field: data[field] for field in expected}, expected)
+        self.assertEqual(data['study_streak'], 1)
+        self.assertEqual(len(data['recent_sessions']), 1)
+
+
+class DailyActivityTests(TestCase):
+    """Streaks, local-day bucketing and the heatmap window"""
+
+    def setUp(self):
+        self.user = stress.make_user('activity')
+        UserProfile.objects.create(user=self.user, timezone='Pacific/Auckland')
+        rebuild_stats([self.user.id])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def active(self, *days_ago, today=date(2024, 3, 1)):
+        DailyActivity.objects.bulk_create([
+            DailyActivity(user=self.user, local_date=today - timedelta(days=n), minutes=10) for n in days_ago
+        ])
+        return current_streak(self.user.id, today)
+
+    def study(self, start, minutes):
+        response = self.client.post(reverse('study-sessions'), {
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=minutes)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def local_days(self):
+        return dict(DailyActivity.objects.filter(user=self.user).values_list('local_date', 'minutes'))
+
+    def test_streak_stops_at_the_first_gap(self):
+        self.assertEqual(self.active(0, 1, 2, 4, 5), 3)
+
+    def test_streak_is_alive_from_yesterday(self):
+        self.assertEqual(self.active(1, 2), 2)
+
+    def test_streak_older_than_yesterday_is_broken(self):
+        self.assertEqual(self.active(2, 3, 4), 0)
+
+    def test_streak_of_exactly_one_page(self):
+        self.assertEqual(self.active(*range(STREAK_PAGE)), STREAK_PAGE)
+
+    def test_streak_across_pages(self):
+        self.assertEqual(self.active(*range(1, 2 * STREAK_PAGE + 6)), 2 * STREAK_PAGE + 5)
+
+    def test_gap_right_after_a_full_page(self):
+        self.assertEqual(self.active(*range(STREAK_PAGE), STREAK_PAGE + 1, STREAK_PAGE + 2), STREAK_PAGE)
+
+    def test_days_are_bucketed_in_the_users_timezone(self):
+        # 09:00 and 20:00 UTC on 1 January are 22:00 on the 1st and 09:00 on the 2nd in Auckland
+        self.study(datetime(2024, 1, 1, 9, tzinfo=dt_timezone.utc), 30)
+        self.study(datetime(2024, 1, 1, 20, tzinfo=dt_timezone.utc), 45)
+        self.assertEqual(self.local_days(), {date(2024, 1, 1): 30, date(2024, 1, 2): 45})
+
+    def test_incremental_rows_equal_rebuild(self):
+        for hour in (0, 10, 11, 12, 30, 60):
+            self.study(datetime(2024, 1, 1, tzinfo=dt_timezone.utc) + timedelta(hours=hour), 20)
+        incremental = self.local_days()
+        rebuild_activity([self.user.id])
+        self.assertEqual(self.local_days(), incremental)
+
+    def test_heatmap_window_ends_on_the_users_today(self):
+        UserProfile.objects.filter(user=self.user).update(timezone='America/Los_Angeles')
+        self.active(0, 1, 2, today=date(2024, 1, 1))
+        # 03:00 UTC on 2 January is still 1 January in Los Angeles
+        now = datetime(2024, 1, 2, 3, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            data = self.client.get(reverse('activity-heatmap'), {'days': 2}).json()
+        self.assertEqual((data['from'], data['to']), ('2023-12-31', '2024-01-01'))
+        self.assertEqual([day['date'] for day in data['activity']], ['2023-12-31', '2024-01-01'])
 
-# Create your tests here.
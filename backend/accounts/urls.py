@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_OUTBOUND_VIEWS:
+    from . import async_views as reset_views
+else:
+    reset_views = views
+
 urlpatterns = [
     path('register/', views.RegisterView.as_view(), name='register'),
     path('login/', views.login_view, name='login'),
@@ -11,10 +17,12 @@ urlpatterns = [
     path('delete-account/', views.delete_account, name='delete-account'),
     path('preferences/', views.update_preferences, name='update-preferences'),
     path('preferences/get/', views.get_preferences, name='get-preferences'),
-    path('password-reset/request/', views.request_password_reset, name='request-password-reset'),
+    path('password-reset/request/', reset_views.request_password_reset, name='request-password-reset'),
     path('password-reset/confirm/', views.reset_password, name='reset-password'),
+    path('outbox/metrics/', views.email_outbox_metrics, name='email-outbox-metrics'),
     path('achievements/', views.AchievementListView.as_view(), name='achievements'),
     path('study-sessions/', views.StudySessionListCreateView.as_view(), name='study-sessions'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('activity/heatmap/', views.activity_heatmap, name='activity-heatmap'),
     path('upcoming-tasks/', views.upcoming_tasks, name='upcoming-tasks'),
 ]
\ No newline at end of file
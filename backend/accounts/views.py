@@ -6,17 +6,19 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.db import models
 from django.conf import settings
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse
 from drf_spectacular.types import OpenApiTypes
+from bece_platform.authentication import invalidate_user_tokens
 from .models import CustomUser, UserProfile, Achievement, StudySession
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, CustomUserSerializer,
     UserProfileSerializer, AchievementSerializer, StudySessionSerializer,
     PasswordChangeSerializer
 )
-from .email_service import brevo_service
+from .activity import current_streak, heatmap
+from .dashboard import get_dashboard_stats, local_today, record_activity, stats_payload
+from .outbox import enqueue_email, outbox_metrics
 
 
 @extend_schema(
@@ -73,7 +75,9 @@ def login_view(request):
     serializer = UserLoginSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        login(request, user)
+        # Token API clients skip the session middleware (bece_platform.middleware)
+        if hasattr(request, 'session'):
+            login(request, user)
         
         token, created = Token.objects.get_or_create(user=user)
         
@@ -96,11 +100,13 @@ def login_view(request):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def logout_view(request):
+    invalidate_user_tokens(request.user)
     try:
         request.user.auth_token.delete()
     except:
         pass
-    logout(request)
+    if hasattr(request, 'session'):
+        logout(request)
     return Response({'message': 'Logout successful'})
 
 
@@ -181,6 +187,7 @@ def change_password(request):
         user.save()
         
         # Update token
+        invalidate_user_tokens(user)
         try:
             request.user.auth_token.delete()
         except:
@@ -231,18 +238,19 @@ def request_password_reset(request):
     # Create reset link
     reset_link = f"{settings.FRONTEND_URL}/reset-password/{uid}/{token}/"
     
-    # Send email
-    email_result = brevo_service.send_password_reset_email(
-        user_email=user.email,
-        user_name=user.get_full_name() or user.email,
-        reset_link=reset_link,
-        expires_in_hours=24
+    # Queue the email; the send_outbox worker (or enqueue_email itself) delivers it
+    enqueue_email(
+        'password_reset',
+        recipient_email=user.email,
+        recipient_name=user.get_full_name() or user.email,
+        context={
+            'user_name': user.get_full_name() or user.email,
+            'reset_link': reset_link,
+            'expires_in_hours': 24,
+        }
     )
     
-    if email_result['success']:
-        return Response({'message': 'If an account with this email exists, you will receive a password reset link.'})
-    else:
-        return Response({'error': 'Failed to send email. Please try again later.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    return Response({'message': 'If an account with this email exists, you will receive a password reset link.'})
 
 
 @extend_schema(
@@ -290,16 +298,31 @@ def reset_password(request):
     # Reset password
     user.set_password(new_password)
     user.save()
-    
-    # Send confirmation email
-    brevo_service.send_password_changed_email(
-        user_email=user.email,
-        user_name=user.get_full_name() or user.email
+    invalidate_user_tokens(user)
+    
+    # Queue confirmation email
+    enqueue_email(
+        'password_changed',
+        recipient_email=user.email,
+        recipient_name=user.get_full_name() or user.email,
+        context={'user_name': user.get_full_name() or user.email}
     )
     
     return Response({'message': 'Password reset successful'})
 
 
+@extend_schema(
+    tags=['Authentication'],
+    summary='Email Outbox Metrics',
+    description='Delivery health of the transactional email outbox (admin only)',
+    responses={200: OpenApiTypes.OBJECT}
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def email_outbox_metrics(request):
+    return Response(outbox_metrics())
+
+
 @extend_schema(
     tags=['Authentication'],
     summary='Get User Achievements',
@@ -336,7 +359,8 @@ class StudySessionListCreateView(generics.ListCreateAPIView):
         return StudySession.objects.filter(user=self.request.user).order_by('-start_time')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        session = serializer.save(user=self.request.user)
+        record_activity(self.request.user.id, activity_at=session.start_time, minutes=session.duration_minutes)
 
 
 @extend_schema(
@@ -360,83 +384,39 @@ class StudySessionListCreateView(generics.ListCreateAPIView):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def dashboard_stats(request):
-    from courses.models import LessonProgress, QuizAttempt, UserProgress
-    from django.utils import timezone
-    from datetime import datetime, timedelta
-    
     user = request.user
     
-    # Get lessons completed count
-    lessons_completed = LessonProgress.objects.filter(
-        user=user, 
-        is_completed=True
-    ).count()
-    
-    # Get quizzes passed count (score >= 70%)
-    quizzes_passed = QuizAttempt.objects.filter(
-        user=user,
-        is_completed=True,
-        score__gte=70  # Assuming 70% is passing score
-    ).count()
-    
-    # Get total study time from lesson progress and quiz attempts
-    lesson_study_time = LessonProgress.objects.filter(user=user).aggregate(
-        total=models.Sum('time_spent_minutes')
-    )['total'] or 0
-    
-    quiz_study_time = QuizAttempt.objects.filter(user=user).aggregate(
-        total=models.Sum('time_taken_minutes')
-    )['total'] or 0
-    
-    total_study_hours = round((lesson_study_time + quiz_study_time) / 60, 1)
-    
-    # Calculate study streak (consecutive days with activity)
-    study_streak = calculate_study_streak(user)
-    
-    # Get overall progress percentage
-    user_progress_data = UserProgress.objects.filter(user=user)
-    if user_progress_data.exists():
-        overall_progress = round(
-            user_progress_data.aggregate(
-                avg_progress=models.Avg('completion_percentage')
-            )['avg_progress'] or 0, 1
-        )
-    else:
-        overall_progress = 0.0
-    
-    # Get achievements count
-    achievements_count = Achievement.objects.filter(user=user).count()
-    
-    # Get recent study sessions
+    stats = get_dashboard_stats(user)
+    streak = current_streak(user.id, local_today(stats))
     recent_sessions = StudySession.objects.filter(user=user).order_by('-start_time')[:5]
     
-    # Get recent activity (lessons and quizzes from last 7 days)
-    week_ago = timezone.now() - timedelta(days=7)
-    recent_lessons = LessonProgress.objects.filter(
-        user=user, 
-        last_accessed__gte=week_ago
-    ).order_by('-last_accessed')[:5]
-    
-    recent_quizzes = QuizAttempt.objects.filter(
-        user=user,
-        started_at__gte=week_ago
-    ).order_by('-started_at')[:5]
-    
     return Response({
-        'lessons_completed': lessons_completed,
-        'quizzes_passed': quizzes_passed,
-        'total_study_hours': total_study_hours,
-        'study_streak': study_streak,
-        'overall_progress': overall_progress,
-        'achievements_count': achievements_count,
-        'total_study_time_minutes': lesson_study_time + quiz_study_time,
+        **stats_payload(stats, streak),
         'recent_sessions': StudySessionSerializer(recent_sessions, many=True).data,
-        'recent_lessons_count': recent_lessons.count(),
-        'recent_quizzes_count': recent_quizzes.count(),
         'is_premium': user.is_premium
     })
 
 
+@extend_schema(
+    tags=['Authentication'],
+    summary='Get Activity Heatmap',
+    description='Daily study activity (minutes, lessons, quizzes) for the last year, in the user\'s timezone',
+    parameters=[
+        OpenApiParameter(name='days', type=OpenApiTypes.INT, description='Number of days (default 365, max 366)')
+    ],
+    responses={200: OpenApiResponse(description='Active days with their counts')}
+)
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def activity_heatmap(request):
+    try:
+        days = min(max(int(request.query_params.get('days', 365)), 1), 366)
+    except ValueError:
+        return Response({'error': 'days must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response(heatmap(request.user.id, days))
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def upcoming_tasks(request):
@@ -470,9 +450,9 @@ def upcoming_tasks(request):
             'days_until_due': task.days_until_due,
             'urgency_label': task.urgency_label,
             'urgency_color': task.urgency_color,
-            'course_id': task.course.id if task.course else None,
-            'lesson_id': task.lesson.id if task.lesson else None,
-            'quiz_id': task.quiz.id if task.quiz else None,
+            'course_id': task.course_id,
+            'lesson_id': task.lesson_id,
+            'quiz_id': task.quiz_id,
         })
     
     return Response({
@@ -481,74 +461,6 @@ def upcoming_tasks(request):
     })
 
 
-def calculate_study_streak(user):
-    """Calculate consecutive days of study activity"""
-    from courses.models import LessonProgress, QuizAttempt
-    from accounts.models import StudySession
-    from django.utils import timezone
-    from datetime import datetime, timedelta
-    
-    # Get all activity dates (lessons, quizzes, and study sessions)
-    lesson_dates = set(
-        LessonProgress.objects.filter(user=user)
-        .values_list('last_accessed__date', flat=True)
-        .distinct()
-    )
-    
-    quiz_dates = set(
-        QuizAttempt.objects.filter(user=user)
-        .values_list('started_at__date', flat=True)
-        .distinct()
-    )
-    
-    session_dates = set(
-        StudySession.objects.filter(user=user)
-        .values_list('start_time__date', flat=True)
-        .distinct()
-    )
-    
-    # Combine all activity dates
-    all_activity_dates = lesson_dates.union(quiz_dates).union(session_dates)
-    
-    if not all_activity_dates:
-        return 0
-    
-    # Sort dates in descending order
-    sorted_dates = sorted(all_activity_dates, reverse=True)
-    
-    # Calculate streak from most recent activity date backwards
-    today = timezone.now().date()
-    streak = 0
-    
-    # Start from today or the most recent activity date
-    if sorted_dates and sorted_dates[0] == today:
-        current_check_date = today
-    elif sorted_dates and sorted_dates[0] == today - timedelta(days=1):
-        # If most recent activity was yesterday, start streak from yesterday
-        current_check_date = today - timedelta(days=1)
-    else:
-        # No recent activity, no streak
-        return 0
-    
-    # Count consecutive days with activity
-    for activity_date in sorted_dates:
-        if activity_date == current_check_date:
-            streak += 1
-            current_check_date -= timedelta(days=1)
-        elif activity_date < current_check_date:
-            # Check if there's a gap
-            gap_days = (current_check_date - activity_date).days
-            if gap_days == 1:
-                # Continue checking previous day
-                current_check_date = activity_date
-                streak += 1
-                current_check_date -= timedelta(days=1)
-            else:
-                # Gap found, break streak
-                break
-    
-    return streak
-
 @extend_schema(
     tags=['Authentication'],
     summary='Delete Account',
@@ -572,6 +484,7 @@ def delete_account(request):
         print(f"Account deletion requested for user: {user.email} (ID: {user.id})")
         
         # Delete the user account (this will cascade delete related data)
+        invalidate_user_tokens(user)
         user.delete()
         
         return Response({
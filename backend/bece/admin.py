@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django import forms
+from django.db import transaction
 from .models import (
     BECESubject, BECEYear, BECEPaper, BECEQuestion, BECEAnswer,
-    BECEPracticeAttempt, BECEUserAnswer, BECEStatistics
+    BECEPracticeAttempt, BECEUserAnswer, BECEStatistics, PendingEssayAnswer
 )
+from .grading import pending_essay_answers, apply_grades
 
 
 @admin.register(BECESubject)
@@ -183,6 +185,85 @@ class BECEUserAnswerAdmin(admin.ModelAdmin):
     )
 
 
+class EssayGradeForm(forms.ModelForm):
+    """Changelist row form; prefilled with the suggested mark, rejects marks outside 0..question.marks"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        prescore = getattr(self.instance, 'prescore', None)
+        # Only when rendering: a bound form compares against the stored mark, so accepting the suggestion still saves
+        if not self.is_bound and prescore is not None:
+            self.initial['marks_earned'] = prescore.suggested_marks
+    
+    def clean_marks_earned(self):
+        marks = self.cleaned_data['marks_earned']
+        max_marks = self.instance.question.marks
+        if marks < 0:
+            raise forms.ValidationError("Marks cannot be negative")
+        if marks > max_marks:
+            raise forms.ValidationError(f"Cannot earn more than {max_marks} marks")
+        return marks
+
+
+@admin.register(PendingEssayAnswer)
+class PendingEssayAnswerAdmin(admin.ModelAdmin):
+    """Grading queue: edit marks and feedback for many essays, then save once"""
+    list_display = ('question', 'student', 'max_marks', 'suggested_marks', 'keyword_coverage', 'text_answer', 'marks_earned', 'teacher_feedback', 'answered_at')
+    list_editable = ('marks_earned', 'teacher_feedback')
+    list_display_links = None
+    search_fields = ('attempt__user__email',)
+    list_per_page = 50
+    
+    def get_queryset(self, request):
+        return pending_essay_answers()
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def student(self, obj):
+        return obj.attempt.user.email
+    student.short_description = 'Student'
+    
+    def max_marks(self, obj):
+        return obj.question.marks
+    max_marks.short_description = 'Out of'
+    
+    def suggested_marks(self, obj):
+        prescore = getattr(obj, 'prescore', None)
+        return prescore.suggested_marks if prescore else None
+    suggested_marks.short_description = 'Suggested'
+    suggested_marks.admin_order_field = 'prescore__suggested_marks'
+    
+    def keyword_coverage(self, obj):
+        prescore = getattr(obj, 'prescore', None)
+        return f"{prescore.keyword_coverage:.0%}" if prescore else None
+    keyword_coverage.short_description = 'Keywords'
+    keyword_coverage.admin_order_field = 'prescore__keyword_coverage'
+    
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', EssayGradeForm)
+        return super().get_changelist_form(request, **kwargs)
+    
+    def changelist_view(self, request, extra_context=None):
+        # Edited rows are collected by save_model and graded as one batch
+        request._essay_grades = []
+        with transaction.atomic():
+            response = super().changelist_view(request, extra_context)
+            if request._essay_grades:
+                apply_grades(request._essay_grades, graded_by=request.user)
+        return response
+    
+    def save_model(self, request, obj, form, change):
+        grades = getattr(request, '_essay_grades', None)
+        if grades is None:
+            return super().save_model(request, obj, form, change)
+        grades.append({
+            'answer_id': obj.id,
+            'marks_earned': obj.marks_earned,
+            'teacher_feedback': obj.teacher_feedback,
+        })
+
+
 @admin.register(BECEStatistics)
 class BECEStatisticsAdmin(admin.ModelAdmin):
     list_display = ('user', 'subject', 'total_attempts', 'best_score', 'average_score', 'last_attempt')
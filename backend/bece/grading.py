@@ -0,0 +1,138 @@
+"""
+Essay grading queue for BECE practice attempts
+Teachers mark essay answers in batches; attempt totals and user statistics
+are recomputed set-wise for every attempt touched by the batch
+"""
+
+from django.db import transaction
+from django.db.models import (
+    Avg, Case, Count, F, FloatField, IntegerField, Max, OuterRef, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import BECEPracticeAttempt, BECEUserAnswer, BECEStatistics
+
+
+def pending_essay_answers():
+    """Essay answers waiting for a mark, oldest first (served by the partial index)"""
+    return (
+        BECEUserAnswer.objects.filter(needs_grading=True)
+        .select_related(
+            'question', 'question__paper__year', 'question__paper__subject', 'attempt__user', 'prescore'
+        )
+        .order_by('answered_at')
+    )
+
+
+def apply_grades(grades, graded_by=None):
+    """
+    Record marks and feedback for many essay answers in one transaction
+
+    Args:
+        grades (list): dicts with answer_id, marks_earned and optional teacher_feedback
+        graded_by (User): teacher submitting the marks
+
+    Returns:
+        dict: number of answers graded and ids of the attempts recomputed
+    """
+    by_id = {grade['answer_id']: grade for grade in grades}
+    now = timezone.now()
+
+    with transaction.atomic():
+        answers = list(
+            BECEUserAnswer.objects.select_for_update()
+            .filter(id__in=by_id.keys())
+            .select_related('question')
+        )
+        for answer in answers:
+            grade = by_id[answer.id]
+            answer.marks_earned = grade['marks_earned']
+            answer.is_correct = grade['marks_earned'] >= answer.question.marks
+            if 'teacher_feedback' in grade:
+                answer.teacher_feedback = grade['teacher_feedback']
+            answer.needs_grading = False
+            answer.graded_at = now
+            answer.graded_by = graded_by
+
+        BECEUserAnswer.objects.bulk_update(
+            answers,
+            ['marks_earned', 'is_correct', 'teacher_feedback', 'needs_grading', 'graded_at', 'graded_by'],
+        )
+
+        attempt_ids = {answer.attempt_id for answer in answers}
+        recompute_attempts(attempt_ids)
+        recompute_statistics(attempt_ids)
+
+    return {'graded': len(answers), 'attempt_ids': sorted(attempt_ids)}
+
+
+def recompute_attempts(attempt_ids):
+    """Recompute score and percentage of the given attempts with a single UPDATE"""
+    marks = (
+        BECEUserAnswer.objects.filter(attempt=OuterRef('pk'))
+        .values('attempt')
+        .annotate(total=Sum('marks_earned'))
+        .values('total')
+    )
+    BECEPracticeAttempt.objects.filter(id__in=attempt_ids).update(
+        score=Coalesce(Subquery(marks, output_field=IntegerField()), Value(0))
+    )
+    BECEPracticeAttempt.objects.filter(id__in=attempt_ids).update(
+        percentage=Case(
+            When(total_marks__gt=0, then=Cast(F('score'), FloatField()) * 100.0 / F('total_marks')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+def recompute_statistics(attempt_ids):
+    """Rebuild BECEStatistics rows for every (user, subject) pair behind the given attempts"""
+    pairs = (
+        BECEPracticeAttempt.objects.filter(id__in=attempt_ids)
+        .values_list('user_id', 'paper__subject_id')
+        .distinct()
+    )
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    user_ids = {user_id for user_id, _ in pairs}
+    subject_ids = {subject_id for _, subject_id in pairs}
+    rows = (
+        BECEPracticeAttempt.objects.filter(
+            user_id__in=user_ids,
+            paper__subject_id__in=subject_ids,
+            is_completed=True,
+        )
+        .values('user_id', 'paper__subject_id')
+        .annotate(
+            attempts=Count('id'),
+            best=Max('score'),
+            average=Avg('score'),
+            minutes=Sum('time_taken_minutes'),
+            last=Max('completed_at'),
+        )
+    )
+
+    stats = [
+        BECEStatistics(
+            user_id=row['user_id'],
+            subject_id=row['paper__subject_id'],
+            total_attempts=row['attempts'],
+            best_score=row['best'] or 0,
+            average_score=row['average'] or 0,
+            total_time_minutes=row['minutes'] or 0,
+            last_attempt=row['last'],
+        )
+        for row in rows
+        if (row['user_id'], row['paper__subject_id']) in pairs
+    ]
+    BECEStatistics.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['user', 'subject'],
+        update_fields=['total_attempts', 'best_score', 'average_score', 'total_time_minutes', 'last_attempt'],
+    )
+    return len(stats)
@@ -0,0 +1,415 @@
+"""
+Streaming bulk importer for BECE papers, questions and answer options
+Reads JSONL or CSV record streams, validates them in a first pass and then
+upserts them in batches on the models' natural keys
+"""
+
+import csv
+import json
+import os
+
+from django.db import transaction
+
+from .models import BECESubject, BECEYear, BECEPaper, BECEQuestion, BECEAnswer
+
+RECORD_TYPES = ('paper', 'question', 'answer')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+
+class ImportValidationError(Exception):
+    """Raised when the first pass finds invalid records"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(f"{len(errors)} invalid record(s)")
+
+
+def _to_int(value, required=False):
+    if value is None or value == '':
+        if required:
+            raise ValueError('is required')
+        return None
+    if isinstance(value, bool):
+        raise ValueError('must be an integer')
+    return int(value)
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value is None:
+        return False
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError('must be a boolean')
+
+
+def _to_text(value):
+    return '' if value is None else str(value)
+
+
+def _choice(value, choices, required=True):
+    valid = {key for key, _ in choices}
+    if value in (None, ''):
+        if required:
+            raise ValueError('is required')
+        return None
+    if value not in valid:
+        raise ValueError(f"must be one of {', '.join(sorted(valid))}")
+    return value
+
+
+# Optional fields per record type: field name -> (parser, default)
+PAPER_FIELDS = {
+    'title': (_to_text, ''),
+    'duration_minutes': (_to_int, 120),
+    'total_marks': (_to_int, 100),
+    'instructions': (_to_text, ''),
+    'is_published': (_to_bool, False),
+}
+
+QUESTION_FIELDS = {
+    'question_text': (_to_text, ''),
+    'marks': (_to_int, 1),
+    'topic': (_to_text, ''),
+    'essay_instructions': (_to_text, ''),
+    'word_limit': (_to_int, None),
+    'time_limit_minutes': (_to_int, None),
+    'learning_objective': (_to_text, ''),
+    'explanation': (_to_text, ''),
+}
+
+ANSWER_FIELDS = {
+    'answer_text': (_to_text, ''),
+    'is_correct': (_to_bool, False),
+}
+
+QUESTION_TYPES = BECEQuestion._meta.get_field('question_type').choices
+DIFFICULTY_LEVELS = BECEQuestion._meta.get_field('difficulty_level').choices
+OPTION_LETTERS = BECEAnswer._meta.get_field('option_letter').choices
+
+
+def read_records(path, file_format=None, start_line=0):
+    """
+    Stream (line_number, record) pairs from a JSONL or CSV file
+
+    Args:
+        path (str): File to read
+        file_format (str): 'jsonl' or 'csv'; guessed from the extension when omitted
+        start_line (int): Skip records up to and including this line number
+    """
+    file_format = file_format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+
+    with open(path, newline='', encoding='utf-8') as handle:
+        if file_format == 'csv':
+            reader = csv.DictReader(handle)
+            # Header is line 1, so data starts at line 2
+            for line_number, row in enumerate(reader, start=2):
+                if line_number <= start_line:
+                    continue
+                yield line_number, {key: value for key, value in row.items() if key}
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                if line_number <= start_line or not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = {'_error': f'invalid JSON: {e.msg}'}
+                yield line_number, record
+
+
+def parse_record(record):
+    """
+    Validate and normalise one raw record
+
+    Returns:
+        tuple: (record_type, key, values)
+    """
+    if '_error' in record:
+        raise ValueError(record['_error'])
+
+    record_type = record.get('type') or record.get('record_type')
+    if record_type not in RECORD_TYPES:
+        raise ValueError(f"type must be one of {', '.join(RECORD_TYPES)}")
+
+    try:
+        year = _to_int(record.get('year'), required=True)
+    except ValueError as e:
+        raise ValueError(f'year {e}')
+    subject = record.get('subject')
+    if not subject:
+        raise ValueError('subject is required')
+    paper_type = _choice(record.get('paper_type'), BECEPaper.PAPER_TYPES)
+    paper_key = (year, subject, paper_type)
+
+    if record_type == 'paper':
+        return record_type, paper_key, _parse_fields(record, PAPER_FIELDS)
+
+    try:
+        question_number = _to_int(record.get('question_number'), required=True)
+    except ValueError as e:
+        raise ValueError(f'question_number {e}')
+    question_key = paper_key + (question_number,)
+
+    if record_type == 'question':
+        values = _parse_fields(record, QUESTION_FIELDS)
+        values['question_type'] = _choice(record.get('question_type'), QUESTION_TYPES, required=False) or 'multiple_choice'
+        values['difficulty_level'] = _choice(record.get('difficulty_level'), DIFFICULTY_LEVELS, required=False) or 'medium'
+        if not values['question_text']:
+            raise ValueError('question_text is required')
+        return record_type, question_key, values
+
+    option_letter = _choice(record.get('option_letter'), OPTION_LETTERS)
+    values = _parse_fields(record, ANSWER_FIELDS)
+    if not values['answer_text']:
+        raise ValueError('answer_text is required')
+    return record_type, question_key + (option_letter,), values
+
+
+def _parse_fields(record, spec):
+    values = {}
+    for field, (parser, default) in spec.items():
+        raw = record.get(field)
+        if raw is None or raw == '':
+            values[field] = default
+            continue
+        try:
+            values[field] = parser(raw)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'{field} {e}')
+    return values
+
+
+class BECEImporter:
+    """Two-pass importer: validate the whole stream, then upsert it in batches"""
+
+    def __init__(self, path, file_format=None, batch_size=500, checkpoint_path=None, max_errors=50):
+        self.path = path
+        self.file_format = file_format
+        self.batch_size = batch_size
+        self.checkpoint_path = checkpoint_path
+        self.max_errors = max_errors
+        self._subjects = None
+        self._years = {}
+        self._papers = {}
+
+    # Checkpoints
+
+    def load_checkpoint(self):
+        """Line number of the last committed record, or 0"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return 0
+        with open(self.checkpoint_path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        if data.get('path') != os.path.abspath(self.path) or data.get('size') != os.path.getsize(self.path):
+            raise ValueError('Checkpoint belongs to a different or modified file')
+        return data.get('line', 0)
+
+    def save_checkpoint(self, line_number, rows_done):
+        if not self.checkpoint_path:
+            return
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'path': os.path.abspath(self.path),
+                'size': os.path.getsize(self.path),
+                'line': line_number,
+                'rows': rows_done,
+            }, handle)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # Pass 1
+
+    def validate(self, start_line=0):
+        """
+        Check every record and its references without writing anything
+
+        Papers and questions must be defined earlier in the file or already
+        exist in the database before records can reference them.
+
+        Returns:
+            dict: Number of records of each type
+
+        Raises:
+            ImportValidationError: If any record is invalid
+        """
+        subjects = self.subjects()
+        known_papers = set(
+            BECEPaper.objects.values_list('year__year', 'subject__name', 'paper_type')
+        )
+        known_questions = set()
+        counts = dict.fromkeys(RECORD_TYPES, 0)
+        errors = []
+
+        for line_number, record in read_records(self.path, self.file_format, start_line):
+            try:
+                record_type, key, _ = parse_record(record)
+                if key[1] not in subjects:
+                    raise ValueError(f"unknown subject '{key[1]}'")
+                if record_type == 'paper':
+                    known_papers.add(key)
+                elif key[:3] not in known_papers:
+                    raise ValueError(f'paper {key[:3]} is not defined')
+                elif record_type == 'question':
+                    known_questions.add(key)
+                elif key[:4] not in known_questions:
+                    if not self._question_exists(key[:4]):
+                        raise ValueError(f'question {key[:4]} is not defined')
+                    known_questions.add(key[:4])
+                counts[record_type] += 1
+            except ValueError as e:
+                errors.append((line_number, str(e)))
+                if len(errors) >= self.max_errors:
+                    break
+
+        if errors:
+            raise ImportValidationError(errors)
+        return counts
+
+    def _question_exists(self, question_key):
+        year, subject, paper_type, number = question_key
+        return BECEQuestion.objects.filter(
+            paper__year__year=year,
+            paper__subject__name=subject,
+            paper__paper_type=paper_type,
+            question_number=number,
+        ).exists()
+
+    # Pass 2
+
+    def run(self, start_line=0):
+        """
+        Upsert records in batches, committing and checkpointing after each batch
+
+        Yields:
+            tuple: (rows written so far, last line number committed)
+        """
+        rows_done = 0
+        batch = []
+        for line_number, record in read_records(self.path, self.file_format, start_line):
+            batch.append(parse_record(record))
+            if len(batch) >= self.batch_size:
+                rows_done += self._write_batch(batch)
+                self.save_checkpoint(line_number, rows_done)
+                yield rows_done, line_number
+                batch = []
+        if batch:
+            rows_done += self._write_batch(batch)
+            self.save_checkpoint(line_number, rows_done)
+            yield rows_done, line_number
+
+    def _write_batch(self, batch):
+        papers = {}
+        questions = {}
+        answers = {}
+        # Later records win when a key repeats inside a batch
+        for record_type, key, values in batch:
+            {'paper': papers, 'question': questions, 'answer': answers}[record_type][key] = values
+
+        with transaction.atomic():
+            self._upsert_papers(papers)
+            question_ids = self._upsert_questions(questions, answers)
+            self._upsert_answers(answers, question_ids)
+
+        return len(batch)
+
+    def _upsert_papers(self, papers):
+        if not papers:
+            return
+        self._ensure_years({key[0] for key in papers})
+        subjects = self.subjects()
+        objects = []
+        for (year, subject, paper_type), values in papers.items():
+            if not values['title']:
+                label = dict(BECEPaper.PAPER_TYPES)[paper_type]
+                values = dict(values, title=f"{year} {subjects[subject].display_name} - {label}")
+            objects.append(BECEPaper(
+                year_id=self._years[year], subject_id=subjects[subject].id, paper_type=paper_type, **values
+            ))
+        BECEPaper.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=['year', 'subject', 'paper_type'],
+            update_fields=list(PAPER_FIELDS),
+        )
+        # Forget cached ids so newly created papers are looked up again
+        for key in papers:
+            self._papers.pop(key, None)
+
+    def _upsert_questions(self, questions, answers):
+        paper_ids = self._paper_ids({key[:3] for key in questions} | {key[:3] for key in answers})
+        if questions:
+            BECEQuestion.objects.bulk_create(
+                [
+                    BECEQuestion(paper_id=paper_ids[key[:3]], question_number=key[3], **values)
+                    for key, values in questions.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['paper', 'question_number'],
+                update_fields=list(QUESTION_FIELDS) + ['question_type', 'difficulty_level'],
+            )
+
+        needed = {key[:4] for key in answers}
+        if not needed:
+            return {}
+        by_paper = {}
+        for key in needed:
+            by_paper.setdefault(paper_ids[key[:3]], set()).add(key[3])
+        reverse_papers = {paper_id: key for key, paper_id in paper_ids.items()}
+
+        question_ids = {}
+        for paper_id, numbers in by_paper.items():
+            rows = BECEQuestion.objects.filter(paper_id=paper_id, question_number__in=numbers)
+            for question_id, number in rows.values_list('id', 'question_number'):
+                question_ids[reverse_papers[paper_id] + (number,)] = question_id
+        return question_ids
+
+    def _upsert_answers(self, answers, question_ids):
+        if not answers:
+            return
+        BECEAnswer.objects.bulk_create(
+            [
+                BECEAnswer(question_id=question_ids[key[:4]], option_letter=key[4], **values)
+                for key, values in answers.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['question', 'option_letter'],
+            update_fields=list(ANSWER_FIELDS),
+        )
+
+    # Lookups
+
+    def subjects(self):
+        if self._subjects is None:
+            self._subjects = {subject.name: subject for subject in BECESubject.objects.all()}
+        return self._subjects
+
+    def _ensure_years(self, years):
+        missing = set(years) - self._years.keys()
+        if not missing:
+            return
+        BECEYear.objects.bulk_create(
+            [BECEYear(year=year) for year in missing], ignore_conflicts=True
+        )
+        self._years.update(BECEYear.objects.filter(year__in=missing).values_list('year', 'id'))
+
+    def _paper_ids(self, keys):
+        missing = set(keys) - self._papers.keys()
+        if missing:
+            years = {key[0] for key in missing}
+            rows = BECEPaper.objects.filter(year__year__in=years).values_list(
+                'year__year', 'subject__name', 'paper_type', 'id'
+            )
+            for year, subject, paper_type, paper_id in rows:
+                self._papers[(year, subject, paper_type)] = paper_id
+        return {key: self._papers[key] for key in keys}
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bece.importer import BECEImporter, ImportValidationError
+
+
+class Command(BaseCommand):
+    help = 'Import BECE papers, questions and answer options from a JSONL or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSONL or CSV file; each record has a type of paper, question or answer')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], help='File format (default: from the extension)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Records upserted per transaction')
+        parser.add_argument('--checkpoint', help='Checkpoint file recording the last committed line')
+        parser.add_argument('--resume', action='store_true', help='Continue after the line stored in --checkpoint')
+        parser.add_argument('--dry-run', action='store_true', help='Only run the validation pass')
+
+    def handle(self, *args, **options):
+        if options['resume'] and not options['checkpoint']:
+            raise CommandError('--resume requires --checkpoint')
+
+        importer = BECEImporter(
+            options['path'],
+            file_format=options['format'],
+            batch_size=options['batch_size'],
+            checkpoint_path=options['checkpoint'],
+        )
+
+        try:
+            start_line = importer.load_checkpoint() if options['resume'] else 0
+        except ValueError as e:
+            raise CommandError(str(e))
+        if start_line:
+            self.stdout.write(f'Resuming after line {start_line}')
+
+        # Pass 1: validate everything before writing anything
+        started = time.perf_counter()
+        try:
+            counts = importer.validate(start_line)
+        except ImportValidationError as e:
+            for line_number, message in e.errors:
+                self.stderr.write(f'  line {line_number}: {message}')
+            raise CommandError(f'Validation failed: {e}')
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['path']}")
+
+        total = sum(counts.values())
+        self.stdout.write(
+            f"Validated {total} records ({counts['paper']} papers, {counts['question']} questions, "
+            f"{counts['answer']} answers) in {time.perf_counter() - started:.2f}s"
+        )
+        if options['dry_run'] or not total:
+            return
+
+        # Pass 2: batched upserts
+        started = time.perf_counter()
+        rows_done = 0
+        for rows_done, line_number in importer.run(start_line):
+            elapsed = time.perf_counter() - started
+            rate = rows_done / elapsed if elapsed > 0 else 0
+            self.stdout.write(f'  {rows_done}/{total} records (line {line_number}, {rate:.0f} rows/s)')
+
+        elapsed = time.perf_counter() - started
+        rate = rows_done / elapsed if elapsed > 0 else 0
+        importer.clear_checkpoint()
+        self.stdout.write(
+            self.style.SUCCESS(f'Imported {rows_done} records in {elapsed:.2f}s ({rate:.0f} rows/s)')
+        )
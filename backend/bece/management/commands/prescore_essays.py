@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bece.prescoring import prescore_answers
+
+
+class Command(BaseCommand):
+    help = 'Compute pre-scoring features for essay answers in the grading queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Answers processed per batch')
+        parser.add_argument(
+            '--recompute',
+            action='store_true',
+            help='Refresh answers that already have features (e.g. after editing a marking scheme)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = 0
+
+        for scored in prescore_answers(batch_size=options['batch_size'], recompute=options['recompute']):
+            total += scored
+            self.stdout.write(f'Scored {total} essays...')
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed > 0 else 0
+        self.stdout.write(
+            self.style.SUCCESS(f'Pre-scored {total} essays in {elapsed:.2f}s ({rate:.0f} essays/s)')
+        )
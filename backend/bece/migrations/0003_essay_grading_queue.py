@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def queue_ungraded_essays(apps, schema_editor):
+    """Essay answers that were never marked go into the grading queue"""
+    BECEUserAnswer = apps.get_model('bece', 'BECEUserAnswer')
+    BECEUserAnswer.objects.filter(
+        question__question_type='essay',
+        marks_earned=0,
+        teacher_feedback='',
+    ).update(needs_grading=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bece', '0002_becequestion_essay_instructions_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingEssayAnswer',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'Pending essay answer',
+                'verbose_name_plural': 'Essay grading queue',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('bece.beceuseranswer',),
+        ),
+        migrations.AddField(
+            model_name='beceuseranswer',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='beceuseranswer',
+            name='graded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='graded_bece_answers', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='beceuseranswer',
+            name='needs_grading',
+            field=models.BooleanField(default=False, help_text="Essay answer waiting for a teacher's mark"),
+        ),
+        migrations.AddIndex(
+            model_name='beceuseranswer',
+            index=models.Index(condition=models.Q(('needs_grading', True)), fields=['answered_at'], name='bece_answer_grading_queue'),
+        ),
+        migrations.RunPython(queue_ungraded_essays, migrations.RunPython.noop),
+    ]
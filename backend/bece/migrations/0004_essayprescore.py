@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bece', '0003_essay_grading_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EssayPreScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word_count', models.IntegerField(default=0)),
+                ('word_limit_ratio', models.FloatField(blank=True, help_text="Word count divided by the question's word limit", null=True)),
+                ('sentence_count', models.IntegerField(default=0)),
+                ('lexical_diversity', models.FloatField(default=0.0, help_text='Distinct words / total words')),
+                ('keyword_coverage', models.FloatField(default=0.0, help_text='Share of model-answer keywords found in the essay')),
+                ('matched_keywords', models.JSONField(blank=True, default=list)),
+                ('suggested_marks', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('answer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='prescore', to='bece.beceuseranswer')),
+            ],
+        ),
+    ]
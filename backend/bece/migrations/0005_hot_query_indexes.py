@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bece', '0004_essayprescore'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='becepracticeattempt',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', 'paper', '-started_at'], name='bece_attempt_open'),
+        ),
+        migrations.AddIndex(
+            model_name='becepracticeattempt',
+            index=models.Index(fields=['user', '-started_at'], name='bece_attempt_user_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='becepracticeattempt',
+            index=models.Index(condition=models.Q(('is_completed', True)), fields=['user', '-completed_at'], name='bece_attempt_completed'),
+        ),
+    ]
@@ -150,6 +150,26 @@ class BECEPracticeAttempt(models.Model):
     time_taken_minutes = models.IntegerField(default=0)
     is_completed = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # submit_bece_practice looks up the user's open attempt of a paper
+            models.Index(
+                fields=['user', 'paper', '-started_at'],
+                name='bece_attempt_open',
+                condition=models.Q(is_completed=False),
+            ),
+            # Attempt history, newest first
+            models.Index(fields=['user', '-started_at'], name='bece_attempt_user_recent'),
+            # Dashboard and subject performance: completed attempts, latest
+            # first. Partial because Django filters booleans as a bare column
+            # ("WHERE is_completed"), which can't seek into an index column
+            models.Index(
+                fields=['user', '-completed_at'],
+                name='bece_attempt_completed',
+                condition=models.Q(is_completed=True),
+            ),
+        ]
+    
     def __str__(self):
         return f"{self.user.email} - {self.paper}"
 
@@ -170,12 +190,27 @@ class BECEUserAnswer(models.Model):
     marks_earned = models.IntegerField(default=0)
     teacher_feedback = models.TextField(blank=True, help_text="Teacher feedback for essay questions")
     
+    # Manual grading
+    needs_grading = models.BooleanField(default=False, help_text="Essay answer waiting for a teacher's mark")
+    graded_at = models.DateTimeField(null=True, blank=True)
+    graded_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='graded_bece_answers'
+    )
+    
     # Metadata
     answered_at = models.DateTimeField(default=timezone.now)
     time_spent_seconds = models.IntegerField(default=0, help_text="Time spent on this question")
     
     class Meta:
         unique_together = ['attempt', 'question']
+        indexes = [
+            # Partial index backing the essay grading queue
+            models.Index(
+                fields=['answered_at'],
+                name='bece_answer_grading_queue',
+                condition=models.Q(needs_grading=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.attempt.user.email} - {self.question}"
@@ -190,6 +225,31 @@ class BECEUserAnswer(models.Model):
         return "No answer provided"
 
 
+class EssayPreScore(models.Model):
+    """Machine-computed features that help teachers mark an essay answer"""
+    answer = models.OneToOneField(BECEUserAnswer, on_delete=models.CASCADE, related_name='prescore')
+    word_count = models.IntegerField(default=0)
+    word_limit_ratio = models.FloatField(null=True, blank=True, help_text="Word count divided by the question's word limit")
+    sentence_count = models.IntegerField(default=0)
+    lexical_diversity = models.FloatField(default=0.0, help_text="Distinct words / total words")
+    keyword_coverage = models.FloatField(default=0.0, help_text="Share of model-answer keywords found in the essay")
+    matched_keywords = models.JSONField(default=list, blank=True)
+    suggested_marks = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"Pre-score for answer {self.answer_id}"
+
+
+class PendingEssayAnswer(BECEUserAnswer):
+    """Essay answers waiting in the grading queue (admin proxy)"""
+    
+    class Meta:
+        proxy = True
+        verbose_name = 'Pending essay answer'
+        verbose_name_plural = 'Essay grading queue'
+
+
 class BECEStatistics(models.Model):
     """User BECE performance statistics"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bece_stats')
@@ -0,0 +1,159 @@
+"""
+Essay pre-scoring for the BECE grading queue
+Extracts cheap text features from pending essay answers so teachers can sort
+the queue and start from a suggested mark
+"""
+
+import re
+from collections import Counter
+
+from django.utils import timezone
+
+from .models import BECEQuestion, BECEUserAnswer, EssayPreScore
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+SENTENCE_END_RE = re.compile(r'[.!?]+(?:\s|$)')
+
+# Words that carry no marking-scheme meaning
+STOPWORDS = frozenset("""
+    a about above after again against all also am an and any are as at be because been before being
+    below between both but by can could did do does doing down during each few for from further had has
+    have having he her here hers him his how i if in into is it its itself just me more most my no nor
+    not now of off on once only or other our ours out over own same she should so some such than that
+    the their theirs them then there these they this those through to too under until up very was we
+    were what when where which while who whom why will with would you your yours answer answers
+    candidate candidates essay marks mark question questions write explain discuss describe state give
+    should must well each points point example examples
+""".split())
+
+MIN_KEYWORD_LENGTH = 4
+
+
+def tokenize(text):
+    """Lower-case word tokens of a text"""
+    return WORD_RE.findall(text.lower())
+
+
+def build_keyword_index(question):
+    """
+    Keywords a good answer is expected to mention
+
+    Taken from the question's explanation (the model answer / marking scheme),
+    falling back to the essay instructions when no explanation is recorded.
+    """
+    source = question.explanation or question.essay_instructions
+    return frozenset(
+        token for token in tokenize(source)
+        if len(token) >= MIN_KEYWORD_LENGTH and token not in STOPWORDS
+    )
+
+
+def extract_features(text, keywords, word_limit=None, max_marks=0):
+    """
+    Compute pre-scoring features for one essay
+
+    Args:
+        text (str): Essay text
+        keywords (frozenset): Keyword index of the question
+        word_limit (int): Word limit of the question, if any
+        max_marks (int): Marks available for the question
+
+    Returns:
+        dict: Feature values ready to store on EssayPreScore
+    """
+    tokens = tokenize(text)
+    word_count = len(tokens)
+    counts = Counter(tokens)
+
+    matched = sorted(keywords.intersection(counts)) if keywords else []
+    coverage = len(matched) / len(keywords) if keywords else 0.0
+
+    sentence_count = len(SENTENCE_END_RE.findall(text))
+    if word_count and not sentence_count:
+        sentence_count = 1
+
+    ratio = word_count / word_limit if word_limit else None
+
+    # Length factor: full credit from half the word limit, no penalty without a limit
+    if word_limit:
+        length_factor = min(1.0, word_count / (word_limit * 0.5))
+    else:
+        length_factor = 1.0 if word_count else 0.0
+
+    return {
+        'word_count': word_count,
+        'word_limit_ratio': round(ratio, 3) if ratio is not None else None,
+        'sentence_count': sentence_count,
+        'lexical_diversity': round(len(counts) / word_count, 3) if word_count else 0.0,
+        'keyword_coverage': round(coverage, 3),
+        'matched_keywords': matched,
+        'suggested_marks': round(max_marks * coverage * length_factor),
+    }
+
+
+def prescore_answers(answer_ids=None, batch_size=1000, recompute=False):
+    """
+    Compute and store features for pending essay answers in batches
+
+    Args:
+        answer_ids (iterable): Restrict to these answers (default: whole queue)
+        batch_size (int): Answers read and upserted per batch
+        recompute (bool): Also refresh answers that already have features
+
+    Yields:
+        int: Number of answers scored in each batch
+    """
+    queryset = BECEUserAnswer.objects.filter(needs_grading=True)
+    if answer_ids is not None:
+        queryset = queryset.filter(id__in=answer_ids)
+    if not recompute:
+        queryset = queryset.filter(prescore__isnull=True)
+
+    rows = queryset.order_by('id').values_list('id', 'question_id', 'text_answer').iterator(chunk_size=batch_size)
+
+    indexes = {}
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield _score_batch(batch, indexes)
+            batch = []
+    if batch:
+        yield _score_batch(batch, indexes)
+
+
+def prescore_all(answer_ids=None, batch_size=1000, recompute=False):
+    """
+    Run prescore_answers to completion
+
+    Returns:
+        int: Total number of answers scored
+    """
+    return sum(prescore_answers(answer_ids=answer_ids, batch_size=batch_size, recompute=recompute))
+
+
+def _score_batch(batch, indexes):
+    """Score one batch of (answer_id, question_id, text) rows and upsert the results"""
+    missing = {question_id for _, question_id, _ in batch} - indexes.keys()
+    for question in BECEQuestion.objects.filter(id__in=missing).only(
+        'id', 'marks', 'word_limit', 'explanation', 'essay_instructions'
+    ):
+        indexes[question.id] = (build_keyword_index(question), question.word_limit, question.marks)
+
+    now = timezone.now()
+    scores = []
+    for answer_id, question_id, text in batch:
+        keywords, word_limit, max_marks = indexes[question_id]
+        features = extract_features(text, keywords, word_limit, max_marks)
+        scores.append(EssayPreScore(answer_id=answer_id, computed_at=now, **features))
+
+    EssayPreScore.objects.bulk_create(
+        scores,
+        update_conflicts=True,
+        unique_fields=['answer'],
+        update_fields=[
+            'word_count', 'word_limit_ratio', 'sentence_count', 'lexical_diversity',
+            'keyword_coverage', 'matched_keywords', 'suggested_marks', 'computed_at',
+        ],
+    )
+    return len(scores)
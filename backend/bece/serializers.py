@@ -42,6 +42,10 @@ class BECEPaperSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_question_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        count = getattr(obj, 'question_count', None)
+        if count is not None:
+            return count
         return obj.questions.count()
 
 
@@ -57,6 +61,10 @@ class BECEPaperListSerializer(serializers.ModelSerializer):
                  'duration_minutes', 'total_marks', 'question_count', 'created_at')
     
     def get_question_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        count = getattr(obj, 'question_count', None)
+        if count is not None:
+            return count
         return obj.questions.count()
 
 
@@ -114,4 +122,66 @@ class BECEDashboardSerializer(serializers.Serializer):
     subjects = BECESubjectSerializer(many=True, read_only=True)
     recent_attempts = BECEPracticeAttemptSerializer(many=True, read_only=True)
     statistics = BECEStatisticsSerializer(many=True, read_only=True)
-    available_years = BECEYearSerializer(many=True, read_only=True)
\ No newline at end of file
+    available_years = BECEYearSerializer(many=True, read_only=True)
+
+
+class EssayGradingQueueSerializer(serializers.ModelSerializer):
+    """Pending essay answer with the context a teacher needs to mark it"""
+    student_email = serializers.EmailField(source='attempt.user.email', read_only=True)
+    paper = serializers.CharField(source='question.paper', read_only=True)
+    question_number = serializers.IntegerField(source='question.question_number', read_only=True)
+    question_text = serializers.CharField(source='question.question_text', read_only=True)
+    max_marks = serializers.IntegerField(source='question.marks', read_only=True)
+    word_limit = serializers.IntegerField(source='question.word_limit', read_only=True)
+    prescore = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BECEUserAnswer
+        fields = ('id', 'attempt', 'student_email', 'paper', 'question', 'question_number',
+                 'question_text', 'max_marks', 'word_limit', 'text_answer', 'answered_at', 'prescore')
+    
+    def get_prescore(self, obj):
+        prescore = getattr(obj, 'prescore', None)
+        if prescore is None:
+            return None
+        return {
+            'suggested_marks': prescore.suggested_marks,
+            'word_count': prescore.word_count,
+            'word_limit_ratio': prescore.word_limit_ratio,
+            'sentence_count': prescore.sentence_count,
+            'lexical_diversity': prescore.lexical_diversity,
+            'keyword_coverage': prescore.keyword_coverage,
+            'matched_keywords': prescore.matched_keywords,
+        }
+
+
+class EssayGradeSerializer(serializers.Serializer):
+    """A single mark/feedback entry in a grading batch"""
+    answer_id = serializers.IntegerField()
+    marks_earned = serializers.IntegerField(min_value=0)
+    teacher_feedback = serializers.CharField(required=False, allow_blank=True)
+
+
+class EssayGradeBatchSerializer(serializers.Serializer):
+    """Serializer for batched essay grading submissions"""
+    grades = EssayGradeSerializer(many=True, allow_empty=False)
+    
+    def validate_grades(self, value):
+        """Reject unknown answers and marks above the question's maximum"""
+        answer_ids = [grade['answer_id'] for grade in value]
+        if len(answer_ids) != len(set(answer_ids)):
+            raise serializers.ValidationError("Each answer can only be graded once per batch")
+        
+        max_marks = dict(
+            BECEUserAnswer.objects.filter(id__in=answer_ids, question__question_type='essay')
+            .values_list('id', 'question__marks')
+        )
+        for grade in value:
+            if grade['answer_id'] not in max_marks:
+                raise serializers.ValidationError(f"Essay answer {grade['answer_id']} not found")
+            if grade['marks_earned'] > max_marks[grade['answer_id']]:
+                raise serializers.ValidationError(
+                    f"Answer {grade['answer_id']} cannot earn more than {max_marks[grade['answer_id']]} marks"
+                )
+        
+        return value
@@ -1,3 +1,302 @@
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from bece_platform.testing import QueryCountTestCase, WritePathStressTestCase
+
+from .grading import apply_grades
+from .importer import BECEImporter, ImportValidationError
+from .models import (
+    BECEAnswer, BECEPaper, BECEPracticeAttempt, BECEQuestion, BECEStatistics, BECESubject, BECEUserAnswer, BECEYear,
+    EssayPreScore,
+)
+from .prescoring import build_keyword_index, extract_features, prescore_all, prescore_answers
+from .serializers import EssayGradeBatchSerializer
+
+
+class QueryCountTests(QueryCountTestCase):
+    """BECE endpoints run the same number of queries for 10 and 100 rows"""
+    urlconf = 'bece.urls'
+    endpoints = {
+        'bece-subjects': lambda d: ('get', {}, None),
+        'bece-years': lambda d: ('get', {}, None),
+        'bece-papers': lambda d: ('get', {}, None),
+        'bece-paper-detail': lambda d: ('get', {'pk': d.paper.id}, None),
+        'submit-bece-practice': lambda d: ('post', {}, {
+            'paper_id': d.paper.id,
+            'answers': [{'question_id': d.bece_question.id, 'answer_id': d.bece_question.answers.first().id}],
+        }),
+        'start-bece-practice': lambda d: ('post', {'paper_id': d.paper.id}, {}),
+        'bece-practice-by-subject': lambda d: ('get', {'subject': d.bece_subject.name}, None),
+        'bece-attempts': lambda d: ('get', {}, None),
+        'bece-statistics': lambda d: ('get', {}, None),
+        'bece-dashboard': lambda d: ('get', {}, None),
+        'bece-subject-performance': lambda d: ('get', {'subject': d.bece_subject.name}, None),
+        'bece-grading-queue': lambda d: ('get', {}, None),
+        'bece-grading-submit': lambda d: ('post', {}, {
+            'grades': [{'answer_id': d.essay_answer.id, 'marks_earned': 5, 'teacher_feedback': 'Good'}],
+        }),
+    }
+
+
+class WritePathStressTests(WritePathStressTestCase):
+    """BECE statistics under concurrent submissions"""
+    scenarios = ('bece-statistics',)
+
+
+class PreScoringTests(TestCase):
+    def setUp(self):
+        paper = BECEPaper.objects.create(
+            year=BECEYear.objects.create(year=2020),
+            subject=BECESubject.objects.create(name='social_studies', display_name='Social Studies'),
+            paper_type='paper2', title='Essays',
+        )
+        self.question = BECEQuestion.objects.create(
+            paper=paper, question_number=1, question_type='essay', question_text='Discuss erosion', marks=10,
+            word_limit=20, explanation='Erosion is caused by rainfall, wind and deforestation.',
+        )
+        user = get_user_model().objects.create_user(username='pupil', email='pupil@example.com', password=None)
+        attempt = BECEPracticeAttempt.objects.create(user=user, paper=paper, total_marks=10, is_completed=True)
+        self.answer = BECEUserAnswer.objects.create(
+            attempt=attempt, question=self.question, needs_grading=True,
+            text_answer='Heavy rainfall washes soil away. Deforestation leaves it bare, so erosion gets worse.',
+        )
+
+    def test_keyword_index_drops_stopwords_and_short_words(self):
+        self.assertEqual(build_keyword_index(self.question), {'erosion', 'caused', 'rainfall', 'wind', 'deforestation'})
+
+    def test_features(self):
+        features = extract_features(self.answer.text_answer, build_keyword_index(self.question), 20, 10)
+        self.assertEqual(features['word_count'], 13)
+        self.assertEqual(features['sentence_count'], 2)
+        self.assertEqual(features['matched_keywords'], ['deforestation', 'erosion', 'rainfall'])
+        self.assertEqual(features['keyword_coverage'], 0.6)
+        self.assertEqual(features['word_limit_ratio'], 0.65)
+        # Past half the word limit, so only coverage counts
+        self.assertEqual(features['suggested_marks'], 6)
+
+    def test_empty_answer(self):
+        features = extract_features('', build_keyword_index(self.question), 20, 10)
+        self.assertEqual((features['word_count'], features['sentence_count'], features['suggested_marks']), (0, 0, 0))
+
+    def test_prescore_is_idempotent(self):
+        self.assertEqual(sum(prescore_answers()), 1)
+        self.assertEqual(sum(prescore_answers()), 0)
+        prescore = EssayPreScore.objects.get(answer=self.answer)
+        self.assertEqual(prescore.suggested_marks, 6)
+
+        self.answer.text_answer = 'Wind.'
+        self.answer.save()
+        self.assertEqual(sum(prescore_answers(recompute=True)), 1)
+        self.assertEqual(EssayPreScore.objects.count(), 1)
+        self.assertEqual(EssayPreScore.objects.get(answer=self.answer).matched_keywords, ['wind'])
+
+    def test_prescore_all_runs_every_batch(self):
+        attempt = BECEPracticeAttempt.objects.create(
+            user=self.answer.attempt.user, paper=self.question.paper, total_marks=10, is_completed=True,
+        )
+        BECEUserAnswer.objects.create(attempt=attempt, question=self.question, needs_grading=True, text_answer='Wind.')
+        self.assertEqual(prescore_all(batch_size=1), 2)
+        self.assertEqual(EssayPreScore.objects.count(), 2)
+
+    def test_admin_changelist_prefills_suggested_marks(self):
+        prescore_all()
+        admin_user = get_user_model().objects.create_superuser(
+            username='teacher', email='teacher@example.com', password='pass12345',
+        )
+        self.client.force_login(admin_user)
+        url = reverse('admin:bece_pendingessayanswer_changelist')
+        form = self.client.get(url).context['cl'].formset.forms[0]
+        self.assertEqual(form['marks_earned'].value(), 6)
+
+        # Accepting the suggestion unchanged still grades the answer
+        self.client.post(url, {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1, '_save': 'Save',
+            'form-0-id': self.answer.id, 'form-0-marks_earned': 6, 'form-0-teacher_feedback': '',
+        })
+        self.answer.refresh_from_db()
+        self.assertEqual((self.answer.marks_earned, self.answer.needs_grading), (6, False))
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        self.paper = BECEPaper.objects.create(
+            year=BECEYear.objects.create(year=2021),
+            subject=BECESubject.objects.create(name='english', display_name='English'),
+            paper_type='paper2', title='Composition', total_marks=20,
+        )
+        self.essay1, self.essay2 = (
+            BECEQuestion.objects.create(
+                paper=self.paper, question_number=n, question_type='essay', question_text=f'Essay {n}', marks=8,
+            )
+            for n in (1, 2)
+        )
+        self.mcq = BECEQuestion.objects.create(paper=self.paper, question_number=3, question_text='Pick one', marks=4)
+        self.user = get_user_model().objects.create_user(username='pupil', email='pupil@example.com', password=None)
+        self.attempts = []
+        self.essays = []
+        for minutes in (30, 45):
+            attempt = BECEPracticeAttempt.objects.create(
+                user=self.user, paper=self.paper, total_marks=20, time_taken_minutes=minutes,
+                is_completed=True, completed_at=timezone.now(),
+            )
+            BECEUserAnswer.objects.create(attempt=attempt, question=self.mcq, is_correct=True, marks_earned=4)
+            for question in (self.essay1, self.essay2):
+                self.essays.append(BECEUserAnswer.objects.create(
+                    attempt=attempt, question=question, text_answer='An answer.', needs_grading=True,
+                ))
+            self.attempts.append(attempt)
+
+    def grade(self, *marks, **kwargs):
+        return apply_grades([
+            {'answer_id': answer.id, 'marks_earned': value} for answer, value in zip(self.essays, marks)
+        ], **kwargs)
+
+    def test_grades_update_attempts_and_statistics(self):
+        result = self.grade(8, 6, 5, 1)
+        self.assertEqual(result['graded'], 4)
+        self.assertEqual(result['attempt_ids'], sorted(a.id for a in self.attempts))
+
+        first, second = (BECEPracticeAttempt.objects.get(pk=a.pk) for a in self.attempts)
+        self.assertEqual((first.score, first.percentage), (18, 90.0))
+        self.assertEqual((second.score, second.percentage), (10, 50.0))
+
+        stats = BECEStatistics.objects.get(user=self.user, subject=self.paper.subject)
+        self.assertEqual(stats.total_attempts, 2)
+        self.assertEqual(stats.best_score, 18)
+        self.assertEqual(stats.average_score, 14.0)
+        self.assertEqual(stats.total_time_minutes, 75)
+
+        answer = BECEUserAnswer.objects.get(pk=self.essays[0].pk)
+        self.assertFalse(answer.needs_grading)
+        self.assertTrue(answer.is_correct)
+        self.assertIsNotNone(answer.graded_at)
+
+    def test_regrade_overwrites_previous_result(self):
+        self.grade(8, 6, 5, 1)
+        apply_grades([{'answer_id': self.essays[0].id, 'marks_earned': 2, 'teacher_feedback': 'Too short'}])
+
+        answer = BECEUserAnswer.objects.get(pk=self.essays[0].pk)
+        self.assertEqual((answer.marks_earned, answer.is_correct, answer.teacher_feedback), (2, False, 'Too short'))
+        first = BECEPracticeAttempt.objects.get(pk=self.attempts[0].pk)
+        self.assertEqual((first.score, first.percentage), (12, 60.0))
+
+        stats = BECEStatistics.objects.get(user=self.user, subject=self.paper.subject)
+        self.assertEqual(BECEStatistics.objects.filter(user=self.user).count(), 1)
+        self.assertEqual((stats.best_score, stats.average_score), (12, 11.0))
+
+    def test_batch_serializer_rejects_invalid_grades(self):
+        mcq_answer = BECEUserAnswer.objects.get(attempt=self.attempts[0], question=self.mcq)
+        essay_id = self.essays[0].id
+        cases = {
+            'not found': [{'answer_id': mcq_answer.id, 'marks_earned': 1}],
+            'only be graded once': [
+                {'answer_id': essay_id, 'marks_earned': 1}, {'answer_id': essay_id, 'marks_earned': 2},
+            ],
+            'more than 8 marks': [{'answer_id': essay_id, 'marks_earned': 9}],
+        }
+        for message, grades in cases.items():
+            with self.subTest(message):
+                serializer = EssayGradeBatchSerializer(data={'grades': grades})
+                self.assertFalse(serializer.is_valid())
+                self.assertIn(message, str(serializer.errors['grades']))
+
+    def test_admin_changelist_rejects_marks_above_maximum(self):
+        admin_user = get_user_model().objects.create_superuser(
+            username='teacher', email='teacher@example.com', password='pass12345',
+        )
+        self.client.force_login(admin_user)
+        url = reverse('admin:bece_pendingessayanswer_changelist')
+        answers = self.client.get(url).context['cl'].result_list
+        data = {'form-TOTAL_FORMS': len(answers), 'form-INITIAL_FORMS': len(answers), '_save': 'Save'}
+        for i, answer in enumerate(answers):
+            data.update({f'form-{i}-id': answer.id, f'form-{i}-marks_earned': 3, f'form-{i}-teacher_feedback': ''})
+        data['form-0-marks_earned'] = 9
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cannot earn more than 8 marks', str(response.context['cl'].formset.errors))
+        self.assertEqual(BECEUserAnswer.objects.filter(needs_grading=True).count(), 4)
+
+        data['form-0-marks_earned'] = 8
+        self.assertEqual(self.client.post(url, data).status_code, 302)
+        self.assertFalse(BECEUserAnswer.objects.filter(needs_grading=True).exists())
+
+
+class ImporterTests(TestCase):
+    records = [
+        {'type': 'paper', 'year': 2021, 'subject': 'mathematics', 'paper_type': 'paper1', 'is_published': 'yes'},
+        {'type': 'question', 'year': 2021, 'subject': 'mathematics', 'paper_type': 'paper1', 'question_number': 1,
+         'question_text': '2 + 2 = ?'},
+        {'type': 'answer', 'year': 2021, 'subject': 'mathematics', 'paper_type': 'paper1', 'question_number': 1,
+         'option_letter': 'A', 'answer_text': '4', 'is_correct': True},
+        {'type': 'answer', 'year': 2021, 'subject': 'mathematics', 'paper_type': 'paper1', 'question_number': 1,
+         'option_letter': 'B', 'answer_text': '5'},
+    ]
+
+    def setUp(self):
+        BECESubject.objects.create(name='mathematics', display_name='Mathematics')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'papers.jsonl')
+        self.checkpoint = os.path.join(directory.name, 'papers.checkpoint')
+        self.write(self.records)
+
+    def write(self, records):
+        with open(self.path, 'w', encoding='utf-8') as handle:
+            handle.writelines(json.dumps(record) + '\n' for record in records)
+
+    def run_import(self, **kwargs):
+        importer = BECEImporter(self.path, **kwargs)
+        counts = importer.validate()
+        list(importer.run())
+        return counts
+
+    def test_import(self):
+        self.assertEqual(self.run_import(), {'paper': 1, 'question': 1, 'answer': 2})
+        paper = BECEPaper.objects.get()
+        self.assertEqual(paper.title, '2021 Mathematics - Paper 1 - Objective')
+        self.assertTrue(paper.is_published)
+        self.assertEqual(
+            list(BECEAnswer.objects.order_by('option_letter').values_list('option_letter', 'is_correct')),
+            [('A', True), ('B', False)],
+        )
+
+    def test_reimport_updates_in_place(self):
+        self.run_import()
+        question_id = BECEQuestion.objects.get().id
+        self.write(self.records[:1] + [dict(self.records[1], question_text='1 + 3 = ?')] + self.records[2:])
+        self.run_import()
+        self.assertEqual((BECEPaper.objects.count(), BECEQuestion.objects.count(), BECEAnswer.objects.count()),
+                         (1, 1, 2))
+        self.assertEqual(BECEQuestion.objects.get(id=question_id).question_text, '1 + 3 = ?')
+
+    def test_validation_writes_nothing(self):
+        self.write(self.records + [
+            {'type': 'question', 'year': 2021, 'subject': 'mathematics', 'paper_type': 'paper2', 'question_number': 1,
+             'question_text': 'Orphan'},
+            {'type': 'answer', 'year': 2021, 'subject': 'french', 'paper_type': 'paper1', 'question_number': 1,
+             'option_letter': 'C', 'answer_text': '6'},
+        ])
+        with self.assertRaises(ImportValidationError) as raised:
+            BECEImporter(self.path).validate()
+        self.assertEqual([line for line, _ in raised.exception.errors], [5, 6])
+        self.assertFalse(BECEPaper.objects.exists())
+
+    def test_resume_from_checkpoint(self):
+        importer = BECEImporter(self.path, batch_size=2, checkpoint_path=self.checkpoint)
+        rows = importer.run()
+        self.assertEqual(next(rows), (2, 2))
+        rows.close()
+        self.assertEqual(BECEAnswer.objects.count(), 0)
 
-# Create your tests here.
+        resumed = BECEImporter(self.path, batch_size=2, checkpoint_path=self.checkpoint)
+        start = resumed.load_checkpoint()
+        self.assertEqual(start, 2)
+        self.assertEqual(list(resumed.run(start)), [(2, 4)])
+        self.assertEqual(BECEAnswer.objects.count(), 2)
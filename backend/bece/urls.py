@@ -14,4 +14,6 @@ urlpatterns = [
     path('statistics/', views.BECEStatisticsView.as_view(), name='bece-statistics'),
     path('dashboard/', views.bece_dashboard, name='bece-dashboard'),
     path('performance/<str:subject>/', views.bece_subject_performance, name='bece-subject-performance'),
+    path('grading/queue/', views.EssayGradingQueueView.as_view(), name='bece-grading-queue'),
+    path('grading/submit/', views.grade_essay_answers, name='bece-grading-submit'),
 ]
\ No newline at end of file
@@ -2,7 +2,9 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Count, Avg, Max
+from django.db.models import Count, Avg, Max, Prefetch
+from django.db import transaction
+from django.utils import timezone
 from .models import (
     BECESubject, BECEYear, BECEPaper, BECEQuestion, BECEAnswer,
     BECEPracticeAttempt, BECEUserAnswer, BECEStatistics
@@ -10,8 +12,11 @@ from .models import (
 from .serializers import (
     BECESubjectSerializer, BECEYearSerializer, BECEPaperSerializer,
     BECEPaperListSerializer, BECEQuestionSerializer, BECEPracticeAttemptSerializer,
-    BECESubmissionSerializer, BECEStatisticsSerializer, BECEDashboardSerializer
+    BECESubmissionSerializer, BECEStatisticsSerializer, BECEDashboardSerializer,
+    EssayGradingQueueSerializer, EssayGradeBatchSerializer
 )
+from .grading import pending_essay_answers, apply_grades, recompute_statistics
+from .prescoring import prescore_all
 
 
 def has_bece_access(user):
@@ -32,6 +37,16 @@ def has_bece_access(user):
         return False
 
 
+def annotated_papers():
+    """Papers with year and subject joined and questions counted"""
+    return BECEPaper.objects.select_related('year', 'subject').annotate(question_count=Count('questions'))
+
+
+def with_attempt_details(attempts):
+    """Prefetch what BECEPracticeAttemptSerializer reads for each attempt"""
+    return attempts.prefetch_related('user_answers', Prefetch('paper', queryset=annotated_papers()))
+
+
 class BECESubjectListView(generics.ListAPIView):
     queryset = BECESubject.objects.filter(is_active=True)
     serializer_class = BECESubjectSerializer
@@ -49,7 +64,7 @@ class BECEPaperListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        queryset = BECEPaper.objects.filter(is_published=True).select_related('year', 'subject')
+        queryset = annotated_papers().filter(is_published=True)
         
         # Filter by subject
         subject = self.request.query_params.get('subject')
@@ -70,7 +85,7 @@ class BECEPaperListView(generics.ListAPIView):
 
 
 class BECEPaperDetailView(generics.RetrieveAPIView):
-    queryset = BECEPaper.objects.filter(is_published=True)
+    queryset = annotated_papers().filter(is_published=True).prefetch_related('questions__answers')
     serializer_class = BECEPaperSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -98,10 +113,10 @@ def bece_practice_by_subject(request, subject):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    papers = BECEPaper.objects.filter(
+    papers = annotated_papers().filter(
         subject__name=subject,
         is_published=True
-    ).select_related('year', 'subject').order_by('-year__year', 'paper_type')
+    ).order_by('-year__year', 'paper_type')
     
     serializer = BECEPaperListSerializer(papers, many=True)
     return Response(serializer.data)
@@ -144,94 +159,96 @@ def submit_bece_practice(request):
     paper_id = serializer.validated_data['paper_id']
     answers = serializer.validated_data['answers']
     
-    # Get the latest attempt for this paper
-    attempt = BECEPracticeAttempt.objects.filter(
-        user=request.user,
-        paper_id=paper_id,
-        is_completed=False
-    ).order_by('-started_at').first()
+    # The attempt row stays locked until its answers and score are saved, so
+    # a repeated submit finds it completed instead of grading it twice
+    with transaction.atomic():
+        # Get the latest attempt for this paper
+        attempt = BECEPracticeAttempt.objects.select_for_update().filter(
+            user=request.user,
+            paper_id=paper_id,
+            is_completed=False
+        ).order_by('-started_at').first()
     
-    if not attempt:
-        return Response(
-            {'error': 'No active practice attempt found'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        if not attempt:
+            return Response(
+                {'error': 'No active practice attempt found'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
     
-    # Check if this is an essay paper
-    paper = attempt.paper
-    has_essay_questions = paper.questions.filter(question_type='essay').exists()
+        # Check if this is an essay paper
+        paper = attempt.paper
+        has_essay_questions = paper.questions.filter(question_type='essay').exists()
     
-    # Process answers
-    score = 0
-    essay_questions_count = 0
+        # Process answers
+        score = 0
+        essay_questions_count = 0
+        essay_answer_ids = []
     
-    for answer_data in answers:
-        question_id = answer_data.get('question_id')
-        selected_answer_id = answer_data.get('answer_id')
-        text_answer = answer_data.get('text_answer', '')
+        for answer_data in answers:
+            question_id = answer_data.get('question_id')
+            selected_answer_id = answer_data.get('answer_id')
+            text_answer = answer_data.get('text_answer', '')
         
-        try:
-            question = BECEQuestion.objects.get(id=question_id, paper_id=paper_id)
+            try:
+                question = BECEQuestion.objects.get(id=question_id, paper_id=paper_id)
             
-            if question.question_type == 'essay':
-                # Handle essay questions
-                essay_questions_count += 1
-                BECEUserAnswer.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    text_answer=text_answer,
-                    is_correct=False,  # Will be graded manually
-                    marks_earned=0     # Will be updated after manual grading
-                )
-            else:
-                # Handle multiple choice questions
-                selected_answer = BECEAnswer.objects.get(id=selected_answer_id, question=question)
-                is_correct = selected_answer.is_correct
-                marks_earned = question.marks if is_correct else 0
-                score += marks_earned
+                if question.question_type == 'essay':
+                    # Handle essay questions
+                    essay_questions_count += 1
+                    essay_answer = BECEUserAnswer.objects.create(
+                        attempt=attempt,
+                        question=question,
+                        text_answer=text_answer,
+                        is_correct=False,  # Will be graded manually
+                        marks_earned=0,    # Will be updated after manual grading
+                        needs_grading=True
+                    )
+                    essay_answer_ids.append(essay_answer.id)
+                else:
+                    # Handle multiple choice questions
+                    selected_answer = BECEAnswer.objects.get(id=selected_answer_id, question=question)
+                    is_correct = selected_answer.is_correct
+                    marks_earned = question.marks if is_correct else 0
+                    score += marks_earned
                 
-                BECEUserAnswer.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    selected_answer=selected_answer,
-                    is_correct=is_correct,
-                    marks_earned=marks_earned
-                )
-        except (BECEQuestion.DoesNotExist, BECEAnswer.DoesNotExist):
-            continue
+                    BECEUserAnswer.objects.create(
+                        attempt=attempt,
+                        question=question,
+                        selected_answer=selected_answer,
+                        is_correct=is_correct,
+                        marks_earned=marks_earned
+                    )
+            except (BECEQuestion.DoesNotExist, BECEAnswer.DoesNotExist):
+                continue
     
-    # Complete the attempt
-    attempt.score = score
-    attempt.is_completed = True
+        # Complete the attempt
+        attempt.score = score
+        attempt.is_completed = True
+        attempt.completed_at = timezone.now()
     
-    # For essay papers, don't calculate percentage yet (pending manual grading)
-    if has_essay_questions:
-        attempt.percentage = 0  # Will be updated after manual grading
-    else:
-        attempt.percentage = (score / attempt.total_marks) * 100 if attempt.total_marks > 0 else 0
+        # For essay papers, don't calculate percentage yet (pending manual grading)
+        if has_essay_questions:
+            attempt.percentage = 0  # Will be updated after manual grading
+        else:
+            attempt.percentage = (score / attempt.total_marks) * 100 if attempt.total_marks > 0 else 0
     
-    attempt.save()
+        attempt.save()
+    
+    # Pre-score essays so they reach the grading queue with a suggested mark
+    if essay_answer_ids:
+        prescore_all(answer_ids=essay_answer_ids)
     
     # Update user statistics only for non-essay papers
     if not has_essay_questions:
-        stats, created = BECEStatistics.objects.get_or_create(
-            user=request.user,
-            subject=attempt.paper.subject
-        )
-        
-        stats.total_attempts += 1
-        if attempt.score > stats.best_score:
-            stats.best_score = attempt.score
-        
-        # Calculate average score
-        all_attempts = BECEPracticeAttempt.objects.filter(
-            user=request.user,
-            paper__subject=attempt.paper.subject,
-            is_completed=True
-        )
-        stats.average_score = all_attempts.aggregate(avg=Avg('score'))['avg'] or 0
-        stats.last_attempt = attempt.completed_at
-        stats.save()
+        # Rebuilt from the attempts while holding the row lock, so concurrent
+        # submissions can't overwrite each other's totals
+        with transaction.atomic():
+            BECEStatistics.objects.select_for_update().get_or_create(
+                user=request.user,
+                subject=attempt.paper.subject
+            )
+            recompute_statistics([attempt.id])
+        stats = BECEStatistics.objects.get(user=request.user, subject=attempt.paper.subject)
     
     # Return different responses based on paper type
     if has_essay_questions:
@@ -256,7 +273,9 @@ class BECEAttemptListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        queryset = BECEPracticeAttempt.objects.filter(user=self.request.user).order_by('-started_at')
+        queryset = with_attempt_details(
+            BECEPracticeAttempt.objects.filter(user=self.request.user).order_by('-started_at')
+        )
         
         # Filter by subject
         subject = self.request.query_params.get('subject')
@@ -303,10 +322,10 @@ def bece_dashboard(request):
     subjects = BECESubject.objects.filter(is_active=True)
     
     # Get recent attempts
-    recent_attempts = BECEPracticeAttempt.objects.filter(
+    recent_attempts = with_attempt_details(BECEPracticeAttempt.objects.filter(
         user=request.user,
         is_completed=True
-    ).order_by('-completed_at')[:5]
+    ).order_by('-completed_at'))[:5]
     
     # Get statistics
     statistics = BECEStatistics.objects.filter(user=request.user).select_related('subject')
@@ -343,11 +362,11 @@ def bece_subject_performance(request, subject):
         )
     
     # Get attempts for this subject
-    attempts = BECEPracticeAttempt.objects.filter(
+    attempts = with_attempt_details(BECEPracticeAttempt.objects.filter(
         user=request.user,
         paper__subject=bece_subject,
         is_completed=True
-    ).order_by('-completed_at')
+    ).order_by('-completed_at'))
     
     # Get statistics
     try:
@@ -357,7 +376,7 @@ def bece_subject_performance(request, subject):
         stats_data = None
     
     # Get available papers
-    papers = BECEPaper.objects.filter(
+    papers = annotated_papers().filter(
         subject=bece_subject,
         is_published=True
     ).order_by('-year__year', 'paper_type')
@@ -375,4 +394,50 @@ def bece_subject_performance(request, subject):
             }
             for attempt in attempts[:10]  # Last 10 attempts
         ]
-    })
\ No newline at end of file
+    })
+
+
+class EssayGradingQueueView(generics.ListAPIView):
+    """Ungraded essay answers for teachers, oldest first"""
+    serializer_class = EssayGradingQueueSerializer
+    permission_classes = [permissions.IsAdminUser]
+    ordering_fields = {
+        'answered_at': 'answered_at',
+        'suggested_marks': 'prescore__suggested_marks',
+        'keyword_coverage': 'prescore__keyword_coverage',
+        'word_count': 'prescore__word_count',
+    }
+
+    def get_queryset(self):
+        queryset = pending_essay_answers()
+        
+        # Filter by paper
+        paper = self.request.query_params.get('paper')
+        if paper:
+            queryset = queryset.filter(question__paper_id=paper)
+        
+        # Sort by a pre-scoring feature, e.g. ?ordering=-suggested_marks
+        ordering = self.request.query_params.get('ordering', '')
+        field = self.ordering_fields.get(ordering.lstrip('-'))
+        if field:
+            queryset = queryset.order_by(f"{'-' if ordering.startswith('-') else ''}{field}", 'answered_at')
+        
+        return queryset
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAdminUser])
+def grade_essay_answers(request):
+    """Submit marks and feedback for a batch of essay answers"""
+    serializer = EssayGradeBatchSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = apply_grades(serializer.validated_data['grades'], graded_by=request.user)
+    
+    return Response({
+        'success': True,
+        'graded': result['graded'],
+        'attempts_updated': result['attempt_ids'],
+        'message': 'Essay grades saved successfully'
+    })
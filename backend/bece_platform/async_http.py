@@ -0,0 +1,84 @@
+"""
+Async HTTP support for outbound-I/O views served under ASGI
+One pooled httpx.AsyncClient per event loop, plus a small decorator that gives
+plain async Django views DRF authentication and JSON handling
+"""
+
+import asyncio
+import functools
+import json
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """The pooled AsyncClient of the running event loop (uvicorn runs one loop per worker)"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        limit = getattr(settings, 'ASYNC_HTTP_MAX_CONNECTIONS', 500)
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+        )
+        _clients[loop] = client
+    return client
+
+
+def _authenticate(request):
+    # Same authenticators as the DRF views (session + token), run in a thread
+    from rest_framework.views import APIView
+
+    drf_request = APIView().initialize_request(request)
+    return drf_request.user
+
+
+def async_api_view(methods, authenticated=False):
+    """
+    Decorator for async views returning JSON
+
+    Sets request.data (a parsed JSON object or form body) and request.user (via DRF
+    authentication), answers 405/400/401 like the DRF views, and lets a view
+    return a plain dict (200) or a (dict, status) tuple.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+            request.data = {}
+            if request.method in ('POST', 'PUT', 'PATCH'):
+                if request.content_type == 'application/json':
+                    try:
+                        request.data = json.loads(request.body or b'{}')
+                    except ValueError:
+                        return JsonResponse({'detail': 'JSON parse error'}, status=400)
+                    # Views index request.data by field name
+                    if not isinstance(request.data, dict):
+                        return JsonResponse({'detail': 'Expected a JSON object.'}, status=400)
+                else:
+                    request.data = request.POST.dict()
+
+            try:
+                request.user = await sync_to_async(_authenticate)(request)
+            except Exception as e:
+                return JsonResponse({'detail': str(getattr(e, 'detail', e))}, status=401)
+            if authenticated and not request.user.is_authenticated:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+            result = await view(request, *args, **kwargs)
+            if isinstance(result, tuple):
+                body, status = result
+                return JsonResponse(body, status=status)
+            return JsonResponse(result)
+        return wrapper
+    return decorator
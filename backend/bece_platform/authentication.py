@@ -0,0 +1,64 @@
+"""
+Token authentication with a cached token -> user lookup
+Drop-in replacement for DRF's TokenAuthentication: the Token + user join runs
+once per AUTH_TOKEN_CACHE_TTL per token instead of on every request. Anything
+that revokes a token or changes the user must call invalidate_user_tokens.
+With AUTH_TOKEN_CACHE unset (no shared cache backend) nothing is cached.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def _cache():
+    alias = getattr(settings, 'AUTH_TOKEN_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _cache_key(key):
+    # Never store raw token keys as cache keys
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    """Drop the cached snapshot for one token key"""
+    cache = _cache()
+    if cache is not None:
+        cache.delete(_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    """Drop the cached snapshots of every token belonging to the user"""
+    cache = _cache()
+    if cache is None:
+        return
+    keys = list(Token.objects.filter(user_id=user.pk).values_list('key', flat=True))
+    if keys:
+        cache.delete_many([_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that keeps (user, token) snapshots in the
+    AUTH_TOKEN_CACHE cache for AUTH_TOKEN_CACHE_TTL seconds
+
+    Invalid and inactive-user tokens are not cached and fail exactly as with
+    TokenAuthentication, which is also all this does without AUTH_TOKEN_CACHE.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = _cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+        cache_key = _cache_key(key)
+        snapshot = cache.get(cache_key)
+        if snapshot is not None:
+            return snapshot
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, (user, token), getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 60))
+        return user, token
@@ -0,0 +1,331 @@
+"""
+Endpoint latency benchmarks
+Drives the hot API endpoints as the users of a generate_load_dataset dataset,
+either in-process through the Django test client or over HTTP against a local
+server (gunicorn, uvicorn), and records latency percentiles, throughput and
+queries per request. Results are plain JSON so they can be kept as baselines
+and compared between commits.
+"""
+
+import json
+import math
+import platform
+import random
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.db import connection
+from django.urls import reverse
+
+SCHEMA_VERSION = 1
+
+# (name, build(user, rng) -> [(method, path, body), ...]); users come from
+# load_users(). Only the last request of each step list is timed, the ones
+# before it set it up (submits need the attempt a start request creates)
+ENDPOINTS = [
+    ('course-list', lambda u, rng: [('get', reverse('courses'), None)]),
+    ('course-detail', lambda u, rng: [('get', reverse('course-detail', args=[rng.choice(u['courses'])]), None)]),
+    ('lesson-detail', lambda u, rng: [('get', reverse('lesson-detail', args=[rng.choice(u['lessons'])]), None)]),
+    ('quiz-start', lambda u, rng: [('post', reverse('start-quiz', args=[rng.choice(u['quizzes'])['id']]), {})]),
+    ('quiz-submit', lambda u, rng: quiz_submission(rng.choice(u['quizzes']), rng)),
+    ('quiz-results', lambda u, rng: [
+        ('get', reverse('quiz-results', args=[rng.choice(u['quiz_attempts'])]), None)
+    ]),
+    ('bece-paper-detail', lambda u, rng: [
+        ('get', reverse('bece-paper-detail', args=[rng.choice(u['papers'])['id']]), None)
+    ]),
+    ('bece-submit', lambda u, rng: paper_submission(rng.choice(u['papers']), rng)),
+    ('bundle-detail', lambda u, rng: [('get', reverse('bundle-detail', args=[rng.choice(u['bundles'])]), None)]),
+    ('dashboard-stats', lambda u, rng: [('get', reverse('dashboard-stats'), None)]),
+    ('bece-dashboard', lambda u, rng: [('get', reverse('bece-dashboard'), None)]),
+]
+
+_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def quiz_submission(quiz, rng):
+    return [
+        ('post', reverse('start-quiz', args=[quiz['id']]), {}),
+        ('post', reverse('submit-quiz'), {
+            'quiz_id': quiz['id'],
+            'answers': [
+                {'question_id': str(question_id), 'answer_id': str(rng.choice(answer_ids))}
+                for question_id, answer_ids in quiz['questions']
+            ],
+        }),
+    ]
+
+
+def paper_submission(paper, rng):
+    return [
+        ('post', reverse('start-bece-practice', args=[paper['id']]), {}),
+        ('post', reverse('submit-bece-practice'), {
+            'paper_id': paper['id'],
+            'answers': [
+                {'question_id': question_id, 'answer_id': rng.choice(answer_ids)}
+                for question_id, answer_ids in paper['questions']
+            ],
+        }),
+    ]
+
+
+def load_users(count, seed=0):
+    """
+    Benchmark identities: generated users who own the BECE bundle and have a
+    finished quiz attempt, so every endpoint in ENDPOINTS is reachable for them
+
+    Returns:
+        list: One dict per user with a token key and the ids the endpoints need
+    """
+    from rest_framework.authtoken.models import Token
+
+    from accounts.management.commands.generate_load_dataset import BECE_BUNDLE_SLUG, EMAIL_DOMAIN
+    from bece.models import BECEPaper
+    from courses.models import Course, Lesson, Quiz, QuizAttempt
+    from ecommerce.models import Bundle
+
+    user_ids = list(
+        QuizAttempt.objects.filter(
+            user__email__endswith=f'@{EMAIL_DOMAIN}', user__purchases__bundle__slug=BECE_BUNDLE_SLUG,
+            is_completed=True,
+        ).values_list('user_id', flat=True).distinct().order_by('user_id')
+    )
+    if not user_ids:
+        raise ValueError('No generated users found; run generate_load_dataset first')
+    user_ids = random.Random(seed).sample(user_ids, min(count, len(user_ids)))
+
+    courses = list(Course.objects.filter(is_published=True).values_list('slug', flat=True))
+    lessons = list(Lesson.objects.filter(is_published=True, is_free=True).values_list('id', flat=True)[:500]) \
+        or list(Lesson.objects.filter(is_published=True).values_list('id', flat=True)[:500])
+    quizzes = [
+        {'id': quiz.id, 'questions': [
+            (question.id, [answer.id for answer in question.answers.all()]) for question in quiz.questions.all()
+        ]}
+        for quiz in Quiz.objects.filter(is_published=True).prefetch_related('questions__answers')[:50]
+    ]
+    papers = [
+        {'id': paper.id, 'questions': [
+            (question.id, [answer.id for answer in question.answers.all()]) for question in paper.questions.all()
+        ]}
+        for paper in BECEPaper.objects.filter(is_published=True).prefetch_related('questions__answers')[:50]
+    ]
+    bundles = list(Bundle.objects.filter(is_active=True).values_list('slug', flat=True))
+
+    attempts = {}
+    for attempt_id, user_id in QuizAttempt.objects.filter(user_id__in=user_ids, is_completed=True).values_list(
+        'id', 'user_id'
+    ):
+        attempts.setdefault(user_id, []).append(attempt_id)
+
+    return [
+        {
+            'id': user_id,
+            'token': Token.objects.get_or_create(user_id=user_id)[0].key,
+            'courses': courses,
+            'lessons': lessons,
+            'quizzes': quizzes,
+            'papers': papers,
+            'bundles': bundles,
+            'quiz_attempts': attempts[user_id],
+        }
+        for user_id in user_ids
+    ]
+
+
+class ClientTransport:
+    """In-process requests through django.test.Client, one client per thread"""
+    name = 'client'
+
+    def __init__(self):
+        from django.test import Client
+
+        self._local = threading.local()
+        self._client = Client
+
+    def request(self, method, path, body, token):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._client()
+        kwargs = {'HTTP_AUTHORIZATION': f'Token {token}'}
+        if body is not None:
+            kwargs.update(data=json.dumps(body), content_type='application/json')
+        response = getattr(client, method)(path, **kwargs)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server, one keep-alive httpx.Client per thread"""
+    name = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+        self._clients = []
+
+    def request(self, method, path, body, token):
+        import httpx
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = httpx.Client(base_url=self.base_url, timeout=60.0)
+            self._clients.append(client)
+        response = client.request(method.upper(), path, json=body, headers={'Authorization': f'Token {token}'})
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+    def close(self):
+        for client in self._clients:
+            client.close()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        # From the Server-Timing header (bece_platform.perf); None if the server doesn't send it
+        'queries_per_request': round(sum(queries) / len(queries), 1) if queries else None,
+    }
+
+
+def run_endpoint(transport, endpoint, users, requests, concurrency, warmup=5, seed=0):
+    """Send `requests` requests to one endpoint from `concurrency` threads and summarize them"""
+    name, build = endpoint
+    rng = random.Random(f'{seed}-{name}')
+    plan = [(user, build(user, rng)) for user in (rng.choice(users) for _ in range(warmup + requests))]
+    # A user's set-up and timed requests must not interleave with another
+    # thread's (a second start would take over the attempt being submitted)
+    user_locks = {user['id']: threading.Lock() for user in users}
+
+    for user, steps in plan[:warmup]:
+        for method, path, body in steps:
+            transport.request(method, path, body, user['token'])
+
+    latencies, queries, errors = [], [], [0]
+    lock = threading.Lock()
+
+    def send(item):
+        user, steps = item
+        *setup, (method, path, body) = steps
+        with user_locks[user['id']]:
+            started = time.perf_counter()
+            try:
+                for step in setup:
+                    transport.request(*step, user['token'])
+                started = time.perf_counter()
+                status, server_timing = transport.request(method, path, body, user['token'])
+            except Exception:
+                status, server_timing = 599, ''
+            latency = (time.perf_counter() - started) * 1000
+        match = _QUERIES.search(server_timing)
+        with lock:
+            latencies.append(latency)
+            if status >= 400:
+                errors[0] += 1
+            if match:
+                queries.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, plan[warmup:]))
+    return summarize(latencies, queries, errors[0], time.perf_counter() - started)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def dataset_size():
+    from bece.models import BECEUserAnswer
+    from courses.models import UserAnswer
+    from django.contrib.auth import get_user_model
+
+    return {
+        'users': get_user_model().objects.count(),
+        'quiz_answers': UserAnswer.objects.count(),
+        'bece_answers': BECEUserAnswer.objects.count(),
+    }
+
+
+def run(transport, endpoints, users, requests, concurrency, warmup=5, seed=0, progress=None):
+    """
+    Benchmark every endpoint in turn
+
+    Returns:
+        dict: The JSON baseline document (metadata plus one summary per endpoint)
+    """
+    results = {}
+    for endpoint in endpoints:
+        results[endpoint[0]] = run_endpoint(transport, endpoint, users, requests, concurrency, warmup, seed)
+        if progress:
+            progress(endpoint[0], results[endpoint[0]])
+    return {
+        'schema': SCHEMA_VERSION,
+        'revision': git_revision(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'transport': transport.name,
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'settings': {'requests': requests, 'concurrency': concurrency, 'warmup': warmup, 'users': len(users),
+                     'seed': seed},
+        'dataset': dataset_size(),
+        'endpoints': results,
+    }
+
+
+def compare(baseline, current, threshold=0.20, min_delta_ms=2.0):
+    """
+    Compare two benchmark documents endpoint by endpoint
+
+    A latency regression is a p50 or p95 that grew by more than `threshold`
+    (a fraction) and by more than `min_delta_ms`, so millisecond-level noise on
+    fast endpoints is not flagged. One or more extra queries per request, and
+    errors appearing where there were none, are regressions too.
+
+    Returns:
+        list: (endpoint, metric, baseline value, current value, change, regressed) rows
+    """
+    rows = []
+    for name, now in current['endpoints'].items():
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            change = (now[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            regressed = (
+                metric in ('p50_ms', 'p95_ms')
+                and change > threshold and now[metric] - before[metric] > min_delta_ms
+            )
+            rows.append((name, metric, before[metric], now[metric], change, regressed))
+        if before['queries_per_request'] is not None and now['queries_per_request'] is not None:
+            change = now['queries_per_request'] - before['queries_per_request']
+            rows.append((name, 'queries_per_request', before['queries_per_request'], now['queries_per_request'],
+                         change, change >= 1))
+        if now['errors'] and not before['errors']:
+            rows.append((name, 'errors', before['errors'], now['errors'], now['errors'], True))
+    return rows
@@ -0,0 +1,248 @@
+"""
+Streaming data exports for analysis
+Rows are read with values_list(...).iterator() and encoded on the fly as CSV
+or JSON Lines (optionally gzip-compressed), so memory use stays constant no
+matter how many rows a dataset has
+"""
+
+import csv
+import json
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+CHUNK_SIZE = 2000
+OUTPUT_FORMATS = ('csv', 'jsonl')
+
+
+class ExportError(ValueError):
+    """Raised for unknown datasets or invalid filters"""
+
+
+def _quiz_attempts():
+    from courses.models import QuizAttempt
+    return QuizAttempt.objects.all()
+
+
+def _quiz_answers():
+    from courses.models import UserAnswer
+    return UserAnswer.objects.all()
+
+
+def _bece_attempts():
+    from bece.models import BECEPracticeAttempt
+    return BECEPracticeAttempt.objects.all()
+
+
+def _bece_answers():
+    from bece.models import BECEUserAnswer
+    return BECEUserAnswer.objects.all()
+
+
+def _orders():
+    from ecommerce.models import Order
+    return Order.objects.all()
+
+
+def _payments():
+    from ecommerce.models import Payment
+    return Payment.objects.all()
+
+
+# name -> queryset factory, (column, lookup) pairs, date lookup, subject lookup
+DATASETS = {
+    'quiz_attempts': {
+        'queryset': _quiz_attempts,
+        'columns': [
+            ('id', 'id'), ('user_id', 'user_id'), ('user_email', 'user__email'),
+            ('quiz_id', 'quiz_id'), ('quiz', 'quiz__slug'), ('subject', 'quiz__subject__code'),
+            ('started_at', 'started_at'), ('completed_at', 'completed_at'), ('score', 'score'),
+            ('total_questions', 'total_questions'), ('time_taken_minutes', 'time_taken_minutes'),
+            ('is_completed', 'is_completed'),
+        ],
+        'date_field': 'started_at',
+        'subject_field': 'quiz__subject__code',
+    },
+    'quiz_answers': {
+        'queryset': _quiz_answers,
+        'columns': [
+            ('id', 'id'), ('attempt_id', 'attempt_id'), ('user_id', 'attempt__user_id'),
+            ('quiz_id', 'attempt__quiz_id'), ('question_id', 'question_id'),
+            ('selected_answer_id', 'selected_answer_id'), ('is_correct', 'is_correct'),
+            ('points_earned', 'points_earned'),
+        ],
+        'date_field': 'attempt__started_at',
+        'subject_field': 'attempt__quiz__subject__code',
+    },
+    'bece_attempts': {
+        'queryset': _bece_attempts,
+        'columns': [
+            ('id', 'id'), ('user_id', 'user_id'), ('user_email', 'user__email'),
+            ('paper_id', 'paper_id'), ('year', 'paper__year__year'), ('subject', 'paper__subject__name'),
+            ('paper_type', 'paper__paper_type'), ('started_at', 'started_at'),
+            ('completed_at', 'completed_at'), ('score', 'score'), ('total_marks', 'total_marks'),
+            ('percentage', 'percentage'), ('time_taken_minutes', 'time_taken_minutes'),
+            ('is_completed', 'is_completed'),
+        ],
+        'date_field': 'started_at',
+        'subject_field': 'paper__subject__name',
+    },
+    'bece_answers': {
+        'queryset': _bece_answers,
+        'columns': [
+            ('id', 'id'), ('attempt_id', 'attempt_id'), ('user_id', 'attempt__user_id'),
+            ('question_id', 'question_id'), ('selected_answer_id', 'selected_answer_id'),
+            ('text_answer', 'text_answer'), ('is_correct', 'is_correct'), ('marks_earned', 'marks_earned'),
+            ('needs_grading', 'needs_grading'), ('answered_at', 'answered_at'),
+            ('time_spent_seconds', 'time_spent_seconds'),
+        ],
+        'date_field': 'answered_at',
+        'subject_field': 'question__paper__subject__name',
+    },
+    'orders': {
+        'queryset': _orders,
+        'columns': [
+            ('id', 'id'), ('order_number', 'order_number'), ('user_id', 'user_id'),
+            ('user_email', 'user__email'), ('subtotal', 'subtotal'), ('discount_amount', 'discount_amount'),
+            ('total_amount', 'total_amount'), ('coupon', 'coupon__code'), ('status', 'status'),
+            ('created_at', 'created_at'),
+        ],
+        'date_field': 'created_at',
+        'subject_field': None,
+    },
+    'payments': {
+        'queryset': _payments,
+        'columns': [
+            ('id', 'id'), ('transaction_id', 'transaction_id'), ('order_number', 'order__order_number'),
+            ('user_id', 'order__user_id'), ('payment_method', 'payment_method'), ('amount', 'amount'),
+            ('currency', 'currency'), ('status', 'status'), ('processed_at', 'processed_at'),
+            ('created_at', 'created_at'),
+        ],
+        'date_field': 'created_at',
+        'subject_field': None,
+    },
+}
+
+
+def _day_start(value, name):
+    try:
+        day = parse_date(value) if isinstance(value, str) else value
+    except ValueError:
+        # Well formed but not a real day (2024-13-45)
+        day = None
+    if day is None:
+        raise ExportError(f"{name} must be a date in YYYY-MM-DD format")
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(dataset, date_from=None, date_to=None, subject=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream the header and rows of a dataset
+
+    Args:
+        dataset (str): One of DATASETS
+        date_from (str|date): First day included (YYYY-MM-DD)
+        date_to (str|date): Last day included (YYYY-MM-DD)
+        subject (str): Subject code (courses) or BECE subject name
+
+    Returns:
+        tuple: (column names, row iterator)
+    """
+    spec = DATASETS.get(dataset)
+    if spec is None:
+        raise ExportError(f"Unknown dataset '{dataset}'. Choose from: {', '.join(DATASETS)}")
+
+    queryset = spec['queryset']()
+    if date_from:
+        queryset = queryset.filter(**{f"{spec['date_field']}__gte": _day_start(date_from, 'from')})
+    if date_to:
+        end = _day_start(date_to, 'to') + timedelta(days=1)
+        queryset = queryset.filter(**{f"{spec['date_field']}__lt": end})
+    if subject:
+        if not spec['subject_field']:
+            raise ExportError(f"Dataset '{dataset}' cannot be filtered by subject")
+        queryset = queryset.filter(**{spec['subject_field']: subject})
+
+    headers = [column for column, _ in spec['columns']]
+    lookups = [lookup for _, lookup in spec['columns']]
+    rows = queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+    return headers, rows
+
+
+class _Echo:
+    """File-like object whose write() returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_csv(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_format_value(value) for value in row])
+
+
+def encode_jsonl(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), default=_json_default) + '\n'
+
+
+def stream_export(dataset, output='csv', compress=False, **filters):
+    """
+    Encoded export chunks (bytes) ready for a streaming response or a file
+
+    Filters are applied before the first chunk is produced, so invalid
+    filters raise ExportError immediately.
+    """
+    if output not in OUTPUT_FORMATS:
+        raise ExportError(f"output must be one of {', '.join(OUTPUT_FORMATS)}")
+
+    headers, rows = export_rows(dataset, **filters)
+    encoder = encode_csv if output == 'csv' else encode_jsonl
+    chunks = _buffered(encoder(headers, rows))
+    return _gzip(chunks) if compress else chunks
+
+
+def _buffered(lines, size=64 * 1024):
+    """Join small encoded lines into larger byte chunks"""
+    buffer = []
+    length = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(dataset, output='csv', compress=False):
+    stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+    return f"{dataset}-{stamp}.{output}{'.gz' if compress else ''}"
@@ -0,0 +1,119 @@
+"""
+Project middleware
+PerformanceMiddleware times every request (see bece_platform.perf).
+
+Requests under /api/ that carry an `Authorization: Token ...` header never use
+the session, CSRF cookie, messages or framing headers, so these subclasses of
+Django's middleware (Browser*) return early for them. Everything else, including /admin/
+and session-authenticated calls from the browsable API, runs the full stack.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+from . import perf
+
+API_PREFIX = '/api/'
+
+
+class PerformanceMiddleware:
+    """
+    Server-Timing headers, sampled timing logs and query budgets
+
+    Goes first in MIDDLEWARE so the total covers the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Middleware is built before the first request; install() also wraps
+        # connections that are already open
+        perf.install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = perf.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            perf.stop(token)
+        perf.report(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = perf.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            perf.stop(token)
+        perf.report(request, response, metrics)
+        return response
+
+
+def is_token_api_request(request):
+    """Whether the request is an /api/ call authenticated with a DRF token"""
+    return (
+        request.path_info.startswith(API_PREFIX)
+        and request.META.get('HTTP_AUTHORIZATION', '').startswith('Token ')
+    )
+
+
+class BrowserSessionMiddleware(SessionMiddleware):
+    def process_request(self, request):
+        if not is_token_api_request(request):
+            super().process_request(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'session'):
+            return response
+        return super().process_response(request, response)
+
+
+class BrowserCsrfViewMiddleware(CsrfViewMiddleware):
+    def process_request(self, request):
+        if not is_token_api_request(request):
+            super().process_request(request)
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_token_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+    def process_response(self, request, response):
+        if is_token_api_request(request):
+            return response
+        return super().process_response(request, response)
+
+
+class BrowserAuthenticationMiddleware(AuthenticationMiddleware):
+    # Needs request.session; DRF authenticates token requests itself
+    def process_request(self, request):
+        if not is_token_api_request(request):
+            super().process_request(request)
+
+
+class BrowserMessageMiddleware(MessageMiddleware):
+    def process_request(self, request):
+        if not is_token_api_request(request):
+            super().process_request(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_messages'):
+            return response
+        return super().process_response(request, response)
+
+
+class BrowserXFrameOptionsMiddleware(XFrameOptionsMiddleware):
+    def process_response(self, request, response):
+        if is_token_api_request(request):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,231 @@
+"""
+Per-request performance metrics
+RequestMetrics collects database, serializer and cache timings for the request
+being served. It lives in a context variable, so concurrent async requests and
+their sync_to_async threads each see their own. PerformanceMiddleware reports
+the totals as Server-Timing headers, sampled log lines and query budget checks.
+"""
+
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_metrics', default=None)
+_MISSING = object()
+_installed = False
+
+
+class QueryBudgetExceeded(Exception):
+    """A view ran more queries than its QUERY_BUDGETS entry allows"""
+
+
+class RequestMetrics:
+    """Counters for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_seconds = 0.0
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_seconds = 0.0
+        # Nesting of timed calls (a serializer calling another, a cache get
+        # implemented with get_many); only the outermost call is counted
+        self.depth = {'serializer': 0, 'cache': 0}
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total_seconds * 1000, 2),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_seconds * 1000, 2),
+            'serializer_ms': round(self.serializer_seconds * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_seconds * 1000, 2),
+        }
+
+    def server_timing(self):
+        """Server-Timing header value"""
+        return ', '.join([
+            f'total;dur={self.total_seconds * 1000:.1f}',
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f'serializer;dur={self.serializer_seconds * 1000:.1f}',
+            f'cache;dur={self.cache_seconds * 1000:.1f};desc="{self.cache_hits} hits {self.cache_misses} misses"',
+        ])
+
+
+def current():
+    """Metrics of the request being served, or None outside a request"""
+    return _current.get()
+
+
+def start():
+    """Begin collecting for a request; returns (metrics, token for stop())"""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def stop(token):
+    metrics = _current.get()
+    metrics.total_seconds = time.perf_counter() - metrics.started
+    _current.reset(token)
+    return metrics
+
+
+# Database
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def _add_query_wrapper(connection, **kwargs):
+    # Installed once per connection rather than per request, so queries run
+    # from sync_to_async threads (async views) are counted too
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+# Serializers and caches
+
+def _outermost(kind, func, record=None):
+    """Wrap func so its time (and record(metrics, args, kwargs, result)) is added only for outermost calls"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = _current.get()
+        if metrics is None or metrics.depth[kind]:
+            return func(*args, **kwargs)
+        metrics.depth[kind] += 1
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            metrics.depth[kind] -= 1
+            setattr(metrics, f'{kind}_seconds', getattr(metrics, f'{kind}_seconds') + time.perf_counter() - started)
+        if record:
+            record(metrics, args, kwargs, result)
+        return result
+    return wrapper
+
+
+def _instrument_serializers():
+    from rest_framework.serializers import BaseSerializer
+
+    # Serializer.data and ListSerializer.data both go through BaseSerializer.data,
+    # which runs to_representation (and any queries it triggers)
+    BaseSerializer.data = property(_outermost('serializer', BaseSerializer.data.fget))
+
+
+def _instrument_cache_backend(backend):
+    if vars(backend).get('_perf_instrumented'):
+        return
+    get, get_many = backend.get, backend.get_many
+
+    def raw_get(self, key, version=None):
+        return get(self, key, _MISSING, version=version)
+
+    def record_get(metrics, args, kwargs, value):
+        if value is _MISSING:
+            metrics.cache_misses += 1
+        else:
+            metrics.cache_hits += 1
+
+    counted_get = _outermost('cache', raw_get, record_get)
+
+    @wraps(get)
+    def timed_get(self, key, default=None, version=None):
+        value = counted_get(self, key, version=version)
+        return default if value is _MISSING else value
+
+    def record_many(metrics, args, kwargs, result):
+        keys = list(args[1] if len(args) > 1 else kwargs['keys'])
+        metrics.cache_hits += len(result)
+        metrics.cache_misses += len(keys) - len(result)
+
+    backend.get = timed_get
+    backend.get_many = _outermost('cache', get_many, record_many)
+    backend._perf_instrumented = True
+
+
+def _instrument_caches(setting='CACHES', **kwargs):
+    if setting != 'CACHES':
+        return
+    for alias in settings.CACHES:
+        _instrument_cache_backend(type(caches[alias]))
+
+
+def install():
+    """Hook query, serializer and cache timing (once per process)"""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    connection_created.connect(_add_query_wrapper)
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+    _instrument_serializers()
+    _instrument_caches()
+    # Tests may swap cache backends with override_settings
+    setting_changed.connect(_instrument_caches)
+
+
+# Reporting
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def report(request, response, metrics):
+    """
+    Attach Server-Timing, log a sample of requests and enforce query budgets
+
+    Raises:
+        QueryBudgetExceeded: If the view went over its budget and
+            QUERY_BUDGET_STRICT is set (as it is under the test runner)
+    """
+    if getattr(settings, 'SERVER_TIMING', False):
+        response['Server-Timing'] = metrics.server_timing()
+
+    name = view_name(request)
+    budget = getattr(settings, 'QUERY_BUDGETS', {}).get(name)
+    over_budget = budget is not None and metrics.db_queries > budget
+
+    if over_budget or random.random() < getattr(settings, 'PERF_LOG_SAMPLE_RATE', 0.0):
+        line = json.dumps({
+            'view': name,
+            'method': request.method,
+            'status': response.status_code,
+            **metrics.as_dict(),
+            'query_budget': budget,
+        })
+        if over_budget:
+            logger.warning(f'Query budget exceeded: {line}')
+        else:
+            logger.info(line)
+
+    if over_budget and getattr(settings, 'QUERY_BUDGET_STRICT', False):
+        raise QueryBudgetExceeded(
+            f'{name} ran {metrics.db_queries} queries, budget is {budget} (QUERY_BUDGETS)'
+        )
@@ -0,0 +1,210 @@
+"""
+Query plans of the hot paths
+HOT_QUERIES mirrors the filters and orderings the busiest views run, each with
+the index columns it should be able to use. explain_hot_queries() runs EXPLAIN
+for every one of them (SQLite or PostgreSQL) and reports full table scans,
+sorts that no index serves, and expected indexes missing from the schema.
+"""
+
+import re
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+
+@dataclass
+class HotQuery:
+    name: str
+    model: str  # app_label.ModelName
+    columns: list  # leading columns of the index the query needs
+    build: object  # callable(sample ids) -> QuerySet
+
+
+def _model(label):
+    from django.apps import apps
+
+    return apps.get_model(label)
+
+
+def _due_payments(limit):
+    from ecommerce.reconciliation import due_payments
+
+    return due_payments(limit)
+
+
+HOT_QUERIES = [
+    HotQuery('quiz-open-attempt', 'courses.QuizAttempt', ['user_id', 'quiz_id'], lambda s: (
+        _model('courses.QuizAttempt').objects.filter(user_id=s['user'], quiz_id=s['quiz'], is_completed=False)
+        .order_by('-started_at')[:1]
+    )),
+    HotQuery('quiz-attempt-history', 'courses.QuizAttempt', ['user_id', 'started_at'], lambda s: (
+        _model('courses.QuizAttempt').objects.filter(user_id=s['user']).order_by('-started_at')[:20]
+    )),
+    HotQuery('bece-open-attempt', 'bece.BECEPracticeAttempt', ['user_id', 'paper_id'], lambda s: (
+        _model('bece.BECEPracticeAttempt').objects.filter(user_id=s['user'], paper_id=s['paper'], is_completed=False)
+        .order_by('-started_at')[:1]
+    )),
+    HotQuery('bece-attempt-history', 'bece.BECEPracticeAttempt', ['user_id', 'started_at'], lambda s: (
+        _model('bece.BECEPracticeAttempt').objects.filter(user_id=s['user']).order_by('-started_at')[:20]
+    )),
+    HotQuery('bece-recent-completed', 'bece.BECEPracticeAttempt', ['user_id', 'completed_at'],
+             lambda s: (
+        _model('bece.BECEPracticeAttempt').objects.filter(user_id=s['user'], is_completed=True)
+        .order_by('-completed_at')[:5]
+    )),
+    HotQuery('bece-subject-performance', 'bece.BECEPracticeAttempt', ['user_id', 'completed_at'],
+             lambda s: (
+        _model('bece.BECEPracticeAttempt').objects.filter(
+            user_id=s['user'], paper__subject_id=s['bece_subject'], is_completed=True
+        ).order_by('-completed_at')
+    )),
+    HotQuery('recent-lessons', 'courses.LessonProgress', ['user_id', 'last_accessed'], lambda s: (
+        _model('courses.LessonProgress').objects.filter(user_id=s['user']).order_by('-last_accessed')[:5]
+    )),
+    HotQuery('course-lessons-completed', 'courses.LessonProgress', ['user_id'], lambda s: (
+        _model('courses.LessonProgress').objects.filter(
+            user_id=s['user'], lesson__course_id=s['course'], is_completed=True
+        )
+    )),
+    HotQuery('course-list', 'courses.Course', ['created_at'], lambda s: (
+        _model('courses.Course').objects.filter(is_published=True).order_by('-created_at')[:20]
+    )),
+    HotQuery('bundle-access', 'ecommerce.UserPurchase', ['user_id', 'bundle_id'], lambda s: (
+        _model('ecommerce.UserPurchase').objects.filter(user_id=s['user'], bundle_id=s['bundle'], is_active=True)
+    )),
+    HotQuery('purchase-history', 'ecommerce.UserPurchase', ['user_id', 'purchased_at'], lambda s: (
+        _model('ecommerce.UserPurchase').objects.filter(user_id=s['user'], is_active=True)
+        .order_by('-purchased_at', '-id')[:20]
+    )),
+    HotQuery('order-history', 'ecommerce.Order', ['user_id', 'created_at'], lambda s: (
+        _model('ecommerce.Order').objects.filter(user_id=s['user']).order_by('-created_at', '-id')[:20]
+    )),
+    HotQuery('payments-by-status', 'ecommerce.Payment', ['status', 'created_at'], lambda s: (
+        _model('ecommerce.Payment').objects.filter(status='completed').order_by('-created_at')[:50]
+    )),
+    HotQuery('reconcile-queue', 'ecommerce.Payment', ['next_check_at'], lambda s: _due_payments(50)),
+    HotQuery('upcoming-tasks', 'accounts.UpcomingTask', ['user_id', 'due_date'], lambda s: (
+        _model('accounts.UpcomingTask').objects.filter(
+            user_id=s['user'], is_completed=False,
+            due_date__gte=timezone.now(), due_date__lte=timezone.now() + timedelta(days=30),
+        ).order_by('due_date', '-priority')[:10]
+    )),
+]
+
+
+@dataclass
+class PlanReport:
+    query: HotQuery
+    table: str
+    plan: str
+    indexes_used: list = field(default_factory=list)
+    full_scans: list = field(default_factory=list)  # tables read in full
+    unindexed_sort: bool = False
+    expected_indexes: list = field(default_factory=list)  # indexes whose leading columns are query.columns
+
+    @property
+    def ok(self):
+        return self.table not in self.full_scans and bool(self.expected_indexes)
+
+    @property
+    def uses_expected_index(self):
+        return bool(set(self.expected_indexes) & set(self.indexes_used))
+
+
+def sample_values():
+    """Ids to put in the hot queries: the most active user and rows they touch (0 if the table is empty)"""
+    from django.db.models import Count
+
+    from bece.models import BECEPaper, BECESubject
+    from courses.models import Course, Quiz, QuizAttempt
+    from ecommerce.models import Bundle
+
+    busiest = (
+        QuizAttempt.objects.values('user_id').annotate(n=Count('id')).order_by('-n').values_list('user_id', flat=True)
+        .first()
+    )
+    first = lambda model: model.objects.order_by('pk').values_list('pk', flat=True).first() or 0  # noqa: E731
+    return {
+        'user': busiest or 0,
+        'quiz': first(Quiz),
+        'paper': first(BECEPaper),
+        'bece_subject': first(BECESubject),
+        'course': first(Course),
+        'bundle': first(Bundle),
+    }
+
+
+# SQLite: "SCAN t" reads the table, "SCAN t USING INDEX i" reads all of an
+# index, "SEARCH t USING INDEX i (...)" seeks into it
+_SQLITE_SCAN = re.compile(r'\bSCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+_SQLITE_SEARCH = re.compile(r'\bSEARCH (\w+) USING (?:COVERING |INTEGER PRIMARY KEY)?(?:INDEX (\w+))?')
+_SQLITE_SORT = re.compile(r'USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY')
+# PostgreSQL text plans
+_PG_SEQ = re.compile(r'Seq Scan on (\w+)')
+_PG_INDEX = re.compile(r'(?:Index Scan|Index Only Scan|Bitmap Index Scan)(?: Backward)? (?:using|on) (\w+)')
+_PG_SORT = re.compile(r'^\s*(?:->\s*)?(?:Incremental )?Sort\b', re.MULTILINE)
+
+
+def parse_plan(plan, vendor):
+    """(indexes used, tables read in full, whether rows are sorted without an index)"""
+    if vendor == 'sqlite':
+        indexes, scans = [], []
+        for table, index in _SQLITE_SCAN.findall(plan):
+            if index:
+                indexes.append(index)
+            else:
+                scans.append(table)
+        indexes += [index for _, index in _SQLITE_SEARCH.findall(plan) if index]
+        return indexes, scans, bool(_SQLITE_SORT.search(plan))
+    return _PG_INDEX.findall(plan), _PG_SEQ.findall(plan), bool(_PG_SORT.search(plan))
+
+
+def table_indexes(table):
+    """{index name: [columns]} of a table, from the database itself"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return {
+        name: info['columns'] for name, info in constraints.items()
+        if (info['index'] or info['unique'] or info['primary_key']) and info['columns']
+    }
+
+
+def covering_indexes(indexes, columns):
+    """Names of the indexes whose leading columns are `columns`"""
+    return sorted(name for name, index_columns in indexes.items() if index_columns[:len(columns)] == columns)
+
+
+def refresh_statistics():
+    """ANALYZE the database so the planner costs the plans with real row counts"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def explain_hot_queries(queries=HOT_QUERIES, sample=None):
+    """
+    EXPLAIN every hot query against the current database
+
+    Returns:
+        list: One PlanReport per query
+    """
+    sample = sample or sample_values()
+    reports = []
+    for query in queries:
+        model = _model(query.model)
+        table = model._meta.db_table
+        plan = query.build(sample).explain()
+        indexes_used, full_scans, unindexed_sort = parse_plan(plan, connection.vendor)
+        reports.append(PlanReport(
+            query=query, table=table, plan=plan, indexes_used=indexes_used, full_scans=full_scans,
+            unindexed_sort=unindexed_sort, expected_indexes=covering_indexes(table_indexes(table), query.columns),
+        ))
+    return reports
+
+
+def suggested_index(report):
+    """models.Index line to add to the model's Meta for a missing index"""
+    fields = [column[:-3] if column.endswith('_id') else column for column in report.query.columns]
+    name = f"{report.table.split('_', 1)[-1]}_{'_'.join(fields)}"[:30]
+    return f"{report.query.model}: models.Index(fields={fields!r}, name={name!r})"
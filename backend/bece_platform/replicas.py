@@ -0,0 +1,145 @@
+"""
+Read-replica routing
+ReplicaMiddleware marks GET requests to the views in REPLICA_READ_VIEWS (the
+catalog, paper details, history lists) and ReplicaRouter sends their reads to
+the REPLICA_DATABASE alias. Writes always go to default. Once a request
+writes, the rest of it reads from default too. The client that wrote is pinned
+to default for REPLICA_PIN_SECONDS, so a quiz submit followed by its results
+reads its own writes even while the replica lags. Credentials (tokens,
+sessions, users) are always read from default: a client that just registered
+or logged in is identified by a token the replica may not have yet.
+
+Without a REPLICA_DATABASE (DATABASE_REPLICA_URL unset) every query uses default.
+"""
+
+import hashlib
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    """Routing of one request"""
+
+    def __init__(self):
+        self.read_from_replica = False
+        self.wrote = False
+
+
+def _pin_key(request):
+    # Token requests are identified by their token, browsers by their session
+    # (the user isn't authenticated yet when the view is chosen)
+    credential = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return 'replica-pin:' + hashlib.sha256(credential.encode()).hexdigest()
+
+
+def is_pinned(request):
+    """Whether the client wrote within the last REPLICA_PIN_SECONDS"""
+    key = _pin_key(request)
+    return key is not None and caches[settings.REPLICA_PIN_CACHE].get(key) is not None
+
+
+def pin(request):
+    """Send the client's reads to default for the next REPLICA_PIN_SECONDS"""
+    key = _pin_key(request)
+    if key is not None:
+        caches[settings.REPLICA_PIN_CACHE].set(key, 1, settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaMiddleware:
+    """
+    Route reads of safe views to the replica and pin clients after writes
+
+    Goes right after PerformanceMiddleware; the decision is made in
+    process_view, once the URL name is known.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, state)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, state)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _current.get()
+        if (
+            state is not None and settings.REPLICA_DATABASE
+            and request.method in SAFE_METHODS
+            and request.resolver_match.url_name in settings.REPLICA_READ_VIEWS
+            and not is_pinned(request)
+        ):
+            state.read_from_replica = True
+        return None
+
+    def _finish(self, request, state):
+        if state.wrote and settings.REPLICA_DATABASE:
+            pin(request)
+
+
+def _is_cache(model):
+    # DatabaseCache rows (the pins themselves when REPLICA_PIN_CACHE is a
+    # database cache) always live on default and don't count as writes
+    return model._meta.app_label == 'django_cache'
+
+
+def _is_credential(model):
+    return model._meta.label in ('authtoken.Token', 'sessions.Session', settings.AUTH_USER_MODEL)
+
+
+class ReplicaRouter:
+    """Reads of requests marked by ReplicaMiddleware go to REPLICA_DATABASE, everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or not settings.REPLICA_DATABASE:
+            return None
+        if state.read_from_replica and not state.wrote and not _is_cache(model) and not _is_credential(model):
+            return settings.REPLICA_DATABASE
+        # Explicitly, or related objects of a row read from the replica earlier
+        # in the request would follow it there
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None and not _is_cache(model):
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default
+        databases = {'default', settings.REPLICA_DATABASE}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
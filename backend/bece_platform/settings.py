@@ -60,15 +60,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'bece_platform.middleware.PerformanceMiddleware',
+    'bece_platform.replicas.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Token-authenticated /api/ requests skip the browser-only middleware
+    # below (bece_platform.middleware); /admin/ and session clients get all of it
+    'bece_platform.middleware.BrowserSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'bece_platform.middleware.BrowserCsrfViewMiddleware',
+    'bece_platform.middleware.BrowserAuthenticationMiddleware',
+    'bece_platform.middleware.BrowserMessageMiddleware',
+    'bece_platform.middleware.BrowserXFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'bece_platform.urls'
@@ -110,6 +114,117 @@ else:
         }
     }
 
+# SQLite allows one writer at a time. WAL keeps readers going while it writes,
+# and IMMEDIATE transactions take the write lock when they begin (waiting up
+# to `timeout` seconds) instead of failing with "database is locked" when a
+# read-then-write transaction tries to upgrade its lock
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': 20,
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+    })
+    # A file rather than the in-memory default, so the concurrency tests'
+    # worker threads can open their own connections to it
+    DATABASES['default'].setdefault('TEST', {'NAME': BASE_DIR / 'test_db.sqlite3'})
+
+# Read replica (bece_platform.replicas): GETs of REPLICA_READ_VIEWS read from it,
+# everything else from default. A client that wrote stays on default for
+# REPLICA_PIN_SECONDS so it reads its own writes while the replica catches up
+DATABASE_ROUTERS = ['bece_platform.replicas.ReplicaRouter']
+REPLICA_DATABASE = None
+if os.getenv('DATABASE_REPLICA_URL'):
+    import dj_database_url
+    DATABASES['replica'] = dj_database_url.parse(os.getenv('DATABASE_REPLICA_URL'))
+    REPLICA_DATABASE = 'replica'
+elif DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Unused outside the replica tests, which keep a second SQLite file in sync
+    # with the test database (bece_platform.testing.ReplicaTestCase)
+    DATABASES['replica'] = {**DATABASES['default']}
+if DATABASES.get('replica', {}).get('ENGINE') == 'django.db.backends.sqlite3':
+    DATABASES['replica']['TEST'] = {'NAME': BASE_DIR / 'test_replica.sqlite3'}
+elif 'replica' in DATABASES:
+    # Tests can't replicate between server databases; read the test database
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+# Pins must be visible to every worker
+REPLICA_PIN_CACHE = 'shared'
+REPLICA_READ_VIEWS = {
+    # Catalog
+    'teachers', 'teacher-detail', 'subjects', 'levels', 'courses', 'course-detail', 'course-by-level-subject',
+    'quizzes', 'quiz-detail', 'bece-subjects', 'bece-years', 'bece-papers', 'bece-paper-detail',
+    'pricing-tiers', 'bundles', 'bundle-detail', 'bundle-subjects', 'bundle-subject-courses', 'faqs',
+    'announcements',
+    # History
+    'quiz-results', 'quiz-attempts', 'user-quizzes', 'user-progress', 'bece-attempts', 'user-orders',
+    'user-purchases',
+}
+
+
+# Serve outbound-I/O endpoints (MoMo initiate/status, password reset) with async
+# views. Enable when running under ASGI: uvicorn bece_platform.asgi:application
+ASYNC_OUTBOUND_VIEWS = os.getenv('ASYNC_OUTBOUND_VIEWS', 'False').lower() == 'true'
+ASYNC_HTTP_MAX_CONNECTIONS = int(os.getenv('ASYNC_HTTP_MAX_CONNECTIONS', '500'))
+
+# Caches
+# "default" is per-process; "shared" is visible to every worker/lambda and is
+# used for state that must not be duplicated (e.g. the MTN MoMo access token)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+}
+if os.getenv('REDIS_URL'):
+    # Shared across workers without a database round trip (needs the redis package)
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    }
+
+# Bundle detail version tokens (ecommerce.catalog): a bundle saved on one worker
+# must invalidate the details every worker has cached
+BUNDLE_DETAIL_VERSION_CACHE = 'shared'
+
+# Token -> user snapshots for CachedTokenAuthentication, only with a real shared
+# backend. Per-process copies would keep a revoked token working on the other
+# workers until the TTL ran out, and the database cache would cost the same one
+# query as the lookup it replaces; without Redis tokens are checked as usual
+AUTH_TOKEN_CACHE = 'shared' if os.getenv('REDIS_URL') else None
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', '60'))
+
+# Request instrumentation (bece_platform.perf): Server-Timing headers, a sample
+# of per-request timing log lines, and per-view query budgets keyed by URL name.
+# A view over budget logs a warning; the test runner makes it raise instead.
+# Server-Timing exposes query counts and timings, so it is off unless DEBUG
+SERVER_TIMING = os.getenv('SERVER_TIMING', str(DEBUG)).lower() == 'true'
+PERF_LOG_SAMPLE_RATE = float(os.getenv('PERF_LOG_SAMPLE_RATE', '0.01'))
+QUERY_BUDGET_STRICT = False
+# Budgets count every query, including session or token authentication
+QUERY_BUDGETS = {
+    'health-check': 2,
+    'api-overview': 2,
+    'profile': 3,
+    'user-profile': 3,
+    'activity-heatmap': 3,
+    'courses': 6,
+    'course-detail': 7,
+}
+TEST_RUNNER = 'bece_platform.test_runner.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'bece_platform.perf': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,7 +275,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'bece_platform.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -223,6 +338,23 @@ MTN_MOMO_SUBSCRIPTION_KEY = os.getenv('MTN_MOMO_SUBSCRIPTION_KEY')  # Set in env
 MTN_MOMO_USER_ID = os.getenv('MTN_MOMO_USER_ID')  # Set in environment variables
 MTN_MOMO_API_KEY = os.getenv('MTN_MOMO_API_KEY')  # Set in environment variables
 MTN_MOMO_ENVIRONMENT = os.getenv('MTN_MOMO_ENVIRONMENT', 'sandbox')
+MTN_MOMO_CONNECT_TIMEOUT = float(os.getenv('MTN_MOMO_CONNECT_TIMEOUT', '3.05'))
+MTN_MOMO_READ_TIMEOUT = float(os.getenv('MTN_MOMO_READ_TIMEOUT', '15'))
+MTN_MOMO_MAX_RETRIES = int(os.getenv('MTN_MOMO_MAX_RETRIES', '2'))  # Idempotent calls only
+MTN_MOMO_BREAKER_THRESHOLD = int(os.getenv('MTN_MOMO_BREAKER_THRESHOLD', '5'))
+MTN_MOMO_BREAKER_RESET_SECONDS = float(os.getenv('MTN_MOMO_BREAKER_RESET_SECONDS', '30'))
+MTN_MOMO_POOL_SIZE = int(os.getenv('MTN_MOMO_POOL_SIZE', '10'))
+MTN_MOMO_TOKEN_CACHE = 'shared'
+MTN_MOMO_CALLBACK_HOST = os.getenv('MTN_MOMO_CALLBACK_HOST', '')  # e.g. https://api.example.com
+# Set when `manage.py reconcile_momo` runs as a worker or cron job. Without it
+# and without a callback host, status polls check MTN inline (with backoff)
+MTN_MOMO_RECONCILE_WORKER = os.getenv('MTN_MOMO_RECONCILE_WORKER', 'False').lower() == 'true'
+# In DEBUG, payments are simulated in-process unless MTN_MOMO_BASE_URL is set
+# (e.g. to the run_momo_emulator address); MTN_MOMO_SIMULATE overrides both
+MTN_MOMO_SIMULATE = os.getenv(
+    'MTN_MOMO_SIMULATE', str(DEBUG and 'MTN_MOMO_BASE_URL' not in os.environ)
+).lower() == 'true'
+MTN_MOMO_TOKEN_REFRESH_MARGIN = int(os.getenv('MTN_MOMO_TOKEN_REFRESH_MARGIN', '300'))  # Seconds before expiry
 
 # For production, use these URLs:
 # MTN_MOMO_BASE_URL = 'https://momodeveloper.mtn.com'
@@ -230,9 +362,14 @@ MTN_MOMO_ENVIRONMENT = os.getenv('MTN_MOMO_ENVIRONMENT', 'sandbox')
 
 # Brevo (Sendinblue) Email Configuration
 BREVO_API_KEY = os.getenv('BREVO_API_KEY')  # Set this in your environment variables
-BREVO_API_URL = 'https://api.brevo.com/v3'
+BREVO_API_URL = os.getenv('BREVO_API_URL', 'https://api.brevo.com/v3')  # Point at run_brevo_stub for load tests
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'awuleynovember@gmail.com')
 DEFAULT_FROM_NAME = os.getenv('DEFAULT_FROM_NAME', 'GhanaLearn')
+# Email outbox (delivered by `manage.py send_outbox`). Set EMAIL_OUTBOX_WORKER
+# when that worker runs; otherwise emails are sent right after they are queued
+EMAIL_OUTBOX_WORKER = os.getenv('EMAIL_OUTBOX_WORKER', 'False').lower() == 'true'
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', '6'))
+EMAIL_OUTBOX_RESET_LIMIT = int(os.getenv('EMAIL_OUTBOX_RESET_LIMIT', '3'))  # Reset emails per address per hour
 
 # Password Reset Configuration
 PASSWORD_RESET_TIMEOUT = 86400  # 24 hours in seconds
@@ -279,6 +416,7 @@ SPECTACULAR_SETTINGS = {
     ],
     'AUTHENTICATION_WHITELIST': [
         'rest_framework.authentication.TokenAuthentication',
+        'bece_platform.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'SECURITY': [
@@ -0,0 +1,441 @@
+"""
+Concurrency stress scenarios for write paths
+Each scenario builds its own committed fixture, fires the same write endpoint
+from many threads at once (each thread with its own database connection) and
+then checks the invariants a race would break: lost counter increments,
+duplicate purchases, statistics that disagree with the rows they summarize.
+Run them with the stress_write_paths command or from a TransactionTestCase;
+they need a database other threads can see (a SQLite file or PostgreSQL, not
+the in-memory test database).
+"""
+
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connection
+from django.db.models import Avg, Count, Max
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+User = get_user_model()
+
+EMAIL_DOMAIN = 'stress.example.com'
+
+
+def _lock_statement(sql):
+    # Statements that wait for a lock: SQLite's BEGIN IMMEDIATE takes the
+    # database write lock, SELECT ... FOR UPDATE takes row locks elsewhere
+    sql = sql.lstrip().upper()
+    return sql.startswith('BEGIN') or 'FOR UPDATE' in sql
+
+
+class LockTimer:
+    """execute_wrapper that adds up the time spent in lock-acquiring statements"""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.statements = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _lock_statement(sql):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.statements += 1
+
+
+def make_user(name, **fields):
+    return User.objects.create_user(
+        username=f'stress-{name}-{uuid.uuid4().hex[:8]}',
+        email=f'{name}-{uuid.uuid4().hex[:8]}@{EMAIL_DOMAIN}',
+        password=None,
+        **fields
+    )
+
+
+def make_course(lessons=1):
+    from courses.models import Course, Lesson, Level, Subject
+
+    suffix = uuid.uuid4().hex[:8]
+    subject = Subject.objects.create(name=f'Stress {suffix}', code=f'S{suffix}')
+    level = Level.objects.create(name=f'Stress {suffix}', code=f'L{suffix}')
+    course = Course.objects.create(
+        title=f'Stress {suffix}', slug=f'stress-{suffix}', description='Stress test course',
+        subject=subject, level=level, is_published=True,
+    )
+    Lesson.objects.bulk_create([
+        Lesson(course=course, title=f'Lesson {n}', slug=f'lesson-{n}', order=n, is_published=True)
+        for n in range(lessons)
+    ])
+    return course
+
+
+def make_bundle():
+    from ecommerce.models import Bundle
+
+    suffix = uuid.uuid4().hex[:8]
+    return Bundle.objects.create(
+        title=f'Stress {suffix}', slug=f'stress-{suffix}', description='Stress test bundle',
+        bundle_type='custom', original_price=100, discounted_price=80,
+    )
+
+
+def make_order(user, bundle, coupon=None):
+    from ecommerce.models import Order, OrderItem
+
+    order = Order.objects.create(
+        user=user, order_number=f'STRESS-{uuid.uuid4().hex[:12]}', subtotal=bundle.discounted_price,
+        total_amount=bundle.discounted_price, coupon=coupon,
+    )
+    OrderItem.objects.create(order=order, bundle=bundle, unit_price=bundle.discounted_price,
+                             total_price=bundle.discounted_price)
+    return order
+
+
+class Scenario:
+    """
+    One write path under contention
+
+    setup() returns the state work() and check() share; work() runs once per
+    (worker, round) from the worker's own thread and returns an HTTP status.
+    """
+    name = None
+    description = ''
+
+    def setup(self, workers, rounds):
+        raise NotImplementedError
+
+    def work(self, state, client, worker, round):
+        raise NotImplementedError
+
+    def check(self, state):
+        """Invariant violations, as messages"""
+        raise NotImplementedError
+
+    def teardown(self, state):
+        from courses.models import Course, Level, Subject
+        from ecommerce.models import Bundle, Coupon
+
+        User.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+        Course.objects.filter(slug__startswith='stress-').delete()
+        Subject.objects.filter(name__startswith='Stress ').delete()
+        Level.objects.filter(name__startswith='Stress ').delete()
+        Bundle.objects.filter(slug__startswith='stress-').delete()
+        Coupon.objects.filter(code__startswith='STRESS').delete()
+
+    def users(self, state, workers):
+        """The user each worker acts as"""
+        return [state['user']] * workers
+
+
+class CompleteLesson(Scenario):
+    name = 'complete-lesson'
+    description = 'One user completing overlapping lessons of a course from every worker'
+
+    def setup(self, workers, rounds):
+        from accounts.dashboard import rebuild_stats
+
+        user = make_user('lesson')
+        rebuild_stats([user.id])
+        course = make_course(lessons=max(2, workers // 2))
+        return {'user': user, 'course': course, 'lessons': list(course.lessons.values_list('id', flat=True))}
+
+    def work(self, state, client, worker, round):
+        lessons = state['lessons']
+        lesson_id = lessons[(worker + round) % len(lessons)]
+        return client.post(reverse('complete-lesson', args=[lesson_id])).status_code
+
+    def check(self, state):
+        from accounts.models import UserDashboardStats
+        from courses.models import LessonProgress, UserProgress
+
+        user, course = state['user'], state['course']
+        completed = LessonProgress.objects.filter(user=user, lesson__course=course, is_completed=True).count()
+        problems = []
+        progress = UserProgress.objects.filter(user=user, course=course)
+        if progress.count() != 1:
+            problems.append(f'{progress.count()} UserProgress rows for one course')
+        elif progress.get().lessons_completed != completed:
+            problems.append(f'UserProgress.lessons_completed is {progress.get().lessons_completed}, '
+                            f'{completed} lessons are completed')
+        stats = UserDashboardStats.objects.get(user=user)
+        if stats.lessons_completed != completed:
+            problems.append(f'dashboard lessons_completed is {stats.lessons_completed}, '
+                            f'{completed} lessons are completed')
+        return problems
+
+
+class StartQuiz(Scenario):
+    name = 'start-quiz'
+    description = 'One user starting the same quiz from every worker'
+
+    def setup(self, workers, rounds):
+        from courses.models import Quiz
+
+        course = make_course()
+        quiz = Quiz.objects.create(title='Stress quiz', slug=course.slug, course=course, subject=course.subject,
+                                   is_published=True)
+        return {'user': make_user('quiz'), 'quiz': quiz}
+
+    def work(self, state, client, worker, round):
+        return client.post(reverse('start-quiz', args=[state['quiz'].id])).status_code
+
+    def check(self, state):
+        from courses.models import QuizAttempt
+
+        open_attempts = QuizAttempt.objects.filter(user=state['user'], quiz=state['quiz'], is_completed=False).count()
+        if open_attempts != 1:
+            return [f'{open_attempts} open attempts for one quiz (expected 1)']
+        return []
+
+
+class BECEStatisticsUpdate(Scenario):
+    name = 'bece-statistics'
+    description = 'One user submitting papers of the same subject from every worker'
+
+    def setup(self, workers, rounds):
+        from bece.models import BECEAnswer, BECEPaper, BECEQuestion, BECESubject, BECEYear
+
+        subject = BECESubject.objects.get_or_create(
+            name=BECESubject.BECE_SUBJECTS[0][0], defaults={'display_name': BECESubject.BECE_SUBJECTS[0][1]}
+        )[0]
+        papers = []
+        for n in range(workers):
+            # One paper per worker: a worker's start and submit must not race its own attempt
+            year = BECEYear.objects.get_or_create(year=1900 + n)[0]
+            paper = BECEPaper.objects.create(year=year, subject=subject, paper_type='paper1', total_marks=2,
+                                             title=f'Stress paper {n}', is_published=True)
+            answers = []
+            for number in (1, 2):
+                question = BECEQuestion.objects.create(paper=paper, question_number=number, question_text='?')
+                answers.append((question.id, [
+                    BECEAnswer.objects.create(question=question, option_letter=letter, answer_text=letter,
+                                              is_correct=letter == 'A').id
+                    for letter in 'AB'
+                ]))
+            papers.append((paper, answers))
+        return {'user': make_user('bece', is_premium=True), 'subject': subject, 'papers': papers}
+
+    def work(self, state, client, worker, round):
+        paper, questions = state['papers'][worker]
+        client.post(reverse('start-bece-practice', args=[paper.id]))
+        return client.post(reverse('submit-bece-practice'), {
+            'paper_id': paper.id,
+            # Vary the score between rounds so best and average are meaningful
+            'answers': [{'question_id': question_id, 'answer_id': answer_ids[(round + n) % 2]}
+                        for n, (question_id, answer_ids) in enumerate(questions)],
+        }, format='json').status_code
+
+    def check(self, state):
+        from bece.models import BECEPracticeAttempt, BECEStatistics
+
+        attempts = BECEPracticeAttempt.objects.filter(
+            user=state['user'], paper__subject=state['subject'], is_completed=True
+        ).aggregate(total=Count('id'), best=Max('score'), average=Avg('score'))
+        try:
+            stats = BECEStatistics.objects.get(user=state['user'], subject=state['subject'])
+        except BECEStatistics.DoesNotExist:
+            return ['no BECEStatistics row']
+        problems = []
+        if stats.total_attempts != (attempts['total'] or 0):
+            problems.append(f'total_attempts is {stats.total_attempts}, {attempts["total"]} attempts completed')
+        if stats.best_score != (attempts['best'] or 0):
+            problems.append(f'best_score is {stats.best_score}, best attempt scored {attempts["best"]}')
+        if not math.isclose(stats.average_score, attempts['average'] or 0, abs_tol=1e-6):
+            problems.append(f'average_score is {stats.average_score}, attempts average {attempts["average"]}')
+        return problems
+
+    def teardown(self, state):
+        from bece.models import BECEPaper, BECEYear
+
+        BECEPaper.objects.filter(title__startswith='Stress paper').delete()
+        BECEYear.objects.filter(year__lt=2000).delete()
+        super().teardown(state)
+
+
+class CouponUsage(Scenario):
+    name = 'coupon-usage'
+    description = 'Every worker paying its own order with the same coupon'
+
+    def setup(self, workers, rounds):
+        from ecommerce.models import Coupon
+
+        coupon = Coupon.objects.create(
+            code=f'STRESS{uuid.uuid4().hex[:8].upper()}', description='Stress coupon', coupon_type='fixed',
+            value=Decimal('5.00'), usage_limit=workers * rounds, valid_until=timezone.now() + timedelta(days=1),
+        )
+        users = [make_user(f'coupon{n}') for n in range(workers)]
+        orders = {}
+        for n, user in enumerate(users):
+            for round in range(rounds):
+                orders[n, round] = make_order(user, make_bundle(), coupon)
+        return {'coupon': coupon, 'workers': users, 'orders': orders}
+
+    def users(self, state, workers):
+        return state['workers']
+
+    def work(self, state, client, worker, round):
+        order = state['orders'][worker, round]
+        return client.post(reverse('process-payment'), {
+            'order_id': order.id, 'payment_method': 'mobile_money',
+        }, format='json').status_code
+
+    def check(self, state):
+        from ecommerce.models import Order
+
+        state['coupon'].refresh_from_db()
+        paid = Order.objects.filter(coupon=state['coupon'], status='completed').count()
+        if state['coupon'].used_count != paid:
+            return [f'coupon used_count is {state["coupon"].used_count}, {paid} orders paid with it']
+        return []
+
+
+class DuplicatePayment(Scenario):
+    name = 'duplicate-payment'
+    description = 'Every worker paying the same pending order'
+
+    def setup(self, workers, rounds):
+        user = make_user('payment')
+        return {'user': user, 'orders': [make_order(user, make_bundle()) for _ in range(rounds)]}
+
+    def work(self, state, client, worker, round):
+        return client.post(reverse('process-payment'), {
+            'order_id': state['orders'][round].id, 'payment_method': 'mobile_money',
+        }, format='json').status_code
+
+    def check(self, state):
+        from ecommerce.models import Payment, UserPurchase
+
+        problems = []
+        for order in state['orders']:
+            payments = Payment.objects.filter(order=order).count()
+            purchases = UserPurchase.objects.filter(order=order).count()
+            if payments != 1 or purchases != 1:
+                problems.append(f'order {order.order_number}: {payments} payments, {purchases} purchases')
+        return problems
+
+
+class MomoFulfilment(Scenario):
+    name = 'momo-fulfilment'
+    description = 'MTN callbacks and user cancellations racing on the same pending MoMo payment'
+
+    def setup(self, workers, rounds):
+        from ecommerce.mtn_momo import CALLBACK_SALT
+        from ecommerce.reconciliation import create_pending_momo_payment
+
+        user = make_user('momo')
+        payments = []
+        for _ in range(rounds):
+            bundle = make_bundle()
+            transaction_id = f'STRESS-{uuid.uuid4()}'
+            create_pending_momo_payment(user, bundle, bundle.discounted_price, transaction_id)
+            payments.append((transaction_id, signing.Signer(salt=CALLBACK_SALT).sign(transaction_id)))
+        return {'user': user, 'payments': payments}
+
+    def work(self, state, client, worker, round):
+        transaction_id, token = state['payments'][round]
+        if worker % 4 == 3:
+            return client.post(reverse('cancel-mtn-momo'), {'transaction_id': transaction_id},
+                               format='json').status_code
+        return client.post(reverse('mtn-momo-callback', args=[token]), {'status': 'SUCCESSFUL'},
+                           format='json').status_code
+
+    def check(self, state):
+        from ecommerce.models import Payment, UserPurchase
+
+        problems = []
+        for transaction_id, _ in state['payments']:
+            payment = Payment.objects.select_related('order').get(transaction_id=transaction_id)
+            purchases = UserPurchase.objects.filter(order=payment.order).count()
+            expected = 1 if payment.status == 'completed' else 0
+            if payment.order.status != payment.status or purchases != expected:
+                problems.append(f'{transaction_id}: payment {payment.status}, order {payment.order.status}, '
+                                f'{purchases} purchases')
+        return problems
+
+
+SCENARIOS = [
+    CompleteLesson(), StartQuiz(), BECEStatisticsUpdate(), CouponUsage(), DuplicatePayment(), MomoFulfilment(),
+]
+
+
+def run(scenario, workers=8, rounds=5):
+    """
+    Run a scenario: `workers` threads released together, `rounds` requests each
+
+    Returns:
+        dict: requests, server errors, throughput, latency and lock-wait
+            figures, and the invariant violations found afterwards
+    """
+    state = scenario.setup(workers, rounds)
+    # Expected 4xx responses (paying an order that was just paid) would flood the log
+    request_logger = logging.getLogger('django.request')
+    log_level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        users = scenario.users(state, workers)
+        barrier = threading.Barrier(workers)
+        lock = threading.Lock()
+        latencies, statuses, timers, exceptions = [], {}, [], []
+
+        def worker(n):
+            client = APIClient()
+            client.force_authenticate(user=User.objects.get(pk=users[n].pk))
+            timer = LockTimer()
+            try:
+                with connection.execute_wrapper(timer):
+                    barrier.wait()
+                    for round in range(rounds):
+                        started = time.perf_counter()
+                        try:
+                            status = scenario.work(state, client, n, round)
+                        except Exception as e:
+                            status = 500
+                            with lock:
+                                exceptions.append(f'{type(e).__name__}: {e}')
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            latencies.append(elapsed)
+                            statuses[status] = statuses.get(status, 0) + 1
+            finally:
+                with lock:
+                    timers.append(timer)
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        lock_seconds = sum(timer.seconds for timer in timers)
+        return {
+            'scenario': scenario.name,
+            'requests': len(latencies),
+            'statuses': dict(sorted(statuses.items())),
+            'server_errors': sum(count for status, count in statuses.items() if status >= 500),
+            'exceptions': exceptions[:5],
+            'throughput_rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+            'p95_ms': round(latencies[max(0, math.ceil(len(latencies) * 0.95) - 1)] * 1000, 1),
+            'lock_wait_ms': round(lock_seconds * 1000, 1),
+            'lock_wait_per_request_ms': round(lock_seconds * 1000 / len(latencies), 2),
+            'violations': scenario.check(state),
+        }
+    finally:
+        request_logger.setLevel(log_level)
+        scenario.teardown(state)
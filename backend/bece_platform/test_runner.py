@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Fail views that go over their QUERY_BUDGETS entry instead of logging a
+    warning, and expose the verbosity to tests that can print reports
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+        settings.PERF_LOG_SAMPLE_RATE = 0.0
+        settings.TEST_VERBOSITY = self.verbosity
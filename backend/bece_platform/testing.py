@@ -0,0 +1,408 @@
+"""
+Query-count regression tests
+QueryCountTestCase seeds a dataset, requests every URL of an app's urlconf,
+grows the dataset from SMALL to LARGE rows per table and requests them again.
+An endpoint whose query count grows with the data has an N+1 somewhere; the
+test fails on any growth with a table of queries per endpoint (printed on
+passing runs too at verbosity 2 or more).
+WritePathStressTestCase runs bece_platform.stress scenarios and fails on any
+broken invariant. ReplicaTestCase pairs the test database with a lagging
+SQLite replica for the read-replica routing tests.
+"""
+
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import SkipTest
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+SMALL = 10
+LARGE = 100
+PASSWORD = 'pass12345'
+
+
+def seed_dataset(d, start, stop):
+    """
+    Create rows start..stop-1 of every table the API reads
+
+    The first row of each parent (course 0, quiz 0, bundle 0, paper 0) also
+    collects one child per row, so detail endpoints grow along with lists.
+
+    Args:
+        d (SimpleNamespace): Fixture from QueryCountTestCase.setUpTestData
+        start (int): First row index
+        stop (int): Row index to stop before
+    """
+    from accounts.models import Achievement, DailyActivity, EmailOutbox, StudySession, UpcomingTask
+    from bece.models import (
+        BECEAnswer, BECEPaper, BECEPracticeAttempt, BECEQuestion, BECEStatistics, BECESubject,
+        BECEUserAnswer, BECEYear,
+    )
+    from courses.models import (
+        Answer, Course, Lesson, LessonContent, LessonProgress, Level, Question, Quiz, QuizAttempt,
+        Subject, Teacher, UserAnswer, UserProgress,
+    )
+    from ecommerce.models import (
+        FAQ, Announcement, Bundle, Coupon, Order, OrderItem, Payment, PricingTier, Subscription, UserPurchase,
+    )
+
+    now = timezone.now()
+    rows = range(start, stop)
+    user = d.user
+
+    # Courses
+    subjects = Subject.objects.bulk_create(Subject(name=f'Subject {i}', code=f'S{i}') for i in rows)
+    levels = Level.objects.bulk_create(Level(name=f'Level {i}', code=f'L{i}', order=i) for i in rows)
+    teachers = Teacher.objects.bulk_create(
+        Teacher(name=f'Teacher {i}', email=f'teacher{i}@example.com', bio='Bio', qualification='B.Ed',
+                specialization='Teaching', display_order=i)
+        for i in rows
+    )
+    if start == 0:
+        d.subject, d.teacher = subjects[0], teachers[0]
+    Teacher.subjects.through.objects.bulk_create(
+        [Teacher.subjects.through(teacher=teacher, subject=subject) for teacher, subject in zip(teachers, subjects)]
+        + [Teacher.subjects.through(teacher=d.teacher, subject=subject) for subject in subjects[start == 0:]]
+    )
+
+    courses = Course.objects.bulk_create(
+        Course(title=f'Course {i}', slug=f'course-{i}', description='Course', subject=subject, level=level,
+               is_published=True)
+        for i, subject, level in zip(rows, subjects, levels)
+    )
+    if start == 0:
+        d.course = courses[0]
+    lessons = Lesson.objects.bulk_create(
+        Lesson(course=d.course, title=f'Lesson {i}', slug=f'lesson-{i}', order=i, duration_minutes=10,
+               is_published=True)
+        for i in rows
+    )
+    LessonContent.objects.bulk_create(LessonContent(lesson=lesson, content_type='text') for lesson in lessons)
+
+    quizzes = Quiz.objects.bulk_create(
+        Quiz(title=f'Quiz {i}', slug=f'quiz-{i}', course=course, subject=course.subject, is_published=True)
+        for i, course in zip(rows, courses)
+    )
+    if start == 0:
+        d.lesson, d.quiz = lessons[0], quizzes[0]
+    questions = Question.objects.bulk_create(
+        Question(quiz=d.quiz, question_text=f'Question {i}', order=i) for i in rows
+    )
+    Answer.objects.bulk_create(
+        Answer(question=question, answer_text=text, is_correct=text == 'Right', order=order)
+        for question in questions for order, text in enumerate(['Right', 'Wrong'])
+    )
+    if start == 0:
+        d.question = questions[0]
+        d.open_attempt = QuizAttempt.objects.create(user=user, quiz=d.quiz, total_questions=1)
+
+    UserProgress.objects.bulk_create(UserProgress(user=user, course=course, total_lessons=1) for course in courses)
+    LessonProgress.objects.bulk_create(
+        LessonProgress(user=user, lesson=lesson, is_completed=True, time_spent_minutes=10, completed_at=now)
+        for lesson in lessons
+    )
+    attempts = QuizAttempt.objects.bulk_create(
+        QuizAttempt(user=user, quiz=quiz, score=80, total_questions=1, is_completed=True, completed_at=now,
+                    started_at=now - timedelta(minutes=i))
+        for i, quiz in zip(rows, quizzes)
+    )
+    if start == 0:
+        d.attempt = attempts[0]
+    UserAnswer.objects.bulk_create(
+        UserAnswer(attempt=d.attempt, question=question, is_correct=True, points_earned=1) for question in questions
+    )
+
+    # Accounts
+    Achievement.objects.bulk_create(
+        Achievement(user=user, title=f'Achievement {i}', description='Earned', achievement_type='quiz') for i in rows
+    )
+    StudySession.objects.bulk_create(
+        StudySession(user=user, start_time=now - timedelta(hours=i), duration_minutes=30) for i in rows
+    )
+    DailyActivity.objects.bulk_create(
+        DailyActivity(user=user, local_date=timezone.localdate() - timedelta(days=i), minutes=30) for i in rows
+    )
+    UpcomingTask.objects.bulk_create(
+        UpcomingTask(user=user, title=f'Task {i}', subject='Maths', due_date=now + timedelta(days=i % 29 + 1),
+                     course=course, lesson=lesson, quiz=quiz)
+        for i, course, lesson, quiz in zip(rows, courses, lessons, quizzes)
+    )
+    EmailOutbox.objects.bulk_create(
+        EmailOutbox(recipient_email=f'student{i}@example.com', template='password_reset') for i in rows
+    )
+
+    # E-commerce
+    PricingTier.objects.bulk_create(
+        PricingTier(name=f'Tier {i}', tier_type=f'tier{i}', description='Tier', price_monthly=i) for i in rows
+    )
+    if start == 0:
+        d.tier = PricingTier.objects.get(tier_type='tier0')
+    bundles = Bundle.objects.bulk_create(
+        Bundle(title=f'Bundle {i}', slug=f'bundle-{i}', description='Bundle', bundle_type='subject',
+               original_price=100, discounted_price=80)
+        for i in rows
+    )
+    if start == 0:
+        d.bundle = bundles[0]
+    Bundle.courses.through.objects.bulk_create(
+        [Bundle.courses.through(bundle=bundle, course=course) for bundle, course in zip(bundles, courses)]
+        + [Bundle.courses.through(bundle=d.bundle, course=course) for course in courses[start == 0:]]
+    )
+    orders = Order.objects.bulk_create(
+        Order(user=user, order_number=f'ORD-{i}', subtotal=80, total_amount=80, status='completed') for i in rows
+    )
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, bundle=bundle, unit_price=80, total_price=80) for order, bundle in zip(orders, bundles)
+    )
+    Payment.objects.bulk_create(
+        Payment(order=order, payment_method='mobile_money', amount=80, transaction_id=f'TXN-{i}', status='completed')
+        for i, order in zip(rows, orders)
+    )
+    UserPurchase.objects.bulk_create(
+        UserPurchase(user=user, bundle=bundle, order=order) for bundle, order in zip(bundles, orders)
+    )
+    Subscription.objects.bulk_create(
+        Subscription(user=user, pricing_tier=d.tier, billing_cycle='monthly', end_date=now, next_billing_date=now,
+                     status='expired')
+        for i in rows
+    )
+    Coupon.objects.bulk_create(
+        Coupon(code=f'CODE{i}', description='Coupon', coupon_type='percentage', value=10,
+               valid_until=now + timedelta(days=30))
+        for i in rows
+    )
+    FAQ.objects.bulk_create(FAQ(question=f'Question {i}?', answer='Answer', order=i) for i in rows)
+    announcements = Announcement.objects.bulk_create(
+        Announcement(title=f'Announcement {i}', content='News', show_to_all=i % 2 == 0) for i in rows
+    )
+    Announcement.target_users.through.objects.bulk_create(
+        Announcement.target_users.through(announcement=announcement, customuser=user)
+        for announcement in announcements if not announcement.show_to_all
+    )
+
+    # BECE
+    bece_subjects = BECESubject.objects.bulk_create(
+        BECESubject(name=f'subject_{i}', display_name=f'BECE Subject {i}') for i in rows
+    )
+    years = BECEYear.objects.bulk_create(BECEYear(year=1900 + i) for i in rows)
+    papers = BECEPaper.objects.bulk_create(
+        BECEPaper(year=year, subject=subject, paper_type='paper1', title=f'Paper {i}', is_published=True)
+        for i, year, subject in zip(rows, years, bece_subjects)
+    )
+    if start == 0:
+        d.bece_subject, d.paper = bece_subjects[0], papers[0]
+        d.essay_paper = BECEPaper.objects.create(
+            year=years[0], subject=d.bece_subject, paper_type='paper2', title='Essay paper', is_published=True
+        )
+        d.essay_question = BECEQuestion.objects.create(
+            paper=d.essay_paper, question_number=1, question_type='essay', question_text='Discuss', marks=10
+        )
+        d.open_bece_attempt = BECEPracticeAttempt.objects.create(user=user, paper=d.paper, total_marks=100)
+    bece_questions = BECEQuestion.objects.bulk_create(
+        BECEQuestion(paper=d.paper, question_number=i + 1, question_text=f'Question {i}') for i in rows
+    )
+    BECEAnswer.objects.bulk_create(
+        BECEAnswer(question=question, option_letter=letter, answer_text=letter, is_correct=letter == 'A')
+        for question in bece_questions for letter in 'AB'
+    )
+    if start == 0:
+        d.bece_question = bece_questions[0]
+    BECEPracticeAttempt.objects.bulk_create(
+        BECEPracticeAttempt(user=user, paper=d.paper, score=60, total_marks=100, percentage=60, is_completed=True,
+                            completed_at=now - timedelta(minutes=i))
+        for i in rows
+    )
+    BECEStatistics.objects.bulk_create(
+        BECEStatistics(user=user, subject=subject, total_attempts=1, best_score=60) for subject in bece_subjects
+    )
+    essay_attempts = BECEPracticeAttempt.objects.bulk_create(
+        BECEPracticeAttempt(user=d.classmate, paper=d.essay_paper, total_marks=10, is_completed=True, completed_at=now)
+        for i in rows
+    )
+    essay_answers = BECEUserAnswer.objects.bulk_create(
+        BECEUserAnswer(attempt=attempt, question=d.essay_question, text_answer='An essay', needs_grading=True)
+        for attempt in essay_attempts
+    )
+    if start == 0:
+        d.essay_answer = essay_answers[0]
+
+
+def setup_fixture():
+    """The requesting user and the rows write endpoints need, before seeding"""
+    from accounts.models import CustomUser, UserProfile
+    from ecommerce.models import Bundle, Order, OrderItem, Payment, UserPurchase
+
+    user = CustomUser.objects.create(
+        username='student', email='student@example.com', password=make_password(PASSWORD), is_staff=True
+    )
+    UserProfile.objects.create(user=user)
+    d = SimpleNamespace(user=user, token=Token.objects.create(user=user))
+    # Writes the essays waiting to be graded
+    d.classmate = CustomUser.objects.create(username='classmate', email='classmate@example.com')
+
+    # BECE endpoints check for this purchase
+    bece_bundle = Bundle.objects.create(
+        title='BECE', slug='jhs3-bece-prep', description='BECE', bundle_type='bece_prep',
+        original_price=100, discounted_price=80,
+    )
+    order = Order.objects.create(user=user, order_number='ORD-BECE', status='completed')
+    UserPurchase.objects.create(user=user, bundle=bece_bundle, order=order)
+
+    # Something left to buy, an order for it awaiting payment and a MoMo
+    # payment still waiting for its callback
+    d.spare_bundle = Bundle.objects.create(
+        title='Spare', slug='spare', description='Spare', bundle_type='subject',
+        original_price=100, discounted_price=80,
+    )
+    d.unpaid_order = Order.objects.create(user=user, order_number='ORD-UNPAID', subtotal=80, total_amount=80)
+    OrderItem.objects.create(order=d.unpaid_order, bundle=d.spare_bundle, unit_price=80, total_price=80)
+    pending_order = Order.objects.create(user=user, order_number='ORD-PENDING', total_amount=80)
+    d.pending_payment = Payment.objects.create(
+        order=pending_order, payment_method='mobile_money', amount=80, transaction_id='TXN-PENDING'
+    )
+    return d
+
+
+def url_names(urlconf):
+    """Names of every URL pattern in a urlconf module"""
+    return [pattern.name for pattern in get_resolver(urlconf).url_patterns if isinstance(pattern, URLPattern)]
+
+
+# Requests run with cold caches, so their counts are above the warm-cache
+# QUERY_BUDGETS; growth is what this suite checks
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], QUERY_BUDGETS={})
+class QueryCountTestCase(TestCase):
+    """
+    Subclasses set `urlconf` and `endpoints`, a dict of URL name ->
+    callable(d) returning (method, reverse kwargs, request body). Every
+    request runs in a rolled-back savepoint with cold caches, so write
+    endpoints see the same state each time. `allowed_growth` maps URL names
+    to the extra queries tolerated at LARGE rows (batched work, not N+1s).
+    """
+    urlconf = None
+    endpoints = {}
+    allowed_growth = {}
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.urlconf is None:
+            raise SkipTest('QueryCountTestCase is a base class')
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.d = setup_fixture()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.d.token.key}')
+
+    def request(self, name):
+        method, kwargs, body = self.endpoints[name](self.d)
+        path = reverse(name, kwargs=kwargs)
+        for alias in ('default', 'shared'):
+            caches[alias].clear()
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(path, body, format='json')
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 500, f'{method.upper()} {path}: {response.content[:500]}')
+        return response.status_code, len(queries)
+
+    def measure(self):
+        from accounts.dashboard import rebuild_stats
+
+        # Dashboard stats are kept up to date by events, not by bulk inserts
+        rebuild_stats([self.d.user.id])
+        return {name: self.request(name) for name in self.endpoints}
+
+    def test_every_url_is_covered(self):
+        self.assertEqual(sorted(url_names(self.urlconf)), sorted(self.endpoints))
+
+    def test_query_counts_do_not_grow(self):
+        seed_dataset(self.d, 0, SMALL)
+        small = self.measure()
+        seed_dataset(self.d, SMALL, LARGE)
+        large = self.measure()
+
+        grown = [
+            name for name in self.endpoints
+            if large[name][1] > small[name][1] + self.allowed_growth.get(name, 0)
+        ]
+        table = [f"{'endpoint':<32}{'status':>8}{SMALL:>8}{LARGE:>8}"]
+        for name in self.endpoints:
+            status_code, count = large[name]
+            mark = '  <- grows' if name in grown else ''
+            table.append(f'{name:<32}{status_code:>8}{small[name][1]:>8}{count:>8}{mark}')
+        if getattr(settings, 'TEST_VERBOSITY', 1) >= 2:
+            print(f'\n{self.urlconf} queries per request\n' + '\n'.join(table))
+
+        self.assertEqual(grown, [], 'Query counts grow with the data:\n' + '\n'.join(table))
+
+
+@override_settings(QUERY_BUDGETS={})
+class WritePathStressTestCase(TransactionTestCase):
+    """
+    Subclasses set `scenarios`, names from bece_platform.stress.SCENARIOS.
+    Worker threads need their own connections to the test database, which
+    is why the SQLite test database is a file (see DATABASES); it is skipped
+    if the test database is in-memory SQLite anyway.
+    """
+    scenarios = ()
+    workers = 8
+    rounds = 3
+
+    @classmethod
+    def setUpClass(cls):
+        if not cls.scenarios:
+            raise SkipTest('WritePathStressTestCase is a base class')
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest('Concurrent workers need a file or server database')
+        super().setUpClass()
+
+    def test_invariants_hold_under_concurrency(self):
+        from bece_platform import stress
+
+        for scenario in stress.SCENARIOS:
+            if scenario.name not in self.scenarios:
+                continue
+            with self.subTest(scenario=scenario.name):
+                result = stress.run(scenario, self.workers, self.rounds)
+                self.assertEqual(result['violations'], [], f"Responses: {result['statuses']}")
+                self.assertEqual(result['server_errors'], 0, result['exceptions'])
+
+
+@override_settings(QUERY_BUDGETS={}, REPLICA_DATABASE='replica')
+class ReplicaTestCase(TransactionTestCase):
+    """
+    The SQLite test database plus a second SQLite file as its replica
+    (DATABASES['replica'] when DATABASE_REPLICA_URL is unset). Nothing copies
+    rows between them until sync_replica() is called, so tests control exactly
+    how far the replica lags. Skipped on other databases.
+    """
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        replica = connections.settings.get('replica', {})
+        if connection.vendor != 'sqlite' or replica.get('ENGINE') != 'django.db.backends.sqlite3' \
+                or replica.get('TEST', {}).get('MIRROR'):
+            raise SkipTest('The replica tests need two SQLite databases')
+        super().setUpClass()
+
+    def sync_replica(self):
+        """Copy the test database onto the replica, as replication catching up would"""
+        primary, replica = connections['default'], connections['replica']
+        primary.ensure_connection()
+        replica.ensure_connection()
+        primary.connection.backup(replica.connection)
@@ -40,6 +40,7 @@ urlpatterns = [
     path('api/courses/', include('courses.urls')),
     path('api/bece/', include('bece.urls')),
     path('api/ecommerce/', include('ecommerce.urls')),
+    path('api/exports/<str:dataset>/', views.export_dataset, name='export-dataset'),
 ]
 
 # Serve media files in development
@@ -1,7 +1,11 @@
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
+from rest_framework import status
 from django.conf import settings
+from django.http import StreamingHttpResponse
+
+from .exports import ExportError, stream_export, export_filename
 
 
 @api_view(['GET'])
@@ -52,6 +56,9 @@ def api_overview(request):
             'purchases': '/api/ecommerce/purchases/',
             'subscriptions': '/api/ecommerce/subscriptions/',
             'faqs': '/api/ecommerce/faqs/',
+        },
+        'Exports (staff)': {
+            'export': '/api/exports/{dataset}/?output=csv|jsonl&from=&to=&subject=&gzip=1',
         }
     }
     
@@ -83,4 +90,35 @@ def health_check(request):
         'status': 'healthy',
         'message': 'BECE Platform API is running',
         'debug': settings.DEBUG,
-    })
\ No newline at end of file
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_dataset(request, dataset):
+    """Stream a dataset as CSV or JSON Lines, optionally gzip-compressed"""
+    output = request.query_params.get('output', 'csv')
+    compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    try:
+        chunks = stream_export(
+            dataset,
+            output=output,
+            compress=compress,
+            date_from=request.query_params.get('from'),
+            date_to=request.query_params.get('to'),
+            subject=request.query_params.get('subject'),
+        )
+    except ExportError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if compress:
+        content_type = 'application/gzip'
+    elif output == 'csv':
+        content_type = 'text/csv; charset=utf-8'
+    else:
+        content_type = 'application/x-ndjson; charset=utf-8'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, output, compress)}"'
+    return response
@@ -0,0 +1,315 @@
+"""
+Declarative curriculum loading
+A curriculum file (YAML or JSON) describes courses, their lessons and lesson
+contents. Loading diffs the file against the database by natural keys and
+applies only the inserts, updates and deletes needed, so existing lesson ids
+(and the LessonProgress rows pointing at them) survive a reload.
+
+File format::
+
+    subjects:                 # optional, upserted by code
+      - {code: MATH, name: Mathematics}
+    levels:                   # optional, upserted by code
+      - {code: JHS1, name: JHS 1, order: 1}
+    courses:
+      - slug: jhs1-mathematics
+        title: JHS 1 Mathematics
+        subject: MATH         # Subject.code
+        level: JHS1           # Level.code
+        description: ...
+        is_published: true
+        lessons:
+          - slug: number-and-numeration   # defaults to slugify(title)
+            title: Number and Numeration
+            order: 1                       # defaults to position in the list
+            contents:
+              - content_type: text         # keyed by order within the lesson
+                title: Introduction
+                text_content: ...
+
+Fields left out of the file take the model default, so the file is the full
+description of every course it lists. Courses missing from the file are left
+alone; lessons and contents missing under a listed course are deleted.
+"""
+
+import json
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import Subject, Level, Course, Lesson, LessonContent
+
+COURSE_FIELDS = (
+    'title', 'description', 'duration_hours', 'difficulty', 'learning_objectives', 'prerequisites',
+    'is_premium', 'is_published', 'preview_video_url', 'preview_video_duration',
+)
+LESSON_FIELDS = (
+    'title', 'description', 'lesson_type', 'order', 'duration_minutes', 'is_free', 'is_published',
+    'video_url', 'video_duration',
+)
+CONTENT_FIELDS = ('content_type', 'title', 'text_content', 'video_url')
+SUBJECT_FIELDS = ('name', 'description', 'icon', 'color', 'is_active')
+LEVEL_FIELDS = ('name', 'description', 'order', 'is_active')
+
+
+class CurriculumError(Exception):
+    """Raised when a curriculum file is malformed"""
+
+
+def read_curriculum(path):
+    """Parse a curriculum file; YAML needs PyYAML, JSON works out of the box"""
+    with open(path, encoding='utf-8') as handle:
+        if path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise CurriculumError('PyYAML is required to load YAML curricula (pip install PyYAML)')
+            data = yaml.safe_load(handle)
+        else:
+            data = json.load(handle)
+
+    if not isinstance(data, dict) or not isinstance(data.get('courses', []), list):
+        raise CurriculumError('Curriculum must be a mapping with a list of courses')
+    return data
+
+
+def _clean(model, fields, spec, where):
+    """Values for the given fields, falling back to model defaults"""
+    values = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        if name in spec and spec[name] is not None:
+            value = spec[name]
+            if field.choices and value not in {key for key, _ in field.choices}:
+                raise CurriculumError(f'{where}: invalid {name} {value!r}')
+            if field.get_internal_type() != 'JSONField':
+                try:
+                    value = field.to_python(value)
+                except Exception:
+                    raise CurriculumError(f'{where}: invalid {name} {value!r}')
+            values[name] = value
+        else:
+            values[name] = field.get_default()
+    return values
+
+
+class CurriculumPlan:
+    """The changes needed to bring the database in line with a curriculum file"""
+
+    def __init__(self):
+        self.course_inserts = []
+        self.course_updates = []
+        self.lesson_inserts = []
+        self.lesson_updates = []
+        self.lesson_deletes = []
+        self.content_inserts = []
+        self.content_updates = []
+        self.content_deletes = []
+        self.updated_fields = {Course: set(), Lesson: set(), LessonContent: set()}
+
+    def summary(self):
+        return {
+            'courses': {'insert': len(self.course_inserts), 'update': len(self.course_updates)},
+            'lessons': {
+                'insert': len(self.lesson_inserts),
+                'update': len(self.lesson_updates),
+                'delete': len(self.lesson_deletes),
+            },
+            'contents': {
+                'insert': len(self.content_inserts),
+                'update': len(self.content_updates),
+                'delete': len(self.content_deletes),
+            },
+        }
+
+
+class CurriculumLoader:
+    """Diff a parsed curriculum against the database and apply it in bulk"""
+
+    def __init__(self, data, delete_missing=True):
+        self.data = data
+        self.delete_missing = delete_missing
+
+    def load(self, dry_run=False):
+        """
+        Apply the curriculum in one transaction
+
+        Returns:
+            dict: Counts of inserted, updated and deleted rows per model
+        """
+        with transaction.atomic():
+            self._upsert_lookup(Subject, SUBJECT_FIELDS, self.data.get('subjects', []))
+            self._upsert_lookup(Level, LEVEL_FIELDS, self.data.get('levels', []))
+            plan = self.plan()
+            if not dry_run:
+                self.apply(plan)
+            else:
+                transaction.set_rollback(True)
+        return plan.summary()
+
+    def _upsert_lookup(self, model, fields, specs):
+        if not specs:
+            return
+        objects = []
+        for spec in specs:
+            if not spec.get('code'):
+                raise CurriculumError(f'{model.__name__} entries need a code')
+            values = _clean(model, fields, spec, f"{model.__name__} {spec['code']}")
+            if not values['name']:
+                raise CurriculumError(f"{model.__name__} {spec['code']}: name is required")
+            objects.append(model(code=spec['code'], **values))
+        model.objects.bulk_create(
+            objects, update_conflicts=True, unique_fields=['code'], update_fields=list(fields)
+        )
+
+    def plan(self):
+        """Work out every insert, update and delete without writing"""
+        plan = CurriculumPlan()
+        specs = self.data.get('courses', [])
+
+        subjects = dict(Subject.objects.values_list('code', 'id'))
+        levels = dict(Level.objects.values_list('code', 'id'))
+        slugs = [spec.get('slug') for spec in specs]
+        if not all(slugs) or len(set(slugs)) != len(slugs):
+            raise CurriculumError('Every course needs a unique slug')
+
+        existing_courses = {course.slug: course for course in Course.objects.filter(slug__in=slugs)}
+        existing_lessons = {}
+        for lesson in Lesson.objects.filter(course__slug__in=slugs).select_related('course'):
+            existing_lessons.setdefault(lesson.course.slug, {})[lesson.slug] = lesson
+        existing_contents = {}
+        for content in LessonContent.objects.filter(lesson__course__slug__in=slugs).order_by('id'):
+            by_order = existing_contents.setdefault(content.lesson_id, {})
+            if content.order in by_order:
+                # Contents sharing an order cannot be matched to the file; drop the extras
+                if self.delete_missing:
+                    plan.content_deletes.append(content)
+                continue
+            by_order[content.order] = content
+
+        for spec in specs:
+            slug = spec['slug']
+            where = f'course {slug}'
+            values = _clean(Course, COURSE_FIELDS, spec, where)
+            if not values['title']:
+                raise CurriculumError(f'{where}: title is required')
+            try:
+                values['subject_id'] = subjects[spec.get('subject')]
+                values['level_id'] = levels[spec.get('level')]
+            except KeyError as e:
+                raise CurriculumError(f'{where}: unknown subject or level {e}')
+
+            course = existing_courses.get(slug)
+            if course is None:
+                course = Course(slug=slug, **values)
+                plan.course_inserts.append(course)
+            else:
+                self._diff(plan, plan.course_updates, course, values)
+
+            self._plan_lessons(plan, course, spec.get('lessons', []), existing_lessons.get(slug, {}), existing_contents)
+
+        return plan
+
+    def _plan_lessons(self, plan, course, specs, existing, existing_contents):
+        seen = set()
+        for position, spec in enumerate(specs, start=1):
+            slug = spec.get('slug') or slugify(spec.get('title', ''))
+            where = f'lesson {course.slug}/{slug}'
+            if not slug or slug in seen:
+                raise CurriculumError(f'{where}: lessons need a unique slug or title')
+            seen.add(slug)
+
+            spec = dict(spec)
+            spec.setdefault('order', position)
+            values = _clean(Lesson, LESSON_FIELDS, spec, where)
+            if not values['title']:
+                raise CurriculumError(f'{where}: title is required')
+
+            lesson = existing.get(slug)
+            if lesson is None:
+                lesson = Lesson(course=course, slug=slug, **values)
+                plan.lesson_inserts.append(lesson)
+                current_contents = {}
+            else:
+                self._diff(plan, plan.lesson_updates, lesson, values)
+                current_contents = existing_contents.get(lesson.id, {})
+
+            self._plan_contents(plan, lesson, spec.get('contents', []), current_contents, where)
+
+        if self.delete_missing:
+            plan.lesson_deletes.extend(lesson for slug, lesson in existing.items() if slug not in seen)
+
+    def _plan_contents(self, plan, lesson, specs, existing, where):
+        seen = set()
+        for position, spec in enumerate(specs, start=1):
+            order = spec.get('order', position)
+            if order in seen:
+                raise CurriculumError(f'{where}: duplicate content order {order}')
+            seen.add(order)
+
+            values = _clean(LessonContent, CONTENT_FIELDS, spec, f'{where} content {order}')
+            if not values['content_type']:
+                raise CurriculumError(f'{where} content {order}: content_type is required')
+
+            content = existing.get(order)
+            if content is None:
+                plan.content_inserts.append(LessonContent(lesson=lesson, order=order, **values))
+            else:
+                self._diff(plan, plan.content_updates, content, values)
+
+        if self.delete_missing:
+            plan.content_deletes.extend(content for order, content in existing.items() if order not in seen)
+
+    def _diff(self, plan, updates, instance, values):
+        changed = [name for name, value in values.items() if getattr(instance, name) != value]
+        if changed:
+            for name in changed:
+                setattr(instance, name, values[name])
+            plan.updated_fields[type(instance)].update(changed)
+            updates.append(instance)
+
+    def apply(self, plan):
+        """Write a plan with bulk operations (caller provides the transaction)"""
+        now = timezone.now()
+
+        if plan.content_deletes:
+            LessonContent.objects.filter(id__in=[content.id for content in plan.content_deletes]).delete()
+        if plan.lesson_deletes:
+            Lesson.objects.filter(id__in=[lesson.id for lesson in plan.lesson_deletes]).delete()
+
+        if plan.course_updates:
+            for course in plan.course_updates:
+                course.updated_at = now
+            Course.objects.bulk_update(plan.course_updates, sorted(plan.updated_fields[Course]) + ['updated_at'])
+        if plan.course_inserts:
+            Course.objects.bulk_create(plan.course_inserts)
+            ids = dict(Course.objects.filter(
+                slug__in=[course.slug for course in plan.course_inserts]
+            ).values_list('slug', 'id'))
+            for course in plan.course_inserts:
+                course.id = ids[course.slug]
+
+        if plan.lesson_updates:
+            for lesson in plan.lesson_updates:
+                lesson.updated_at = now
+            Lesson.objects.bulk_update(plan.lesson_updates, sorted(plan.updated_fields[Lesson]) + ['updated_at'])
+        if plan.lesson_inserts:
+            for lesson in plan.lesson_inserts:
+                lesson.course_id = lesson.course.id
+            Lesson.objects.bulk_create(plan.lesson_inserts)
+            ids = {
+                (course_id, slug): lesson_id
+                for lesson_id, course_id, slug in Lesson.objects.filter(
+                    course_id__in={lesson.course_id for lesson in plan.lesson_inserts}
+                ).values_list('id', 'course_id', 'slug')
+            }
+            for lesson in plan.lesson_inserts:
+                lesson.id = ids[(lesson.course_id, lesson.slug)]
+
+        if plan.content_updates:
+            LessonContent.objects.bulk_update(plan.content_updates, sorted(plan.updated_fields[LessonContent]))
+        if plan.content_inserts:
+            for content in plan.content_inserts:
+                content.lesson_id = content.lesson.id
+            LessonContent.objects.bulk_create(plan.content_inserts)
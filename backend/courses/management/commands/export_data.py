@@ -0,0 +1,51 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bece_platform.exports import DATASETS, OUTPUT_FORMATS, ExportError, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Stream attempts, answers, orders or payments to a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--output', choices=OUTPUT_FORMATS, default='csv', help='File format')
+        parser.add_argument('--file', help='Destination path (default: stdout)')
+        parser.add_argument('--from', dest='date_from', help='First day included (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last day included (YYYY-MM-DD)')
+        parser.add_argument('--subject', help='Subject code (quizzes) or BECE subject name')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            chunks = stream_export(
+                options['dataset'],
+                output=options['output'],
+                compress=options['gzip'],
+                date_from=options['date_from'],
+                date_to=options['date_to'],
+                subject=options['subject'],
+            )
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        written = 0
+        handle = open(options['file'], 'wb') if options['file'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                handle.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['file']:
+                handle.close()
+            else:
+                handle.flush()
+
+        if options['file']:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {options['dataset']} to {options['file']} ({written} bytes in {elapsed:.2f}s)"
+            ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from courses.curriculum import CurriculumError, CurriculumLoader, read_curriculum
+
+
+class Command(BaseCommand):
+    help = 'Load courses, lessons and lesson contents from a declarative YAML or JSON curriculum file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Curriculum files (.yaml, .yml or .json)')
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            help='Do not delete lessons or contents that are missing from the file',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Show the changes without applying them')
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            started = time.perf_counter()
+            try:
+                data = read_curriculum(path)
+                loader = CurriculumLoader(data, delete_missing=not options['keep_missing'])
+                summary = loader.load(dry_run=options['dry_run'])
+            except FileNotFoundError:
+                raise CommandError(f'File not found: {path}')
+            except (CurriculumError, ValueError) as e:
+                raise CommandError(f'{path}: {e}')
+
+            elapsed = time.perf_counter() - started
+            prefix = '[dry run] ' if options['dry_run'] else ''
+            self.stdout.write(f'{prefix}{path}')
+            for model, counts in summary.items():
+                changes = ', '.join(f'{count} {action}' for action, count in counts.items())
+                self.stdout.write(f'  {model}: {changes}')
+            self.stdout.write(self.style.SUCCESS(f'  done in {elapsed:.2f}s'))
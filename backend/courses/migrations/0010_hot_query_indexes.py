@@ -0,0 +1,32 @@
+# Generated manually: indexes for the hot attempt, progress and catalog queries
+# (makemigrations would also pick up the pending Episode state changes)
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_add_lesson_video_fields'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['-created_at'], name='course_published_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(fields=['user', '-last_accessed'], name='lesson_progress_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', 'quiz', '-started_at'], name='quiz_attempt_open'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-started_at'], name='quiz_attempt_user_recent'),
+        ),
+    ]
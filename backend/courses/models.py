@@ -51,7 +51,8 @@ class Teacher(models.Model):
     @property
     def primary_subject(self):
         """Return the first subject they teach"""
-        return self.subjects.first()
+        # Same result as subjects.first(), but served from prefetched subjects
+        return min(self.subjects.all(), key=lambda subject: subject.pk, default=None)
     
     @property
     def subjects_list(self):
@@ -125,6 +126,10 @@ class Course(models.Model):
     
     class Meta:
         ordering = ['subject__name', 'title']
+        indexes = [
+            # The catalog lists published courses newest first
+            models.Index(fields=['-created_at'], name='course_published_recent', condition=models.Q(is_published=True)),
+        ]
     
     def __str__(self):
         return f"{self.level.name} {self.subject.name}"
@@ -322,6 +327,18 @@ class QuizAttempt(models.Model):
     time_taken_minutes = models.IntegerField(default=0)
     is_completed = models.BooleanField(default=False)
     
+    class Meta:
+        indexes = [
+            # start_quiz/submit_quiz look up the user's open attempt of a quiz
+            models.Index(
+                fields=['user', 'quiz', '-started_at'],
+                name='quiz_attempt_open',
+                condition=models.Q(is_completed=False),
+            ),
+            # Attempt history and recent quizzes, newest first
+            models.Index(fields=['user', '-started_at'], name='quiz_attempt_user_recent'),
+        ]
+    
     def __str__(self):
         return f"{self.user.email} - {self.quiz.title}"
 
@@ -366,6 +383,10 @@ class LessonProgress(models.Model):
     
     class Meta:
         unique_together = ['user', 'lesson']
+        indexes = [
+            # Recently opened lessons
+            models.Index(fields=['user', '-last_accessed'], name='lesson_progress_recent'),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.lesson.title}"
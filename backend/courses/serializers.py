@@ -70,6 +70,9 @@ class CourseSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_lesson_count(self, obj):
+        count = getattr(obj, 'published_lesson_count', None)
+        if count is not None:
+            return count
         return obj.lessons.filter(is_published=True).count()
 
 
@@ -89,6 +92,10 @@ class CourseListSerializer(serializers.ModelSerializer):
                  'has_preview_video', 'learning_objectives', 'prerequisites', 'created_at')
     
     def get_lesson_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        count = getattr(obj, 'published_lesson_count', None)
+        if count is not None:
+            return count
         return obj.lessons.filter(is_published=True).count()
     
     def get_has_preview_video(self, obj):
@@ -119,6 +126,10 @@ class QuizSerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_question_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        count = getattr(obj, 'question_count', None)
+        if count is not None:
+            return count
         return obj.questions.count()
 
 
@@ -133,6 +144,10 @@ class QuizListSerializer(serializers.ModelSerializer):
                  'time_limit_minutes', 'passing_score', 'question_count', 'created_at')
     
     def get_question_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        count = getattr(obj, 'question_count', None)
+        if count is not None:
+            return count
         return obj.questions.count()
 
 
@@ -1,3 +1,190 @@
-from django.test import TestCase
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from bece_platform import stress
+from bece_platform.testing import PASSWORD, QueryCountTestCase, ReplicaTestCase, WritePathStressTestCase
+
+from .curriculum import CurriculumError, CurriculumLoader
+from .models import Answer, Course, Lesson, LessonContent, LessonProgress, Question, Quiz
+
+
+class QueryCountTests(QueryCountTestCase):
+    """Course endpoints run the same number of queries for 10 and 100 rows"""
+    urlconf = 'courses.urls'
+    endpoints = {
+        'teachers': lambda d: ('get', {}, None),
+        'teacher-detail': lambda d: ('get', {'id': d.teacher.id}, None),
+        'subjects': lambda d: ('get', {}, None),
+        'levels': lambda d: ('get', {}, None),
+        'courses': lambda d: ('get', {}, None),
+        'course-detail': lambda d: ('get', {'slug': d.course.slug}, None),
+        'course-by-level-subject': lambda d: (
+            'get', {'level': d.course.level.code, 'subject': d.course.subject.code}, None
+        ),
+        'lesson-detail': lambda d: ('get', {'id': d.lesson.id}, None),
+        'complete-lesson': lambda d: ('post', {'lesson_id': d.lesson.id}, {}),
+        'quizzes': lambda d: ('get', {}, None),
+        'user-quizzes': lambda d: ('get', {}, None),
+        'submit-quiz': lambda d: ('post', {}, {
+            'quiz_id': d.quiz.id,
+            'answers': [{'question_id': str(d.question.id), 'answer_id': str(d.question.answers.first().id)}],
+        }),
+        'quiz-results': lambda d: ('get', {'attempt_id': d.attempt.id}, None),
+        'start-quiz': lambda d: ('post', {'quiz_id': d.quiz.id}, {}),
+        'quiz-detail': lambda d: ('get', {'slug': d.quiz.slug}, None),
+        'user-progress': lambda d: ('get', {}, None),
+        'quiz-attempts': lambda d: ('get', {}, None),
+    }
+
+
+class WritePathStressTests(WritePathStressTestCase):
+    """Lesson completion and quiz starts under concurrent requests"""
+    scenarios = ('complete-lesson', 'start-quiz')
+
+
+class ReplicaRoutingTests(ReplicaTestCase):
+    """Catalog and history GETs read the replica; a client that wrote reads its own writes"""
+
+    def setUp(self):
+        self.course = stress.make_course()
+        self.quiz = Quiz.objects.create(title='Replica quiz', slug=self.course.slug, course=self.course,
+                                        subject=self.course.subject, is_published=True)
+        question = Question.objects.create(quiz=self.quiz, question_text='2 + 2?')
+        self.answer = Answer.objects.create(question=question, answer_text='4', is_correct=True)
+        self.writer = self.client_for(stress.make_user('writer'))
+        self.reader = self.client_for(stress.make_user('reader'))
+        self.sync_replica()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client
+
+    def course_slugs(self, client):
+        response = client.get(reverse('courses'))
+        self.assertEqual(response.status_code, 200)
+        return {course['slug'] for course in response.json()['results']}
+
+    def new_course(self):
+        return Course.objects.create(title='Unreplicated', slug='unreplicated', description='Only on primary',
+                                     subject=self.course.subject, level=self.course.level, is_published=True)
+
+    def test_catalog_reads_from_replica(self):
+        self.new_course()
+        self.assertNotIn('unreplicated', self.course_slugs(self.reader))
+        self.sync_replica()
+        self.assertIn('unreplicated', self.course_slugs(self.reader))
+
+    def test_submit_then_results_reads_own_writes(self):
+        self.writer.post(reverse('start-quiz', args=[self.quiz.id]))
+        response = self.writer.post(reverse('submit-quiz'), {
+            'quiz_id': self.quiz.id,
+            'answers': [{'question_id': str(self.answer.question_id), 'answer_id': str(self.answer.id)}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        attempt_id = response.json()['attempt_id']
+
+        # The attempt isn't on the replica yet, but the writer is pinned to primary
+        response = self.writer.get(reverse('quiz-results', args=[attempt_id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results']['score'], 1)
+        self.new_course()
+        self.assertIn('unreplicated', self.course_slugs(self.writer))
+        self.assertNotIn('unreplicated', self.course_slugs(self.reader))
+
+    def test_pin_expires(self):
+        self.writer.post(reverse('start-quiz', args=[self.quiz.id]))
+        self.new_course()
+        self.assertIn('unreplicated', self.course_slugs(self.writer))
+        caches['shared'].clear()
+        self.assertNotIn('unreplicated', self.course_slugs(self.writer))
+
+    def test_new_credentials_work_before_replication(self):
+        client = APIClient()
+        response = client.post(reverse('register'), {
+            'email': 'new@example.com', 'username': 'new', 'password': PASSWORD, 'password_confirm': PASSWORD,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+        self.assertIn(self.course.slug, self.course_slugs(client))
+
+        # Logging in again issues no write, so nothing pins the client
+        client = APIClient()
+        response = client.post(reverse('login'), {'email': 'new@example.com', 'password': PASSWORD}, format='json')
+        self.assertEqual(response.status_code, 200)
+        client.credentials(HTTP_AUTHORIZATION=f"Token {response.json()['token']}")
+        self.assertIn(self.course.slug, self.course_slugs(client))
+
+    @override_settings(REPLICA_READ_VIEWS=set())
+    def test_unlisted_views_read_primary(self):
+        self.new_course()
+        self.assertIn('unreplicated', self.course_slugs(self.reader))
+
+
+class CurriculumLoaderTests(TestCase):
+    def curriculum(self, lessons):
+        return {
+            'subjects': [{'code': 'MATH', 'name': 'Mathematics'}],
+            'levels': [{'code': 'JHS1', 'name': 'JHS 1', 'order': 1}],
+            'courses': [{
+                'slug': 'jhs1-mathematics', 'title': 'JHS 1 Mathematics', 'subject': 'MATH', 'level': 'JHS1',
+                'description': 'Numbers', 'is_published': True, 'lessons': lessons,
+            }],
+        }
+
+    lessons = [
+        {'title': 'Number and Numeration', 'contents': [
+            {'content_type': 'text', 'title': 'Introduction', 'text_content': 'Counting'},
+            {'content_type': 'text', 'title': 'Place value', 'text_content': 'Tens and units'},
+        ]},
+        {'slug': 'fractions', 'title': 'Fractions'},
+    ]
+
+    def test_load(self):
+        summary = CurriculumLoader(self.curriculum(self.lessons)).load()
+        self.assertEqual(summary['courses'], {'insert': 1, 'update': 0})
+        self.assertEqual(summary['lessons'], {'insert': 2, 'update': 0, 'delete': 0})
+        self.assertEqual(summary['contents'], {'insert': 2, 'update': 0, 'delete': 0})
+        self.assertEqual(
+            list(Lesson.objects.order_by('order').values_list('slug', 'order')),
+            [('number-and-numeration', 1), ('fractions', 2)],
+        )
+
+    def test_reload_is_a_no_op(self):
+        CurriculumLoader(self.curriculum(self.lessons)).load()
+        summary = CurriculumLoader(self.curriculum(self.lessons)).load()
+        self.assertEqual(summary, {
+            'courses': {'insert': 0, 'update': 0},
+            'lessons': {'insert': 0, 'update': 0, 'delete': 0},
+            'contents': {'insert': 0, 'update': 0, 'delete': 0},
+        })
+
+    def test_diff_keeps_lesson_ids(self):
+        CurriculumLoader(self.curriculum(self.lessons)).load()
+        lesson = Lesson.objects.get(slug='number-and-numeration')
+        user = stress.make_user('curriculum')
+        LessonProgress.objects.create(user=user, lesson=lesson)
+
+        lessons = [dict(self.lessons[0], title='Numbers', slug='number-and-numeration')]
+        lessons[0]['contents'] = lessons[0]['contents'][:1]
+        summary = CurriculumLoader(self.curriculum(lessons)).load()
+        self.assertEqual(summary['lessons'], {'insert': 0, 'update': 1, 'delete': 1})
+        self.assertEqual(summary['contents'], {'insert': 0, 'update': 0, 'delete': 1})
+        self.assertEqual(Lesson.objects.get(id=lesson.id).title, 'Numbers')
+        self.assertTrue(LessonProgress.objects.filter(lesson_id=lesson.id).exists())
+        self.assertFalse(Lesson.objects.filter(slug='fractions').exists())
+        self.assertEqual(LessonContent.objects.count(), 1)
+
+    def test_dry_run_writes_nothing(self):
+        summary = CurriculumLoader(self.curriculum(self.lessons)).load(dry_run=True)
+        self.assertEqual(summary['lessons']['insert'], 2)
+        self.assertFalse(Course.objects.exists())
+
+    def test_invalid_choice(self):
+        curriculum = self.curriculum(self.lessons)
+        curriculum['courses'][0]['difficulty'] = 'impossible'
+        with self.assertRaises(CurriculumError):
+            CurriculumLoader(curriculum).load()
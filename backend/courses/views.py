@@ -2,11 +2,13 @@ from rest_framework import generics, status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, Avg, Max
-from django.db import models
+from django.db.models import Q, Count, Avg, Max, Prefetch
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter, OpenApiResponse
 from drf_spectacular.types import OpenApiTypes
+from accounts.dashboard import QUIZ_PASS_SCORE, record_activity
 from .models import (
     Teacher, Subject, Level, Course, Lesson, Quiz, Question, Answer,
     QuizAttempt, UserAnswer, UserProgress, LessonProgress
@@ -19,6 +21,23 @@ from .serializers import (
 )
 
 
+def annotated_courses():
+    """Courses with subject and level joined and published lessons counted"""
+    return Course.objects.select_related('subject', 'level').annotate(
+        published_lesson_count=Count('lessons', filter=Q(lessons__is_published=True))
+    )
+
+
+def annotated_quizzes():
+    """Quizzes with subject joined and questions counted"""
+    return Quiz.objects.select_related('subject').annotate(question_count=Count('questions'))
+
+
+def course_detail_queryset():
+    """Courses with everything CourseSerializer needs in one extra query"""
+    return annotated_courses().prefetch_related('lessons__contents')
+
+
 @extend_schema(
     tags=['Teachers'],
     summary='List Teachers',
@@ -66,7 +85,7 @@ class TeacherListView(generics.ListAPIView):
     responses={200: TeacherSerializer}
 )
 class TeacherDetailView(generics.RetrieveAPIView):
-    queryset = Teacher.objects.filter(is_active=True)
+    queryset = Teacher.objects.filter(is_active=True).prefetch_related('subjects')
     serializer_class = TeacherSerializer
     lookup_field = 'id'
     permission_classes = [permissions.AllowAny]
@@ -133,7 +152,7 @@ class CourseListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        queryset = Course.objects.filter(is_published=True).select_related('subject', 'level')
+        queryset = annotated_courses().filter(is_published=True)
         
         # Filter by subject
         subject = self.request.query_params.get('subject')
@@ -159,7 +178,7 @@ class CourseListView(generics.ListAPIView):
 
 
 class CourseDetailView(generics.RetrieveAPIView):
-    queryset = Course.objects.filter(is_published=True)
+    queryset = course_detail_queryset().filter(is_published=True)
     serializer_class = CourseSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
@@ -170,7 +189,7 @@ class CourseDetailView(generics.RetrieveAPIView):
 def course_by_level_subject(request, level, subject):
     """Get course by level and subject codes"""
     course = get_object_or_404(
-        Course.objects.select_related('subject', 'level'),
+        course_detail_queryset(),
         level__code=level,
         subject__code=subject,
         is_published=True
@@ -203,6 +222,12 @@ class LessonDetailView(generics.RetrieveAPIView):
                 lesson=lesson
             )
             progress.save()  # Update last_accessed
+            if created:
+                record_activity(
+                    request.user.id,
+                    activity_at=progress.last_accessed,
+                    lesson_access=(lesson.id, progress.last_accessed)
+                )
         
         serializer = self.get_serializer(lesson)
         return Response(serializer.data)
@@ -214,34 +239,54 @@ def complete_lesson(request, lesson_id):
     """Mark lesson as completed"""
     lesson = get_object_or_404(Lesson, id=lesson_id, is_published=True)
     
-    progress, created = LessonProgress.objects.get_or_create(
-        user=request.user,
-        lesson=lesson
-    )
-    
-    progress.is_completed = True
-    progress.completion_percentage = 100.0
-    progress.save()
+    # Concurrent completions (double clicks, several tabs) are serialized on
+    # the user's progress rows, so each lesson is counted once and the course
+    # totals include every committed completion
+    with transaction.atomic():
+        progress, lesson_started = LessonProgress.objects.select_for_update().get_or_create(
+            user=request.user,
+            lesson=lesson
+        )
+        newly_completed = not progress.is_completed
+        
+        progress.is_completed = True
+        progress.completion_percentage = 100.0
+        if newly_completed:
+            progress.completed_at = timezone.now()
+        progress.save()
+        
+        # Update course progress
+        course_progress, course_started = UserProgress.objects.select_for_update().get_or_create(
+            user=request.user,
+            course=lesson.course
+        )
+        previous_percentage = course_progress.completion_percentage
+        
+        completed_lessons = LessonProgress.objects.filter(
+            user=request.user,
+            lesson__course=lesson.course,
+            is_completed=True
+        ).count()
+        
+        total_lessons = lesson.course.lessons.filter(is_published=True).count()
+        
+        course_progress.lessons_completed = completed_lessons
+        course_progress.total_lessons = total_lessons
+        course_progress.completion_percentage = (
+            (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
+        )
+        course_progress.save()
     
-    # Update course progress
-    course_progress, created = UserProgress.objects.get_or_create(
-        user=request.user,
-        course=lesson.course
+    record_activity(
+        request.user.id,
+        activity_at=progress.completed_at if newly_completed else None,
+        lesson_access=(lesson.id, progress.last_accessed) if lesson_started else None,
+        lessons=int(newly_completed),
+        lessons_completed=int(newly_completed),
+        progress_total=course_progress.completion_percentage - previous_percentage,
+        courses_started=int(course_started)
     )
     
-    completed_lessons = LessonProgress.objects.filter(
-        user=request.user,
-        lesson__course=lesson.course,
-        is_completed=True
-    ).count()
-    
-    total_lessons = lesson.course.lessons.filter(is_published=True).count()
-    
-    course_progress.lessons_completed = completed_lessons
-    course_progress.total_lessons = total_lessons
-    course_progress.completion_percentage = (completed_lessons / total_lessons) * 100 if total_lessons > 0 else 0
-    course_progress.save()
-    
     return Response({
         'message': 'Lesson completed successfully',
         'lesson_progress': LessonProgressSerializer(progress).data,
@@ -255,7 +300,7 @@ class QuizListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        queryset = Quiz.objects.filter(is_published=True).select_related('subject')
+        queryset = annotated_quizzes().filter(is_published=True)
         
         # Filter by subject
         subject = self.request.query_params.get('subject')
@@ -271,7 +316,7 @@ class QuizListView(generics.ListAPIView):
 
 
 class QuizDetailView(generics.RetrieveAPIView):
-    queryset = Quiz.objects.filter(is_published=True)
+    queryset = annotated_quizzes().filter(is_published=True).prefetch_related('questions__answers')
     serializer_class = QuizSerializer
     lookup_field = 'slug'
     permission_classes = [permissions.IsAuthenticated]
@@ -283,12 +328,22 @@ def start_quiz(request, quiz_id):
     """Start a new quiz attempt"""
     quiz = get_object_or_404(Quiz, id=quiz_id, is_published=True)
     
-    # Create new attempt (no max attempts restriction)
-    attempt = QuizAttempt.objects.create(
-        user=request.user,
-        quiz=quiz,
-        total_questions=quiz.questions.count()
-    )
+    # No max attempts restriction, but one open attempt per quiz: starting
+    # again restarts it. The user row lock keeps concurrent starts from each
+    # creating one
+    with transaction.atomic():
+        get_user_model().objects.select_for_update().only('id').get(pk=request.user.pk)
+        attempt = QuizAttempt.objects.filter(
+            user=request.user,
+            quiz=quiz,
+            is_completed=False
+        ).order_by('-started_at').first()
+        if attempt is None:
+            attempt = QuizAttempt(user=request.user, quiz=quiz)
+        attempt.started_at = timezone.now()
+        attempt.total_questions = quiz.questions.count()
+        attempt.save()
+    record_activity(request.user.id, activity_at=attempt.started_at, quiz_start=(attempt.id, attempt.started_at))
     
     return Response({
         'attempt_id': attempt.id,
@@ -358,6 +413,15 @@ def submit_quiz(request):
     attempt.time_taken_minutes = int((timezone.now() - attempt.started_at).total_seconds() / 60)
     attempt.save()
     
+    record_activity(
+        request.user.id,
+        activity_at=attempt.completed_at,
+        quizzes=1,
+        minutes=attempt.time_taken_minutes,
+        quizzes_passed=int(score >= QUIZ_PASS_SCORE),
+        quiz_minutes=attempt.time_taken_minutes
+    )
+    
     # Check if passed
     passed = percentage_score >= attempt.quiz.passing_score
     
@@ -380,7 +444,9 @@ class UserProgressListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return UserProgress.objects.filter(user=self.request.user).select_related('course')
+        return UserProgress.objects.filter(user=self.request.user).prefetch_related(
+            Prefetch('course', queryset=annotated_courses())
+        )
 
 
 class QuizAttemptListView(generics.ListAPIView):
@@ -388,7 +454,9 @@ class QuizAttemptListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user).order_by('-started_at')
+        return QuizAttempt.objects.filter(user=self.request.user).order_by('-started_at').prefetch_related(
+            'user_answers', Prefetch('quiz', queryset=annotated_quizzes())
+        )
 
 
 @api_view(['GET'])
@@ -408,17 +476,30 @@ def get_quiz_results(request, attempt_id):
         )
     
     quiz = attempt.quiz
-    user_answers = attempt.user_answers.all().select_related('question', 'selected_answer')
+    user_answers = list(attempt.user_answers.all().select_related('selected_answer'))
+    answers_by_question = {}
+    for user_answer in user_answers:
+        answers_by_question.setdefault(user_answer.question_id, user_answer)
+    questions = list(quiz.questions.all().prefetch_related('answers'))
     
     # Calculate scores
-    total_points = sum(question.points for question in quiz.questions.all())
+    total_points = sum(question.points for question in questions)
     percentage_score = (attempt.score / total_points * 100) if total_points > 0 else 0
     passed = percentage_score >= quiz.passing_score
     
     # Prepare detailed results
     questions_results = []
-    for question in quiz.questions.all().prefetch_related('answers'):
-        user_answer = user_answers.filter(question=question).first()
+    for question in questions:
+        user_answer = answers_by_question.get(question.id)
+        answers = [
+            {
+                'id': answer.id,
+                'answer_text': answer.answer_text,
+                'is_correct': answer.is_correct,
+                'order': answer.order
+            }
+            for answer in question.answers.all()
+        ]
         
         question_result = {
             'id': question.id,
@@ -427,15 +508,7 @@ def get_quiz_results(request, attempt_id):
             'points': question.points,
             'order': question.order,
             'explanation': question.explanation,
-            'answers': [
-                {
-                    'id': answer.id,
-                    'answer_text': answer.answer_text,
-                    'is_correct': answer.is_correct,
-                    'order': answer.order
-                }
-                for answer in question.answers.all()
-            ],
+            'answers': answers,
             'user_answer': {
                 'selected_answer_id': user_answer.selected_answer.id if user_answer and user_answer.selected_answer else None,
                 'selected_answer_text': user_answer.selected_answer.answer_text if user_answer and user_answer.selected_answer else None,
@@ -450,7 +523,7 @@ def get_quiz_results(request, attempt_id):
                 'points_earned': 0
             },
             'correct_answer': next(
-                (answer for answer in question.answers.all() if answer.is_correct),
+                (answer for answer in answers if answer['is_correct']),
                 None
             )
         }
@@ -477,7 +550,7 @@ def get_quiz_results(request, attempt_id):
             'percentage_score': round(percentage_score, 1),
             'passed': passed,
             'time_taken_minutes': attempt.time_taken_minutes,
-            'total_questions': quiz.questions.count(),
+            'total_questions': len(questions),
             'correct_answers': sum(1 for ua in user_answers if ua.is_correct),
             'started_at': attempt.started_at.isoformat(),
             'completed_at': attempt.completed_at.isoformat() if attempt.completed_at else None
@@ -499,7 +572,7 @@ def get_user_quizzes(request):
     user_purchases = UserPurchase.objects.filter(
         user=request.user,
         is_active=True
-    ).select_related('bundle')
+    ).select_related('bundle').prefetch_related('bundle__courses')
     
     if not user_purchases.exists():
         return Response({
@@ -515,7 +588,7 @@ def get_user_quizzes(request):
         bundle_courses = purchase.bundle.courses.all()
         purchased_courses.extend(bundle_courses)
         for course in bundle_courses:
-            purchased_subjects.add(course.subject.id)
+            purchased_subjects.add(course.subject_id)
     
     # Get quizzes for purchased subjects and courses
     quizzes = Quiz.objects.filter(
@@ -523,7 +596,17 @@ def get_user_quizzes(request):
     ).filter(
         models.Q(subject_id__in=purchased_subjects) |
         models.Q(course__in=purchased_courses)
-    ).select_related('subject', 'course').prefetch_related('questions').distinct()
+    ).select_related('subject', 'course').annotate(question_count=Count('questions', distinct=True))
+    
+    # The user's attempts for all of these quizzes in one query
+    attempt_stats = {
+        row['quiz_id']: row for row in
+        QuizAttempt.objects.filter(user=request.user, quiz__in=quizzes).values('quiz_id').annotate(
+            attempts_count=Count('id'),
+            best_score=Max('score', filter=Q(is_completed=True)),
+            last_started_at=Max('started_at'),
+        )
+    }
     
     # Group quizzes by subject
     quizzes_by_subject = {}
@@ -541,23 +624,11 @@ def get_user_quizzes(request):
                 'quizzes': []
             }
         
-        # Get user's attempts for this quiz
-        user_attempts = QuizAttempt.objects.filter(
-            user=request.user,
-            quiz=quiz
-        ).order_by('-started_at')
-        
-        best_score = 0
-        attempts_count = user_attempts.count()
-        last_attempt = None
-        
-        if user_attempts.exists():
-            completed_attempts = user_attempts.filter(is_completed=True)
-            if completed_attempts.exists():
-                best_score = completed_attempts.aggregate(
-                    models.Max('score')
-                )['score__max'] or 0
-            last_attempt = user_attempts.first()
+        # User's attempts for this quiz
+        stats = attempt_stats.get(quiz.id, {})
+        attempts_count = stats.get('attempts_count', 0)
+        best_score = stats.get('best_score') or 0
+        last_started_at = stats.get('last_started_at')
         
         quiz_data = {
             'id': quiz.id,
@@ -568,7 +639,7 @@ def get_user_quizzes(request):
             'time_limit_minutes': quiz.time_limit_minutes,
             'passing_score': quiz.passing_score,
             'max_attempts': quiz.max_attempts,
-            'question_count': quiz.questions.count(),
+            'question_count': quiz.question_count,
             'course': ({
                 'id': quiz.course.id,
                 'title': quiz.course.title,
@@ -578,7 +649,7 @@ def get_user_quizzes(request):
                 'attempts_count': attempts_count,
                 'best_score': best_score,
                 'can_attempt': True,  # Always allow attempts
-                'last_attempt_date': last_attempt.started_at.isoformat() if last_attempt else None,
+                'last_attempt_date': last_started_at.isoformat() if last_started_at else None,
                 'passed': best_score >= quiz.passing_score,
             }
         }
@@ -0,0 +1,93 @@
+"""
+Async (ASGI) variants of the MTN MoMo endpoints
+Routed instead of the sync views when ASYNC_OUTBOUND_VIEWS is on, so a single
+uvicorn worker can keep many MTN calls in flight
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from bece_platform.async_http import async_api_view
+from .models import Bundle, Payment, UserPurchase
+from .momo_async import ainitiate_mtn_momo_payment
+from .mtn_momo import simulate_mtn_momo_payment
+from .reconciliation import create_pending_momo_payment, inline_status_checks, reconcile_payment
+
+
+@async_api_view(['POST'], authenticated=True)
+async def initiate_mtn_momo(request):
+    """Initiate MTN Mobile Money payment"""
+    for field in ['phone_number', 'amount', 'bundle_id']:
+        if field not in request.data:
+            return {'error': f'{field} is required'}, 400
+
+    phone_number = request.data['phone_number']
+    bundle_id = request.data['bundle_id']
+    try:
+        amount = float(request.data['amount'])
+    except (TypeError, ValueError):
+        return {'error': 'amount must be a number'}, 400
+
+    bundle = await Bundle.objects.filter(id=bundle_id, is_active=True).afirst()
+    if bundle is None:
+        return {'error': 'Bundle not found'}, 404
+
+    if await UserPurchase.objects.filter(user=request.user, bundle=bundle, is_active=True).aexists():
+        return {'error': 'You already own this bundle'}, 400
+
+    try:
+        if getattr(settings, 'MTN_MOMO_SIMULATE', settings.DEBUG):
+            result = await sync_to_async(simulate_mtn_momo_payment, thread_sensitive=False)(
+                phone_number, amount, bundle_id, request.user.id
+            )
+        else:
+            result = await ainitiate_mtn_momo_payment(phone_number, amount, bundle_id, request.user.id)
+
+        if not result['success']:
+            return {
+                'success': False,
+                'error': result.get('error', 'Payment initiation failed'),
+                'message': result.get('message', 'Failed to initiate payment')
+            }, 400
+
+        order, payment = await sync_to_async(create_pending_momo_payment)(
+            request.user, bundle, amount, result['transaction_id']
+        )
+    except Exception as e:
+        return {'error': str(e)}, 500
+
+    return {
+        'success': True,
+        'transaction_id': result['transaction_id'],
+        'order_id': order.id,
+        'payment_id': payment.id,
+        'message': result['message']
+    }
+
+
+@async_api_view(['GET'], authenticated=True)
+async def check_mtn_momo_status(request, transaction_id):
+    """MTN Mobile Money payment status (reads the payment row, see the sync view)"""
+    payments = Payment.objects.filter(
+        transaction_id=transaction_id,
+        order__user=request.user
+    ).values('status', 'order_id', 'gateway_response')
+    payment = await payments.afirst()
+
+    if payment is None:
+        return {'error': 'Payment not found'}, 404
+
+    if payment['status'] == 'pending' and inline_status_checks():
+        if await sync_to_async(reconcile_payment)(transaction_id):
+            payment = await payments.afirst()
+
+    gateway_response = payment['gateway_response'] or {}
+    return {
+        'success': True,
+        'status': gateway_response.get('status') or payment['status'].upper(),
+        'transaction_id': transaction_id,
+        'order_id': payment['order_id'],
+        'financial_transaction_id': gateway_response.get('financial_transaction_id')
+        or gateway_response.get('financialTransactionId'),
+        'payment_status': payment['status']
+    }
@@ -0,0 +1,89 @@
+"""
+Bundle detail caching for the storefront
+Serialized bundle details are cached under a per-bundle version token that
+signal handlers replace whenever the bundle, its courses or their lessons change.
+The tokens live in a cache every worker shares (BUNDLE_DETAIL_VERSION_CACHE), so
+a change saved by one worker invalidates the details cached by all of them; the
+payloads themselves stay in each process's default cache.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db.models import Count, Prefetch, Q, prefetch_related_objects
+
+from courses.models import Course
+from .models import Bundle
+
+BUNDLE_DETAIL_TIMEOUT = 60 * 15
+
+
+def bundle_courses_prefetch():
+    """Bundle courses with subject and level joined and published lessons counted"""
+    courses = (
+        Course.objects.select_related('subject', 'level')
+        .annotate(published_lesson_count=Count('lessons', filter=Q(lessons__is_published=True)))
+    )
+    return Prefetch('courses', queryset=courses)
+
+
+def bundle_detail_queryset():
+    """Active bundles with everything BundleSerializer needs in one extra query"""
+    return Bundle.objects.filter(is_active=True).prefetch_related(bundle_courses_prefetch())
+
+
+def prefetch_bundle_courses(bundles):
+    """Attach the detail course set to already-fetched bundles"""
+    prefetch_related_objects(list(bundles), bundle_courses_prefetch())
+
+
+def _versions():
+    return caches[settings.BUNDLE_DETAIL_VERSION_CACHE]
+
+
+def _version_key(bundle_id):
+    return f'bundle-detail-version:{bundle_id}'
+
+
+def bundle_version(bundle_id):
+    """Current version token of a bundle's cached detail"""
+    versions = _versions()
+    key = _version_key(bundle_id)
+    version = versions.get(key)
+    if version is None:
+        versions.add(key, uuid.uuid4().hex, None)
+        version = versions.get(key)
+    return version
+
+
+def bundle_detail_cache_key(bundle_id, host=''):
+    # Media URLs are absolute, so the host is part of the key
+    return f'bundle-detail:{bundle_id}:{bundle_version(bundle_id)}:{host}'
+
+
+def invalidate_bundles(bundle_ids):
+    """Give the listed bundles a new version so their cached details are ignored"""
+    versions = {_version_key(bundle_id): uuid.uuid4().hex for bundle_id in set(bundle_ids)}
+    if versions:
+        _versions().set_many(versions, None)
+
+
+def get_bundle_detail(bundle_id, serialize, host=''):
+    """
+    Cached bundle detail data
+
+    Args:
+        bundle_id (int): Bundle primary key
+        serialize (callable): Builds the detail data on a cache miss
+        host (str): Request host, since media URLs embed it
+
+    Returns:
+        dict: Serialized bundle detail
+    """
+    key = bundle_detail_cache_key(bundle_id, host)
+    data = cache.get(key)
+    if data is None:
+        data = serialize()
+        cache.set(key, data, BUNDLE_DETAIL_TIMEOUT)
+    return data
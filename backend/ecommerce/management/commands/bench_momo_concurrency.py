@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from ecommerce.momo_emulator import EmulatorConfig, make_server
+
+
+class Command(BaseCommand):
+    help = 'Compare in-flight MTN MoMo calls per worker: sync client vs async client, against the emulator'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Request-to-pay calls per mode')
+        parser.add_argument('--concurrency', type=int, default=200, help='Max concurrent calls in async mode')
+        parser.add_argument('--latency-ms', type=float, default=200.0, help='Fixed emulator latency')
+
+    def handle(self, *args, **options):
+        server, app = make_server('127.0.0.1', 0, EmulatorConfig(
+            latency='fixed', latency_ms=options['latency_ms'], decline_rate=0, send_callbacks=False,
+        ))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        try:
+            # Keep the benchmark off the database: token in the local cache, no callbacks
+            with override_settings(MTN_MOMO_BASE_URL=base_url, MTN_MOMO_TOKEN_CACHE='default',
+                                   MTN_MOMO_CALLBACK_HOST=''):
+                from ecommerce import momo_client, momo_token
+                momo_client.reset_client()
+                momo_token._manager = None
+
+                results = [
+                    ('sync worker', self._run(app, self._sync, options)),
+                    ('async worker', self._run(app, self._async, options)),
+                ]
+                momo_token._manager = None
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(f"{'mode':<14}{'calls':>7}{'seconds':>10}{'calls/s':>10}{'max in flight':>15}")
+        for name, (calls, elapsed, in_flight) in results:
+            self.stdout.write(f'{name:<14}{calls:>7}{elapsed:>10.2f}{calls / elapsed:>10.1f}{in_flight:>15}')
+
+    def _run(self, app, runner, options):
+        from ecommerce.mtn_momo import MTNMoMoAPI
+        MTNMoMoAPI().get_access_token()  # warm the token so only request-to-pay is measured
+        app.max_in_flight = 0
+        started = time.perf_counter()
+        calls = runner(options)
+        return calls, time.perf_counter() - started, app.max_in_flight
+
+    def _sync(self, options):
+        # A sync worker thread makes one outbound call at a time
+        from ecommerce.mtn_momo import MTNMoMoAPI
+        api = MTNMoMoAPI()
+        ok = 0
+        for _ in range(options['requests']):
+            ok += api.request_to_pay('0241234567', 1)['success']
+        return ok
+
+    def _async(self, options):
+        from ecommerce.momo_async import AsyncMTNMoMoAPI
+
+        async def main():
+            api = AsyncMTNMoMoAPI()
+            limit = asyncio.Semaphore(options['concurrency'])
+
+            async def one():
+                async with limit:
+                    return (await api.arequest_to_pay('0241234567', 1))['success']
+
+            results = await asyncio.gather(*(one() for _ in range(options['requests'])))
+            return sum(results)
+
+        return asyncio.run(main())
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecommerce.reconciliation import reconcile_pending
+
+
+class Command(BaseCommand):
+    help = 'Poll MTN MoMo for pending payments and apply their final status'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Payments polled per round')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent MTN status calls')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Run a single round and exit (e.g. from cron)')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            counts = reconcile_pending(batch_size=options['batch_size'], workers=options['workers'])
+            elapsed = time.perf_counter() - started
+
+            if counts['checked']:
+                self.stdout.write(
+                    f"Checked {counts['checked']} payments in {elapsed:.2f}s: "
+                    f"{counts['completed']} completed, {counts['failed']} failed, {counts['pending']} pending"
+                )
+
+            if options['once']:
+                self.stdout.write(self.style.SUCCESS('Reconciliation round finished'))
+                return
+
+            # Go straight to the next batch while there is a backlog
+            if counts['checked'] < options['batch_size']:
+                time.sleep(options['interval'])
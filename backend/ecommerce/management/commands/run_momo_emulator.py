@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from ecommerce.momo_emulator import EmulatorConfig, make_server
+
+
+class Command(BaseCommand):
+    help = 'Run a local MTN MoMo API emulator (set MTN_MOMO_BASE_URL to its address)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', choices=['fixed', 'uniform', 'lognormal'], default='lognormal',
+                            help='Latency distribution')
+        parser.add_argument('--latency-ms', type=float, default=150.0, help='Fixed/mean/median latency')
+        parser.add_argument('--jitter-ms', type=float, default=50.0, help='Spread of the uniform distribution')
+        parser.add_argument('--sigma', type=float, default=0.5, help='Shape of the lognormal distribution')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Share of calls answered with HTTP 500')
+        parser.add_argument('--decline-rate', type=float, default=0.1, help='Share of payments that end FAILED')
+        parser.add_argument('--settle-seconds', type=float, default=3.0, help='Time a payment stays PENDING')
+        parser.add_argument('--no-callbacks', action='store_true', help='Do not call X-Callback-Url')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for repeatable runs')
+
+    def handle(self, *args, **options):
+        config = EmulatorConfig(
+            latency=options['latency'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            sigma=options['sigma'],
+            error_rate=options['error_rate'],
+            decline_rate=options['decline_rate'],
+            settle_seconds=options['settle_seconds'],
+            send_callbacks=not options['no_callbacks'],
+            seed=options['seed'],
+        )
+        server, app = make_server(options['host'], options['port'], config)
+        address = f"http://{options['host']}:{options['port']}"
+        self.stdout.write(self.style.SUCCESS(f'MoMo emulator listening on {address}'))
+        self.stdout.write(f'Run the API with MTN_MOMO_BASE_URL={address} to use it')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"Served {app.calls['token']} token, {app.calls['requesttopay']} requesttopay "
+                              f"and {app.calls['status']} status calls")
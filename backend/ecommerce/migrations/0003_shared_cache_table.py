@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Used to create the "shared" DatabaseCache table, which depends on the
+    # runtime CACHES setting rather than on models. The table is now created
+    # by `manage.py createcachetable` in the start command; kept as a no-op so
+    # databases that already applied it keep a consistent history
+
+    dependencies = [
+        ('ecommerce', '0002_bundle_preview_video_duration_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, migrations.RunPython.noop),
+    ]
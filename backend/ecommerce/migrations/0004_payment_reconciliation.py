@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0003_shared_cache_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='check_attempts',
+            field=models.IntegerField(default=0, help_text='Gateway status checks made so far'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='last_checked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='next_check_at',
+            field=models.DateTimeField(blank=True, help_text='When the reconcile worker polls next', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['next_check_at'], name='payment_reconcile_queue'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecommerce', '0004_payment_reconciliation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='order_user_history'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', '-created_at'], name='payment_status_recent'),
+        ),
+        migrations.AddIndex(
+            model_name='userpurchase',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', '-purchased_at', '-id'], name='purchase_active_history'),
+        ),
+    ]
@@ -157,6 +157,12 @@ class Order(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Order history (OrderHistoryPagination order)
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_history'),
+        ]
+    
     def __str__(self):
         return f"Order {self.order_number} - {self.user.email}"
 
@@ -205,6 +211,22 @@ class Payment(models.Model):
     processed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     
+    # Gateway reconciliation (see reconciliation.py)
+    check_attempts = models.IntegerField(default=0, help_text="Gateway status checks made so far")
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    next_check_at = models.DateTimeField(null=True, blank=True, help_text="When the reconcile worker polls next")
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_check_at'],
+                name='payment_reconcile_queue',
+                condition=models.Q(status='pending'),
+            ),
+            # Payments by status (admin, reports), newest first
+            models.Index(fields=['status', '-created_at'], name='payment_status_recent'),
+        ]
+    
     def __str__(self):
         return f"Payment {self.transaction_id} - {self.amount}"
 
@@ -252,6 +274,14 @@ class UserPurchase(models.Model):
     
     class Meta:
         unique_together = ['user', 'bundle']
+        indexes = [
+            # Purchase history (PurchaseHistoryPagination order)
+            models.Index(
+                fields=['user', '-purchased_at', '-id'],
+                name='purchase_active_history',
+                condition=models.Q(is_active=True),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.email} - {self.bundle.title}"
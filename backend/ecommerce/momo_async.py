@@ -0,0 +1,133 @@
+"""
+Async MTN MoMo client for ASGI views
+Same requests, parsing, circuit breaker and metrics as the sync client, sent
+with a pooled httpx.AsyncClient so one worker can wait on hundreds of calls
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from bece_platform.async_http import get_async_client
+from .momo_client import RETRY_STATUSES, CircuitOpenError, get_client
+from .mtn_momo import MTNMoMoAPI
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncMTNMoMoAPI(MTNMoMoAPI):
+    """MTNMoMoAPI with awaitable request-to-pay and status calls"""
+
+    async def aget_access_token(self):
+        # Usually a shared-cache hit; refreshes are rare and single-flight
+        return await sync_to_async(self.get_access_token, thread_sensitive=False)()
+
+    async def arequest_to_pay(self, phone_number, amount, currency='GHS', external_id=None,
+                              payer_message=None, payee_note=None):
+        transaction_id, url, headers, payload = self.build_request_to_pay(
+            await self.aget_access_token(), phone_number, amount, currency, external_id, payer_message, payee_note
+        )
+        try:
+            response = await self._send('POST', url, 'requesttopay', idempotent=False, headers=headers, json=payload)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logger.error(f"MTN MoMo request error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': 'Network error occurred'
+            }
+        return self.parse_request_to_pay(response, transaction_id)
+
+    async def aget_transaction_status(self, transaction_id):
+        url, headers = self.build_status_request(await self.aget_access_token(), transaction_id)
+        try:
+            response = await self._send('GET', url, 'requesttopay_status', idempotent=True, headers=headers)
+        except (httpx.HTTPError, CircuitOpenError) as e:
+            logger.error(f"Transaction status check error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'status': 'UNKNOWN'
+            }
+        return self.parse_status(response)
+
+    async def _send(self, method, url, operation, idempotent, **kwargs):
+        """Async counterpart of MoMoHTTPClient.request, sharing its breaker and metrics"""
+        sync_client = get_client()
+        breaker, metrics = sync_client.breaker, sync_client.metrics
+        connect_timeout, read_timeout = sync_client.timeout
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        client = get_async_client()
+        # requests drops None-valued headers (e.g. an unset subscription key); httpx rejects them
+        kwargs['headers'] = {key: value for key, value in kwargs.get('headers', {}).items() if value is not None}
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                metrics.record(operation, 0.0, 'rejected')
+                raise CircuitOpenError(f"MTN MoMo circuit is open; {operation} call rejected")
+
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, timeout=timeout, **kwargs)
+            except httpx.TransportError as e:
+                elapsed = time.perf_counter() - started
+                breaker.record_failure()
+                safe = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                if safe and attempt < sync_client.max_retries:
+                    metrics.record(operation, elapsed, 'retry')
+                    attempt += 1
+                    await asyncio.sleep(self._backoff(sync_client, attempt))
+                    continue
+                metrics.record(operation, elapsed, 'error')
+                raise
+
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.record_failure()
+                if idempotent and response.status_code in RETRY_STATUSES and attempt < sync_client.max_retries:
+                    metrics.record(operation, elapsed, 'retry')
+                    attempt += 1
+                    await asyncio.sleep(self._backoff(sync_client, attempt))
+                    continue
+                metrics.record(operation, elapsed, 'error')
+            else:
+                breaker.record_success()
+                metrics.record(operation, elapsed, 'ok')
+            return response
+
+    def _backoff(self, sync_client, attempt):
+        return random.uniform(0, min(sync_client.backoff_cap, sync_client.backoff_base * 2 ** attempt))
+
+
+async def ainitiate_mtn_momo_payment(phone_number, amount, bundle_id, user_id):
+    """Async counterpart of mtn_momo.initiate_mtn_momo_payment"""
+    mtn_api = AsyncMTNMoMoAPI()
+
+    # Validate MTN number
+    if not mtn_api.validate_phone_number(phone_number):
+        return {
+            'success': False,
+            'error': 'Invalid MTN Mobile Money number',
+            'message': 'Please provide a valid MTN number (024, 025, 053, 054, 055, 059)'
+        }
+
+    external_id = f"BECE-{bundle_id}-{user_id}-{int(datetime.now().timestamp())}"
+
+    # For sandbox, use EUR. For production, use GHS
+    currency = 'EUR' if settings.DEBUG else 'GHS'
+
+    return await mtn_api.arequest_to_pay(
+        phone_number=phone_number,
+        amount=amount,
+        currency=currency,
+        external_id=external_id,
+        payer_message='BECE Platform - Course Bundle Purchase',
+        payee_note=f'Bundle ID: {bundle_id}, User ID: {user_id}'
+    )
@@ -0,0 +1,255 @@
+"""
+HTTP transport for the MTN MoMo API
+One pooled keep-alive session per process, explicit timeouts, jittered retries
+for idempotent calls, a circuit breaker and per-operation latency metrics
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without calling MTN while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Fail fast after repeated failures
+
+    closed: calls go through and consecutive failures are counted
+    open: calls are rejected until reset_timeout has passed
+    half-open: a single trial call decides whether to close or re-open
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"MTN MoMo circuit opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                self._trial_running = False
+
+
+class LatencyMetrics:
+    """Per-operation call counts, errors and latency percentiles (in-process)"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds, outcome):
+        with self._lock:
+            stats = self._calls.setdefault(operation, {
+                'count': 0, 'errors': 0, 'retries': 0, 'rejected': 0,
+                'total_seconds': 0.0, 'max_seconds': 0.0, 'samples': deque(maxlen=self.window),
+            })
+            if outcome == 'rejected':
+                stats['rejected'] += 1
+                return
+            if outcome == 'retry':
+                stats['retries'] += 1
+            stats['count'] += 1
+            if outcome in ('error', 'retry'):
+                stats['errors'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['samples'].append(seconds)
+
+    def snapshot(self):
+        """
+        Current metrics per operation
+
+        Returns:
+            dict: count, errors, retries, rejected and latency (ms) per operation
+        """
+        with self._lock:
+            result = {}
+            for operation, stats in self._calls.items():
+                samples = sorted(stats['samples'])
+                result[operation] = {
+                    'count': stats['count'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'rejected': stats['rejected'],
+                    'avg_ms': round(stats['total_seconds'] / stats['count'] * 1000, 1) if stats['count'] else 0.0,
+                    'p50_ms': _percentile(samples, 50),
+                    'p95_ms': _percentile(samples, 95),
+                    'max_ms': round(stats['max_seconds'] * 1000, 1),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+
+
+def _percentile(samples, percent):
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, int(round(percent / 100 * (len(samples) - 1))))
+    return round(samples[index] * 1000, 1)
+
+
+class MoMoHTTPClient:
+    """Pooled, resilient HTTP client used by MTNMoMoAPI"""
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None,
+                 backoff_base=None, backoff_cap=None, breaker=None, metrics=None, pool_size=None):
+        self.timeout = (
+            connect_timeout or getattr(settings, 'MTN_MOMO_CONNECT_TIMEOUT', 3.05),
+            read_timeout or getattr(settings, 'MTN_MOMO_READ_TIMEOUT', 15.0),
+        )
+        self.max_retries = max_retries if max_retries is not None else getattr(settings, 'MTN_MOMO_MAX_RETRIES', 2)
+        self.backoff_base = backoff_base or getattr(settings, 'MTN_MOMO_BACKOFF_BASE', 0.25)
+        self.backoff_cap = backoff_cap or getattr(settings, 'MTN_MOMO_BACKOFF_CAP', 4.0)
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=getattr(settings, 'MTN_MOMO_BREAKER_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'MTN_MOMO_BREAKER_RESET_SECONDS', 30.0),
+        )
+        self.metrics = metrics or LatencyMetrics()
+
+        pool_size = pool_size or getattr(settings, 'MTN_MOMO_POOL_SIZE', 10)
+        self.session = requests.Session()
+        # Retries are handled here so they respect the breaker and idempotency
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, operation, idempotent=False, **kwargs):
+        """
+        Send a request through the breaker with timeouts and retries
+
+        Args:
+            method (str): HTTP method
+            url (str): Full URL
+            operation (str): Name used for metrics (e.g. 'token', 'requesttopay')
+            idempotent (bool): Retry on timeouts, connection errors and 5xx/429.
+                Non-idempotent calls are only retried when the connection was
+                never established.
+
+        Returns:
+            requests.Response: The final response (any status code)
+
+        Raises:
+            CircuitOpenError: MTN is considered down; nothing was sent
+            requests.exceptions.RequestException: Network failure after retries
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.metrics.record(operation, 0.0, 'rejected')
+                raise CircuitOpenError(f"MTN MoMo circuit is open; {operation} call rejected")
+
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                elapsed = time.perf_counter() - started
+                self.breaker.record_failure()
+                safe = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if safe and attempt < self.max_retries:
+                    self.metrics.record(operation, elapsed, 'retry')
+                    attempt += 1
+                    self._sleep(attempt, operation, e)
+                    continue
+                self.metrics.record(operation, elapsed, 'error')
+                raise
+
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 500 or response.status_code == 429:
+                self.breaker.record_failure()
+                if idempotent and response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    self.metrics.record(operation, elapsed, 'retry')
+                    attempt += 1
+                    self._sleep(attempt, operation, f"HTTP {response.status_code}", response)
+                    continue
+                self.metrics.record(operation, elapsed, 'error')
+            else:
+                self.breaker.record_success()
+                self.metrics.record(operation, elapsed, 'ok')
+
+            logger.debug(f"MTN MoMo {operation} -> {response.status_code} in {elapsed * 1000:.0f}ms")
+            return response
+
+    def _sleep(self, attempt, operation, reason, response=None):
+        # Full jitter: uniform(0, min(cap, base * 2^attempt)); honour Retry-After when given
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = min(self.backoff_cap, float(retry_after))
+        logger.info(f"Retrying MTN MoMo {operation} in {delay:.2f}s ({reason})")
+        time.sleep(delay)
+
+    def get(self, url, operation, idempotent=True, **kwargs):
+        return self.request('GET', url, operation, idempotent=idempotent, **kwargs)
+
+    def post(self, url, operation, idempotent=False, **kwargs):
+        return self.request('POST', url, operation, idempotent=idempotent, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """The process-wide MoMo HTTP client (created on first use)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MoMoHTTPClient()
+    return _client
+
+
+def reset_client():
+    """Drop the process-wide client, e.g. after changing settings in tests"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.session.close()
+        _client = None
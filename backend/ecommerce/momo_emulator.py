@@ -0,0 +1,217 @@
+"""
+Local MTN MoMo collection API emulator
+A small WSGI app implementing the token, request-to-pay and status endpoints
+with configurable latency, error and decline rates. Outcomes are derived from
+a seed so load tests are repeatable. Run it with `manage.py run_momo_emulator`
+and point MTN_MOMO_BASE_URL at it.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmulatorConfig:
+    """
+    Emulator behaviour
+
+    latency: 'fixed', 'uniform' (latency_ms +/- jitter_ms) or 'lognormal'
+        (median latency_ms, shape sigma) added to every response
+    error_rate: share of calls answered with HTTP 500 (transient failures)
+    decline_rate: share of payments that end FAILED instead of SUCCESSFUL
+    settle_seconds: how long a payment stays PENDING
+    seed: makes latencies, errors and outcomes repeatable
+    """
+    latency: str = 'lognormal'
+    latency_ms: float = 150.0
+    jitter_ms: float = 50.0
+    sigma: float = 0.5
+    error_rate: float = 0.0
+    decline_rate: float = 0.1
+    settle_seconds: float = 3.0
+    token_expires_in: int = 3600
+    send_callbacks: bool = True
+    seed: int = 0
+
+
+class MoMoEmulator:
+    """WSGI application emulating the MTN MoMo collection API"""
+
+    def __init__(self, config=None):
+        self.config = config or EmulatorConfig()
+        self.transactions = {}
+        self.calls = {'token': 0, 'requesttopay': 0, 'status': 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+
+    # Randomness
+
+    def _draw(self):
+        """Latency (seconds) and whether to fail this call, from the seeded stream"""
+        with self._lock:
+            rng = self._rng
+            if self.config.latency == 'fixed':
+                latency = self.config.latency_ms
+            elif self.config.latency == 'uniform':
+                latency = rng.uniform(
+                    self.config.latency_ms - self.config.jitter_ms, self.config.latency_ms + self.config.jitter_ms
+                )
+            else:
+                latency = self.config.latency_ms * math.exp(rng.gauss(0, self.config.sigma))
+            fail = rng.random() < self.config.error_rate
+        return max(0.0, latency) / 1000, fail
+
+    def _outcome(self, reference_id):
+        """Final status of a payment; depends only on the seed and the reference id"""
+        digest = hashlib.sha256(f'{self.config.seed}:{reference_id}'.encode()).digest()
+        roll = int.from_bytes(digest[:8], 'big') / 2 ** 64
+        return 'FAILED' if roll < self.config.decline_rate else 'SUCCESSFUL'
+
+    # WSGI
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return self._handle(environ, start_response)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _handle(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        path = environ.get('PATH_INFO', '')
+        latency, fail = self._draw()
+        time.sleep(latency)
+
+        if fail:
+            return self._respond(start_response, 500, {'code': 'INTERNAL_PROCESSING_ERROR'})
+
+        if method == 'POST' and path.rstrip('/') == '/collection/token':
+            return self._token(environ, start_response)
+        if method == 'POST' and path.rstrip('/') == '/collection/v1_0/requesttopay':
+            return self._request_to_pay(environ, start_response)
+        if method == 'GET' and path.startswith('/collection/v1_0/requesttopay/'):
+            return self._status(environ, start_response, path.rsplit('/', 1)[-1])
+        return self._respond(start_response, 404, {'code': 'RESOURCE_NOT_FOUND'})
+
+    def _token(self, environ, start_response):
+        with self._lock:
+            self.calls['token'] += 1
+        if not environ.get('HTTP_AUTHORIZATION', '').startswith('Basic '):
+            return self._respond(start_response, 401, {'error': 'login_failed'})
+        return self._respond(start_response, 200, {
+            'access_token': uuid.uuid4().hex,
+            'token_type': 'access_token',
+            'expires_in': self.config.token_expires_in,
+        })
+
+    def _request_to_pay(self, environ, start_response):
+        with self._lock:
+            self.calls['requesttopay'] += 1
+        if not environ.get('HTTP_AUTHORIZATION', '').startswith('Bearer '):
+            return self._respond(start_response, 401, {'code': 'UNAUTHORIZED'})
+
+        reference_id = environ.get('HTTP_X_REFERENCE_ID')
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+            payload = json.loads(environ['wsgi.input'].read(length) or b'{}')
+        except ValueError:
+            return self._respond(start_response, 400, {'code': 'INVALID_BODY'})
+        if not reference_id or 'amount' not in payload or 'payer' not in payload:
+            return self._respond(start_response, 400, {'code': 'INVALID_REQUEST'})
+
+        with self._lock:
+            if reference_id in self.transactions:
+                return self._respond(start_response, 409, {'code': 'RESOURCE_ALREADY_EXIST'})
+            self.transactions[reference_id] = {
+                'created': time.monotonic(),
+                'payload': payload,
+                'status': self._outcome(reference_id),
+            }
+
+        callback_url = environ.get('HTTP_X_CALLBACK_URL')
+        if callback_url and self.config.send_callbacks:
+            timer = threading.Timer(self.config.settle_seconds, self._send_callback, (reference_id, callback_url))
+            timer.daemon = True
+            timer.start()
+        return self._respond(start_response, 202, None)
+
+    def _status(self, environ, start_response, reference_id):
+        with self._lock:
+            self.calls['status'] += 1
+            transaction = self.transactions.get(reference_id)
+        if transaction is None:
+            return self._respond(start_response, 404, {'code': 'RESOURCE_NOT_FOUND'})
+        return self._respond(start_response, 200, self._status_body(reference_id, transaction))
+
+    def _status_body(self, reference_id, transaction):
+        payload = transaction['payload']
+        settled = time.monotonic() - transaction['created'] >= self.config.settle_seconds
+        status = transaction['status'] if settled else 'PENDING'
+        body = {
+            'amount': payload.get('amount'),
+            'currency': payload.get('currency'),
+            'externalId': payload.get('externalId'),
+            'payer': payload.get('payer'),
+            'payerMessage': payload.get('payerMessage'),
+            'payeeNote': payload.get('payeeNote'),
+            'status': status,
+        }
+        if status == 'SUCCESSFUL':
+            body['financialTransactionId'] = str(int(hashlib.sha256(reference_id.encode()).hexdigest()[:8], 16))
+        elif status == 'FAILED':
+            body['reason'] = 'APPROVAL_REJECTED'
+        return body
+
+    def _send_callback(self, reference_id, callback_url):
+        import requests
+
+        body = self._status_body(reference_id, self.transactions[reference_id])
+        try:
+            requests.put(callback_url, json=body, timeout=5)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Emulator callback to {callback_url} failed: {e}")
+
+    def _respond(self, start_response, status, body):
+        reasons = {
+            200: 'OK', 202: 'Accepted', 400: 'Bad Request', 401: 'Unauthorized',
+            404: 'Not Found', 409: 'Conflict', 500: 'Internal Server Error',
+        }
+        data = json.dumps(body).encode() if body is not None else b''
+        start_response(f'{status} {reasons[status]}', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(data))),
+        ])
+        return [data]
+
+
+def make_server(host='127.0.0.1', port=8765, config=None):
+    """Threaded WSGI server for the emulator, so slow responses do not block each other"""
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+    from wsgiref.simple_server import make_server as wsgi_server
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 1024  # Load tests open many connections at once
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    app = MoMoEmulator(config)
+    server = wsgi_server(host, port, app, server_class=ThreadingWSGIServer, handler_class=QuietHandler)
+    return server, app
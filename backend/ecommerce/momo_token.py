@@ -0,0 +1,147 @@
+"""
+MTN MoMo access-token manager
+Tokens live in the shared cache so every worker and lambda reuses one token.
+Refreshes are single-flight (an in-process lock plus a cache lock), start
+before expiry, and fall back to the still-valid token on transient failures
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+TOKEN_KEY = 'mtn_momo:access_token'
+LOCK_KEY = 'mtn_momo:access_token:lock'
+
+
+class MoMoTokenManager:
+    """
+    Hand out MTN MoMo access tokens
+
+    Args:
+        fetch (callable): Requests a new token; returns (access_token, expires_in)
+        cache_alias (str): Cache holding the token (shared across processes)
+        refresh_margin (int): Seconds before expiry when a proactive refresh starts
+        retry_after (int): Seconds to keep serving the current token after a failed refresh
+        lock_timeout (int): Lifetime of the cross-process refresh lock
+        wait_timeout (float): How long callers wait for another refresh when no token is valid
+    """
+
+    def __init__(self, fetch, cache_alias=None, refresh_margin=None, retry_after=None,
+                 lock_timeout=None, wait_timeout=None, clock=time.time):
+        self.fetch = fetch
+        self.cache = caches[cache_alias or getattr(settings, 'MTN_MOMO_TOKEN_CACHE', 'default')]
+        self.refresh_margin = refresh_margin if refresh_margin is not None else getattr(
+            settings, 'MTN_MOMO_TOKEN_REFRESH_MARGIN', 300
+        )
+        self.retry_after = retry_after if retry_after is not None else 30
+        self.lock_timeout = lock_timeout or 30
+        self.wait_timeout = wait_timeout or 20.0
+        self.clock = clock
+        self._local_lock = threading.Lock()
+
+    def get_token(self):
+        """Current access token, refreshing it if needed"""
+        entry = self.cache.get(TOKEN_KEY)
+        now = self.clock()
+
+        if entry and now < entry['refresh_at']:
+            return entry['token']
+
+        if entry and now < entry['expires_at']:
+            # Still valid: one caller refreshes, everyone else keeps using it
+            self._refresh_in_place(entry)
+            current = self.cache.get(TOKEN_KEY) or entry
+            return current['token']
+
+        return self._obtain()
+
+    def invalidate(self):
+        """Forget the cached token, e.g. after MTN rejects it with 401"""
+        self.cache.delete(TOKEN_KEY)
+
+    def _refresh_in_place(self, entry):
+        if not self._local_lock.acquire(blocking=False):
+            return
+        try:
+            owner = self._acquire_lock()
+            if owner is None:
+                return
+            try:
+                self._refresh()
+            except Exception as e:
+                # Stale-while-revalidate: keep the valid token, try again shortly
+                logger.warning(f"MTN MoMo token refresh failed, serving current token: {e}")
+                entry = dict(entry, refresh_at=self.clock() + self.retry_after)
+                self.cache.set(TOKEN_KEY, entry, self._ttl(entry))
+            finally:
+                self._release_lock(owner)
+        finally:
+            self._local_lock.release()
+
+    def _obtain(self):
+        """Block until a valid token exists, fetching it ourselves if we win the lock"""
+        deadline = time.monotonic() + self.wait_timeout
+        with self._local_lock:
+            while True:
+                entry = self.cache.get(TOKEN_KEY)
+                if entry and self.clock() < entry['expires_at']:
+                    return entry['token']
+
+                owner = self._acquire_lock()
+                if owner is not None:
+                    try:
+                        # Another worker may have stored a token between our read and the lock
+                        entry = self.cache.get(TOKEN_KEY)
+                        if entry and self.clock() < entry['expires_at']:
+                            return entry['token']
+                        return self._refresh()['token']
+                    finally:
+                        self._release_lock(owner)
+
+                if time.monotonic() >= deadline:
+                    raise Exception("Timed out waiting for MTN MoMo access token refresh")
+                time.sleep(0.05)
+
+    def _refresh(self):
+        token, expires_in = self.fetch()
+        now = self.clock()
+        entry = {
+            'token': token,
+            'expires_at': now + expires_in,
+            'refresh_at': now + max(expires_in - self.refresh_margin, expires_in / 2),
+        }
+        self.cache.set(TOKEN_KEY, entry, self._ttl(entry))
+        return entry
+
+    def _ttl(self, entry):
+        return max(1, int(entry['expires_at'] - self.clock()))
+
+    def _acquire_lock(self):
+        owner = uuid.uuid4().hex
+        if self.cache.add(LOCK_KEY, owner, self.lock_timeout):
+            return owner
+        return None
+
+    def _release_lock(self, owner):
+        if self.cache.get(LOCK_KEY) == owner:
+            self.cache.delete(LOCK_KEY)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager(fetch):
+    """The process-wide token manager (created on first use with the given fetcher)"""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = MoMoTokenManager(fetch)
+    return _manager
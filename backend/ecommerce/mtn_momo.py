@@ -8,9 +8,12 @@ import uuid
 import json
 from datetime import datetime, timedelta
 from django.conf import settings
-from django.core.cache import cache
+from django.core import signing
 import logging
 
+from .momo_client import get_client
+from .momo_token import get_token_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,14 +33,20 @@ class MTNMoMoAPI:
         # Environment
         self.environment = getattr(settings, 'MTN_MOMO_ENVIRONMENT', 'sandbox')
         
+        # Shared pooled session with timeouts, retries and circuit breaker
+        self.http = get_client()
+        
     def get_access_token(self):
-        """Get or refresh access token for MTN MoMo API"""
+        """Get the shared access token, refreshing it when needed"""
+        return get_token_manager(_fetch_access_token).get_token()
+    
+    def fetch_access_token(self):
+        """
+        Request a new access token from MTN MoMo
         
-        # Check if we have a cached token
-        cached_token = cache.get('mtn_momo_access_token')
-        if cached_token:
-            return cached_token
-            
+        Returns:
+            tuple: (access_token, expires_in seconds)
+        """
         url = f"{self.collection_url}/token/"
         
         # Create Basic Auth header with user_id:api_key
@@ -52,17 +61,11 @@ class MTNMoMoAPI:
         }
         
         try:
-            response = requests.post(url, headers=headers)
+            response = self.http.post(url, operation='token', idempotent=True, headers=headers)
             response.raise_for_status()
             
             token_data = response.json()
-            access_token = token_data.get('access_token')
-            expires_in = token_data.get('expires_in', 3600)
-            
-            # Cache the token for slightly less than its expiry time
-            cache.set('mtn_momo_access_token', access_token, expires_in - 60)
-            
-            return access_token
+            return token_data.get('access_token'), int(token_data.get('expires_in', 3600))
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get MTN MoMo access token: {e}")
@@ -84,7 +87,31 @@ class MTNMoMoAPI:
             dict: Payment response with transaction ID and status
         """
         
-        access_token = self.get_access_token()
+        transaction_id, url, headers, payload = self.build_request_to_pay(
+            self.get_access_token(), phone_number, amount, currency, external_id, payer_message, payee_note
+        )
+        
+        try:
+            # Not retried once sent: a duplicate X-Reference-Id would be rejected
+            response = self.http.post(url, operation='requesttopay', headers=headers, json=payload)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"MTN MoMo request error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'message': 'Network error occurred'
+            }
+        
+        return self.parse_request_to_pay(response, transaction_id)
+    
+    def build_request_to_pay(self, access_token, phone_number, amount, currency='GHS', external_id=None,
+                             payer_message=None, payee_note=None):
+        """
+        Prepare a request-to-pay call (shared by the sync and async clients)
+        
+        Returns:
+            tuple: (transaction_id, url, headers, payload)
+        """
         transaction_id = str(uuid.uuid4())
         
         url = f"{self.collection_url}/v1_0/requesttopay"
@@ -97,6 +124,11 @@ class MTNMoMoAPI:
             'Content-Type': 'application/json',
         }
         
+        # MTN posts the final status here; the reconcile worker covers missed callbacks
+        callback = callback_url(transaction_id)
+        if callback:
+            headers['X-Callback-Url'] = callback
+        
         # Format phone number for MTN API
         formatted_phone = self.format_phone_number(phone_number)
         
@@ -111,32 +143,27 @@ class MTNMoMoAPI:
             'payerMessage': payer_message or f'Payment for BECE Platform course bundle',
             'payeeNote': payee_note or f'Course bundle purchase - {external_id}',
         }
+        return transaction_id, url, headers, payload
+    
+    def parse_request_to_pay(self, response, transaction_id):
+        """Result dict for a request-to-pay response (requests or httpx)"""
+        if response.status_code == 401:
+            get_token_manager(_fetch_access_token).invalidate()
         
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            
-            if response.status_code == 202:  # Accepted
-                return {
-                    'success': True,
-                    'transaction_id': transaction_id,
-                    'status': 'PENDING',
-                    'message': 'Payment request sent successfully'
-                }
-            else:
-                logger.error(f"MTN MoMo request failed: {response.status_code} - {response.text}")
-                return {
-                    'success': False,
-                    'error': f'Payment request failed: {response.status_code}',
-                    'message': 'Failed to initiate payment'
-                }
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"MTN MoMo request error: {e}")
+        if response.status_code == 202:  # Accepted
             return {
-                'success': False,
-                'error': str(e),
-                'message': 'Network error occurred'
+                'success': True,
+                'transaction_id': transaction_id,
+                'status': 'PENDING',
+                'message': 'Payment request sent successfully'
             }
+        
+        logger.error(f"MTN MoMo request failed: {response.status_code} - {response.text}")
+        return {
+            'success': False,
+            'error': f'Payment request failed: {response.status_code}',
+            'message': 'Failed to initiate payment'
+        }
     
     def get_transaction_status(self, transaction_id):
         """
@@ -149,8 +176,27 @@ class MTNMoMoAPI:
             dict: Transaction status and details
         """
         
-        access_token = self.get_access_token()
+        url, headers = self.build_status_request(self.get_access_token(), transaction_id)
         
+        try:
+            response = self.http.get(url, operation='requesttopay_status', headers=headers)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Transaction status check error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'status': 'UNKNOWN'
+            }
+        
+        return self.parse_status(response)
+    
+    def build_status_request(self, access_token, transaction_id):
+        """
+        Prepare a status call (shared by the sync and async clients)
+        
+        Returns:
+            tuple: (url, headers)
+        """
         url = f"{self.collection_url}/v1_0/requesttopay/{transaction_id}"
         
         headers = {
@@ -158,37 +204,32 @@ class MTNMoMoAPI:
             'X-Target-Environment': self.environment,
             'Ocp-Apim-Subscription-Key': self.subscription_key,
         }
+        return url, headers
+    
+    def parse_status(self, response):
+        """Result dict for a status response (requests or httpx)"""
+        if response.status_code == 401:
+            get_token_manager(_fetch_access_token).invalidate()
         
-        try:
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return {
-                    'success': True,
-                    'status': data.get('status', 'UNKNOWN'),
-                    'amount': data.get('amount'),
-                    'currency': data.get('currency'),
-                    'financial_transaction_id': data.get('financialTransactionId'),
-                    'external_id': data.get('externalId'),
-                    'payer': data.get('payer', {}),
-                    'reason': data.get('reason', {})
-                }
-            else:
-                logger.error(f"Failed to get transaction status: {response.status_code} - {response.text}")
-                return {
-                    'success': False,
-                    'error': f'Status check failed: {response.status_code}',
-                    'status': 'UNKNOWN'
-                }
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Transaction status check error: {e}")
+        if response.status_code == 200:
+            data = response.json()
             return {
-                'success': False,
-                'error': str(e),
-                'status': 'UNKNOWN'
+                'success': True,
+                'status': data.get('status', 'UNKNOWN'),
+                'amount': data.get('amount'),
+                'currency': data.get('currency'),
+                'financial_transaction_id': data.get('financialTransactionId'),
+                'external_id': data.get('externalId'),
+                'payer': data.get('payer', {}),
+                'reason': data.get('reason', {})
             }
+        
+        logger.error(f"Failed to get transaction status: {response.status_code} - {response.text}")
+        return {
+            'success': False,
+            'error': f'Status check failed: {response.status_code}',
+            'status': 'UNKNOWN'
+        }
     
     def format_phone_number(self, phone_number):
         """
@@ -233,6 +274,34 @@ class MTNMoMoAPI:
         return any(formatted.startswith(prefix) for prefix in mtn_prefixes)
 
 
+CALLBACK_SALT = 'ecommerce.mtn_momo.callback'
+
+
+def callback_url(transaction_id):
+    """
+    Signed callback URL for a transaction, or None when no callback host is configured
+    
+    The signature stops third parties from posting fake statuses for a transaction.
+    """
+    host = getattr(settings, 'MTN_MOMO_CALLBACK_HOST', '')
+    if not host:
+        return None
+    token = signing.Signer(salt=CALLBACK_SALT).sign(transaction_id)
+    return f"{host.rstrip('/')}/api/ecommerce/mtn-momo/callback/{token}/"
+
+
+def unsign_callback_token(token):
+    """Transaction ID from a callback token, or None if the signature is invalid"""
+    try:
+        return signing.Signer(salt=CALLBACK_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def _fetch_access_token():
+    return MTNMoMoAPI().fetch_access_token()
+
+
 # Utility functions for Django views
 def initiate_mtn_momo_payment(phone_number, amount, bundle_id, user_id):
     """
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OrderHistoryPagination(CursorPagination):
+    """Keyset pagination: no COUNT(*) and no deep OFFSET for long histories"""
+    page_size = 20
+    ordering = ('-created_at', '-id')
+
+
+class PurchaseHistoryPagination(CursorPagination):
+    page_size = 20
+    ordering = ('-purchased_at', '-id')
@@ -0,0 +1,237 @@
+"""
+MTN MoMo payment reconciliation
+Final payment states arrive through the MTN callback or the reconcile_momo
+worker, which polls pending payments with bounded concurrency and
+per-transaction exponential backoff. Client status polls only read the row,
+unless neither is deployed: then each poll checks its own payment with MTN,
+at most once per backoff step.
+"""
+
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Order, OrderItem, Payment, UserPurchase
+from .mtn_momo import check_mtn_momo_status, simulate_mtn_momo_status_check
+
+logger = logging.getLogger(__name__)
+
+STATUS_MAPPING = {
+    'SUCCESSFUL': 'completed',
+    'FAILED': 'failed',
+    'REJECTED': 'failed',
+    'TIMEOUT': 'failed',
+    'PENDING': 'pending',
+}
+
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_CAP_SECONDS = 15 * 60
+
+
+def create_pending_momo_payment(user, bundle, amount, transaction_id):
+    """
+    Record the order and pending payment for an accepted request-to-pay
+
+    Returns:
+        tuple: (order, payment)
+    """
+    with transaction.atomic():
+        order = Order.objects.create(
+            user=user,
+            order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}',
+            subtotal=amount,
+            total_amount=amount,
+            status='pending'
+        )
+        OrderItem.objects.create(
+            order=order,
+            bundle=bundle,
+            unit_price=amount,
+            total_price=amount
+        )
+        payment = Payment.objects.create(
+            order=order,
+            payment_method='mobile_money',
+            amount=amount,
+            currency='GHS',
+            transaction_id=transaction_id,
+            status='pending'
+        )
+    return order, payment
+
+
+def apply_payment_status(transaction_id, gateway_status, gateway_response=None):
+    """
+    Record a gateway status on a pending payment and fulfil or cancel its order
+
+    Safe to call repeatedly and concurrently: only a payment that is still
+    pending changes, under a row lock.
+
+    Args:
+        transaction_id (str): Payment transaction ID (MTN reference ID)
+        gateway_status (str): MTN status (SUCCESSFUL, FAILED, PENDING, ...)
+        gateway_response (dict): Raw status payload to keep on the payment
+
+    Returns:
+        str: The payment status after the update, or None if the payment does not exist
+    """
+    new_status = STATUS_MAPPING.get(str(gateway_status).upper(), 'pending')
+
+    with transaction.atomic():
+        payment = (
+            Payment.objects.select_for_update()
+            .select_related('order__user')
+            .filter(transaction_id=transaction_id)
+            .first()
+        )
+        if payment is None:
+            return None
+        if payment.status != 'pending' or new_status == 'pending':
+            return payment.status
+
+        order = payment.order
+        payment.status = new_status
+        payment.gateway_response = gateway_response or {'status': gateway_status}
+        payment.next_check_at = None
+
+        if new_status == 'completed':
+            payment.processed_at = timezone.now()
+            order.status = 'completed'
+
+            items = list(order.items.select_related('bundle'))
+            UserPurchase.objects.bulk_create(
+                [UserPurchase(user=order.user, bundle=item.bundle, order=order, is_active=True) for item in items],
+                ignore_conflicts=True,
+            )
+
+            # Update user premium status if BECE bundle
+            if any(item.bundle.bundle_type == 'bece_prep' for item in items) and not order.user.is_premium:
+                order.user.is_premium = True
+                order.user.save(update_fields=['is_premium'])
+        else:
+            order.status = 'cancelled'
+
+        order.save(update_fields=['status', 'updated_at'])
+        payment.save(update_fields=['status', 'gateway_response', 'processed_at', 'next_check_at'])
+
+    logger.info(f"Payment {transaction_id} reconciled as {new_status}")
+    return new_status
+
+
+def next_check_delay(attempts):
+    """Exponential backoff with jitter for the next status poll of a transaction"""
+    delay = min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempts)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def due_payments(limit, transaction_id=None):
+    """Pending mobile money payments whose next check is due, most overdue first"""
+    now = timezone.now()
+    payments = Payment.objects.filter(status='pending', payment_method='mobile_money')
+    if transaction_id is not None:
+        payments = payments.filter(transaction_id=transaction_id)
+    return (
+        payments.filter(Q(next_check_at__isnull=True) | Q(next_check_at__lte=now))
+        .order_by('next_check_at', 'id')
+        .values_list('id', 'transaction_id', 'check_attempts')[:limit]
+    )
+
+
+def _status_checker():
+    # Mirror the views: simulated gateway in development
+    simulate = getattr(settings, 'MTN_MOMO_SIMULATE', settings.DEBUG)
+    return simulate_mtn_momo_status_check if simulate else check_mtn_momo_status
+
+
+def inline_status_checks():
+    """Whether status polls must check MTN themselves (no callback host and no reconcile worker)"""
+    return not (settings.MTN_MOMO_CALLBACK_HOST or settings.MTN_MOMO_RECONCILE_WORKER)
+
+
+def _poll(check, transaction_id):
+    try:
+        return check(transaction_id)
+    except Exception as e:
+        logger.warning(f"Status check for {transaction_id} failed: {e}")
+        return {'success': False, 'error': str(e)}
+
+
+def _apply_results(due, results):
+    """Apply polled statuses and reschedule the payments that are still pending"""
+    counts = {'checked': len(due), 'completed': 0, 'failed': 0, 'pending': 0}
+    now = timezone.now()
+    backoff = []
+    for (payment_id, transaction_id, attempts), result in zip(due, results):
+        status = None
+        if result.get('success'):
+            status = apply_payment_status(transaction_id, result.get('status', 'PENDING'), result)
+        if status in ('completed', 'failed'):
+            counts[status] += 1
+        elif status in (None, 'pending'):
+            counts['pending'] += 1
+            backoff.append(Payment(
+                id=payment_id,
+                check_attempts=attempts + 1,
+                last_checked_at=now,
+                next_check_at=now + timedelta(seconds=next_check_delay(attempts)),
+            ))
+
+    # Only reschedule rows that are still pending (a callback may have landed meanwhile)
+    still_pending = set(
+        Payment.objects.filter(id__in=[payment.id for payment in backoff], status='pending')
+        .values_list('id', flat=True)
+    )
+    Payment.objects.bulk_update(
+        [payment for payment in backoff if payment.id in still_pending],
+        ['check_attempts', 'last_checked_at', 'next_check_at'],
+    )
+    return counts
+
+
+def reconcile_pending(batch_size=100, workers=8, check=None):
+    """
+    Poll the gateway for one batch of due payments
+
+    Gateway calls run in a thread pool; database writes stay on the calling
+    thread.
+
+    Args:
+        batch_size (int): Payments polled in this round
+        workers (int): Concurrent gateway calls
+        check (callable): Status function taking a transaction ID (default: MTN client)
+
+    Returns:
+        dict: Counts of payments checked, completed, failed and still pending
+    """
+    check = check or _status_checker()
+    due = list(due_payments(batch_size))
+    if not due:
+        return {'checked': 0, 'completed': 0, 'failed': 0, 'pending': 0}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(due)))) as pool:
+        results = list(pool.map(lambda transaction_id: _poll(check, transaction_id),
+                                [transaction_id for _, transaction_id, _ in due]))
+    return _apply_results(due, results)
+
+
+def reconcile_payment(transaction_id, check=None):
+    """
+    Check one pending payment with the gateway if its next check is due
+
+    The fallback for status polls when inline_status_checks() is true; the
+    backoff schedule bounds how often a polling client reaches MTN.
+
+    Returns:
+        dict: Counts as for reconcile_pending, or None if no check was due
+    """
+    due = list(due_payments(1, transaction_id=transaction_id))
+    if not due:
+        return None
+    return _apply_results(due, [_poll(check or _status_checker(), transaction_id)])
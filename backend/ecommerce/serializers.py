@@ -13,53 +13,44 @@ class PricingTierSerializer(serializers.ModelSerializer):
 
 
 class BundleSerializer(serializers.ModelSerializer):
+    """
+    Bundle detail with its courses, subjects and courses grouped by subject
+
+    Courses are serialized once and grouped in memory; use
+    catalog.bundle_detail_queryset() or catalog.prefetch_bundle_courses() so
+    they come from a single prefetch.
+    """
     courses = CourseListSerializer(many=True, read_only=True)
-    courses_by_subject = serializers.SerializerMethodField()
-    subjects = serializers.SerializerMethodField()
-    course_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Bundle
         fields = '__all__'
     
-    def get_course_count(self, obj):
-        return obj.courses.count()
-    
-    def get_subjects(self, obj):
-        """Get unique subjects in this bundle"""
-        from courses.serializers import SubjectSerializer
-        subjects = obj.courses.values_list('subject', flat=True).distinct()
-        from courses.models import Subject
-        subject_objects = Subject.objects.filter(id__in=subjects)
-        return SubjectSerializer(subject_objects, many=True).data
-    
-    def get_courses_by_subject(self, obj):
-        """Group courses by subject"""
-        from collections import defaultdict
-        courses_by_subject = defaultdict(list)
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
         
-        for course in obj.courses.all():
-            subject_data = {
-                'id': course.subject.id,
-                'name': course.subject.name,
-                'code': course.subject.code,
-                'icon': course.subject.icon,
-                'color': course.subject.color,
-            }
-            
-            course_data = CourseListSerializer(course).data
-            
-            # Find existing subject or create new entry
-            subject_key = course.subject.id
-            if subject_key not in courses_by_subject:
-                courses_by_subject[subject_key] = {
-                    'subject': subject_data,
+        subjects = {}
+        courses_by_subject = {}
+        for course_data in data['courses']:
+            subject = course_data['subject']
+            if subject['id'] not in subjects:
+                subjects[subject['id']] = subject
+                courses_by_subject[subject['id']] = {
+                    'subject': {
+                        'id': subject['id'],
+                        'name': subject['name'],
+                        'code': subject['code'],
+                        'icon': subject['icon'],
+                        'color': subject['color'],
+                    },
                     'courses': []
                 }
-            
-            courses_by_subject[subject_key]['courses'].append(course_data)
+            courses_by_subject[subject['id']]['courses'].append(course_data)
         
-        return list(courses_by_subject.values())
+        data['courses_by_subject'] = list(courses_by_subject.values())
+        data['subjects'] = list(subjects.values())
+        data['course_count'] = len(data['courses'])
+        return data
 
 
 class BundleListSerializer(serializers.ModelSerializer):
@@ -76,12 +67,24 @@ class BundleListSerializer(serializers.ModelSerializer):
                  'has_preview_video', 'created_at')
     
     def get_course_count(self, obj):
+        # Use the annotated count when the queryset provides one
+        count = getattr(obj, 'course_count', None)
+        if count is not None:
+            return count
         return obj.courses.count()
     
     def get_has_preview_video(self, obj):
         return bool(obj.preview_video_url or obj.preview_video_file)
 
 
+class BundleSummarySerializer(serializers.ModelSerializer):
+    """Bundle reference for history rows; full contents come from the bundle detail endpoint"""
+    
+    class Meta:
+        model = Bundle
+        fields = ('id', 'title', 'slug', 'bundle_type')
+
+
 class CouponSerializer(serializers.ModelSerializer):
     class Meta:
         model = Coupon
@@ -111,6 +114,24 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'order_number', 'created_at')
 
 
+class OrderItemSummarySerializer(serializers.ModelSerializer):
+    bundle = BundleSummarySerializer(read_only=True)
+    
+    class Meta:
+        model = OrderItem
+        fields = ('id', 'bundle', 'quantity', 'unit_price', 'total_price')
+
+
+class OrderHistorySerializer(serializers.ModelSerializer):
+    """Order history row with bundle summaries"""
+    items = OrderItemSummarySerializer(many=True, read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = ('id', 'order_number', 'items', 'subtotal', 'discount_amount', 'total_amount',
+                  'status', 'created_at', 'updated_at')
+
+
 class OrderCreateSerializer(serializers.Serializer):
     """Serializer for creating orders"""
     bundle_ids = serializers.ListField(
@@ -153,7 +174,7 @@ class SubscriptionCreateSerializer(serializers.Serializer):
 
 
 class UserPurchaseSerializer(serializers.ModelSerializer):
-    bundle = BundleSerializer(read_only=True)
+    bundle = BundleSummarySerializer(read_only=True)
     
     class Meta:
         model = UserPurchase
@@ -0,0 +1,59 @@
+"""
+Cache invalidation for bundle details
+Bulk operations (bulk_create/update, queryset.update) bypass these handlers;
+their changes show up once BUNDLE_DETAIL_TIMEOUT expires
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from courses.models import Course, Lesson, Level, Subject
+from .catalog import invalidate_bundles
+from .models import Bundle
+
+
+def _bundles_with(**course_filter):
+    return Bundle.objects.filter(**{f'courses__{key}': value for key, value in course_filter.items()}).values_list(
+        'id', flat=True
+    )
+
+
+@receiver(post_save, sender=Bundle)
+@receiver(post_delete, sender=Bundle)
+def bundle_changed(sender, instance, **kwargs):
+    invalidate_bundles([instance.id])
+
+
+@receiver(m2m_changed, sender=Bundle.courses.through)
+def bundle_courses_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_bundles([instance.id])
+    elif pk_set:
+        invalidate_bundles(pk_set)
+    else:
+        # post_clear from the course side does not report the bundle ids
+        invalidate_bundles(Bundle.objects.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Course)
+@receiver(pre_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    invalidate_bundles(_bundles_with(id=instance.id))
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    invalidate_bundles(_bundles_with(id=instance.course_id))
+
+
+@receiver(post_save, sender=Subject)
+def subject_changed(sender, instance, **kwargs):
+    invalidate_bundles(_bundles_with(subject_id=instance.id))
+
+
+@receiver(post_save, sender=Level)
+def level_changed(sender, instance, **kwargs):
+    invalidate_bundles(_bundles_with(level_id=instance.id))
@@ -1,3 +1,432 @@
-from django.test import TestCase
+import threading
+import time
+from socketserver import ThreadingMixIn
+from unittest import mock
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
 
-# Create your tests here.
+import requests
+
+from django.core import signing
+from django.core.cache import caches
+from django.db import connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from bece_platform import stress
+from bece_platform.testing import QueryCountTestCase, WritePathStressTestCase
+
+from . import momo_emulator
+from .catalog import _version_key
+from .momo_client import CircuitBreaker, CircuitOpenError, MoMoHTTPClient
+from .momo_token import TOKEN_KEY, MoMoTokenManager
+from .models import Payment, UserPurchase
+from .mtn_momo import CALLBACK_SALT
+from .reconciliation import create_pending_momo_payment
+
+
+class FakeTokenEndpoint:
+    """Counts token requests; each takes a little while like the real endpoint, or waits for gate to open"""
+
+    def __init__(self, delay=0.2, expires_in=3600, gate=None):
+        self.delay = delay
+        self.expires_in = expires_in
+        self.gate = gate
+        self.calls = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            number = self.calls
+        if self.gate is not None:
+            if not self.gate.wait(timeout=10):
+                raise Exception("Token request gate never opened")
+        else:
+            time.sleep(self.delay)
+        if self.fail:
+            raise Exception("Failed to authenticate with MTN MoMo API")
+        return f'token-{number}', self.expires_in
+
+
+class MoMoTokenManagerTests(TransactionTestCase):
+    # Against the "shared" DatabaseCache, the cache workers actually coordinate through
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_concurrent_callers_share_one_token_request(self):
+        gate = threading.Event()
+        endpoint = FakeTokenEndpoint(gate=gate)
+        # Five "workers", each with its own in-process lock, sharing one cache
+        managers = [MoMoTokenManager(endpoint, cache_alias='shared') for _ in range(5)]
+        state = threading.Lock()
+        entered = []
+        contended = set()
+
+        def open_gate_once_everyone_waits():
+            # The token request returns only after all 50 callers are in get_token and
+            # every other worker has found the refresh lock taken
+            if len(entered) == 50 and len(contended) == 4:
+                gate.set()
+
+        def watch_lock(manager):
+            acquire = manager._acquire_lock
+
+            def _acquire_lock():
+                owner = acquire()
+                if owner is None:
+                    with state:
+                        contended.add(id(manager))
+                        open_gate_once_everyone_waits()
+                return owner
+            manager._acquire_lock = _acquire_lock
+
+        for manager in managers:
+            watch_lock(manager)
+
+        tokens = []
+
+        def caller(manager):
+            with state:
+                entered.append(manager)
+                open_gate_once_everyone_waits()
+            try:
+                tokens.append(manager.get_token())
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=caller, args=(managers[i % 5],)) for i in range(50)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(gate.is_set())
+        self.assertEqual(endpoint.calls, 1)
+        self.assertEqual(tokens, ['token-1'] * 50)
+
+    def test_lock_winner_reuses_a_token_stored_while_it_waited(self):
+        endpoint = FakeTokenEndpoint(delay=0)
+        manager = MoMoTokenManager(endpoint, cache_alias='shared')
+        acquire = manager._acquire_lock
+
+        def _acquire_lock():
+            # Another worker finishes its refresh just before this one gets the lock
+            caches['shared'].set(TOKEN_KEY, {'token': 'theirs', 'expires_at': time.time() + 3600,
+                                             'refresh_at': time.time() + 3000})
+            return acquire()
+        manager._acquire_lock = _acquire_lock
+
+        self.assertEqual(manager.get_token(), 'theirs')
+        self.assertEqual(endpoint.calls, 0)
+
+    def test_refreshes_before_expiry_and_serves_stale_token_on_failure(self):
+        now = [1000.0]
+        endpoint = FakeTokenEndpoint(delay=0, expires_in=3600)
+        manager = MoMoTokenManager(endpoint, cache_alias='shared', refresh_margin=300, clock=lambda: now[0])
+
+        self.assertEqual(manager.get_token(), 'token-1')
+
+        # Inside the refresh window a failed refresh keeps the valid token
+        now[0] += 3400
+        endpoint.fail = True
+        self.assertEqual(manager.get_token(), 'token-1')
+        self.assertEqual(endpoint.calls, 2)
+
+        # Proactive refresh succeeds once MTN recovers
+        now[0] += 60
+        endpoint.fail = False
+        self.assertEqual(manager.get_token(), 'token-3')
+
+
+class StubServer:
+    """
+    Local HTTP server answering from a script of (status, delay seconds)
+    steps, the last step repeating; counts the requests it receives
+    """
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+
+        class Server(ThreadingMixIn, WSGIServer):
+            daemon_threads = True
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+        self.server = make_server('127.0.0.1', 0, self.app, server_class=Server, handler_class=QuietHandler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/'
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def app(self, environ, start_response):
+        status, delay = self.steps[min(self.calls, len(self.steps) - 1)]
+        self.calls += 1
+        time.sleep(delay)
+        start_response(f'{status} Stub', [('Content-Type', 'application/json')])
+        return [b'{}']
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MoMoHTTPClientTests(SimpleTestCase):
+
+    def make_client(self, *steps, **kwargs):
+        server = StubServer(*steps)
+        self.addCleanup(server.close)
+        kwargs.setdefault('max_retries', 2)
+        client = MoMoHTTPClient(backoff_base=0.001, backoff_cap=0.001, pool_size=2, **kwargs)
+        self.addCleanup(client.session.close)
+        return server, client
+
+    def test_idempotent_calls_retry_transient_errors(self):
+        server, client = self.make_client((503, 0), (200, 0))
+        self.assertEqual(client.get(server.url, 'status').status_code, 200)
+        self.assertEqual(server.calls, 2)
+        self.assertEqual(client.metrics.snapshot()['status']['retries'], 1)
+
+    def test_non_idempotent_calls_are_not_retried(self):
+        server, client = self.make_client((500, 0), (200, 0))
+        self.assertEqual(client.post(server.url, 'requesttopay').status_code, 500)
+        self.assertEqual(server.calls, 1)
+
+    def test_read_timeout_retries_then_raises(self):
+        server, client = self.make_client((200, 0.3), read_timeout=0.1)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.get(server.url, 'status')
+        self.assertEqual(server.calls, 3)
+
+    def test_breaker_opens_then_recovers_through_a_trial_call(self):
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+        server, client = self.make_client((500, 0), breaker=breaker, max_retries=0)
+        with self.assertLogs('ecommerce.momo_client', 'WARNING'):
+            for _ in range(3):
+                self.assertEqual(client.get(server.url, 'status').status_code, 500)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(CircuitOpenError):
+            client.get(server.url, 'status')
+        self.assertEqual(server.calls, 3)
+        self.assertEqual(client.metrics.snapshot()['status']['rejected'], 1)
+
+        now[0] += 30
+        server.steps = [(200, 0)]
+        self.assertEqual(client.get(server.url, 'status').status_code, 200)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class MoMoEmulatorTests(SimpleTestCase):
+
+    def start(self, **config):
+        server, app = momo_emulator.make_server('127.0.0.1', 0, momo_emulator.EmulatorConfig(
+            send_callbacks=False, **config
+        ))
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_port}/collection/v1_0/requesttopay', app
+
+    def request_to_pay(self, url, reference_id):
+        return requests.post(url, json={'amount': '80', 'currency': 'EUR', 'payer': {'partyId': '0240000000'}},
+                             headers={'Authorization': 'Bearer test', 'X-Reference-Id': reference_id}, timeout=5)
+
+    def run_payments(self, seed):
+        url, app = self.start(seed=seed, latency='uniform', error_rate=0.3, decline_rate=0.5, settle_seconds=0)
+        with mock.patch('ecommerce.momo_emulator.time.sleep') as sleep:
+            results = []
+            for n in range(20):
+                response = self.request_to_pay(url, f'ref-{n}')
+                if response.status_code == 202:
+                    response = requests.get(f'{url}/ref-{n}', timeout=5)
+                results.append((response.status_code, response.json().get('status')))
+        return results, [call.args[0] for call in sleep.call_args_list]
+
+    def test_same_seed_repeats_outcomes_and_latencies(self):
+        results, latencies = self.run_payments(seed=7)
+        self.assertEqual(self.run_payments(seed=7), (results, latencies))
+        self.assertNotEqual(self.run_payments(seed=8)[1], latencies)
+        # The rates actually produced a mix of errors, declines and successes
+        self.assertEqual({status for status, _ in results}, {200, 500})
+        self.assertLessEqual({'SUCCESSFUL', 'FAILED'}, {outcome for _, outcome in results})
+
+    def test_payment_settles_after_settle_seconds(self):
+        url, app = self.start(latency='fixed', latency_ms=0, settle_seconds=0.3)
+        self.assertEqual(self.request_to_pay(url, 'ref-1').status_code, 202)
+        self.assertEqual(requests.get(f'{url}/ref-1', timeout=5).json()['status'], 'PENDING')
+        time.sleep(0.35)
+        status = requests.get(f'{url}/ref-1', timeout=5).json()['status']
+        self.assertIn(status, ('SUCCESSFUL', 'FAILED'))
+        self.assertEqual(status, app._outcome('ref-1'))
+
+    def test_duplicate_reference_id_conflicts(self):
+        url, app = self.start(latency='fixed', latency_ms=0)
+        self.assertEqual(self.request_to_pay(url, 'ref-1').status_code, 202)
+        self.assertEqual(self.request_to_pay(url, 'ref-1').status_code, 409)
+        self.assertEqual(len(app.transactions), 1)
+
+
+class BundleDetailCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        caches['shared'].clear()
+        self.bundle = stress.make_bundle()
+
+    def title(self):
+        return self.client.get(reverse('bundle-detail', args=[self.bundle.slug])).json()['title']
+
+    def test_saving_a_bundle_invalidates_its_detail_for_every_worker(self):
+        self.assertEqual(self.title(), self.bundle.title)
+        self.bundle.title = 'Renamed'
+        self.bundle.save()
+        self.assertEqual(self.title(), 'Renamed')
+        # The version token other workers check lives in the shared cache
+        self.assertIsNotNone(caches['shared'].get(_version_key(self.bundle.id)))
+        self.assertIsNone(caches['default'].get(_version_key(self.bundle.id)))
+
+
+@override_settings(MTN_MOMO_CALLBACK_HOST='', MTN_MOMO_RECONCILE_WORKER=False)
+class InlineStatusCheckTests(TestCase):
+    """Without a callback host or reconcile worker, status polls check MTN themselves"""
+
+    def setUp(self):
+        self.user = stress.make_user('poller')
+        create_pending_momo_payment(self.user, stress.make_bundle(), 80, 'TXN-1')
+        self.client.force_login(self.user)
+        self.check = mock.Mock(return_value={'success': True, 'status': 'PENDING'})
+        patcher = mock.patch('ecommerce.reconciliation._status_checker', return_value=self.check)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def poll(self):
+        return self.client.get(reverse('check-mtn-momo-status', args=['TXN-1'])).json()
+
+    def test_poll_settles_the_payment(self):
+        self.check.return_value = {'success': True, 'status': 'SUCCESSFUL'}
+        self.assertEqual(self.poll()['payment_status'], 'completed')
+        self.assertTrue(self.user.purchases.exists())
+
+    def test_polls_follow_the_backoff_schedule(self):
+        self.assertEqual(self.poll()['payment_status'], 'pending')
+        self.poll()
+        self.assertEqual(self.check.call_count, 1)
+        self.assertEqual(Payment.objects.get(transaction_id='TXN-1').check_attempts, 1)
+
+    @override_settings(MTN_MOMO_RECONCILE_WORKER=True)
+    def test_poll_only_reads_the_row_when_the_worker_runs(self):
+        self.assertEqual(self.poll()['payment_status'], 'pending')
+        self.check.assert_not_called()
+
+    def test_other_users_payments_are_not_checked(self):
+        self.client.force_login(stress.make_user('other'))
+        self.assertEqual(self.client.get(reverse('check-mtn-momo-status', args=['TXN-1'])).status_code, 404)
+        self.check.assert_not_called()
+
+
+class HistoryPaginationTests(TestCase):
+    """Order and purchase history return bundle summaries a cursor page at a time"""
+
+    def setUp(self):
+        self.user = stress.make_user('history')
+        for _ in range(25):
+            bundle = stress.make_bundle()
+            order = stress.make_order(self.user, bundle)
+            UserPurchase.objects.create(user=self.user, bundle=bundle, order=order)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url_name):
+        url = reverse(url_name)
+        pages = []
+        while url:
+            body = self.client.get(url).json()
+            self.assertNotIn('count', body)
+            pages.append(body['results'])
+            url = body['next']
+        return pages
+
+    def assert_summary(self, bundle):
+        self.assertEqual(set(bundle), {'id', 'title', 'slug', 'bundle_type'})
+
+    def test_orders_page_by_cursor(self):
+        pages = self.walk('user-orders')
+        self.assertEqual([len(page) for page in pages], [20, 5])
+        ids = [order['id'] for page in pages for order in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 25)
+        for order in pages[0]:
+            self.assert_summary(order['items'][0]['bundle'])
+
+    def test_purchases_page_by_cursor(self):
+        pages = self.walk('user-purchases')
+        self.assertEqual([len(page) for page in pages], [20, 5])
+        self.assertEqual(len({purchase['id'] for page in pages for purchase in page}), 25)
+        for purchase in pages[0]:
+            self.assert_summary(purchase['bundle'])
+
+    def test_previous_cursor_returns_the_first_page(self):
+        first = self.client.get(reverse('user-orders')).json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(self.client.get(second['previous']).json()['results'], first['results'])
+
+    def test_query_budget(self):
+        # Orders: the page plus one prefetch of items with their bundles
+        with self.assertNumQueries(2):
+            self.client.get(reverse('user-orders'))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('user-purchases'))
+
+
+# Status polls only read the row when the reconcile worker is deployed
+@override_settings(MTN_MOMO_SIMULATE=True, MTN_MOMO_RECONCILE_WORKER=True)
+class QueryCountTests(QueryCountTestCase):
+    """Store endpoints run the same number of queries for 10 and 100 rows"""
+    urlconf = 'ecommerce.urls'
+    endpoints = {
+        'pricing-tiers': lambda d: ('get', {}, None),
+        'bundles': lambda d: ('get', {}, None),
+        'bundle-detail': lambda d: ('get', {'slug': d.bundle.slug}, None),
+        'validate-coupon': lambda d: ('post', {}, {'code': 'CODE0', 'total_amount': '80.00'}),
+        'create-order': lambda d: ('post', {}, {'bundle_ids': [d.spare_bundle.id], 'coupon_code': 'CODE0'}),
+        'user-orders': lambda d: ('get', {}, None),
+        'process-payment': lambda d: ('post', {}, {'order_id': d.unpaid_order.id, 'payment_method': 'card'}),
+        'checkout': lambda d: ('post', {}, {
+            'bundle_ids': [d.spare_bundle.id], 'coupon_code': 'CODE0', 'payment_method': 'card',
+        }),
+        'user-purchases': lambda d: ('get', {}, None),
+        'bundle-subjects': lambda d: ('get', {'bundle_id': d.bundle.id}, None),
+        'bundle-subject-courses': lambda d: ('get', {'bundle_id': d.bundle.id, 'subject_id': d.subject.id}, None),
+        'subscriptions': lambda d: ('get', {}, None),
+        'create-subscription': lambda d: ('post', {}, {
+            'pricing_tier_id': d.tier.id, 'billing_cycle': 'monthly', 'payment_method': 'card',
+        }),
+        'faqs': lambda d: ('get', {}, None),
+        'announcements': lambda d: ('get', {}, None),
+        'initiate-mtn-momo': lambda d: ('post', {}, {
+            'phone_number': '0240000000', 'amount': '80.00', 'bundle_id': d.spare_bundle.id,
+        }),
+        'check-mtn-momo-status': lambda d: ('get', {'transaction_id': d.pending_payment.transaction_id}, None),
+        'cancel-mtn-momo': lambda d: ('post', {}, {'transaction_id': d.pending_payment.transaction_id}),
+        'mtn-momo-callback': lambda d: (
+            'put', {'token': signing.Signer(salt=CALLBACK_SALT).sign(d.pending_payment.transaction_id)},
+            {'status': 'SUCCESSFUL'},
+        ),
+    }
+
+    def setUp(self):
+        super().setUp()
+        # The simulated gateway sleeps for a second per payment
+        patcher = mock.patch('time.sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class WritePathStressTests(WritePathStressTestCase):
+    """Coupon counts, payments and MoMo fulfilment under concurrent requests"""
+    scenarios = ('coupon-usage', 'duplicate-payment', 'momo-fulfilment')
@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if settings.ASYNC_OUTBOUND_VIEWS:
+    from . import async_views as momo_views
+else:
+    momo_views = views
+
 urlpatterns = [
     path('pricing-tiers/', views.PricingTierListView.as_view(), name='pricing-tiers'),
     path('bundles/', views.BundleListView.as_view(), name='bundles'),
@@ -19,7 +25,8 @@ urlpatterns = [
     path('announcements/', views.AnnouncementListView.as_view(), name='announcements'),
     
     # MTN Mobile Money endpoints
-    path('mtn-momo/initiate/', views.initiate_mtn_momo, name='initiate-mtn-momo'),
-    path('mtn-momo/status/<str:transaction_id>/', views.check_mtn_momo_status, name='check-mtn-momo-status'),
+    path('mtn-momo/initiate/', momo_views.initiate_mtn_momo, name='initiate-mtn-momo'),
+    path('mtn-momo/status/<str:transaction_id>/', momo_views.check_mtn_momo_status, name='check-mtn-momo-status'),
     path('mtn-momo/cancel/', views.cancel_mtn_momo_payment, name='cancel-mtn-momo'),
+    path('mtn-momo/callback/<str:token>/', views.mtn_momo_callback, name='mtn-momo-callback'),
 ]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -12,14 +12,18 @@ from .models import (
 )
 from .serializers import (
     PricingTierSerializer, BundleSerializer, BundleListSerializer,
-    CouponValidationSerializer, OrderSerializer, OrderCreateSerializer,
+    CouponValidationSerializer, OrderSerializer, OrderHistorySerializer, OrderCreateSerializer,
     PaymentSerializer, PaymentCreateSerializer, SubscriptionSerializer,
     SubscriptionCreateSerializer, UserPurchaseSerializer, FAQSerializer,
     AnnouncementSerializer, CheckoutSerializer
 )
+from .pagination import OrderHistoryPagination, PurchaseHistoryPagination
+from .catalog import get_bundle_detail, prefetch_bundle_courses
 from .mtn_momo import (
-    initiate_mtn_momo_payment, check_mtn_momo_status,
-    simulate_mtn_momo_payment, simulate_mtn_momo_status_check
+    initiate_mtn_momo_payment, simulate_mtn_momo_payment, unsign_callback_token
+)
+from .reconciliation import (
+    apply_payment_status, create_pending_momo_payment, inline_status_checks, reconcile_payment
 )
 
 
@@ -34,7 +38,7 @@ class BundleListView(generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
 
     def get_queryset(self):
-        queryset = Bundle.objects.filter(is_active=True)
+        queryset = Bundle.objects.filter(is_active=True).annotate(course_count=models.Count('courses'))
         
         # Filter by bundle type
         bundle_type = self.request.query_params.get('type')
@@ -55,6 +59,15 @@ class BundleDetailView(generics.RetrieveAPIView):
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]
 
+    def retrieve(self, request, *args, **kwargs):
+        bundle = self.get_object()
+
+        def serialize():
+            prefetch_bundle_courses([bundle])
+            return self.get_serializer(bundle).data
+
+        return Response(get_bundle_detail(bundle.id, serialize, request.get_host()))
+
 
 @api_view(['POST'])
 @permission_classes([permissions.AllowAny])
@@ -110,42 +123,33 @@ def validate_coupon(request):
         )
 
 
-@api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
-def create_order(request):
-    """Create a new order"""
-    serializer = OrderCreateSerializer(data=request.data)
-    if not serializer.is_valid():
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    bundle_ids = serializer.validated_data['bundle_ids']
-    coupon_code = serializer.validated_data.get('coupon_code')
-    
+def place_order(user, bundle_ids, coupon_code=None):
+    """
+    Create a pending order for bundles the user doesn't own yet
+
+    Returns:
+        tuple: (order, None), or (None, error message) if a bundle is
+            unavailable or already owned
+    """
     # Get bundles
     bundles = Bundle.objects.filter(id__in=bundle_ids, is_active=True)
     if len(bundles) != len(bundle_ids):
-        return Response(
-            {'error': 'Some bundles are not available'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        return None, 'Some bundles are not available'
     
     # Check if user already owns any of these bundles
     existing_purchases = UserPurchase.objects.filter(
-        user=request.user,
+        user=user,
         bundle__in=bundles,
         is_active=True
-    )
-    if existing_purchases.exists():
-        owned_bundles = [p.bundle.title for p in existing_purchases]
-        return Response(
-            {'error': f'You already own: {", ".join(owned_bundles)}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    ).select_related('bundle')
+    owned_bundles = [p.bundle.title for p in existing_purchases]
+    if owned_bundles:
+        return None, f'You already own: {", ".join(owned_bundles)}'
     
     with transaction.atomic():
         # Create order
         order = Order.objects.create(
-            user=request.user,
+            user=user,
             order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}'
         )
         
@@ -182,6 +186,75 @@ def create_order(request):
         order.total_amount = subtotal - discount_amount
         order.save()
     
+    return order, None
+
+
+def pay_order(user, order, payment_method, payment_details=None):
+    """
+    Record a completed payment for a pending order and grant its bundles
+
+    The order row is locked first, so paying the same order from two requests
+    creates one payment; the second finds it no longer pending.
+
+    Returns:
+        Payment: The new payment, or None if the order is no longer pending
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order.pk, status='pending').first()
+        if order is None:
+            return None
+        
+        # Create payment record
+        payment = Payment.objects.create(
+            order=order,
+            payment_method=payment_method,
+            amount=order.total_amount,
+            transaction_id=f'TXN-{uuid.uuid4().hex[:12].upper()}',
+            gateway_response=payment_details or {},
+            status='completed',  # In real app, this would be 'processing'
+            processed_at=timezone.now()
+        )
+        
+        # Update order status
+        order.status = 'completed'
+        order.save()
+        
+        # Create user purchases (another order may have granted a bundle meanwhile)
+        items = list(order.items.select_related('bundle'))
+        UserPurchase.objects.bulk_create(
+            [UserPurchase(user=user, bundle=item.bundle, order=order) for item in items],
+            ignore_conflicts=True,
+        )
+        
+        # Update coupon usage if applicable (in the database, so concurrent
+        # payments with the same coupon are all counted)
+        if order.coupon_id:
+            Coupon.objects.filter(pk=order.coupon_id).update(used_count=models.F('used_count') + 1)
+        
+        # Update user premium status if applicable
+        if any(item.bundle.bundle_type == 'bece_prep' for item in items) and not user.is_premium:
+            user.is_premium = True
+            user.save(update_fields=['is_premium'])
+    
+    return payment
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def create_order(request):
+    """Create a new order"""
+    serializer = OrderCreateSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    order, error = place_order(
+        request.user,
+        serializer.validated_data['bundle_ids'],
+        serializer.validated_data.get('coupon_code')
+    )
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
     return Response({
         'order': OrderSerializer(order).data,
         'message': 'Order created successfully'
@@ -197,8 +270,6 @@ def process_payment(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     order_id = serializer.validated_data['order_id']
-    payment_method = serializer.validated_data['payment_method']
-    payment_details = serializer.validated_data.get('payment_details', {})
     
     try:
         order = Order.objects.get(id=order_id, user=request.user, status='pending')
@@ -208,40 +279,17 @@ def process_payment(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    with transaction.atomic():
-        # Create payment record
-        payment = Payment.objects.create(
-            order=order,
-            payment_method=payment_method,
-            amount=order.total_amount,
-            transaction_id=f'TXN-{uuid.uuid4().hex[:12].upper()}',
-            gateway_response=payment_details,
-            status='completed',  # In real app, this would be 'processing'
-            processed_at=timezone.now()
+    payment = pay_order(
+        request.user,
+        order,
+        serializer.validated_data['payment_method'],
+        serializer.validated_data.get('payment_details', {})
+    )
+    if payment is None:
+        return Response(
+            {'error': 'Order not found or already processed'},
+            status=status.HTTP_400_BAD_REQUEST
         )
-        
-        # Update order status
-        order.status = 'completed'
-        order.save()
-        
-        # Create user purchases
-        for item in order.items.all():
-            UserPurchase.objects.create(
-                user=request.user,
-                bundle=item.bundle,
-                order=order
-            )
-        
-        # Update coupon usage if applicable
-        if order.coupon:
-            order.coupon.used_count += 1
-            order.coupon.save()
-        
-        # Update user premium status if applicable
-        premium_bundles = order.items.filter(bundle__bundle_type='bece_prep')
-        if premium_bundles.exists():
-            request.user.is_premium = True
-            request.user.save()
     
     return Response({
         'payment': PaymentSerializer(payment).data,
@@ -257,51 +305,55 @@ def checkout(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    # Create order first
-    order_data = {
-        'bundle_ids': serializer.validated_data['bundle_ids'],
-        'coupon_code': serializer.validated_data.get('coupon_code')
-    }
-    
-    # Create order
-    order_serializer = OrderCreateSerializer(data=order_data)
-    if not order_serializer.is_valid():
-        return Response(order_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-    
-    # Use the create_order logic
-    order_response = create_order(request)
-    if order_response.status_code != 200:
-        return order_response
-    
-    order_id = order_response.data['order']['id']
-    
-    # Process payment
-    payment_data = {
-        'order_id': order_id,
-        'payment_method': serializer.validated_data['payment_method']
-    }
-    
-    payment_serializer = PaymentCreateSerializer(data=payment_data)
-    if not payment_serializer.is_valid():
-        return Response(payment_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    # Calls the order and payment logic directly: DRF views can't be handed
+    # this view's already-parsed request
+    with transaction.atomic():
+        order, error = place_order(
+            request.user,
+            serializer.validated_data['bundle_ids'],
+            serializer.validated_data.get('coupon_code')
+        )
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        
+        payment = pay_order(request.user, order, serializer.validated_data['payment_method'])
     
-    return process_payment(request)
+    return Response({
+        'payment': PaymentSerializer(payment).data,
+        'message': 'Payment processed successfully'
+    })
 
 
 class UserOrderListView(generics.ListAPIView):
-    serializer_class = OrderSerializer
+    serializer_class = OrderHistorySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderHistoryPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+        items = OrderItem.objects.select_related('bundle').only(
+            'id', 'order_id', 'quantity', 'unit_price', 'total_price',
+            'bundle__id', 'bundle__title', 'bundle__slug', 'bundle__bundle_type',
+        )
+        return (
+            Order.objects.filter(user=self.request.user)
+            .prefetch_related(models.Prefetch('items', queryset=items))
+        )
 
 
 class UserPurchaseListView(generics.ListAPIView):
     serializer_class = UserPurchaseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PurchaseHistoryPagination
 
     def get_queryset(self):
-        return UserPurchase.objects.filter(user=self.request.user, is_active=True).order_by('-purchased_at')
+        return (
+            UserPurchase.objects.filter(user=self.request.user, is_active=True)
+            .select_related('bundle')
+            .only(
+                'id', 'user_id', 'order_id', 'purchased_at', 'expires_at', 'is_active',
+                'bundle__id', 'bundle__title', 'bundle__slug', 'bundle__bundle_type',
+            )
+        )
 
 
 @api_view(['GET'])
@@ -317,9 +369,11 @@ def get_bundle_subjects(request, bundle_id):
         )
         
         bundle = purchase.bundle
+        prefetch_bundle_courses([bundle])
         
         # Get unique subjects in this bundle
         from collections import defaultdict
+        from courses.serializers import CourseListSerializer
         subjects_data = defaultdict(lambda: {'courses': [], 'course_count': 0})
         
         for course in bundle.courses.all():
@@ -338,7 +392,6 @@ def get_bundle_subjects(request, bundle_id):
                     'course_count': 0
                 }
             
-            from courses.serializers import CourseListSerializer
             course_data = CourseListSerializer(course).data
             subjects_data[subject_key]['courses'].append(course_data)
             subjects_data[subject_key]['course_count'] += 1
@@ -414,7 +467,7 @@ class SubscriptionListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Subscription.objects.filter(user=self.request.user).order_by('-created_at')
+        return Subscription.objects.filter(user=self.request.user).select_related('pricing_tier').order_by('-created_at')
 
 
 @api_view(['POST'])
@@ -518,7 +571,7 @@ class AnnouncementListView(generics.ListAPIView):
             models.Q(show_to_all=True) | models.Q(target_users=user)
         )
         
-        return queryset.order_by('-created_at')
+        return queryset.prefetch_related('target_users').order_by('-created_at')
 
 
 # MTN Mobile Money Payment Endpoints
@@ -556,8 +609,8 @@ def initiate_mtn_momo(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Use simulation for development, real API for production
-        if settings.DEBUG:
+        # Use simulation for development, real API (or the local emulator) otherwise
+        if getattr(settings, 'MTN_MOMO_SIMULATE', settings.DEBUG):
             result = simulate_mtn_momo_payment(
                 phone_number=phone_number,
                 amount=amount,
@@ -573,34 +626,7 @@ def initiate_mtn_momo(request):
             )
         
         if result['success']:
-            # Create pending payment record
-            with transaction.atomic():
-                # Create order
-                order = Order.objects.create(
-                    user=request.user,
-                    order_number=f'ORD-{uuid.uuid4().hex[:8].upper()}',
-                    subtotal=amount,
-                    total_amount=amount,
-                    status='pending'
-                )
-                
-                # Create order item
-                OrderItem.objects.create(
-                    order=order,
-                    bundle=bundle,
-                    unit_price=amount,
-                    total_price=amount
-                )
-                
-                # Create payment record
-                payment = Payment.objects.create(
-                    order=order,
-                    payment_method='mobile_money',
-                    amount=amount,
-                    currency='GHS',
-                    transaction_id=result['transaction_id'],
-                    status='pending'
-                )
+            order, payment = create_pending_momo_payment(request.user, bundle, amount, result['transaction_id'])
             
             return Response({
                 'success': True,
@@ -631,98 +657,57 @@ def initiate_mtn_momo(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def check_mtn_momo_status(request, transaction_id):
-    """Check MTN Mobile Money payment status"""
-    
-    try:
-        # Get payment record
-        payment = Payment.objects.get(
-            transaction_id=transaction_id,
-            order__user=request.user
-        )
-        
-        # If already completed, return current status
-        if payment.status in ['completed', 'failed']:
-            return Response({
-                'success': True,
-                'status': payment.status.upper(),
-                'transaction_id': transaction_id,
-                'order_id': payment.order.id
-            })
-        
-        # Check status with MTN API
-        if settings.DEBUG:
-            result = simulate_mtn_momo_status_check(transaction_id)
-        else:
-            result = check_mtn_momo_status(transaction_id)
-        
-        if result['success']:
-            status_mapping = {
-                'SUCCESSFUL': 'completed',
-                'FAILED': 'failed',
-                'PENDING': 'pending'
-            }
-            
-            new_status = status_mapping.get(result['status'], 'pending')
-            
-            # Update payment status
-            if new_status != payment.status:
-                with transaction.atomic():
-                    payment.status = new_status
-                    payment.gateway_response = result
-                    
-                    if new_status == 'completed':
-                        payment.processed_at = timezone.now()
-                        payment.order.status = 'completed'
-                        payment.order.save()
-                        
-                        # Create user purchase
-                        for item in payment.order.items.all():
-                            UserPurchase.objects.get_or_create(
-                                user=request.user,
-                                bundle=item.bundle,
-                                order=payment.order,
-                                defaults={'is_active': True}
-                            )
-                        
-                        # Update user premium status if BECE bundle
-                        premium_bundles = payment.order.items.filter(
-                            bundle__bundle_type='bece_prep'
-                        )
-                        if premium_bundles.exists():
-                            request.user.is_premium = True
-                            request.user.save()
-                    
-                    elif new_status == 'failed':
-                        payment.order.status = 'cancelled'
-                        payment.order.save()
-                    
-                    payment.save()
-            
-            return Response({
-                'success': True,
-                'status': result['status'],
-                'transaction_id': transaction_id,
-                'order_id': payment.order.id,
-                'financial_transaction_id': result.get('financial_transaction_id'),
-                'payment_status': new_status
-            })
-        else:
-            return Response({
-                'success': False,
-                'error': result.get('error', 'Status check failed'),
-                'status': 'UNKNOWN'
-            }, status=status.HTTP_400_BAD_REQUEST)
-            
-    except Payment.DoesNotExist:
+    """
+    MTN Mobile Money payment status
+    
+    Reads the payment row, which the MTN callback and the reconcile_momo worker
+    keep up to date; when neither is deployed, the poll checks MTN itself.
+    """
+    payments = Payment.objects.filter(
+        transaction_id=transaction_id,
+        order__user=request.user
+    ).values('status', 'order_id', 'gateway_response')
+    payment = payments.first()
+    
+    if payment is None:
         return Response(
             {'error': 'Payment not found'},
             status=status.HTTP_404_NOT_FOUND
         )
-    except Exception as e:
-        return Response(
-            {'error': str(e)},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
+    
+    if payment['status'] == 'pending' and inline_status_checks() and reconcile_payment(transaction_id):
+        payment = payments.first()
+    
+    gateway_response = payment['gateway_response'] or {}
+    return Response({
+        'success': True,
+        'status': gateway_response.get('status') or payment['status'].upper(),
+        'transaction_id': transaction_id,
+        'order_id': payment['order_id'],
+        'financial_transaction_id': gateway_response.get('financial_transaction_id')
+        or gateway_response.get('financialTransactionId'),
+        'payment_status': payment['status']
+    })
+
+
+@api_view(['POST', 'PUT'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def mtn_momo_callback(request, token):
+    """Final request-to-pay status pushed by MTN to the signed X-Callback-Url"""
+    transaction_id = unsign_callback_token(token)
+    if transaction_id is None:
+        return Response({'error': 'Invalid callback'}, status=status.HTTP_404_NOT_FOUND)
+    
+    gateway_status = request.data.get('status')
+    if not gateway_status:
+        return Response({'error': 'status is required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    payment_status = apply_payment_status(transaction_id, gateway_status, dict(request.data))
+    if payment_status is None:
+        return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({'success': True, 'payment_status': payment_status})
 
 
 @api_view(['POST'])
@@ -738,13 +723,14 @@ def cancel_mtn_momo_payment(request):
         )
     
     try:
-        payment = Payment.objects.get(
-            transaction_id=transaction_id,
-            order__user=request.user,
-            status='pending'
-        )
-        
+        # Locked like apply_payment_status, so a cancel can't overwrite a
+        # payment a concurrent callback has just completed
         with transaction.atomic():
+            payment = Payment.objects.select_for_update().select_related('order').get(
+                transaction_id=transaction_id,
+                order__user=request.user,
+                status='pending'
+            )
             payment.status = 'cancelled'
             payment.order.status = 'cancelled'
             payment.save()